@@ -5,11 +5,26 @@ Server-side only. The API key is read from config (MESHY_API_KEY) and must never
 be exposed to the browser. All generation is asynchronous on Meshy's side; this
 module only starts tasks, queries their status, and downloads finished assets.
 
+All traffic goes through one pooled requests.Session, so connections to
+Meshy and its asset CDN are kept alive and reused. 429, 5xx and dropped
+connections are retried with exponential backoff and full jitter, and a
+Retry-After header takes precedence over the computed delay. Task-creating
+POSTs are only retried when Meshy cannot have started the task (429/503,
+or a connect timeout), so a retry never bills a second generation. An interrupted asset download resumes with a Range request
+instead of starting over.
+
 Docs: https://docs.meshy.ai/en/api/text-to-3d , https://docs.meshy.ai/en/api/image-to-3d
 """
 
+import email.utils
 import logging
+import random
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
 import config
 
 logger = logging.getLogger(__name__)
@@ -22,6 +37,14 @@ FAILED = "FAILED"
 CANCELED = "CANCELED"
 
 
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A POST answered with one of these was not acted on; safe to send again.
+_POST_RETRY_STATUSES = {429, 503}
+
+_session = None
+_session_lock = threading.Lock()
+
+
 class MeshyError(RuntimeError):
     pass
 
@@ -59,9 +82,70 @@ def _require_data_uri(image_data_uri: str) -> str:
     return value
 
 
+def _http() -> requests.Session:
+    """The process-wide pooled session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            size = getattr(config, "MESHY_POOL_SIZE", 8)
+            # Retries are ours (below), so the adapter must not retry itself.
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size, max_retries=0)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _retry_delay(attempt: int, response=None) -> float:
+    cap = getattr(config, "MESHY_BACKOFF_MAX_SECONDS", 30.0)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+        try:
+            when = email.utils.parsedate_to_datetime(retry_after)
+            return min(cap, max(0.0, when.timestamp() - time.time()))
+        except (TypeError, ValueError):
+            pass  # unparseable; fall back to backoff
+    base = getattr(config, "MESHY_BACKOFF_SECONDS", 0.5)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _request(method: str, url: str, **kwargs) -> requests.Response:
+    """session.request with retries; returns the final response.
+
+    Raises requests.RequestException once the retries are used up on
+    connection errors. An error status that outlives the retries is
+    returned for the caller to report.
+    """
+    retries = getattr(config, "MESHY_MAX_RETRIES", 4)
+    idempotent = method != "POST"
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        try:
+            r = _http().request(method, url, **kwargs)
+        except requests.RequestException as e:
+            # A connect timeout never reached Meshy; anything later might have.
+            retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+            if last or not retryable:
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning("Meshy %s %s failed (%s); retrying in %.1fs", method, url, e, delay)
+        else:
+            retryable = r.status_code in (_RETRY_STATUSES if idempotent else _POST_RETRY_STATUSES)
+            if last or not retryable:
+                return r
+            delay = _retry_delay(attempt, r)
+            logger.warning("Meshy %s %s -> %s; retrying in %.1fs", method, url, r.status_code, delay)
+            r.close()
+        time.sleep(delay)
+
+
 def _post(url: str, payload: dict) -> dict:
     try:
-        r = requests.post(url, json=payload, headers=_headers(), timeout=60)
+        r = _request("POST", url, json=payload, headers=_headers(), timeout=60)
     except requests.RequestException as e:
         raise MeshyError(f"Meshy request failed: {e}")
     if r.status_code == 429:
@@ -76,7 +160,7 @@ def _post(url: str, payload: dict) -> dict:
 
 def _get(url: str) -> dict:
     try:
-        r = requests.get(url, headers=_headers(), timeout=60)
+        r = _request("GET", url, headers=_headers(), timeout=60)
     except requests.RequestException as e:
         raise MeshyError(f"Meshy request failed: {e}")
     if r.status_code >= 400:
@@ -140,14 +224,13 @@ def start_image_to_3d(image_data_uri: str) -> str:
 # --------------------------------------------------------------------------- #
 #  Query + download
 # --------------------------------------------------------------------------- #
-def get_task(kind: str, task_id: str) -> dict:
-    """kind: 'text' (v2/text-to-3d) or 'image' (v1/image-to-3d)."""
-    if kind == "image":
-        url = f"{_base()}/v1/image-to-3d/{task_id}"
-    else:
-        url = f"{_base()}/v2/text-to-3d/{task_id}"
-    data = _get(url)
+def _task_path(kind: str) -> str:
+    return "v1/image-to-3d" if kind == "image" else "v2/text-to-3d"
+
+
+def _task_dict(data: dict) -> dict:
     return {
+        "id": data.get("id"),
         "status": data.get("status"),
         "progress": int(data.get("progress") or 0),
         "model_urls": data.get("model_urls") or {},
@@ -157,19 +240,91 @@ def get_task(kind: str, task_id: str) -> dict:
     }
 
 
+def get_task(kind: str, task_id: str) -> dict:
+    """kind: 'text' (v2/text-to-3d) or 'image' (v1/image-to-3d)."""
+    return _task_dict(_get(f"{_base()}/{_task_path(kind)}/{task_id}"))
+
+
+def list_tasks(kind: str, page_size: int = 50) -> dict:
+    """The account's most recent tasks of a kind, newest first, by task id.
+
+    One request covers every in-flight job of that kind as long as no more
+    than page_size tasks were created since; callers fall back to get_task
+    for ids that aren't in the page.
+    """
+    page_size = max(1, min(50, page_size))  # Meshy caps pages at 50
+    data = _get(f"{_base()}/{_task_path(kind)}?page_size={page_size}&sort_by=-created_at")
+    if not isinstance(data, list):
+        raise MeshyError("Unexpected Meshy task list response")
+    return {task["id"]: task for task in map(_task_dict, data) if task["id"]}
+
+
 def download(url: str, dest_path: str) -> bool:
-    """Download a finished asset (GLB/USDZ) to dest_path."""
-    try:
-        with requests.get(url, stream=True, timeout=180) as r:
-            if r.status_code >= 400:
-                raise MeshyError(f"Download failed {r.status_code}: {url}")
-            with open(dest_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=65536):
-                    if chunk:
-                        f.write(chunk)
-        return True
-    except requests.RequestException as e:
-        raise MeshyError(f"Download failed: {e}")
+    """Download a finished asset (GLB/USDZ) to dest_path.
+
+    One retry loop covers both failed requests and bodies that drop midway.
+    The session is called directly rather than through _request, so the
+    attempts don't multiply. After a drop the download resumes from the
+    bytes already on disk with a Range request. A 206 is appended only if
+    its Content-Range starts exactly there. A server that ignores Range
+    (200) or answers from elsewhere restarts the file.
+    """
+    retries = getattr(config, "MESHY_MAX_RETRIES", 4)
+    have = 0
+    with open(dest_path, "wb") as f:
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            headers = {"Range": f"bytes={have}-"} if have else {}
+            try:
+                with _http().get(url, stream=True, timeout=180, headers=headers) as r:
+                    if r.status_code == 416 and have and _complete(r, have):
+                        return True
+                    if r.status_code in _RETRY_STATUSES and not last:
+                        delay = _retry_delay(attempt, r)
+                        logger.warning("Download of %s -> %s; retrying in %.1fs",
+                                       url, r.status_code, delay)
+                        time.sleep(delay)
+                        continue
+                    if r.status_code >= 400:
+                        raise MeshyError(f"Download failed {r.status_code}: {url}")
+                    start = _range_start(r) if r.status_code == 206 else 0
+                    if start != have:
+                        if start != 0:
+                            # Neither our offset nor the beginning: ask again for all of it.
+                            logger.warning("Download of %s resumed at byte %s, not %d; restarting",
+                                           url, start, have)
+                        f.seek(0)
+                        f.truncate()
+                        have = 0
+                        if start != 0:
+                            continue
+                    for chunk in r.iter_content(chunk_size=65536):
+                        if chunk:
+                            f.write(chunk)
+                            have += len(chunk)
+                return True
+            except requests.RequestException as e:
+                if last:
+                    raise MeshyError(f"Download failed: {e}")
+                f.flush()
+                delay = _retry_delay(attempt)
+                logger.warning("Download of %s dropped at %d bytes (%s); resuming in %.1fs",
+                               url, have, e, delay)
+                time.sleep(delay)
+    raise MeshyError(f"Download failed: {url} never returned a usable range")
+
+
+def _range_start(response):
+    """First byte of a 206 body per its Content-Range, or None if unreadable."""
+    unit, _, spec = response.headers.get("Content-Range", "").partition(" ")
+    first = spec.partition("-")[0]
+    return int(first) if unit == "bytes" and first.isdigit() else None
+
+
+def _complete(response, have: int) -> bool:
+    """A 416 for bytes=have- means done when the total size is `have`."""
+    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    return total.isdigit() and int(total) == have
 
 
 # --------------------------------------------------------------------------- #
@@ -237,7 +392,7 @@ def fetch_image_as_data_uri(url: str, max_bytes: int = _MAX_IMAGE_DOWNLOAD) -> s
     import base64
 
     try:
-        with requests.get(url, stream=True, timeout=120) as r:
+        with _request("GET", url, stream=True, timeout=120) as r:
             if r.status_code >= 400:
                 raise MeshyError(f"Image download failed {r.status_code}")
             mime = (r.headers.get("Content-Type") or "image/png").split(";")[0]
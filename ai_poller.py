@@ -0,0 +1,330 @@
+"""
+AI Poller
+Background loop that advances in-flight Meshy generation jobs.
+
+The generate-3d status endpoint used to drive the job state machine: each
+browser poll made a synchronous Meshy call from a gunicorn thread, so every
+open tab added outbound API traffic. Whichever poll first saw success then
+downloaded the GLB and registered the model inside the request. Now one
+loop per host advances every AIGenerationJob still generating, and the
+status endpoint only reads the row.
+
+Status checks are batched. Each round makes one task-list request per
+Meshy kind (text / image) and looks up only the tasks missing from that
+page one by one. Each job is rechecked on its own adaptive interval: the
+interval shrinks while its progress moves and grows while it stalls, within
+AI_POLL_MIN_SECONDS..AI_POLL_MAX_SECONDS. Finalization (download and
+register_glb_as_model) runs on a small thread pool, so a slow download
+doesn't hold up the other jobs. A finalizing claim is a lease that the
+finalizer renews while it runs, so a finalizer that died is noticed within
+AI_FINALIZE_LEASE_SECONDS, however long a healthy download takes. Each
+claim counts as an attempt; after AI_FINALIZE_MAX_ATTEMPTS the job fails
+instead of downloading (and spending the poller's time) forever.
+
+The loop starts lazily in any process that handles a generation (and in
+worker.py). A leader key in shared state lets only one of them talk to
+Meshy at a time. Stage changes still go through claim_stage, so even two
+loops on different hosts can't start a refine twice or register a model
+twice.
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+
+import ai_generator
+from models import AIGenerationJob, db
+from shared_state import get_state
+
+logger = logging.getLogger(__name__)
+
+AI_POLL_MIN_SECONDS = float(os.environ.get("AI_POLL_MIN_SECONDS", 2))
+AI_POLL_MAX_SECONDS = float(os.environ.get("AI_POLL_MAX_SECONDS", 20))
+# How often an idle loop looks for new jobs (a DB read, no Meshy call).
+AI_POLL_IDLE_SECONDS = float(os.environ.get("AI_POLL_IDLE_SECONDS", 2))
+AI_FINALIZE_WORKERS = int(os.environ.get("AI_FINALIZE_WORKERS", 2))
+# Lease on a finalizing claim; the finalizer renews it every third of this.
+AI_FINALIZE_LEASE_SECONDS = int(os.environ.get("AI_FINALIZE_LEASE_SECONDS", 60))
+AI_FINALIZE_MAX_ATTEMPTS = int(os.environ.get("AI_FINALIZE_MAX_ATTEMPTS", 3))
+
+_LEADER_KEY = "ai-poller:leader"
+_LEADER_TTL = max(10, int(AI_POLL_MAX_SECONDS * 3))
+_ID = uuid.uuid4().hex
+
+# stage being polled -> (Meshy kind, task id column)
+_POLLED_STAGES = {
+    "image": ("image", "meshy_image_id"),
+    "preview": ("text", "meshy_preview_id"),
+    "refine": ("text", "meshy_refine_id"),
+}
+# job kind -> stage to resume polling from after a failed finalize
+_FINALIZE_FROM = {"image": "image", "text": "refine"}
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_schedule = {}  # job_id -> (next_check, interval)
+_thread = None
+_executor = None
+
+
+def claim_stage(job_id, expect_stage, new_stage, **values):
+    """Atomically move a job between stages with UPDATE ... WHERE stage=...
+
+    Exactly one caller wins; this keeps a refine from being started twice
+    (duplicate Meshy credits) and a model from being registered twice, even
+    with more than one loop running. `values` are written in the same UPDATE.
+    """
+    claimed = AIGenerationJob.query.filter_by(
+        id=job_id, stage=expect_stage
+    ).update({"stage": new_stage, **values}, synchronize_session=False)
+    db.session.commit()
+    return bool(claimed)
+
+
+def ensure_running(flask_app, finalize):
+    """Start this process's poller thread if needed and wake it.
+
+    finalize(job, task) downloads and registers a finished job; it runs in
+    an app context on the finalizer pool. Under TESTING no thread is
+    started; tests drive poll_once() themselves.
+    """
+    global _thread
+    if flask_app.config.get("TESTING"):
+        return
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(
+                target=_run, args=(flask_app, finalize), name="ai-poller", daemon=True
+            )
+            _thread.start()
+    _wake.set()
+
+
+def _is_leader():
+    state = get_state()
+    if state.add(_LEADER_KEY, _ID, ttl=_LEADER_TTL) or state.get(_LEADER_KEY) == _ID:
+        state.set(_LEADER_KEY, _ID, ttl=_LEADER_TTL)
+        return True
+    return False
+
+
+def _run(flask_app, finalize):
+    while True:
+        delay = AI_POLL_IDLE_SECONDS
+        try:
+            if _is_leader():
+                with flask_app.app_context():
+                    try:
+                        poll_once(flask_app, finalize)
+                    finally:
+                        db.session.remove()
+                with _lock:
+                    if _schedule:
+                        soonest = min(next_check for next_check, _ in _schedule.values())
+                        delay = max(0.1, min(delay, soonest - time.monotonic()))
+        except Exception as e:
+            logger.error(f"[ai-poller] loop error: {e}", exc_info=True)
+        _wake.wait(delay)
+        _wake.clear()
+
+
+def _finalizer():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=AI_FINALIZE_WORKERS, thread_name_prefix="ai-finalize"
+            )
+        return _executor
+
+
+def _reschedule(job_id, moved, now):
+    _, interval = _schedule.get(job_id, (now, AI_POLL_MIN_SECONDS))
+    interval = interval / 2 if moved else interval * 1.5
+    interval = min(AI_POLL_MAX_SECONDS, max(AI_POLL_MIN_SECONDS, interval))
+    _schedule[job_id] = (now + interval, interval)
+
+
+def _fetch(due):
+    """Current Meshy task for each due job, keyed by task id."""
+    wanted = {}
+    for job in due:
+        kind, column = _POLLED_STAGES[job.stage]
+        wanted.setdefault(kind, set()).add(getattr(job, column))
+    tasks = {}
+    for kind, ids in wanted.items():
+        try:
+            page = ai_generator.list_tasks(kind, page_size=2 * len(ids) + 10)
+            tasks.update((task_id, page[task_id]) for task_id in ids if task_id in page)
+        except ai_generator.MeshyError as e:
+            logger.warning(f"[ai-poller] {kind} task list failed, checking one by one: {e}")
+        for task_id in ids - tasks.keys():
+            try:
+                tasks[task_id] = ai_generator.get_task(kind, task_id)
+            except ai_generator.MeshyError as e:
+                logger.warning(f"[ai-poller] task {task_id} check failed: {e}")
+    return tasks
+
+
+def poll_once(flask_app, finalize, now=None):
+    """One round over due jobs; returns the finalize futures it started."""
+    now = now if now is not None else time.monotonic()
+    _recover_stuck_finalizers()
+    jobs = AIGenerationJob.query.filter(AIGenerationJob.status == "generating").all()
+    with _lock:
+        live = {job.id for job in jobs}
+        for job_id in list(_schedule):
+            if job_id not in live:
+                del _schedule[job_id]
+        due = [
+            job for job in jobs
+            if job.stage in _POLLED_STAGES
+            and getattr(job, _POLLED_STAGES[job.stage][1])
+            and _schedule.get(job.id, (now, None))[0] <= now
+        ]
+    if not due:
+        return []
+
+    # Each commit below expires the session (and another loop may move a
+    # job on meanwhile), so pin the stage and task id seen here.
+    seen = [(job.stage, getattr(job, _POLLED_STAGES[job.stage][1])) for job in due]
+    tasks = _fetch(due)
+    futures = []
+    for job, (stage, task_id) in zip(due, seen):
+        task = tasks.get(task_id)
+        if task is None:
+            with _lock:
+                _reschedule(job.id, False, now)
+            continue
+        before = job.progress
+        try:
+            future = _advance(flask_app, job, stage, task, finalize)
+        except Exception as e:
+            logger.error(f"[ai-poller] advancing job {job.id} failed: {e}", exc_info=True)
+            db.session.rollback()
+            future = None
+        if future is not None:
+            futures.append(future)
+        with _lock:
+            _reschedule(job.id, job.progress != before, now)
+    return futures
+
+
+def _advance(flask_app, job, stage, task, finalize):
+    """Apply one task status to a job seen at `stage`; returns a future if
+    the job was handed to the finalizer."""
+    status = task["status"]
+    failed = status in (ai_generator.FAILED, ai_generator.CANCELED)
+    if stage == "preview":
+        job.progress = min(49, task["progress"] // 2)
+        if status == ai_generator.SUCCEEDED and claim_stage(job.id, "preview", "refining"):
+            try:
+                refine_id = ai_generator.start_refine(job.meshy_preview_id)
+            except Exception:
+                claim_stage(job.id, "refining", "preview")  # retry next round
+                raise
+            job.meshy_refine_id = refine_id
+            job.stage = "refine"
+            job.progress = 50
+        elif failed:
+            job.status = "failed"
+            job.error = task.get("task_error") or "Preview failed"
+    else:
+        job.progress = min(99, task["progress"] if stage == "image"
+                           else 50 + task["progress"] // 2)
+        if status == ai_generator.SUCCEEDED:
+            if claim_stage(
+                job.id, stage, "finalizing",
+                finalize_attempts=AIGenerationJob.finalize_attempts + 1,
+                finalize_lease_expires_at=_lease_deadline(),
+            ):
+                return _finalizer().submit(_finalize, flask_app, job.id, task, finalize)
+        elif failed:
+            job.status = "failed"
+            job.error = task.get("task_error") or (
+                "Generation failed" if stage == "image" else "Texturing failed"
+            )
+    db.session.commit()
+    return None
+
+
+def _lease_deadline():
+    return datetime.utcnow() + timedelta(seconds=AI_FINALIZE_LEASE_SECONDS)
+
+
+@contextlib.contextmanager
+def _finalize_lease(flask_app, job_id):
+    """Renew the job's finalizing lease from a background thread."""
+    stop = threading.Event()
+
+    def renew():
+        with flask_app.app_context():
+            while not stop.wait(AI_FINALIZE_LEASE_SECONDS / 3):
+                try:
+                    AIGenerationJob.query.filter_by(id=job_id, stage="finalizing").update(
+                        {"finalize_lease_expires_at": _lease_deadline()},
+                        synchronize_session=False,
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    logger.warning(f"[ai-poller] finalize lease renewal for {job_id} failed: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=renew, name=f"ai-lease-{job_id[:8]}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join(timeout=AI_FINALIZE_LEASE_SECONDS / 3)
+
+
+def _finalize(flask_app, job_id, task, finalize):
+    with flask_app.app_context():
+        try:
+            with _finalize_lease(flask_app, job_id):
+                finalize(db.session.get(AIGenerationJob, job_id), task)
+        except Exception as e:
+            logger.error(f"[ai-poller] finalizing job {job_id} failed: {e}", exc_info=True)
+            db.session.rollback()
+            _release(db.session.get(AIGenerationJob, job_id), str(e))
+        finally:
+            db.session.remove()
+
+
+def _release(job, reason):
+    """Give a failed or abandoned finalizing claim back to polling (the next
+    round retries the download), or fail the job once it is out of attempts."""
+    if job.finalize_attempts >= AI_FINALIZE_MAX_ATTEMPTS:
+        logger.error(
+            f"[ai-poller] job {job.id} failed to finalize {job.finalize_attempts} times; giving up"
+        )
+        claim_stage(job.id, "finalizing", "finalizing", status="failed",
+                    error=f"Could not save the generated model: {reason}"[:500],
+                    finalize_lease_expires_at=None)
+    else:
+        claim_stage(job.id, "finalizing", _FINALIZE_FROM[job.kind],
+                    finalize_lease_expires_at=None)
+
+
+def _recover_stuck_finalizers():
+    expired = AIGenerationJob.query.filter(
+        AIGenerationJob.status == "generating",
+        AIGenerationJob.stage == "finalizing",
+        or_(
+            AIGenerationJob.finalize_lease_expires_at.is_(None),
+            AIGenerationJob.finalize_lease_expires_at < datetime.utcnow(),
+        ),
+    ).all()
+    for job in expired:
+        logger.warning(f"[ai-poller] job {job.id} lost its finalizer (lease expired)")
+        _release(job, "the finalizer stopped responding")
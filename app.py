@@ -14,6 +14,7 @@ from flask import (
     session,
     make_response,
     abort,
+    Response,
 )
 from flask_wtf.csrf import CSRFProtect
 from flask_login import (
@@ -28,7 +29,7 @@ import logging
 import shutil
 import subprocess
 import threading
-from models import db, User, UserModel, Folder, ModelVersion, ModelLike, ModelSave, ModelHotspot, CameraView, AIGenerationJob, ConversionJob
+from models import db, User, UserModel, Folder, ModelVersion, ModelLike, ModelSave, ModelHotspot, CameraView, AIGenerationJob, ConversionJob, UploadSession
 from auth import auth
 import re
 import traceback
@@ -36,16 +37,47 @@ import uuid
 from flask_migrate import Migrate
 from config import *
 from sqlalchemy.orm import Session
-from sqlalchemy.orm.attributes import flag_modified
-import qrcode
 from slugify import slugify
 import trimesh
 from converters import OBJConverter, FBXConverter, STLConverter
-from converters.glb_optimizer import optimize_glb
+from converters.glb_optimizer import glb_requires_meshopt, optimize_glb
 from converters.glb_quality import finalize_glb
+from converters.meshopt_decoder import decode_glb_file, load_trimesh
+from converters.texture_optimizer import optimize_textures
+from converters.preflight import (
+    PreflightRejected,
+    assess as assess_preflight,
+    estimate_complexity,
+    size_only_mem_mb,
+)
+from converters.tool_runner import ToolCancelled, run_tool
 import numpy as np
-from glb_modifier import modify_glb, normalize_model_to_center
+from glb_modifier import (
+    glb_bounds,
+    modify_glb,
+    normalize_model_to_center,
+    patch_glb_json,
+    recolor_gltf_json,
+)
 from mesh_slicer import slice_mesh, get_mesh_bounds
+from shared_state import get_state
+import version_store
+import mesh_cache
+import edit_queue
+import preview_cache
+import ai_poller
+import qr_cache
+from chunked_upload import (
+    UploadConflict,
+    UploadError,
+    create_session as create_upload,
+    finish_session as finish_upload,
+    mark_finished as mark_upload_finished,
+    session_dir as chunk_session_dir,
+    sweep_stale_sessions,
+    write_chunk,
+)
+from lod_generator import LOD_ENABLED, build_lod_chain, fresh_levels, remove_lod_files
 from pygltflib import GLTF2
 import time
 from version_manager import (
@@ -120,8 +152,9 @@ def load_user(user_id):
 
 
 # Rate limiting — keyed by user id when logged in, client IP otherwise.
-# Default storage is in-process memory (fine for the single-worker gunicorn
-# setup); point RATELIMIT_STORAGE_URI at redis:// when scaling out.
+# Counters live in the shared-state store (shared_state.py, "shared://") so
+# every gunicorn worker counts against the same limit; RATELIMIT_STORAGE_URI
+# can still point the limiter at its own backend (e.g. redis://).
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
@@ -139,7 +172,7 @@ limiter = Limiter(
     key_func=_rate_limit_key,
     app=app,
     default_limits=[],
-    storage_uri=os.environ.get("RATELIMIT_STORAGE_URI", "memory://"),
+    storage_uri=os.environ.get("RATELIMIT_STORAGE_URI", "shared://"),
 )
 
 
@@ -572,7 +605,7 @@ def convert_fbx_to_glb(fbx_path, output_path):
         ]
 
         logger.info(f"Running FBX2glTF command: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_tool("fbx2gltf", cmd, timeout=300)
 
         if result.returncode != 0:
             logger.error(f"FBX conversion failed: {result.stderr}")
@@ -807,47 +840,26 @@ def fix_mtl_paths(content, texture_map):
     return updated_content
 
 
-def generate_qr_code(model_id):
-    """Generate QR code for a model."""
-    try:
-        session = Session(db.engine)
-        model = session.get(UserModel, model_id)
-        if not model:
-            logger.error(f"Model not found with ID: {model_id}")
-            return None
+def _model_view_url(model_id):
+    """Absolute viewer URL for a model (what its QR code encodes).
 
-        # Generate the absolute URL for the model view
-        base_url = request.host_url.rstrip("/")  # Get base URL without trailing slash
-        model_url = f"{base_url}{url_for('view_model', model_id=model_id)}"
-
-        # Create QR code instance
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-
-        # Add data to QR code
-        qr.add_data(model_url)
-        qr.make(fit=True)
-
-        # Create QR code image with proper coloring
-        qr_image = qr.make_image(fill_color="black", back_color="white")
-
-        # Generate unique filename for QR code
-        qr_filename = f"qr_{model_id}_{uuid.uuid4()}.png"
-        qr_path = os.path.join(app.config["CONVERTED_FOLDER"], qr_filename)
+    Built on PUBLIC_BASE_URL when set, so a spoofed Host header can't put a
+    foreign origin into a QR code (or a new entry into its cache).
+    """
+    base = app.config.get("PUBLIC_BASE_URL") or request.host_url
+    return f"{base.rstrip('/')}{url_for('view_model', model_id=model_id)}"
 
-        # Save QR code image
-        qr_image.save(qr_path)
 
-        # Update model with QR code filename
-        model.qr_code = qr_filename
-        db.session.commit()
-
-        logger.info(f"QR code generated successfully: {qr_filename}")
-        return qr_filename
+def generate_qr_code(model_id, fmt="png", size=None):
+    """Render (or reuse) a model's QR code; returns its /qr filename."""
+    try:
+        size = qr_cache.quantize_size(size)
+        url = _model_view_url(model_id)
+        if fmt == "svg":
+            qr_cache.svg(url, size)
+        else:
+            qr_cache.png_path(os.path.join(app.config["CONVERTED_FOLDER"], model_id), url, size)
+        return f"{model_id}.{fmt}"
     except Exception as e:
         logger.error(f"Error generating QR code: {str(e)}")
         return None
@@ -1074,13 +1086,7 @@ def convert_to_usdz(input_glb_path, output_usdz_path):
         logger.info(f"Running Blender command: {cmd}")
 
         # Run conversion
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=300,  # 5 minute timeout
-        )
+        process = run_tool("blender", cmd, timeout=300)  # 5 minute timeout
 
         if process.returncode == 0 and os.path.exists(output_usdz_path):
             logger.info(f"USDZ conversion successful: {output_usdz_path}")
@@ -1146,6 +1152,45 @@ def refresh_usdz_after_edit(model_id, glb_path):
         logger.error(f"[usdz-refresh - {model_id}] Failed to start thread: {e}")
 
 
+def generate_lods_async(model_id, glb_path):
+    """
+    Background task to build the LOD chain for a model and record it.
+    The viewer keeps loading model.glb directly until UserModel.lods is set.
+    """
+    try:
+        logger.info(f"[LOD Async - {model_id}] Starting LOD chain generation")
+        model_dir = os.path.dirname(glb_path)
+        lods = build_lod_chain(glb_path)
+        with app.app_context():
+            model = UserModel.query.get(model_id)
+            if not model:
+                logger.warning(f"[LOD Async - {model_id}] Model not found in database")
+                return
+            model.lods = lods
+            db.session.commit()
+        if lods is None:
+            # An older chain (from before an edit) must not linger on disk.
+            remove_lod_files(model_dir)
+        else:
+            logger.info(
+                f"[LOD Async - {model_id}] {len(lods['levels'])} LOD level(s) recorded"
+            )
+    except Exception as e:
+        logger.error(f"[LOD Async - {model_id}] Error generating LOD chain: {e}")
+
+
+def start_lod_generation(model_id, glb_path):
+    """Kick off generate_lods_async in a daemon thread (no-op if LOD_ENABLED is off)."""
+    if not LOD_ENABLED:
+        return
+    try:
+        threading.Thread(
+            target=generate_lods_async, args=(model_id, glb_path), daemon=True
+        ).start()
+    except Exception as e:
+        logger.error(f"[LOD Async - {model_id}] Failed to start thread: {e}")
+
+
 def generate_thumbnail_async(model_id, input_glb_path, color=None):
     """
     Background task to generate a thumbnail image for a 3D model.
@@ -1403,6 +1448,14 @@ def upload_file():
         file_extension = os.path.splitext(filename)[1].lower()
         logger.info(f"File extension: {file_extension}")
 
+        try:
+            assess_preflight(estimate_complexity(file_path, file_extension))
+        except PreflightRejected as e:
+            shutil.rmtree(upload_subdir, ignore_errors=True)
+            return jsonify({"error": str(e), "estimate": e.estimate}), 413
+        except Exception as e:
+            logger.warning(f"Pre-flight estimate unavailable: {e}")
+
         # Get color settings
         # Handle both string and boolean values for useColor
         use_color_raw = request.form.get("useColor", "false")
@@ -1558,41 +1611,7 @@ def upload_model():
 
     temp_dir = None  # Initialize temp_dir
     try:
-        # Get form data
-        # Handle both string and boolean values for useColor
-        use_color_raw = request.form.get("useColor", "false")
-        if isinstance(use_color_raw, str):
-            use_color = use_color_raw.lower() in ("true", "1", "yes")
-        else:
-            use_color = bool(use_color_raw)
-
-        color = request.form.get("color", "#4CAF50")
-        logger.info(f"Color settings - useColor: {use_color}, color: {color}")
-
-        # Get maximum dimension setting (only if checkbox is checked)
-        use_max_dimension_raw = request.form.get("useMaxDimension")
-        use_max_dimension = (
-            use_max_dimension_raw == "true" if use_max_dimension_raw else False
-        )
-        logger.info(f"useMaxDimension checkbox: {use_max_dimension}")
-
-        max_dimension = None
-        if use_max_dimension:
-            max_dimension_str = request.form.get("maxDimension")
-            if max_dimension_str:
-                try:
-                    max_dimension = (
-                        float(max_dimension_str) / 100.0
-                    )  # Convert cm to meters
-                    logger.info(
-                        f"Maximum dimension limit enabled: {max_dimension_str} cm ({max_dimension} m)"
-                    )
-                except ValueError:
-                    logger.warning(f"Invalid maxDimension value: {max_dimension_str}")
-        else:
-            logger.info(
-                "Maximum dimension limit disabled - model will keep original size"
-            )
+        options = _parse_upload_options(request.form)
 
         # --- Start: Consistent File Handling Logic ---
         unique_id = str(uuid.uuid4())
@@ -1636,59 +1655,16 @@ def upload_model():
                             f"[upload_model - {unique_id}] Texture file saved: {texture_path}"
                         )
 
-        # Build job payload and persist the job. The pipeline itself runs either
-        # inline (default) or in worker.py when JOB_QUEUE is enabled.
-        payload = {
-            "unique_id": unique_id,
-            "original_filename": original_filename,
-            "client_filename": file.filename,
-            "temp_dir": temp_dir,
-            "temp_file_path": temp_file_path,
-            "file_extension": file_extension,
-            "mtl_path": mtl_path,
-            "texture_paths": texture_paths,
-            "use_color": use_color,
-            "color": color,
-            "max_dimension": max_dimension,
-            "source_unit": request.form.get("sourceUnit"),
-            "user_id": current_user.id if current_user.is_authenticated else None,
-        }
-        job = ConversionJob(
-            id=unique_id,
-            job_type="upload",
-            status="pending",
-            payload=payload,
-            user_id=payload["user_id"],
+        return _enqueue_upload_job(
+            unique_id,
+            temp_file_path,
+            original_filename,
+            file.filename,
+            options,
+            user_id=current_user.id if current_user.is_authenticated else None,
+            mtl_path=mtl_path,
+            texture_paths=texture_paths,
         )
-        db.session.add(job)
-        db.session.commit()
-
-        if JOB_QUEUE_ENABLED:
-            # Worker picks it up; frontend polls the status endpoint.
-            return jsonify(
-                {
-                    "success": True,
-                    "job_id": unique_id,
-                    "status": "pending",
-                    "status_url": url_for("upload_job_status", job_id=unique_id),
-                }
-            ), 202
-
-        def run_local_job(job_id):
-            with app.app_context():
-                queued_job = ConversionJob.query.get(job_id)
-                if queued_job:
-                    run_conversion_job(queued_job, allow_retry=False)
-
-        threading.Thread(target=run_local_job, args=(unique_id,), daemon=True).start()
-        return jsonify(
-            {
-                "success": True,
-                "job_id": unique_id,
-                "status": "pending",
-                "status_url": url_for("upload_job_status", job_id=unique_id),
-            }
-        ), 202
 
     except Exception as e:
         if temp_dir and os.path.exists(temp_dir):
@@ -1703,6 +1679,281 @@ def upload_model():
         return jsonify({"error": str(e)}), 500
 
 
+def _parse_upload_options(values):
+    """Conversion options from the upload form (or a chunked session's JSON)."""
+    # Handle both string and boolean values for useColor
+    use_color_raw = values.get("useColor", "false")
+    if isinstance(use_color_raw, str):
+        use_color = use_color_raw.lower() in ("true", "1", "yes")
+    else:
+        use_color = bool(use_color_raw)
+
+    color = values.get("color", "#4CAF50")
+    logger.info(f"Color settings - useColor: {use_color}, color: {color}")
+
+    # Get maximum dimension setting (only if checkbox is checked)
+    use_max_dimension_raw = values.get("useMaxDimension")
+    use_max_dimension = str(use_max_dimension_raw).lower() == "true"
+    logger.info(f"useMaxDimension checkbox: {use_max_dimension}")
+
+    max_dimension = None
+    if use_max_dimension:
+        max_dimension_str = values.get("maxDimension")
+        if max_dimension_str:
+            try:
+                max_dimension = float(max_dimension_str) / 100.0  # Convert cm to meters
+                logger.info(
+                    f"Maximum dimension limit enabled: {max_dimension_str} cm ({max_dimension} m)"
+                )
+            except ValueError:
+                logger.warning(f"Invalid maxDimension value: {max_dimension_str}")
+    else:
+        logger.info("Maximum dimension limit disabled - model will keep original size")
+
+    return {
+        "use_color": use_color,
+        "color": color,
+        "max_dimension": max_dimension,
+        "source_unit": values.get("sourceUnit"),
+    }
+
+
+def _enqueue_upload_job(unique_id, temp_file_path, original_filename, client_filename,
+                        options, user_id=None, mtl_path=None, texture_paths=None):
+    """Pre-flight a staged upload and turn it into a ConversionJob.
+
+    The model file must already sit in TEMP_FOLDER/<unique_id>/. Shared by
+    the multipart upload and the chunked upload completion; returns the
+    Flask response for either.
+    """
+    temp_dir = os.path.dirname(temp_file_path)
+    file_extension = os.path.splitext(original_filename)[1].lower()
+
+    # Pre-flight: size the model from its headers before any conversion
+    # work. Over-limit uploads are refused here instead of after a full
+    # load; large ones go to the "heavy" lane. An unreadable header is
+    # not fatal — the converter reports real parse errors better.
+    estimate, lane = None, "standard"
+    try:
+        estimate = estimate_complexity(temp_file_path, file_extension)
+        lane = assess_preflight(estimate)
+        logger.info(
+            f"[upload_model - {unique_id}] Pre-flight: ~{estimate['triangles']} tris, "
+            f"~{estimate['vertices']} verts, ~{estimate['peak_mem_mb']} MB "
+            f"({estimate['method']}) -> {lane} lane"
+        )
+    except PreflightRejected as e:
+        logger.warning(f"[upload_model - {unique_id}] Rejected at pre-flight: {e}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return jsonify({"error": str(e), "estimate": e.estimate}), 413
+    except Exception as e:
+        logger.warning(f"[upload_model - {unique_id}] Pre-flight estimate unavailable: {e}")
+
+    # Build job payload and persist the job. The pipeline itself runs either
+    # inline (default) or in worker.py when JOB_QUEUE is enabled.
+    payload = {
+        "unique_id": unique_id,
+        "original_filename": original_filename,
+        "client_filename": client_filename,
+        "temp_dir": temp_dir,
+        "temp_file_path": temp_file_path,
+        "file_extension": file_extension,
+        "mtl_path": mtl_path,
+        "texture_paths": texture_paths or [],
+        "use_color": options["use_color"],
+        "color": options["color"],
+        "max_dimension": options["max_dimension"],
+        "source_unit": options["source_unit"],
+        "user_id": user_id,
+        "estimate": estimate,
+    }
+    job = ConversionJob(
+        id=unique_id,
+        job_type="upload",
+        status="pending",
+        payload=payload,
+        user_id=user_id,
+        estimated_triangles=estimate["triangles"] if estimate else None,
+        # Without a header estimate, size it from the file so the worker's
+        # fast lane (which filters on this column) can still see the job.
+        estimated_mem_mb=(
+            estimate["peak_mem_mb"] if estimate
+            else size_only_mem_mb(os.path.getsize(temp_file_path), file_extension)
+        ),
+        lane=lane,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    if not JOB_QUEUE_ENABLED:
+        # No worker: run the pipeline in a background thread of this process.
+        def run_local_job(job_id):
+            with app.app_context():
+                queued_job = ConversionJob.query.get(job_id)
+                if queued_job:
+                    run_conversion_job(queued_job, allow_retry=False)
+
+        threading.Thread(target=run_local_job, args=(unique_id,), daemon=True).start()
+
+    # Either way the frontend polls the status endpoint.
+    return _job_accepted_response(unique_id)
+
+
+def _job_accepted_response(job_id, status="pending"):
+    return jsonify(
+        {
+            "success": True,
+            "job_id": job_id,
+            "status": status,
+            "status_url": url_for("upload_job_status", job_id=job_id),
+        }
+    ), 202
+
+
+def _upload_session_or_error(upload_id):
+    """Load an upload session the current client may write to."""
+    session = UploadSession.query.get(upload_id)
+    if not session:
+        return None, (jsonify({"success": False, "error": "Upload not found"}), 404)
+    user_id = current_user.id if current_user.is_authenticated else None
+    if session.user_id is not None and session.user_id != user_id:
+        return None, (jsonify({"success": False, "error": "Upload not found"}), 404)
+    return session, None
+
+
+def _upload_offset_response(session, status=200, **extra):
+    response = jsonify({"success": True, **session.to_dict(), **extra})
+    response.status_code = status
+    response.headers["Upload-Offset"] = str(session.offset)
+    response.headers["Upload-Length"] = str(session.total_size)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@app.route("/api/uploads", methods=["POST"])
+@limiter.limit("30 per hour")
+def create_upload_session():
+    """Open a resumable chunked upload (see chunked_upload.py).
+
+    JSON body: {filename, size, sha256?, options?} where options carries the
+    same fields as the /upload_model form. Chunks are then PUT to upload_url.
+    """
+    data = request.get_json(silent=True) or {}
+    original_filename = secure_filename(data.get("filename") or "")
+    if not original_filename:
+        return jsonify({"success": False, "error": "No file selected"}), 400
+    if not allowed_file(original_filename):
+        return jsonify({"success": False, "error": "File type not allowed"}), 400
+    try:
+        total_size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "File size is required"}), 400
+
+    sweep_stale_sessions(app.config["TEMP_FOLDER"])
+    options = dict(data.get("options") or {})
+    options["client_filename"] = data.get("filename")
+    try:
+        session = create_upload(
+            app.config["TEMP_FOLDER"],
+            str(uuid.uuid4()),
+            original_filename,
+            total_size,
+            user_id=current_user.id if current_user.is_authenticated else None,
+            expected_sha256=data.get("sha256"),
+            options=options,
+        )
+    except UploadError as e:
+        return jsonify({"success": False, "error": str(e)}), 413
+    logger.info(
+        f"[chunked_upload - {session.id}] Session opened for {original_filename} "
+        f"({total_size} bytes, {session.chunk_size}-byte chunks)"
+    )
+    upload_url = url_for("upload_session", upload_id=session.id)
+    response = _upload_offset_response(session, status=201, upload_url=upload_url)
+    response.headers["Location"] = upload_url
+    return response
+
+
+@app.route("/api/uploads/<upload_id>", methods=["GET", "HEAD", "PUT", "DELETE"])
+def upload_session(upload_id):
+    """Query (GET/HEAD), append a chunk to (PUT) or abort (DELETE) an upload.
+
+    PUT needs an Upload-Offset header equal to the current offset; a
+    mismatch returns 409 with the offset to resume from. The chunk that
+    completes the file hands it straight to the conversion job queue and
+    returns the same 202 payload as /upload_model. If queueing fails the
+    session stays open at its full offset, so an empty PUT at that offset
+    retries the hand-off; repeating it after success returns the same job.
+    """
+    session, error = _upload_session_or_error(upload_id)
+    if error:
+        return error
+
+    if request.method in ("GET", "HEAD"):
+        return _upload_offset_response(session)
+
+    temp_folder = app.config["TEMP_FOLDER"]
+    if request.method == "DELETE":
+        if session.status == "uploading":
+            shutil.rmtree(chunk_session_dir(temp_folder, session), ignore_errors=True)
+            db.session.delete(session)
+            db.session.commit()
+        return jsonify({"success": True})
+
+    existing_job = db.session.get(ConversionJob, session.id)
+    if existing_job:
+        # The hand-off already happened (the client lost our 202, or the
+        # session update after it failed): answer with the same job.
+        if session.status != "completed":
+            session.status = "completed"
+            db.session.commit()
+        return _job_accepted_response(existing_job.id, existing_job.status)
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        return jsonify({"success": False, "error": "Upload-Offset header is required"}), 400
+    retrying_finish = offset == session.offset == session.total_size and not request.content_length
+    if not retrying_finish:
+        try:
+            write_chunk(temp_folder, session, offset, request.stream, request.content_length)
+        except UploadConflict:
+            return _upload_offset_response(session, status=409)
+        except UploadError as e:
+            return jsonify({"success": False, "error": str(e), "offset": session.offset}), 400
+
+    if session.offset < session.total_size:
+        return _upload_offset_response(session)
+
+    try:
+        temp_file_path = finish_upload(temp_folder, session)
+    except UploadError as e:
+        shutil.rmtree(chunk_session_dir(temp_folder, session), ignore_errors=True)
+        return jsonify({"success": False, "error": str(e)}), 422
+    logger.info(f"[chunked_upload - {session.id}] Upload complete, sha256 {session.sha256}")
+    options = session.options or {}
+    try:
+        response, status = _enqueue_upload_job(
+            session.id,
+            temp_file_path,
+            session.filename,
+            options.get("client_filename") or session.filename,
+            _parse_upload_options(options),
+            user_id=session.user_id,
+        )
+    except Exception as e:
+        # Keep the bytes and leave the session open: the client retries the
+        # hand-off instead of uploading the whole file again.
+        db.session.rollback()
+        logger.error(f"[chunked_upload - {session.id}] Could not queue conversion: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e), "retry": True}), 500
+    # Only now is the upload done; a pre-flight rejection already removed
+    # the staged bytes, so that session is over too.
+    mark_upload_finished(session, "completed" if status == 202 else "failed")
+    return response, status
+
+
 JOB_QUEUE_ENABLED = os.environ.get("JOB_QUEUE", "false").lower() in (
     "true",
     "1",
@@ -1715,7 +1966,23 @@ JOB_QUEUE_ENABLED = os.environ.get("JOB_QUEUE", "false").lower() in (
 UPLOAD_STALL_SECONDS = int(os.environ.get("UPLOAD_STALL_SECONDS", "360"))
 
 
-def update_conversion_progress(job, *, progress=None, stage=None, detail=None):
+def _write_job(job, owner, **values):
+    """Write ConversionJob columns only while `owner` still holds the job.
+
+    owner is the worker_id the job was claimed under (None for inline runs,
+    which are written unconditionally). A worker that lost its lease must
+    not overwrite the result of the worker that took the job over, so the
+    UPDATE is fenced on worker_id; returns False when it matched nothing.
+    """
+    query = ConversionJob.query.filter(ConversionJob.id == job.id)
+    if owner is not None:
+        query = query.filter(ConversionJob.worker_id == owner)
+    updated = query.update(values, synchronize_session=False)
+    db.session.commit()
+    return bool(updated)
+
+
+def update_conversion_progress(job, *, progress=None, stage=None, detail=None, owner=None):
     payload = dict(job.payload or {})
     if progress is not None:
         payload["progress"] = int(max(0, min(100, progress)))
@@ -1723,58 +1990,84 @@ def update_conversion_progress(job, *, progress=None, stage=None, detail=None):
         payload["stage"] = stage
     if detail is not None:
         payload["detail"] = detail
-    job.payload = payload
-    flag_modified(job, "payload")
-    db.session.commit()
+    return _write_job(job, owner, payload=payload)
 
 
-def run_conversion_job(job, allow_retry=True):
+def run_conversion_job(job, allow_retry=True, cancel_event=None):
     """Run a ConversionJob through the pipeline with status transitions.
 
     Failure puts the job back to 'pending' while attempts remain (so the
     worker retries), or 'failed' otherwise. Inline callers pass
     allow_retry=False because nothing would re-poll a pending job.
+
+    A worker passes the cancel_event its lease heartbeat sets when the lease
+    is lost. The pipeline then stops at its next progress report. Every
+    write after the start is fenced on the claiming worker_id, so a worker
+    that lost the job never commits a result over the new owner's.
+
+    Returns the status written ('completed', 'pending' or 'failed'), or
+    None when the lease was lost and nothing was recorded. The fenced
+    writes skip the session, so job.status itself still reads 'processing'.
     """
+    owner = job.worker_id
     job.status = "processing"
     job.started_at = datetime.utcnow()
     job.attempts = (job.attempts or 0) + 1
     db.session.commit()
-    update_conversion_progress(
-        job,
-        progress=45,
-        stage="Starting conversion",
-        detail="The model has been received and the converter is starting.",
-    )
+
+    def lost():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def report(progress, stage, detail):
+        if lost() or not update_conversion_progress(
+            job, progress=progress, stage=stage, detail=detail, owner=owner
+        ):
+            raise ToolCancelled("Lost the job lease to another worker")
+
     try:
-        model_id = _run_upload_pipeline(
-            job.payload,
-            progress_callback=lambda progress, stage, detail: update_conversion_progress(
-                job, progress=progress, stage=stage, detail=detail
-            ),
-        )
-        job.model_id = model_id
-        job.status = "completed"
-        job.error = None
-        job.finished_at = datetime.utcnow()
-        db.session.commit()
+        report(45, "Starting conversion",
+               "The model has been received and the converter is starting.")
+        model_id = _run_upload_pipeline(job.payload, progress_callback=report)
+        if lost() or not _write_job(
+            job,
+            owner,
+            model_id=model_id,
+            status="completed",
+            error=None,
+            finished_at=datetime.utcnow(),
+        ):
+            logger.warning(f"[conversion_job - {job.id}] lease lost; result dropped")
+            return None
         update_conversion_progress(
             job,
             progress=100,
             stage="Ready",
             detail="The model is ready for the viewer.",
+            owner=owner,
         )
+        return "completed"
     except Exception as e:
         db.session.rollback()
+        if lost():
+            # The new owner runs the job and needs the staged files as they are.
+            logger.warning(f"[conversion_job - {job.id}] lease lost; stopped: {e}")
+            return None
         retry = allow_retry and job.attempts < (job.max_attempts or 1)
-        job.status = "pending" if retry else "failed"
-        job.error = str(e)[:2000]
-        job.finished_at = None if retry else datetime.utcnow()
-        db.session.commit()
+        if not _write_job(
+            job,
+            owner,
+            status="pending" if retry else "failed",
+            error=str(e)[:2000],
+            finished_at=None if retry else datetime.utcnow(),
+        ):
+            logger.warning(f"[conversion_job - {job.id}] lease lost; failure not recorded: {e}")
+            return None
         update_conversion_progress(
             job,
             progress=35 if retry else 100,
             stage="Retrying" if retry else "Failed",
             detail=str(e)[:240],
+            owner=owner,
         )
         logger.error(
             f"[conversion_job - {job.id}] attempt {job.attempts} failed "
@@ -1789,6 +2082,7 @@ def run_conversion_job(job, allow_retry=True):
                     logger.error(
                         f"[conversion_job - {job.id}] staged cleanup failed: {cleanup_error}"
                     )
+        return "pending" if retry else "failed"
 
 
 def _run_upload_pipeline(payload, progress_callback=None):
@@ -2003,6 +2297,14 @@ def _run_upload_pipeline(payload, progress_callback=None):
         except Exception as e:
             logger.warning(f"[upload_model - {unique_id}] GLB quality pass skipped: {e}")
 
+        # Texture stage: textures are all in the BIN chunk now, so cap their
+        # size, re-encode opaque ones and drop duplicates (fail-safe).
+        try:
+            report(86, "Optimizing textures", "Resizing and re-encoding embedded textures.")
+            optimize_textures(output_path)
+        except Exception as e:
+            logger.warning(f"[upload_model - {unique_id}] Texture stage skipped: {e}")
+
         # --- USDZ Conversion for iOS AR (using Blender) - ASYNC ---
         # Start USDZ conversion in background thread to not block upload response
         usdz_output_path = os.path.join(converted_dir, "model.usdz")
@@ -2237,6 +2539,8 @@ def _run_upload_pipeline(payload, progress_callback=None):
                 f"[upload_model - {unique_id}] Error starting thumbnail generation thread: {e}"
             )
 
+        start_lod_generation(unique_id, output_path)
+
         return unique_id
 
     except Exception as e:
@@ -2574,12 +2878,17 @@ def view_model(model_id):
     display_name = model.display_name or filename_base
     is_owner = current_user.is_authenticated and model.user_id == current_user.id
 
+    # Smallest up-to-date LOD, loaded first and swapped for the full model.
+    lod_levels = fresh_levels(model.filename, model.lods)
+    lod_filename = lod_levels[-1]["filename"] if lod_levels else None
+
     response = make_response(render_template(
         "view.html",
         model_id=model_id,
         model=model,
         model_unique_id=model_unique_id,
         actual_filename=actual_filename,
+        lod_filename=lod_filename,
         usdz_filename=usdz_actual_filename,
         model_dimensions=model_dimensions,
         cumulative_scale=model.cumulative_scale or 1.0,
@@ -2638,11 +2947,15 @@ def embed_view(model_id):
         except Exception:
             pass
 
+    lod_levels = fresh_levels(model.filename, model.lods)
+    lod_filename = lod_levels[-1]["filename"] if lod_levels else None
+
     return render_template(
         "embed.html",
         model=model,
         model_unique_id=model_unique_id,
         actual_filename=actual_filename,
+        lod_filename=lod_filename,
         usdz_filename=usdz_actual_filename,
         model_dimensions=model_dimensions,
         autoplay=request.args.get("autoplay", "0") == "1",
@@ -3259,36 +3572,36 @@ def update_model_color():
                 {"success": False, "error": "Model not found or unauthorized"}
             ), 404
 
-        # Update the model's color in database
-        model.color = color
-        db.session.commit()
-
-        # Find source file in upload directory
-        upload_subdir = os.path.join(app.config["UPLOAD_FOLDER"], model_id)
-        if not os.path.isdir(upload_subdir):
-            return jsonify(
-                {"success": False, "error": "Upload directory not found"}
-            ), 404
-
-        source_files = os.listdir(upload_subdir)
-        if not source_files:
-            return jsonify({"success": False, "error": "Source file not found"}), 404
-
-        input_path = os.path.join(upload_subdir, source_files[0])
-        output_path = os.path.join(
-            app.config["CONVERTED_FOLDER"], model_id, "model.glb"
-        )
+        glb_path = os.path.join(app.config["CONVERTED_FOLDER"], model_id, "model.glb")
+        if not os.path.exists(glb_path):
+            return jsonify({"success": False, "error": "Model file not found"}), 404
 
-        # Re-convert the model with the new color
+        # Only material factors change, so patch the GLB's JSON chunk in place
+        # instead of re-converting the upload: no source file needed (AI
+        # imports have none) and the geometry/texture bytes are copied as is.
         try:
-            convert_model_new(input_path, output_path, color=color)
-            return jsonify({"success": True}), 200
+            with edit_queue.model_write_lock(os.path.dirname(glb_path)):
+                recolored = patch_glb_json(
+                    glb_path, glb_path, lambda doc: recolor_gltf_json(doc, color)
+                )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception as e:
-            logger.error(f"Error converting model with new color: {str(e)}")
+            logger.error(f"Error recoloring model {model_id}: {str(e)}")
             return jsonify(
                 {"success": False, "error": "Failed to update model color"}
             ), 500
 
+        model.color = color
+        db.session.commit()
+        logger.info(f"[update_model_color] {model_id}: {recolored} material(s) set to {color}")
+
+        if recolored:
+            mesh_cache.invalidate(glb_path)
+            refresh_usdz_after_edit(model_id, glb_path)
+            start_lod_generation(model_id, glb_path)
+        return jsonify({"success": True}), 200
+
     except Exception as e:
         logger.error(f"Error in update_model_color: {str(e)}")
         return jsonify({"success": False, "error": "Server error"}), 500
@@ -3313,15 +3626,44 @@ def get_temp_file(filename):
 
 @app.route("/qr/<filename>")
 def get_qr_code(filename):
-    """Serve QR code files."""
+    """Serve a model's QR code as /qr/<model_id>.svg or .png (?size=px).
+
+    No DB access: the code depends only on the viewer URL, size and format,
+    and its cache key doubles as a long-lived ETag. Pre-cache
+    qr_<id>_<uuid>.png files are still served as they are.
+    """
     if os.path.basename(filename) != filename:
         logger.warning(f"Unsafe QR filename rejected: {filename}")
         return "Not Found", 404
-    try:
+    if filename.startswith("qr_") and os.path.isfile(
+        os.path.join(app.config["CONVERTED_FOLDER"], filename)
+    ):
         return send_from_directory(app.config["CONVERTED_FOLDER"], filename)
+
+    model_id, _, fmt = filename.rpartition(".")
+    model_dir = os.path.join(app.config["CONVERTED_FOLDER"], model_id)
+    if fmt not in qr_cache.FORMATS or not model_id or not os.path.isdir(model_dir):
+        return "QR code not found", 404
+    size = qr_cache.quantize_size(request.args.get("size"))
+    url = _model_view_url(model_id)
+    key = qr_cache.cache_key(url, size, fmt)
+    try:
+        if request.if_none_match.contains(key):
+            response = app.response_class(status=304)
+        elif fmt == "svg":
+            _, body = qr_cache.svg(url, size)
+            response = app.response_class(body, mimetype=qr_cache.FORMATS["svg"])
+        else:
+            _, path = qr_cache.png_path(model_dir, url, size)
+            response = send_file(path, mimetype=qr_cache.FORMATS["png"], etag=False)
     except Exception as e:
         logger.error(f"Error serving QR code: {str(e)}")
         return "QR code not found", 404
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
 
 
 @app.route("/delete_model/<string:model_id>", methods=["POST"])
@@ -3811,22 +4153,18 @@ def apply_modifications():
             logger.error(f"Original GLB not found: {original_path}")
             return jsonify({"success": False, "error": "Original model not found"}), 404
 
-        # Create output filename with timestamp
-        timestamp = int(time.time())
-        output_filename = f"modified_{timestamp}.glb"
-        output_path = os.path.join(
-            app.config["CONVERTED_FOLDER"], model_id, output_filename
+        # Previews go to the bounded preview cache (tmpfs), keyed by model
+        # content + modifications, so a repeated preview is a lookup and the
+        # converted volume doesn't collect modified_*.glb files.
+        output_filename, hit = preview_cache.get_or_build(
+            model_id, original_path, modifications, modify_glb
         )
 
-        logger.info(f"[apply_modifications] Input: {original_path}")
-        logger.info(f"[apply_modifications] Output: {output_path}")
-
-        # Apply modifications
-        success = modify_glb(original_path, output_path, modifications)
-
-        if success:
+        if output_filename:
             download_url = f"/download_modified/{model_id}/{output_filename}"
-            logger.info(f"[apply_modifications] Success! Download URL: {download_url}")
+            logger.info(
+                f"[apply_modifications] {'Cache hit' if hit else 'Built preview'}: {download_url}"
+            )
             return jsonify(
                 {
                     "success": True,
@@ -3854,6 +4192,21 @@ def download_modified(model_id, filename):
         logger.warning(f"[download_modified] Unsafe filename rejected: {filename}")
         return "Not Found", 404
     try:
+        # Opened before answering, so a concurrent eviction can't unlink
+        # the preview between the lookup and the send.
+        cached = preview_cache.open_preview(model_id, filename)
+        if cached:
+            fh, size = cached
+            response = send_file(
+                fh,
+                mimetype="model/gltf-binary",
+                as_attachment=True,
+                download_name=f"modified_model_{int(time.time())}.glb",
+            )
+            response.content_length = size
+            return response
+
+        # Previews written before the preview cache existed.
         directory = os.path.join(app.config["CONVERTED_FOLDER"], model_id)
         logger.info(f"[download_modified] Serving {filename} from {directory}")
 
@@ -3872,6 +4225,9 @@ def download_modified(model_id, filename):
         return str(e), 500
 
 
+MODEL_DIMENSIONS_CACHE_SECONDS = int(os.environ.get("MODEL_DIMENSIONS_CACHE_SECONDS", 3600))
+
+
 @app.route("/get_model_dimensions/<model_id>")
 def get_model_dimensions(model_id):
     """Get model dimensions in meters"""
@@ -3884,27 +4240,36 @@ def get_model_dimensions(model_id):
         if not os.path.exists(glb_path):
             return jsonify({"success": False, "error": "Model not found"}), 404
 
-        # Load model with trimesh
-        mesh = trimesh.load(glb_path, force="scene")
+        def measure():
+            # Load model with trimesh
+            mesh = trimesh.load(glb_path, force="scene")
 
-        # Get bounding box
-        bounds = mesh.bounds
+            # Get bounding box
+            bounds = mesh.bounds
 
-        # Empty/degenerate model → report zeros instead of crashing.
-        if bounds is None:
-            return jsonify({"success": True, "dimensions": {
-                "width": 0.0, "height": 0.0, "depth": 0.0, "max": 0.0}})
+            # Empty/degenerate model → report zeros instead of crashing.
+            if bounds is None:
+                return {"width": 0.0, "height": 0.0, "depth": 0.0, "max": 0.0}
 
-        # Calculate dimensions (in meters, assuming GLB units are meters)
-        dimensions = bounds[1] - bounds[0]
+            # Calculate dimensions (in meters, assuming GLB units are meters)
+            dimensions = bounds[1] - bounds[0]
 
-        # Convert to cm for display
-        dimensions_cm = {
-            "width": float(dimensions[0] * 100),  # X
-            "height": float(dimensions[1] * 100),  # Y
-            "depth": float(dimensions[2] * 100),  # Z
-            "unit": "cm",
-        }
+            # Convert to cm for display
+            return {
+                "width": float(dimensions[0] * 100),  # X
+                "height": float(dimensions[1] * 100),  # Y
+                "depth": float(dimensions[2] * 100),  # Z
+                "unit": "cm",
+            }
+
+        # Loading the whole GLB per call is the expensive part; the editor asks
+        # repeatedly. Keyed by the file's mtime/size so a save invalidates it.
+        stat = os.stat(glb_path)
+        dimensions_cm = get_state().cached(
+            f"model-dimensions:{model_id}:{stat.st_mtime_ns}:{stat.st_size}",
+            MODEL_DIMENSIONS_CACHE_SECONDS,
+            measure,
+        )
 
         logger.info(
             f"[get_model_dimensions] Model {model_id} dimensions: {dimensions_cm}"
@@ -3917,16 +4282,140 @@ def get_model_dimensions(model_id):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _edit_operation_type(modifications):
+    if "material" in modifications and "transform" in modifications:
+        return "transform+material"
+    return "transform" if "transform" in modifications else "material"
+
+
+def apply_edit_batch(model_id, batch):
+    """Apply queued save_modifications edits to model.glb in one write.
+
+    Runs on an edit_queue worker. `batch` is the list of modification dicts
+    queued for the model since the last drain, in submission order: one
+    backup, one modify_glb pass, one USDZ/LOD refresh and one version.
+    """
+    current_model_path = os.path.join(
+        app.config["CONVERTED_FOLDER"], model_id, "model.glb"
+    )
+    with app.app_context(), edit_queue.model_write_lock(
+        os.path.dirname(current_model_path)
+    ):
+        if not os.path.exists(current_model_path):
+            raise FileNotFoundError("Model file not found")
+
+        # gltfpack output is decoded by modify_glb; re-compress the result so
+        # the served GLB stays the compressed one.
+        was_compressed = glb_requires_meshopt(current_model_path)
+
+        backup_path = os.path.join(
+            os.path.dirname(current_model_path),
+            f"model_backup_{int(time.time())}.glb",
+        )
+        shutil.copy2(current_model_path, backup_path)
+        logger.info(f"[save_modifications] Created backup: {backup_path}")
+        cleanup_old_backups(os.path.dirname(backup_path))
+
+        temp_output = os.path.join(
+            os.path.dirname(current_model_path), f"temp_{uuid.uuid4().hex}.glb"
+        )
+        if not modify_glb(current_model_path, temp_output, batch) or not os.path.exists(
+            temp_output
+        ):
+            if os.path.exists(temp_output):
+                os.remove(temp_output)
+            raise RuntimeError("Failed to modify GLB")
+
+        # Replace current model.glb with modified version (atomic on same volume)
+        os.replace(temp_output, current_model_path)
+        mesh_cache.invalidate(current_model_path)
+        logger.info(
+            f"[save_modifications] Replaced model.glb with {len(batch)} edit(s) applied"
+        )
+        # JSON-only edits keep the compressed BIN chunk as it was; only a
+        # full rewrite leaves decoded geometry that needs re-compressing.
+        if was_compressed and not glb_requires_meshopt(current_model_path):
+            optimize_glb(current_model_path)
+
+        # Keep iOS AR in sync: Quick Look uses the USDZ, so it must be
+        # rebuilt from the freshly modified GLB.
+        refresh_usdz_after_edit(model_id, current_model_path)
+        start_lod_generation(model_id, current_model_path)
+
+        # Update database dimensions after modifications
+        try:
+            # Transforms live on the root node, so accessor min/max under the
+            # node matrices give the bounds without decoding any geometry.
+            bounds = glb_bounds(current_model_path)
+            if bounds is None:
+                bounds = mesh_cache.world_meshes(current_model_path).bounds
+            model = UserModel.query.get(model_id)
+            if model and bounds is not None:
+                dimensions = bounds[1] - bounds[0]
+                # UserModel stores dimensions in the `bounds` JSON-string
+                # column as {"extents": [x,y,z], "max": m} (cm) — this is the
+                # shape view_model reads.
+                model.bounds = json.dumps(
+                    {
+                        "extents": [round(float(d * 100), 2) for d in dimensions],
+                        "max": round(float(max(dimensions) * 100), 2),
+                    }
+                )
+
+                # Every scale in the batch was applied on top of the previous one.
+                for modifications in batch:
+                    applied_scale = float(
+                        (modifications.get("transform") or {}).get("scale", 1.0)
+                    )
+                    if applied_scale != 1.0:
+                        model.cumulative_scale = (model.cumulative_scale or 1.0) * applied_scale
+                db.session.commit()
+                logger.info(
+                    f"[save_modifications] Updated database dimensions: {model.bounds}"
+                )
+        except Exception as dim_error:
+            db.session.rollback()
+            logger.error(
+                f"[save_modifications] Failed to update dimensions: {dim_error}"
+            )
+
+        # One version for the whole batch; a coalesced batch records each edit.
+        try:
+            if len(batch) == 1:
+                operation_type, details = _edit_operation_type(batch[0]), batch[0]
+            else:
+                types = {_edit_operation_type(m) for m in batch}
+                operation_type = types.pop() if len(types) == 1 else "transform+material"
+                details = {"coalesced": batch}
+            create_version(
+                model_id=model_id,
+                operation_type=operation_type,
+                operation_details=details,
+                comment="Model modifications saved",
+            )
+        except Exception as version_error:
+            logger.error(
+                f"[save_modifications] Failed to create version: {version_error}"
+            )
+
+        return {"backup": os.path.basename(backup_path)}
+
+
 @app.route("/save_modifications", methods=["POST"])
 @limiter.limit("60 per minute")
 def save_modifications():
-    """Save modifications to original GLB model (replaces model.glb)"""
+    """Queue modifications to the model's GLB (replaces model.glb).
+
+    Returns 202 with a job id; poll status_url until the job is completed
+    or failed. Saves on the same model are applied one after another, and
+    saves that arrive while one is running are coalesced into one write.
+    """
     try:
         data = request.json
         model_id = data.get("model_id")
         modifications = data.get("modifications")
 
-        if not model_id or not modifications:
+        if not model_id or not isinstance(modifications, dict) or not modifications:
             return jsonify(
                 {"success": False, "error": "Missing model_id or modifications"}
             ), 400
@@ -3951,152 +4440,53 @@ def save_modifications():
         if guard:
             return guard
 
-        # Use current model.glb file as the base for modifications
         current_model_path = os.path.join(
             app.config["CONVERTED_FOLDER"], model_id, "model.glb"
         )
-
         if not os.path.exists(current_model_path):
             logger.error(f"Current model.glb not found: {current_model_path}")
             return jsonify({"success": False, "error": "Model file not found"}), 404
 
-        # Refuse to edit meshopt-compressed GLBs (trimesh cannot decode them).
-        from converters.glb_optimizer import glb_requires_meshopt
-
-        if glb_requires_meshopt(current_model_path):
-            return jsonify(
-                {
-                    "success": False,
-                    "error": "This model is compressed (meshopt) and cannot be modified. Re-upload it without optimization to edit.",
-                }
-            ), 400
-
-        logger.info(
-            f"[save_modifications] Using current model.glb as base: {current_model_path}"
-        )
-
-        # Create backup of current model
-        backup_path = os.path.join(
-            app.config["CONVERTED_FOLDER"],
+        job_id = edit_queue.submit(
             model_id,
-            f"model_backup_{int(time.time())}.glb",
-        )
-        shutil.copy2(current_model_path, backup_path)
-        logger.info(f"[save_modifications] Created backup: {backup_path}")
-        cleanup_old_backups(os.path.dirname(backup_path))
-
-        # Create temporary output path
-        temp_output = os.path.join(
-            app.config["CONVERTED_FOLDER"], model_id, f"temp_{int(time.time())}.glb"
+            modifications,
+            apply_edit_batch,
+            user_id=current_user.id if current_user.is_authenticated else None,
         )
-
-        logger.info(f"[save_modifications] Input: {current_model_path}")
-        logger.info(f"[save_modifications] Temp output: {temp_output}")
-
-        # Apply modifications to current model
-        success = modify_glb(current_model_path, temp_output, modifications)
-
-        if success and os.path.exists(temp_output):
-            # Replace current model.glb with modified version (atomic on same volume)
-            os.replace(temp_output, current_model_path)
-            logger.info(
-                f"[save_modifications] Successfully replaced model.glb with modified version"
-            )
-
-            # Keep iOS AR in sync: Quick Look uses the USDZ, so it must be
-            # rebuilt from the freshly modified GLB.
-            refresh_usdz_after_edit(model_id, current_model_path)
-
-            # Update database dimensions after modifications
-            try:
-                mesh = trimesh.load(current_model_path, force="scene")
-                if isinstance(mesh, trimesh.Scene):
-                    bounds = mesh.bounds
-                else:
-                    bounds = mesh.bounds
-
-                dimensions = bounds[1] - bounds[0]
-                new_dims = {
-                    "x": round(float(dimensions[0] * 100), 2),
-                    "y": round(float(dimensions[1] * 100), 2),
-                    "z": round(float(dimensions[2] * 100), 2),
-                    "max": round(float(max(dimensions) * 100), 2),
-                }
-
-                # Update database. UserModel stores dimensions in the `bounds`
-                # JSON-string column as {"extents": [x,y,z], "max": m} (cm) —
-                # this is the shape view_model reads. Writing model.dimensions
-                # (no such column) silently dropped the update.
-                model = UserModel.query.get(model_id)
-                if model:
-                    model.bounds = json.dumps(
-                        {
-                            "extents": [new_dims["x"], new_dims["y"], new_dims["z"]],
-                            "max": new_dims["max"],
-                        }
-                    )
-
-                    # Update cumulative scale if scale was applied
-                    if (
-                        "transform" in modifications
-                        and "scale" in modifications["transform"]
-                    ):
-                        applied_scale = float(modifications["transform"]["scale"])
-                        if applied_scale != 1.0:
-                            current_cumulative = model.cumulative_scale or 1.0
-                            model.cumulative_scale = current_cumulative * applied_scale
-                            logger.info(
-                                f"[save_modifications] Updated cumulative scale: {current_cumulative} * {applied_scale} = {model.cumulative_scale}"
-                            )
-
-                    db.session.commit()
-                    logger.info(
-                        f"[save_modifications] Updated database dimensions: {new_dims}"
-                    )
-
-            except Exception as dim_error:
-                logger.error(
-                    f"[save_modifications] Failed to update dimensions: {dim_error}"
-                )
-
-            # Create version entry
-            try:
-                operation_type = (
-                    "transform" if "transform" in modifications else "material"
-                )
-                if "material" in modifications and "transform" in modifications:
-                    operation_type = "transform+material"
-
-                create_version(
-                    model_id=model_id,
-                    operation_type=operation_type,
-                    operation_details=modifications,
-                    comment="Model modifications saved",
-                )
-                logger.info(
-                    f"[save_modifications] Created version entry for {model_id}"
-                )
-            except Exception as version_error:
-                logger.error(
-                    f"[save_modifications] Failed to create version: {version_error}"
-                )
-
-            return jsonify(
-                {
-                    "success": True,
-                    "message": "Model saved successfully",
-                    "backup": os.path.basename(backup_path),
-                }
-            )
-        else:
-            logger.error("[save_modifications] Modification failed")
-            return jsonify({"success": False, "error": "Failed to modify GLB"}), 500
+        return jsonify(
+            {
+                "success": True,
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": url_for("edit_job_status", job_id=job_id),
+            }
+        ), 202
 
     except Exception as e:
         logger.error(f"[save_modifications] Error: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route("/api/edits/<job_id>", methods=["GET"])
+def edit_job_status(job_id):
+    """Status of a queued save_modifications job.
+
+    Only the user who queued it (and who may still edit the model) can see
+    it; anyone else gets the same 404 as for an unknown id.
+    """
+    job = edit_queue.job_status(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    user_id = current_user.id if current_user.is_authenticated else None
+    owner = job.get("user_id")
+    if (owner is not None and owner != user_id) or check_model_mutation_allowed(
+        job.get("model_id"), require_exists=False
+    ):
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    job = {key: value for key, value in job.items() if key != "user_id"}
+    return jsonify({"success": job["status"] != "failed", **job})
+
+
 @app.route("/get_mesh_bounds/<model_id>")
 def api_get_mesh_bounds_route(model_id):
     """Get mesh bounding box for slicer"""
@@ -4191,119 +4581,132 @@ def slice_model():
                 {"success": False, "error": f"Model not found at {input_path}"}
             ), 404
 
-        # Refuse to edit meshopt-compressed GLBs (trimesh cannot decode them).
-        from converters.glb_optimizer import glb_requires_meshopt
+        # Saves go through edit_queue; take the same per-model lock so a
+        # slice never interleaves with a queued edit rewriting model.glb.
+        with edit_queue.model_write_lock(os.path.dirname(input_path)):
+            # Create backup
+            import time
 
-        if glb_requires_meshopt(input_path):
-            return jsonify(
-                {
-                    "success": False,
-                    "error": "This model is compressed (meshopt) and cannot be sliced. Re-upload it without optimization to edit.",
-                }
-            ), 400
+            backup_path = os.path.join(
+                app.config["CONVERTED_FOLDER"],
+                model_id,
+                f"model_backup_{int(time.time())}.glb",
+            )
+            import shutil
 
-        # Create backup
-        import time
+            shutil.copy2(input_path, backup_path)
+            logger.info(f"[slice_model] Created backup: {backup_path}")
+            cleanup_old_backups(os.path.dirname(backup_path))
 
-        backup_path = os.path.join(
-            app.config["CONVERTED_FOLDER"],
-            model_id,
-            f"model_backup_{int(time.time())}.glb",
-        )
-        import shutil
+            # Slice the mesh
+            temp_output = os.path.join(
+                app.config["CONVERTED_FOLDER"],
+                model_id,
+                f"temp_sliced_{int(time.time())}.glb",
+            )
 
-        shutil.copy2(input_path, backup_path)
-        logger.info(f"[slice_model] Created backup: {backup_path}")
-        cleanup_old_backups(os.path.dirname(backup_path))
+            # The slicer works on trimesh, which can't read gltfpack output: slice
+            # a decoded working copy and re-compress the result afterwards.
+            slice_source = input_path
+            was_compressed = glb_requires_meshopt(input_path)
+            decoded_path = os.path.join(
+                app.config["CONVERTED_FOLDER"],
+                model_id,
+                f"temp_decoded_{int(time.time())}.glb",
+            )
+            if decode_glb_file(input_path, decoded_path):
+                slice_source = decoded_path
 
-        # Slice the mesh
-        temp_output = os.path.join(
-            app.config["CONVERTED_FOLDER"],
-            model_id,
-            f"temp_sliced_{int(time.time())}.glb",
-        )
+            try:
+                slice_result = slice_mesh_multi(
+                    input_path=slice_source,
+                    output_path=temp_output,
+                    planes=planes,
+                )
+            finally:
+                if os.path.exists(decoded_path):
+                    os.remove(decoded_path)
+                    mesh_cache.invalidate(decoded_path)
+            success = bool(slice_result.get("success"))
+
+            if success and os.path.exists(temp_output):
+                # Replace original with sliced version (atomic on same volume)
+                os.replace(temp_output, input_path)
+                mesh_cache.invalidate(input_path)
+                logger.info(
+                    f"[slice_model] Successfully replaced original with sliced mesh"
+                )
+                if was_compressed:
+                    optimize_glb(input_path)
 
-        slice_result = slice_mesh_multi(
-            input_path=input_path,
-            output_path=temp_output,
-            planes=planes,
-        )
-        success = bool(slice_result.get("success"))
+                # Rebuild the iOS USDZ from the sliced GLB (Quick Look uses it).
+                refresh_usdz_after_edit(model_id, input_path)
+                start_lod_generation(model_id, input_path)
 
-        if success and os.path.exists(temp_output):
-            # Replace original with sliced version (atomic on same volume)
-            os.replace(temp_output, input_path)
-            logger.info(
-                f"[slice_model] Successfully replaced original with sliced mesh"
-            )
+                # Update dimensions in database
+                try:
+                    import trimesh
 
-            # Rebuild the iOS USDZ from the sliced GLB (Quick Look uses it).
-            refresh_usdz_after_edit(model_id, input_path)
+                    mesh = load_trimesh(input_path, force="mesh")
 
-            # Update dimensions in database
-            try:
-                import trimesh
+                    if isinstance(mesh, trimesh.Scene):
+                        meshes = list(mesh.geometry.values())
+                        if meshes:
+                            mesh = trimesh.util.concatenate(meshes)
 
-                mesh = trimesh.load(input_path, force="mesh")
+                    bounds = mesh.bounds
+                    dimensions = bounds[1] - bounds[0]
+                    new_dims = {
+                        "x": round(float(dimensions[0] * 100), 2),
+                        "y": round(float(dimensions[1] * 100), 2),
+                        "z": round(float(dimensions[2] * 100), 2),
+                        "max": round(float(max(dimensions) * 100), 2),
+                    }
 
-                if isinstance(mesh, trimesh.Scene):
-                    meshes = list(mesh.geometry.values())
-                    if meshes:
-                        mesh = trimesh.util.concatenate(meshes)
+                    model = UserModel.query.get(model_id)
+                    if model:
+                        # Persist to the `bounds` column in the shape view_model reads.
+                        model.bounds = json.dumps(
+                            {
+                                "extents": [new_dims["x"], new_dims["y"], new_dims["z"]],
+                                "max": new_dims["max"],
+                            }
+                        )
+                        db.session.commit()
+                        logger.info(f"[slice_model] Updated dimensions: {new_dims}")
 
-                bounds = mesh.bounds
-                dimensions = bounds[1] - bounds[0]
-                new_dims = {
-                    "x": round(float(dimensions[0] * 100), 2),
-                    "y": round(float(dimensions[1] * 100), 2),
-                    "z": round(float(dimensions[2] * 100), 2),
-                    "max": round(float(max(dimensions) * 100), 2),
-                }
+                except Exception as dim_error:
+                    logger.error(f"[slice_model] Failed to update dimensions: {dim_error}")
 
-                model = UserModel.query.get(model_id)
-                if model:
-                    # Persist to the `bounds` column in the shape view_model reads.
-                    model.bounds = json.dumps(
-                        {
-                            "extents": [new_dims["x"], new_dims["y"], new_dims["z"]],
-                            "max": new_dims["max"],
-                        }
+                # Create a SINGLE version entry for the whole multi-plane slice
+                try:
+                    axis_count = len(planes)
+                    create_version(
+                        model_id=model_id,
+                        operation_type="slice",
+                        operation_details={"planes": planes},
+                        comment=f"Sliced model ({axis_count} plane(s))",
                     )
-                    db.session.commit()
-                    logger.info(f"[slice_model] Updated dimensions: {new_dims}")
+                    logger.info(f"[slice_model] Created version entry for {model_id}")
+                except Exception as version_error:
+                    logger.error(f"[slice_model] Failed to create version: {version_error}")
 
-            except Exception as dim_error:
-                logger.error(f"[slice_model] Failed to update dimensions: {dim_error}")
-
-            # Create a SINGLE version entry for the whole multi-plane slice
-            try:
-                axis_count = len(planes)
-                create_version(
-                    model_id=model_id,
-                    operation_type="slice",
-                    operation_details={"planes": planes},
-                    comment=f"Sliced model ({axis_count} plane(s))",
-                )
-                logger.info(f"[slice_model] Created version entry for {model_id}")
-            except Exception as version_error:
-                logger.error(f"[slice_model] Failed to create version: {version_error}")
-
-            response = {
-                "success": True,
-                "message": "Model sliced successfully",
-                "backup": os.path.basename(backup_path),
-            }
-            # Surface near-flat results so the UI can warn the user instead of
-            # silently producing a degenerate model.
-            if slice_result.get("degenerate"):
-                response["warning"] = (
-                    "The slice result is nearly flat — one dimension is almost zero. "
-                    "Check the kept side / slider position."
-                )
-            return jsonify(response)
-        else:
-            logger.error("[slice_model] Slicing failed")
-            return jsonify({"success": False, "error": "Failed to slice model"}), 500
+                response = {
+                    "success": True,
+                    "message": "Model sliced successfully",
+                    "backup": os.path.basename(backup_path),
+                }
+                # Surface near-flat results so the UI can warn the user instead of
+                # silently producing a degenerate model.
+                if slice_result.get("degenerate"):
+                    response["warning"] = (
+                        "The slice result is nearly flat — one dimension is almost zero. "
+                        "Check the kept side / slider position."
+                    )
+                return jsonify(response)
+            else:
+                logger.error("[slice_model] Slicing failed")
+                return jsonify({"success": False, "error": "Failed to slice model"}), 500
 
     except Exception as e:
         logger.error(f"[slice_model] Error: {e}", exc_info=True)
@@ -4352,13 +4755,17 @@ def restore_model_version(model_id, version_number):
         if guard:
             return guard
 
-        success = restore_version(model_id, version_number)
+        model_dir = os.path.join(app.config["CONVERTED_FOLDER"], model_id)
+        with edit_queue.model_write_lock(model_dir):
+            success = restore_version(model_id, version_number)
         if success:
             # The restored GLB replaced model.glb — rebuild the iOS USDZ too.
             glb_path = os.path.join(
                 app.config["CONVERTED_FOLDER"], model_id, "model.glb"
             )
+            mesh_cache.invalidate(glb_path)
             refresh_usdz_after_edit(model_id, glb_path)
+            start_lod_generation(model_id, glb_path)
             return jsonify(
                 {"success": True, "message": f"Restored to version {version_number}"}
             )
@@ -4404,6 +4811,20 @@ def download_version(model_id, version_number):
         if not os.path.exists(version.filename):
             return jsonify({"success": False, "error": "Version file not found"}), 404
 
+        if version_store.is_manifest(version.filename):
+            # Delta-stored version: stream it straight from its segments.
+            size, chunks = version_store.iter_glb(
+                os.path.join(app.config["CONVERTED_FOLDER"], model_id), version_number
+            )
+            return Response(
+                chunks,
+                mimetype="model/gltf-binary",
+                headers={
+                    "Content-Length": str(size),
+                    "Content-Disposition": f'attachment; filename="model_v{version_number}.glb"',
+                },
+            )
+
         directory = os.path.dirname(version.filename)
         filename = os.path.basename(version.filename)
 
@@ -4664,6 +5085,11 @@ def register_glb_as_model(glb_path, *, user_id=None, source="ai", prompt=None,
     except Exception as e:
         logger.warning(f"[register_glb] GLB quality pass skipped: {e}")
 
+    try:
+        optimize_textures(output_path)
+    except Exception as e:
+        logger.warning(f"[register_glb] texture stage skipped: {e}")
+
     # Dimensions / bounds (mirror upload_model GLB branch)
     model_bounds = None
     try:
@@ -4733,6 +5159,8 @@ def register_glb_as_model(glb_path, *, user_id=None, source="ai", prompt=None,
     except Exception as e:
         logger.error(f"[register_glb] thumbnail thread failed: {e}")
 
+    start_lod_generation(unique_id, output_path)
+
     if not usdz_filename:
         try:
             threading.Thread(target=convert_usdz_async,
@@ -4754,24 +5182,11 @@ def _ai_quota_state(user_id):
     return (count >= limit), count, limit
 
 
-def _claim_ai_stage(job_id, expect_stage, new_stage):
-    """Atomically move a job between stages with UPDATE ... WHERE stage=...
+def _finalize_ai_job(job, task):
+    """Download finished GLB (+USDZ), register as model, mark job ready.
 
-    The state machine is advanced by client polls; two concurrent polls of
-    the same job (multiple tabs/devices) could otherwise both see a finished
-    preview and both call start_refine — burning duplicate Meshy credits —
-    or both finalize and register duplicate models. Exactly one poll wins
-    this claim; the loser just reports current progress.
+    Runs on the ai_poller finalizer pool, never in a request.
     """
-    claimed = AIGenerationJob.query.filter_by(
-        id=job_id, stage=expect_stage
-    ).update({"stage": new_stage}, synchronize_session=False)
-    db.session.commit()
-    return bool(claimed)
-
-
-def _finalize_ai_job(job, task):
-    """Download finished GLB (+USDZ), register as model, mark job ready."""
     import ai_generator
 
     model_urls = task.get("model_urls") or {}
@@ -4780,8 +5195,7 @@ def _finalize_ai_job(job, task):
         job.status = "failed"
         job.error = "Generation finished but returned no GLB"
         db.session.commit()
-        resp = job.to_dict(); resp["success"] = True
-        return jsonify(resp)
+        return
 
     tmp_dir = os.path.join(app.config["TEMP_FOLDER"], "ai_" + job.id)
     os.makedirs(tmp_dir, exist_ok=True)
@@ -4810,9 +5224,6 @@ def _finalize_ai_job(job, task):
     job.progress = 100
     job.model_id = model.id
     db.session.commit()
-    resp = job.to_dict(); resp["success"] = True
-    resp["viewer_url"] = url_for("view_model", model_id=model.id)
-    return jsonify(resp)
 
 
 @app.route("/api/generate-3d", methods=["POST"])
@@ -4861,6 +5272,7 @@ def generate_3d():
                                   status="generating", progress=0)
         db.session.add(job)
         db.session.commit()
+        ai_poller.ensure_running(app, _finalize_ai_job)
         return jsonify({"success": True, "job_id": job_id})
     except ai_generator.MeshyError as e:
         return jsonify({"success": False, "error": str(e)}), 502
@@ -4872,82 +5284,19 @@ def generate_3d():
 @app.route("/api/generate-3d/<job_id>/status", methods=["GET"])
 @login_required
 def generate_3d_status(job_id):
-    """Poll a generation job; advances text two-stage and finalizes on success."""
-    import ai_generator
-
-    job = AIGenerationJob.query.get(job_id)
+    """Report a generation job. A pure DB read: ai_poller advances the job."""
+    job = db.session.get(AIGenerationJob, job_id)
     if not job:
         return jsonify({"success": False, "error": "Job not found"}), 404
     if job.user_id != current_user.id:
         return jsonify({"success": False, "error": "Unauthorized"}), 403
 
-    if job.status in ("ready", "failed"):
-        resp = job.to_dict(); resp["success"] = True
-        if job.status == "ready" and job.model_id:
-            resp["viewer_url"] = url_for("view_model", model_id=job.model_id)
-        return jsonify(resp)
-
-    try:
-        if job.kind == "image":
-            if job.stage == "image":
-                t = ai_generator.get_task("image", job.meshy_image_id)
-                job.progress = min(99, t["progress"])
-                if t["status"] == ai_generator.SUCCEEDED:
-                    if not _claim_ai_stage(job.id, "image", "finalizing"):
-                        db.session.refresh(job)  # another poll is finalizing
-                    else:
-                        try:
-                            return _finalize_ai_job(job, t)
-                        except Exception:
-                            # let the next poll retry the download/registration
-                            _claim_ai_stage(job.id, "finalizing", "image")
-                            raise
-                elif t["status"] in (ai_generator.FAILED, ai_generator.CANCELED):
-                    job.status = "failed"
-                    job.error = t.get("task_error") or "Generation failed"
-        else:
-            if job.stage == "preview":
-                t = ai_generator.get_task("text", job.meshy_preview_id)
-                job.progress = min(49, t["progress"] // 2)
-                if t["status"] == ai_generator.SUCCEEDED:
-                    if not _claim_ai_stage(job.id, "preview", "refining"):
-                        db.session.refresh(job)  # another poll started refine
-                    else:
-                        try:
-                            refine_id = ai_generator.start_refine(job.meshy_preview_id)
-                        except Exception:
-                            # release the claim so the next poll retries
-                            _claim_ai_stage(job.id, "refining", "preview")
-                            raise
-                        job.meshy_refine_id = refine_id
-                        job.stage = "refine"
-                        job.progress = 50
-                elif t["status"] in (ai_generator.FAILED, ai_generator.CANCELED):
-                    job.status = "failed"
-                    job.error = t.get("task_error") or "Preview failed"
-            elif job.stage == "refine":
-                t = ai_generator.get_task("text", job.meshy_refine_id)
-                job.progress = min(99, 50 + t["progress"] // 2)
-                if t["status"] == ai_generator.SUCCEEDED:
-                    if not _claim_ai_stage(job.id, "refine", "finalizing"):
-                        db.session.refresh(job)
-                    else:
-                        try:
-                            return _finalize_ai_job(job, t)
-                        except Exception:
-                            _claim_ai_stage(job.id, "finalizing", "refine")
-                            raise
-                elif t["status"] in (ai_generator.FAILED, ai_generator.CANCELED):
-                    job.status = "failed"
-                    job.error = t.get("task_error") or "Texturing failed"
-        db.session.commit()
-    except ai_generator.MeshyError as e:
-        return jsonify({"success": False, "error": str(e)}), 502
-    except Exception as e:
-        logger.error(f"[generate-3d] status error: {e}", exc_info=True)
-        return jsonify({"success": False, "error": "Status check failed."}), 500
-
+    if job.status == "generating":
+        # Restarts the loop if this process was recycled since the job began.
+        ai_poller.ensure_running(app, _finalize_ai_job)
     resp = job.to_dict(); resp["success"] = True
+    if job.status == "ready" and job.model_id:
+        resp["viewer_url"] = url_for("view_model", model_id=job.model_id)
     return jsonify(resp)
 
 
@@ -0,0 +1,214 @@
+"""
+Chunked Upload
+Resumable, tus-style uploads for model files.
+
+A single multipart POST spools the whole file through Werkzeug and ties up a
+request thread for the entire transfer; a dropped connection on a 200 MB FBX
+means starting over. Instead the client opens an UploadSession with the
+total size, then PUTs fixed-size chunks, each tagged with the offset it
+starts at. The server only accepts a chunk at the current offset (anything
+else gets 409 and the real offset back), writes it straight into the staged
+file and advances the offset, so a client that lost its connection asks for
+the offset and carries on from there.
+
+The SHA-256 is computed while the bytes stream in. Hash state can't be
+persisted, so each process keeps it in memory keyed by session, and a
+process that didn't see the earlier chunks (restart, another worker)
+rebuilds it from the bytes already on disk.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from models import db, UploadSession
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+# Chunked uploads aren't bound by MAX_CONTENT_LENGTH (that caps one request),
+# so the total gets its own limit.
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 1024 * 1024 * 1024))
+# Unfinished sessions older than this are swept together with their bytes.
+UPLOAD_SESSION_TTL_HOURS = int(os.environ.get("UPLOAD_SESSION_TTL_HOURS", 24))
+
+_COPY_BUFSIZE = 1024 * 1024
+
+_hashers = {}  # session id -> (offset, hashlib object)
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class UploadConflict(Exception):
+    """The chunk doesn't start at the session's current offset."""
+
+    def __init__(self, offset):
+        super().__init__(f"expected offset {offset}")
+        self.offset = offset
+
+
+class UploadError(ValueError):
+    """The chunk or session request is invalid (size, state)."""
+
+
+def session_dir(temp_folder, session):
+    return os.path.join(temp_folder, session.id)
+
+
+def partial_path(temp_folder, session):
+    return os.path.join(session_dir(temp_folder, session), session.filename)
+
+
+def _lock(session_id):
+    with _locks_guard:
+        return _locks.setdefault(session_id, threading.Lock())
+
+
+def _hasher_at(path, session_id, offset):
+    """SHA-256 state for the first `offset` bytes of path."""
+    cached = _hashers.get(session_id)
+    if cached and cached[0] == offset:
+        return cached[1]
+    sha = hashlib.sha256()
+    remaining = offset
+    with open(path, "rb") as fh:
+        while remaining:
+            block = fh.read(min(_COPY_BUFSIZE, remaining))
+            if not block:
+                break
+            sha.update(block)
+            remaining -= len(block)
+    return sha
+
+
+def create_session(temp_folder, session_id, filename, total_size, user_id=None,
+                   expected_sha256=None, options=None):
+    """Register a session and pre-create its (empty) staging file."""
+    if total_size <= 0:
+        raise UploadError("Upload size must be positive")
+    if total_size > UPLOAD_MAX_BYTES:
+        raise UploadError(
+            f"File is {total_size:,} bytes; the limit is {UPLOAD_MAX_BYTES:,} bytes"
+        )
+    session = UploadSession(
+        id=session_id,
+        user_id=user_id,
+        filename=filename,
+        total_size=total_size,
+        chunk_size=UPLOAD_CHUNK_SIZE,
+        offset=0,
+        expected_sha256=(expected_sha256 or "").lower() or None,
+        options=options or {},
+        status="uploading",
+    )
+    os.makedirs(session_dir(temp_folder, session), exist_ok=True)
+    open(partial_path(temp_folder, session), "wb").close()
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def write_chunk(temp_folder, session, offset, stream, length):
+    """Append one chunk at `offset`; returns the new offset.
+
+    Raises UploadConflict when offset isn't the session's current one and
+    UploadError for oversize/short chunks. A chunk that fails midway leaves
+    the offset where it was, so the client simply retries it.
+    """
+    if session.status != "uploading":
+        raise UploadError(f"Upload is {session.status}")
+    if length is None:
+        raise UploadError("Content-Length is required")
+    if length > session.chunk_size:
+        raise UploadError(f"Chunks are at most {session.chunk_size} bytes")
+    if offset + length > session.total_size:
+        raise UploadError("Chunk runs past the declared upload size")
+    if offset + length < session.total_size and length != session.chunk_size:
+        # Fixed-size chunks keep every offset on a chunk boundary.
+        raise UploadError(f"Only the last chunk may be shorter than {session.chunk_size} bytes")
+
+    path = partial_path(temp_folder, session)
+    with _lock(session.id):
+        db.session.refresh(session)
+        if offset != session.offset:
+            raise UploadConflict(session.offset)
+        sha = _hasher_at(path, session.id, offset).copy()
+        received = 0
+        with open(path, "r+b") as fh:
+            fh.seek(offset)
+            while received < length:
+                block = stream.read(min(_COPY_BUFSIZE, length - received))
+                if not block:
+                    break
+                fh.write(block)
+                sha.update(block)
+                received += len(block)
+        if received != length:
+            raise UploadError(f"Chunk ended after {received} of {length} bytes")
+
+        new_offset = offset + length
+        # Conditional update: another process may have advanced the same
+        # session meanwhile (the in-process lock doesn't reach it).
+        updated = UploadSession.query.filter_by(id=session.id, offset=offset).update(
+            {"offset": new_offset, "updated_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        if not updated:
+            db.session.refresh(session)
+            raise UploadConflict(session.offset)
+        db.session.refresh(session)
+        _hashers[session.id] = (new_offset, sha)
+    return new_offset
+
+
+def finish_session(temp_folder, session):
+    """Verify a fully received upload; returns the staged file path.
+
+    Truncates anything a failed chunk wrote past the end and records the
+    digest. A digest mismatch fails the session and raises UploadError.
+    The session stays "uploading" until the caller has handed the file on
+    and calls mark_finished, so a failed hand-off can be retried; running
+    this again is harmless.
+    """
+    if session.offset != session.total_size:
+        raise UploadError("Upload is not complete")
+    path = partial_path(temp_folder, session)
+    with open(path, "r+b") as fh:
+        fh.truncate(session.total_size)
+    digest = _hasher_at(path, session.id, session.total_size).hexdigest()
+    _hashers.pop(session.id, None)
+    _locks.pop(session.id, None)
+    session.sha256 = digest
+    if session.expected_sha256 and session.expected_sha256 != digest:
+        session.status = "failed"
+        db.session.commit()
+        raise UploadError("Checksum mismatch: the uploaded file is corrupt")
+    db.session.commit()
+    return path
+
+
+def mark_finished(session, status="completed"):
+    session.status = status
+    session.updated_at = datetime.utcnow()
+    db.session.commit()
+
+
+def sweep_stale_sessions(temp_folder, now=None):
+    """Delete unfinished sessions past the TTL and their staged bytes."""
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+    stale = UploadSession.query.filter(
+        UploadSession.status == "uploading", UploadSession.updated_at < cutoff
+    ).all()
+    for session in stale:
+        shutil.rmtree(session_dir(temp_folder, session), ignore_errors=True)
+        _hashers.pop(session.id, None)
+        _locks.pop(session.id, None)
+        db.session.delete(session)
+    if stale:
+        db.session.commit()
+        logger.info(f"Swept {len(stale)} stale upload session(s)")
+    return len(stale)
@@ -27,6 +27,14 @@ TEMP_FOLDER = os.getenv('WEB_AR_TEMP_DIR', os.path.join(_STORAGE_ROOT, 'temp'))
 QR_FOLDER = os.getenv('WEB_AR_QR_DIR', os.path.join(_STORAGE_ROOT, 'qr_codes'))
 TOOLS_DIR = os.getenv('WEB_AR_TOOLS_DIR', os.path.join(BASE_DIR, 'tools'))  # tools are in the image, not the volume
 
+# Public origin of the site (e.g. https://ar.example.com), used for links that
+# leave the browser such as QR codes. Railway injects RAILWAY_PUBLIC_DOMAIN;
+# unset locally, where the request's own host is used instead.
+PUBLIC_BASE_URL = (
+    os.environ.get('PUBLIC_BASE_URL')
+    or (f"https://{os.environ['RAILWAY_PUBLIC_DOMAIN']}" if os.environ.get('RAILWAY_PUBLIC_DOMAIN') else None)
+)
+
 # Dönüşüm araçları - Platform-specific
 if platform.system() == 'Windows':
     FBX2GLTF_PATH = os.path.join(TOOLS_DIR, 'FBX2glTF.exe')
@@ -86,6 +94,12 @@ ALLOWED_EXTENSIONS = {'obj', 'stl', 'fbx', 'glb', 'gltf'}
 MESHY_API_KEY = os.getenv('MESHY_API_KEY', '')
 MESHY_API_BASE = os.getenv('MESHY_API_BASE', 'https://api.meshy.ai/openapi')
 MESHY_AI_MODEL = os.getenv('MESHY_AI_MODEL', 'meshy-5')
+# Meshy HTTP client: pooled keep-alive connections and retries on 429/5xx
+# and dropped connections (exponential backoff with jitter, Retry-After wins).
+MESHY_POOL_SIZE = int(os.getenv('MESHY_POOL_SIZE', 8))
+MESHY_MAX_RETRIES = int(os.getenv('MESHY_MAX_RETRIES', 4))
+MESHY_BACKOFF_SECONDS = float(os.getenv('MESHY_BACKOFF_SECONDS', 0.5))
+MESHY_BACKOFF_MAX_SECONDS = float(os.getenv('MESHY_BACKOFF_MAX_SECONDS', 30))
 # Image generation model for the optional pre-processing step (text-to-image /
 # image-to-image before image-to-3D).
 MESHY_IMAGE_MODEL = os.getenv('MESHY_IMAGE_MODEL', 'nano-banana-pro')
@@ -6,6 +6,7 @@ import os
 import subprocess
 import logging
 import contextlib
+import threading
 import trimesh
 import tempfile
 import numpy as np
@@ -16,6 +17,9 @@ from .base_converter import (
     hex_to_linear_rgb,
     safe_join_within,
 )
+from .glb_quality import BlobBuilder
+from .texture_optimizer import alpha_profile
+from .tool_runner import run_tool
 from pygltflib import GLTF2, Image, Texture, TextureInfo, PbrMetallicRoughness
 
 
@@ -69,6 +73,11 @@ def is_valid_extension(filename, extensions):
 
 logger = logging.getLogger(__name__)
 
+# How long to keep waiting for a still-running metadata probe once FBX2glTF
+# has produced usable geometry. Past this the probe's auxiliary data (texture
+# recovery, FBX-native dimensions) is skipped rather than delaying the upload.
+PROBE_JOIN_GRACE = float(os.environ.get("FBX_PROBE_JOIN_GRACE", "2"))
+
 
 def _ensure_assimp_library_path():
     """Make libassimp discoverable before pyassimp is imported.
@@ -122,34 +131,57 @@ def _gltf_image_bytes(gltf, image_index):
     return None
 
 
+def _sniff_image_mime(data, default="image/png"):
+    """MIME type from an encoded image's magic bytes."""
+    if data[:4] == b"\x89PNG":
+        return "image/png"
+    if data[:2] == b"\xff\xd8":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+def _pack_images_into_bin(gltf, builder):
+    """Keep every embedded image in the BIN chunk.
+
+    data: URI images are decoded once here and moved into bufferViews
+    (base64 costs +33% bytes and a decode on every client load); images that
+    already live in a bufferView stay put and only get the mimeType glTF
+    requires for them. Returns the number of images moved.
+    """
+    import base64
+
+    moved = 0
+    blob = None
+    for img in gltf.images or []:
+        if img.uri and img.uri.startswith("data:"):
+            header, _, payload = img.uri.partition(",")
+            try:
+                data = base64.b64decode(payload)
+            except Exception:
+                continue
+            mime = header[5:].split(";", 1)[0] or _sniff_image_mime(data)
+            builder.add_image(img, data, mime)
+            moved += 1
+        elif img.bufferView is not None and not img.mimeType:
+            if blob is None:
+                blob = gltf.binary_blob() or b""
+            bv = gltf.bufferViews[img.bufferView]
+            offset = bv.byteOffset or 0
+            img.mimeType = _sniff_image_mime(blob[offset : offset + 12])
+    return moved
+
+
 def _analyze_alpha_channel(image_bytes):
     """Inspect an encoded image's alpha channel.
 
-    Returns (has_transparency, mostly_binary):
-    - has_transparency: any meaningfully transparent pixel exists
-    - mostly_binary: alpha is essentially on/off (foliage cutout) rather than
-      gradual (glass/fades), so MASK renders it better than BLEND
+    Returns (has_transparency, mostly_binary); see texture_optimizer.alpha_profile.
     """
     from PIL import Image as PILImage
     import io
 
-    pil = PILImage.open(io.BytesIO(image_bytes))
-    if pil.mode not in ("RGBA", "LA", "PA") and "transparency" not in pil.info:
-        return False, False
-    alpha = pil.convert("RGBA").getchannel("A")
-    lo, _ = alpha.getextrema()
-    if lo >= 250:
-        return False, False
-    hist = alpha.histogram()
-    total = sum(hist) or 1
-    partial = sum(hist[16:240])  # neither fully transparent nor fully opaque
-    # Foliage cutouts are dominated by fully-transparent/fully-opaque texels;
-    # partial alpha appears only on antialiased edges (typically 5-15%). Truly
-    # gradual textures (glass, fades) have large smooth partial regions. MASK
-    # must win for cutouts: BLEND disables depth sorting, so dense foliage
-    # blends against the background instead of the leaves behind it and the
-    # whole canopy washes out.
-    return True, (partial / total) < 0.25
+    return alpha_profile(PILImage.open(io.BytesIO(image_bytes)))
 
 
 def fix_material_transparency(gltf, log=None):
@@ -263,7 +295,8 @@ class FBXConverter(BaseConverter):
             self.fbx2gltf_path = os.path.join(tools_dir, "FBX2glTF")
 
         self.remove_textures = False  # Option to remove existing textures
-        self._fbx_material_textures = {}  # Store material -> texture mapping from pyassimp
+        # material -> texture mapping, unit scale, rescue geometry (from the probe)
+        self._reset_probe_state()
 
     def validate(self, file_path: str) -> bool:
         """Validate if the file exists and has .fbx extension."""
@@ -352,49 +385,16 @@ class FBXConverter(BaseConverter):
             self.update_status("CONVERTING")
             self.log_operation("Starting FBX conversion")
 
-            # FIRST: Read original FBX dimensions before conversion using pyassimp
-            # FIRST: extract FBX metadata (unit scale, embedded textures,
-            # vertices/faces for the zero-geometry rescue). This runs in a
-            # separate, memory-capped process: pyassimp.load() can allocate
-            # gigabytes on pathological FBX files and OOM-kill the whole
-            # worker. The data is auxiliary, so on any probe failure we just
-            # log a warning and let FBX2glTF do the conversion alone.
-            original_dimensions = None
-            self._fbx_unit_scale = 0.01
-            self._fbx_material_textures = {}
-            self._fbx_vertices = None
-            self._fbx_faces = None
-            try:
-                from . import fbx_probe
-
-                manifest = fbx_probe.run_isolated(input_path)
-                if manifest and not manifest.get("error"):
-                    self._fbx_unit_scale = manifest.get("unit_scale", 0.01)
-                    self._fbx_material_textures = manifest.get("material_textures", {}) or {}
-                    original_dimensions = manifest.get("original_dimensions")
-                    self._fbx_vertices = manifest.get("vertices")
-                    self._fbx_faces = manifest.get("faces")
-                    self.log_operation(
-                        f"FBX probe ok: unit_scale={self._fbx_unit_scale}, "
-                        f"textures={len(self._fbx_material_textures)}, "
-                        f"vertices={'yes' if self._fbx_vertices is not None else 'no'}"
-                    )
-                else:
-                    msg = (manifest or {}).get("error", "no manifest")
-                    self.log_operation(
-                        f"FBX metadata probe unavailable ({msg}); "
-                        "proceeding with FBX2glTF only.",
-                        "WARNING",
-                    )
-            except Exception as probe_err:
-                self.log_operation(
-                    f"FBX metadata probe failed ({probe_err}); "
-                    "proceeding with FBX2glTF only.",
-                    "WARNING",
-                )
-
-            # Store dimensions for later use
-            self.original_dimensions = original_dimensions
+            # Extract FBX metadata (unit scale, embedded textures, vertices/
+            # faces for the zero-geometry rescue) in a separate, memory-capped
+            # process: pyassimp.load() can allocate gigabytes on pathological
+            # FBX files and OOM-kill the whole worker. The probe is independent
+            # of FBX2glTF until texture recovery / the rescue, so it runs
+            # concurrently and is joined after FBX2glTF finishes. The data is
+            # auxiliary, so on any probe failure we just log a warning and let
+            # FBX2glTF do the conversion alone.
+            self._reset_probe_state()
+            self._start_probe(input_path)
 
             # Create output directory
             ensure_directory(os.path.dirname(output_path))
@@ -439,18 +439,12 @@ class FBXConverter(BaseConverter):
 
                     self.log_operation(f"Running command: {' '.join(cmd)}")
                     # Only set cwd to the input's directory if it still exists —
-                    # a missing dir makes subprocess.run raise FileNotFoundError
+                    # a missing dir makes Popen raise FileNotFoundError
                     # (confusing) instead of letting FBX2glTF report cleanly.
                     input_dir = os.path.dirname(input_path)
                     run_cwd = input_dir if input_dir and os.path.isdir(input_dir) else None
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        check=False,
-                        stdin=subprocess.DEVNULL,  # Don't wait for input
-                        cwd=run_cwd,
-                        timeout=300,
+                    result = run_tool(
+                        "fbx2gltf", cmd, timeout=300, cwd=run_cwd
                     )  # 5 minute timeout
 
                     # FBX2glTF sometimes writes the GLB under a variant of the
@@ -486,10 +480,21 @@ class FBXConverter(BaseConverter):
                     # Rescue: FBX2glTF occasionally emits a GLB with degenerate
                     # (zero-extent) geometry. Rebuild from the original FBX data
                     # read via pyassimp instead of publishing an empty model.
-                    if self._rescue_zero_geometry(output_path, color, original_dimensions):
+                    # This is the only step that waits for the probe in full.
+                    if self._rescue_zero_geometry(output_path, color):
                         self.update_status("COMPLETED")
                         return True
 
+                    # Join point: texture recovery and FBX dimensions use the
+                    # probe when it is done (or nearly), but a slow probe must
+                    # not hold up a GLB that FBX2glTF already got right.
+                    if not self._join_probe(PROBE_JOIN_GRACE):
+                        self.log_operation(
+                            f"FBX metadata probe still running after "
+                            f"{PROBE_JOIN_GRACE:g}s grace; proceeding with FBX2glTF only.",
+                            "WARNING",
+                        )
+
                     # If neither FBX2glTF nor the pyassimp rescue produced real
                     # geometry, fail loudly instead of publishing an empty model
                     # that later 500s the viewer/dimension endpoints.
@@ -718,6 +723,10 @@ class FBXConverter(BaseConverter):
 
             self.log_operation(f"Traceback: {traceback.format_exc()}")
             return False
+        finally:
+            # Every exit, including FBX2glTF failures and timeouts, must not
+            # leave the probe holding its fbx_probe slot and child process.
+            self._cancel_probe()
 
     def _glb_has_geometry(self, glb_path: str) -> bool:
         """True if the GLB has at least one mesh with non-zero extents."""
@@ -733,7 +742,85 @@ class FBXConverter(BaseConverter):
             # Be permissive on checker errors — don't fail a possibly-valid model.
             return True
 
-    def _rescue_zero_geometry(self, output_path: str, color, original_dimensions) -> bool:
+    def _reset_probe_state(self) -> None:
+        """Defaults used whenever the FBX metadata probe is unavailable."""
+        self.original_dimensions = None
+        self._fbx_unit_scale = 0.01
+        self._fbx_material_textures = {}
+        self._fbx_vertices = None
+        self._fbx_faces = None
+        self._probe_thread = None
+        self._probe_cancel = None
+        self._probe_result = {}
+
+    def _start_probe(self, input_path: str) -> None:
+        """Launch fbx_probe.run_isolated on a background thread.
+
+        The manifest is only parked in self._probe_result; converter state is
+        updated by _join_probe, so an abandoned probe finishing late can never
+        mutate a conversion that already moved on.
+        """
+        result = self._probe_result
+        cancel = self._probe_cancel = threading.Event()
+
+        def _run():
+            try:
+                from . import fbx_probe
+
+                result["manifest"] = fbx_probe.run_isolated(input_path, cancel_event=cancel)
+            except Exception as probe_err:  # noqa: BLE001
+                result["manifest"] = {"error": f"probe runner error: {probe_err}"}
+
+        self._probe_thread = threading.Thread(
+            target=_run, name="fbx-probe", daemon=True
+        )
+        self._probe_thread.start()
+
+    def _cancel_probe(self) -> None:
+        """Kill a probe that is still running and wait briefly for it to exit."""
+        thread = getattr(self, "_probe_thread", None)
+        if thread is None:
+            return
+        self._probe_cancel.set()
+        thread.join(PROBE_JOIN_GRACE)
+        if thread.is_alive():
+            self.log_operation("FBX metadata probe did not stop after cancel", "WARNING")
+        self._probe_thread = None
+
+    def _join_probe(self, timeout=None) -> bool:
+        """Wait up to `timeout` seconds (None = until the probe's own timeout)
+        for the probe and adopt its manifest. Returns False if still running.
+        """
+        thread = getattr(self, "_probe_thread", None)
+        if thread is None:
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            return False
+        self._probe_thread = None
+
+        manifest = self._probe_result.get("manifest")
+        if manifest and not manifest.get("error"):
+            self._fbx_unit_scale = manifest.get("unit_scale", 0.01)
+            self._fbx_material_textures = manifest.get("material_textures", {}) or {}
+            self.original_dimensions = manifest.get("original_dimensions")
+            self._fbx_vertices = manifest.get("vertices")
+            self._fbx_faces = manifest.get("faces")
+            self.log_operation(
+                f"FBX probe ok: unit_scale={self._fbx_unit_scale}, "
+                f"textures={len(self._fbx_material_textures)}, "
+                f"vertices={'yes' if self._fbx_vertices is not None else 'no'}"
+            )
+        else:
+            msg = (manifest or {}).get("error", "no manifest")
+            self.log_operation(
+                f"FBX metadata probe unavailable ({msg}); "
+                "proceeding with FBX2glTF only.",
+                "WARNING",
+            )
+        return True
+
+    def _rescue_zero_geometry(self, output_path: str, color) -> bool:
         """Rebuild the GLB from pyassimp-read FBX data when FBX2glTF emitted
         degenerate (zero-extent) geometry. Returns True if a rescue happened.
         """
@@ -752,6 +839,9 @@ class FBXConverter(BaseConverter):
             self.log_operation(f"Warning: zero-geometry check failed: {e}", "WARNING")
             return False
 
+        # The rescue needs the probe's vertices/faces: wait for it in full.
+        self._join_probe()
+        original_dimensions = getattr(self, "original_dimensions", None)
         if getattr(self, "_fbx_vertices", None) is None or getattr(self, "_fbx_faces", None) is None:
             self.log_operation(
                 "WARNING: FBX2glTF GLB has zero geometry and no pyassimp data to rescue from",
@@ -781,11 +871,11 @@ class FBXConverter(BaseConverter):
     def _embed_external_textures_gltf(self, gltf, fbx_path: str) -> None:
         """Embed external texture files into an already-loaded GLTF object.
         This version works with a gltf object that's already in memory.
+        Images end up as BIN-chunk bufferViews, never data URIs.
         """
         try:
-            import base64
-
             fbx_dir = os.path.dirname(fbx_path)
+            builder = BlobBuilder(gltf)
 
             # --- AGGRESSIVE TEXTURE RECOVERY ---
             # If pyassimp found textures that aren't in the GLB, add them now
@@ -831,9 +921,9 @@ class FBXConverter(BaseConverter):
                                     break
 
                             if texture_file:
-                                # Add new image, embedded immediately as a data
-                                # URI — a bare filename URI would leave the GLB
-                                # with a dangling external reference.
+                                # Add new image, embedded immediately in the
+                                # BIN chunk — a bare filename URI would leave
+                                # the GLB with a dangling external reference.
                                 with open(texture_file, "rb") as tf:
                                     tex_bytes = tf.read()
                                 ext = os.path.splitext(texture_file)[1].lower()
@@ -842,11 +932,10 @@ class FBXConverter(BaseConverter):
                                     ".jpg": "image/jpeg",
                                     ".jpeg": "image/jpeg",
                                     ".webp": "image/webp",
-                                }.get(ext, "image/png")
+                                }.get(ext) or _sniff_image_mime(tex_bytes)
                                 img_idx = len(gltf.images) if gltf.images else 0
-                                new_img = Image(
-                                    uri=f"data:{mime};base64,{base64.b64encode(tex_bytes).decode('utf-8')}"
-                                )
+                                new_img = Image()
+                                builder.add_image(new_img, tex_bytes, mime)
                                 if gltf.images is None:
                                     gltf.images = []
                                 gltf.images.append(new_img)
@@ -869,48 +958,24 @@ class FBXConverter(BaseConverter):
                                 )
 
             if gltf.images:
-                # Convert buffer-embedded images to data URIs
-                binary_blob = gltf.binary_blob()
-                for i, img in enumerate(gltf.images):
-                    if binary_blob and img.bufferView is not None:
-                        try:
-                            buffer_view = gltf.bufferViews[img.bufferView]
-                            offset = buffer_view.byteOffset if buffer_view.byteOffset else 0
-                            length = buffer_view.byteLength
-
-                            image_data = binary_blob[offset : offset + length]
-
-                            # Determine MIME type
-                            mime_type = "image/png"
-                            if image_data[:4] == b"\x89PNG":
-                                mime_type = "image/png"
-                            elif image_data[:2] == b"\xff\xd8":
-                                mime_type = "image/jpeg"
-
-                            # Convert to data URI
-                            data_uri = f"data:{mime_type};base64,{base64.b64encode(image_data).decode('utf-8')}"
-                            img.uri = data_uri
-                            img.bufferView = None
-                            self.log_operation(f"Converted image {i} to data URI")
-                        except Exception as e:
-                            self.log_operation(
-                                f"Warning: Could not convert image {i}: {e}", "WARNING"
-                            )
+                moved = _pack_images_into_bin(gltf, builder)
+                if moved:
+                    self.log_operation(f"Moved {moved} data URI image(s) into the BIN chunk")
             else:
                 self.log_operation("No images found in GLB to embed")
+            builder.commit()
 
             # Alpha-correctness pass (cutout → MASK, bogus factor alpha → clamp).
-            # Runs after image conversion so the texture bytes are inspectable.
+            # Runs after the blob is committed so the texture bytes are inspectable.
             fix_material_transparency(gltf, self.log_operation)
 
         except Exception as e:
             self.log_operation(f"Warning: Could not embed textures: {e}", "WARNING")
 
     def _embed_external_textures(self, glb_path: str, fbx_path: str) -> None:
-        """Embed external texture files into GLB."""
+        """Embed external texture files into the GLB's BIN chunk."""
         try:
             from pygltflib import GLTF2
-            import base64
 
             # LOG: FBX directory contents (textures that came with FBX)
             fbx_dir = os.path.dirname(fbx_path)
@@ -1003,94 +1068,22 @@ class FBXConverter(BaseConverter):
                         f"  ⚠️  Image {i}: Unknown format (no URI, no bufferView)"
                     )
 
-            # If images are embedded in buffer, convert to data URIs for model-viewer compatibility
+            # Buffer-embedded images stay in the BIN chunk — model-viewer
+            # decodes bufferView images directly, and data URIs would add 33%
+            # and a base64 decode on every load. Only fill in missing mimeTypes.
             if has_buffer_images:
-                self.log_operation(
-                    "🔄 Converting buffer-embedded textures to data URIs for model-viewer"
-                )
+                self.log_operation("🔄 Keeping buffer-embedded textures in the BIN chunk")
                 try:
-                    # Get binary blob
-                    binary_blob = gltf.binary_blob()
-                    if not binary_blob:
-                        self.log_operation(
-                            "⚠️  Warning: No binary blob found", "WARNING"
-                        )
-                        return
-
-                    self.log_operation(f"📦 Binary blob size: {len(binary_blob)} bytes")
-
-                    # Convert each buffer-embedded image to data URI
-                    conversion_summary = []
-                    for i, img in enumerate(gltf.images):
-                        if img.bufferView is not None:
-                            try:
-                                # Get buffer view
-                                buffer_view = gltf.bufferViews[img.bufferView]
-                                offset = (
-                                    buffer_view.byteOffset
-                                    if buffer_view.byteOffset
-                                    else 0
-                                )
-                                length = buffer_view.byteLength
-
-                                self.log_operation(f"  🔄 Converting Image {i}:")
-                                self.log_operation(
-                                    f"     Buffer offset: {offset}, length: {length}"
-                                )
-
-                                # Extract image data from binary blob
-                                image_data = binary_blob[offset : offset + length]
-
-                                # Determine MIME type from image data
-                                mime_type = "image/png"  # Default
-                                if image_data[:4] == b"\x89PNG":
-                                    mime_type = "image/png"
-                                elif image_data[:2] == b"\xff\xd8":
-                                    mime_type = "image/jpeg"
-                                elif (
-                                    image_data[:4] == b"RIFF"
-                                    and image_data[8:12] == b"WEBP"
-                                ):
-                                    mime_type = "image/webp"
-
-                                self.log_operation(f"     Detected format: {mime_type}")
-
-                                # Convert to data URI
-                                data_uri = f"data:{mime_type};base64,{base64.b64encode(image_data).decode('utf-8')}"
-
-                                # Replace bufferView with data URI
-                                img.uri = data_uri
-                                img.bufferView = None
-
-                                conversion_summary.append(
-                                    {
-                                        "index": i,
-                                        "size": len(image_data),
-                                        "mime": mime_type,
-                                        "data_uri_size": len(data_uri),
-                                    }
-                                )
-
-                                self.log_operation(
-                                    f"     ✅ Converted to data URI: {len(image_data)} bytes → {len(data_uri)} chars"
-                                )
-                            except Exception as img_error:
-                                self.log_operation(
-                                    f"     ❌ Failed to convert image {i}: {img_error}",
-                                    "WARNING",
-                                )
-                                conversion_summary.append(
-                                    {"index": i, "error": str(img_error)}
-                                )
-
-                    # Summary
-                    successful = len(
-                        [c for c in conversion_summary if "error" not in c]
-                    )
-                    failed = len([c for c in conversion_summary if "error" in c])
+                    builder = BlobBuilder(gltf)
+                    moved = _pack_images_into_bin(gltf, builder)
+                    builder.commit()
                     self.log_operation(
-                        f"🔄 Conversion Summary: {successful} successful, {failed} failed"
+                        f"📦 Binary blob size: {len(gltf.binary_blob() or b'')} bytes"
                     )
+                    if moved:
+                        self.log_operation(
+                            f"🔄 Moved {moved} data URI image(s) into the BIN chunk"
+                        )
 
                     # Ensure all images have corresponding textures
                     from pygltflib import Texture, Sampler
@@ -1204,7 +1197,10 @@ class FBXConverter(BaseConverter):
                     self.log_operation(
                         f"📦 Images in GLB (from FBX2glTF): {len(gltf.images)}"
                     )
-                    self.log_operation(f"🔄 Images converted to Data URI: {successful}")
+                    self.log_operation(
+                        f"🔄 Images stored as bufferViews: "
+                        f"{sum(1 for img in gltf.images if img.bufferView is not None)}"
+                    )
                     self.log_operation(
                         f"🎨 Textures in GLB: {len(gltf.textures) if gltf.textures else 0}"
                     )
@@ -1233,7 +1229,7 @@ class FBXConverter(BaseConverter):
                     self.log_operation(f"⚠️  Unused textures: {unused_count}")
                     self.log_operation("=" * 60)
 
-                    # Save with data URIs
+                    # Save via temp file, then swap in
                     temp_path = glb_path.replace(".glb", "_temp.glb")
                     gltf.save(temp_path)
 
@@ -1247,7 +1243,7 @@ class FBXConverter(BaseConverter):
 
                         final_size = os.path.getsize(glb_path)
                         self.log_operation(
-                            f"✅ GLB re-exported with data URI textures: {final_size} bytes"
+                            f"✅ GLB re-exported with BIN-chunk textures: {final_size} bytes"
                         )
                         return
                     else:
@@ -1266,7 +1262,8 @@ class FBXConverter(BaseConverter):
 
             fbx_dir = os.path.dirname(fbx_path)
             glb_dir = os.path.dirname(glb_path)
-            modified = False
+            builder = BlobBuilder(gltf)
+            modified = _pack_images_into_bin(gltf, builder) > 0
 
             for i, image in enumerate(gltf.images):
                 # Check if image has external URI (not embedded)
@@ -1312,16 +1309,16 @@ class FBXConverter(BaseConverter):
                         ".jpg": "image/jpeg",
                         ".jpeg": "image/jpeg",
                         ".webp": "image/webp",
-                    }.get(ext, "image/png")
+                    }.get(ext) or _sniff_image_mime(texture_data)
 
-                    # Convert to data URI
-                    data_uri = f"data:{mime_type};base64,{base64.b64encode(texture_data).decode('utf-8')}"
-                    image.uri = data_uri
+                    builder.add_image(image, texture_data, mime_type)
                     modified = True
                     self.log_operation(
                         f"Embedded texture {i}: {len(texture_data)} bytes"
                     )
 
+            builder.commit()
+
             # Alpha-correctness pass for the no-buffer-images path (the buffer
             # path above runs it before saving and returns early).
             if fix_material_transparency(gltf, self.log_operation):
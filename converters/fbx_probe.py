@@ -9,7 +9,17 @@ required for the actual FBX2glTF conversion.
 So we run the probe in a separate child process with an RLIMIT_AS cap: a
 runaway parse hits its own address-space limit (clean failure) instead of
 the kernel OOM-killing the server, and the converter then proceeds with
-FBX2glTF alone. Run as a module:
+FBX2glTF alone.
+
+Paying a fresh interpreter + numpy/trimesh/pyassimp import for every upload
+made the probe slower than the FBX parse itself on small files, so children
+are forked from a warm multiprocessing forkserver instead (preloaded via
+converters.fbx_probe_warm). Every probe still gets its own process, its own
+RLIMIT_AS and a hard timeout; vertices/faces come back through a POSIX
+shared-memory segment rather than a compressed .npz round trip on disk.
+
+Where forkserver is unavailable (or FBX_PROBE_POOL=0) the probe falls back to
+a cold subprocess:
 
     python -m converters.fbx_probe <input.fbx> <work_dir> <out_manifest.json>
 """
@@ -19,28 +29,43 @@ import os
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+import uuid
+
+from .tool_runner import ToolCancelled, ToolResult, record, run_tool, tool_slot
 
 # Optional RLIMIT_AS cap for the child, in MB. Default 0 = disabled.
 # RLIMIT_AS limits *virtual* address space; numpy + the dynamic linker reserve
 # multiple GB of virtual space at rest, so a low cap (e.g. 1536) makes even
 # `import numpy` fail with "libz.so.1: cannot open shared object file" and the
-# probe never runs. Process isolation is the real OOM containment: a runaway
-# parse is OOM-killed as the child (the memory hog), and the web worker
-# survives. Only set this to a *generous* value (>=4096) if you want a hard cap.
+# probe never runs (forked pool children inherit numpy already mapped, but the
+# cold-subprocess fallback does not). Process isolation is the real OOM
+# containment: a runaway parse is OOM-killed as the child (the memory hog),
+# and the web worker survives. Only set this to a *generous* value (>=4096)
+# if you want a hard cap.
 DEFAULT_MEM_MB = int(os.environ.get("FBX_PROBE_MEM_MB", "0"))
 DEFAULT_TIMEOUT = int(os.environ.get("FBX_PROBE_TIMEOUT", "90"))
+# Fork probe children from a warm forkserver. 0 = always use a cold subprocess.
+POOL_ENABLED = os.environ.get("FBX_PROBE_POOL", "1").lower() not in ("0", "false", "no")
 
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SHM_PREFIX = "fbxprobe_"
 
+_pool_lock = threading.Lock()
+_pool_ctx = None
+_pool_unavailable = False
 
-def probe_fbx(input_path, work_dir):
+
+def probe_fbx(input_path):
     """Extract FBX metadata via assimp. Returns a manifest dict:
 
-        {unit_scale, material_textures, original_dimensions, vertices_npz}
+        {unit_scale, material_textures, original_dimensions, vertices, faces}
 
     Embedded textures are written next to input_path (unchanged behaviour);
-    vertices/faces (for the rescue path) go to an .npz in work_dir. Raises on
-    an assimp import failure — the caller treats that as "probe unavailable".
+    vertices/faces (for the rescue path) are numpy arrays or None — the
+    caller decides how to ship them back to the parent. Raises on an assimp
+    import failure — the caller treats that as "probe unavailable".
     """
     import numpy as np
 
@@ -57,7 +82,8 @@ def probe_fbx(input_path, work_dir):
         "unit_scale": 0.01,
         "material_textures": {},
         "original_dimensions": None,
-        "vertices_npz": None,
+        "vertices": None,
+        "faces": None,
     }
 
     with _pyassimp_scene(
@@ -139,12 +165,8 @@ def probe_fbx(input_path, work_dir):
                 if parts:
                     combined_f = np.vstack(parts)
 
-            npz_path = os.path.join(work_dir, "fbx_geometry.npz")
-            if combined_f is not None:
-                np.savez_compressed(npz_path, vertices=combined_v, faces=combined_f)
-            else:
-                np.savez_compressed(npz_path, vertices=combined_v)
-            manifest["vertices_npz"] = npz_path
+            manifest["vertices"] = combined_v
+            manifest["faces"] = combined_f
 
             if float(max(extents)) > 0.001:
                 extents_m = extents * unit_scale
@@ -157,25 +179,201 @@ def probe_fbx(input_path, work_dir):
     return manifest
 
 
-def run_isolated(input_path, mem_mb=None, timeout=None):
-    """Run probe_fbx() in a memory-capped child process.
+def _apply_mem_cap(mem_mb):
+    """Opt-in RLIMIT_AS cap for the current (child) process."""
+    if not mem_mb or mem_mb <= 0:
+        return
+    try:
+        import resource
+
+        cap = mem_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
+    except Exception:
+        pass
+
 
-    Returns a manifest dict with in-memory `vertices`/`faces` arrays (the npz
-    is loaded then deleted), or {"error": ...} on any failure — the converter
-    treats an error as "skip the probe, use FBX2glTF only".
+def _share_geometry(manifest, shm_name):
+    """Move manifest vertices/faces into one shared-memory segment.
+
+    The arrays are replaced by a `geometry_shm` descriptor (segment name plus
+    per-array shape/dtype/offset) so only a few hundred bytes cross the pipe.
+    The segment is unregistered from the resource tracker here because its
+    lifetime now belongs to the parent, which unlinks it in _collect_geometry.
     """
     import numpy as np
+    from multiprocessing import resource_tracker, shared_memory
+
+    arrays = {}
+    for key in ("vertices", "faces"):
+        arr = manifest.pop(key, None)
+        if arr is not None:
+            arrays[key] = np.ascontiguousarray(arr)
+    if not arrays:
+        return manifest
+
+    layout, size = {}, 0
+    for key, arr in arrays.items():
+        size = (size + 7) & ~7  # keep every array 8-byte aligned
+        layout[key] = {"shape": list(arr.shape), "dtype": arr.dtype.str, "offset": size}
+        size += arr.nbytes
+
+    shm = shared_memory.SharedMemory(name=shm_name, create=True, size=max(size, 1))
+    try:
+        for key, arr in arrays.items():
+            view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf,
+                              offset=layout[key]["offset"])
+            view[...] = arr
+            del view
+    finally:
+        resource_tracker.unregister(shm._name, "shared_memory")
+        shm.close()
+    manifest["geometry_shm"] = {"name": shm_name, "arrays": layout}
+    return manifest
+
+
+def _collect_geometry(manifest):
+    """Copy vertices/faces out of the child's segment, then unlink it."""
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    manifest.setdefault("vertices", None)
+    manifest.setdefault("faces", None)
+    desc = manifest.pop("geometry_shm", None)
+    if not desc:
+        return manifest
+    shm = shared_memory.SharedMemory(name=desc["name"])
+    try:
+        for key, spec in desc["arrays"].items():
+            view = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]),
+                              buffer=shm.buf, offset=spec["offset"])
+            manifest[key] = view.copy()
+            del view
+    finally:
+        shm.close()
+        shm.unlink()
+    return manifest
+
+
+def _discard_shm(shm_name):
+    """Unlink a segment a killed/failed child may have left behind."""
+    from multiprocessing import shared_memory
+
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+    except (FileNotFoundError, OSError, ValueError):
+        return
+    try:
+        shm.close()
+        shm.unlink()
+    except Exception:
+        pass
+
+
+def _pool_child(conn, input_path, shm_name, mem_mb):
+    """Forked probe child: cap memory, probe, publish geometry, report."""
+    _apply_mem_cap(mem_mb)
+    try:
+        manifest = _share_geometry(probe_fbx(input_path), shm_name)
+    except BaseException as e:  # includes MemoryError / assimp failures
+        manifest = {"error": str(e)[:500]}
+    try:
+        # Forkserver children aren't ours to wait4(), so report peak RSS here.
+        import resource
+
+        manifest["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        conn.send(manifest)
+    except BaseException:
+        pass
+    finally:
+        conn.close()
+
+
+def _pool_context():
+    """The warm forkserver context, or None if this platform lacks one."""
+    global _pool_ctx, _pool_unavailable
+
+    if not POOL_ENABLED:
+        return None
+    with _pool_lock:
+        if _pool_ctx is None and not _pool_unavailable:
+            try:
+                import multiprocessing
+
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(["converters.fbx_probe_warm"])
+                _pool_ctx = ctx
+            except ValueError:
+                _pool_unavailable = True
+        return _pool_ctx
+
+
+def warm_pool():
+    """Start the forkserver ahead of the first upload (best effort)."""
+    if _pool_context() is None:
+        return False
+    try:
+        from multiprocessing import forkserver
+
+        forkserver.ensure_running()
+        return True
+    except Exception:
+        return False
+
+
+def _run_pooled(ctx, input_path, mem_mb, timeout, cancel_event=None):
+    shm_name = f"{_SHM_PREFIX}{uuid.uuid4().hex[:16]}"
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_pool_child,
+        args=(child_conn, input_path, shm_name, mem_mb),
+        name="fbx-probe",
+        daemon=True,
+    )
+    collected = False
+    try:
+        proc.start()
+        child_conn.close()
+        deadline = time.monotonic() + timeout
+        while not parent_conn.poll(min(0.1, max(0.0, deadline - time.monotonic()))):
+            if cancel_event is not None and cancel_event.is_set():
+                return {"error": "probe cancelled"}
+            if time.monotonic() >= deadline:
+                return {"error": f"probe timed out after {timeout}s"}
+        try:
+            manifest = parent_conn.recv()
+        except EOFError:
+            proc.join(5)
+            return {"error": f"probe exited {proc.exitcode}"}
+        if manifest.get("error"):
+            return manifest
+        _collect_geometry(manifest)
+        collected = True
+        return manifest
+    finally:
+        parent_conn.close()
+        if proc.is_alive():
+            proc.join(1)
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        if not collected:
+            _discard_shm(shm_name)
+
+
+def _run_subprocess(input_path, mem_mb, timeout, cancel_event=None):
+    import numpy as np
 
-    timeout = timeout or DEFAULT_TIMEOUT
     work_dir = tempfile.mkdtemp(prefix="fbxprobe_")
     out_json = os.path.join(work_dir, "manifest.json")
     env = dict(os.environ)
     if mem_mb:
         env["FBX_PROBE_MEM_MB"] = str(mem_mb)
     try:
-        proc = subprocess.run(
+        proc = run_tool(
+            "fbx_probe",
             [sys.executable, "-m", "converters.fbx_probe", input_path, work_dir, out_json],
-            capture_output=True, text=True, timeout=timeout, cwd=_REPO_ROOT, env=env,
+            timeout=timeout, cwd=_REPO_ROOT, env=env, cancel_event=cancel_event,
+            admission_timeout=timeout,
         )
         if not os.path.exists(out_json):
             tail = (proc.stderr or proc.stdout or "")[-300:]
@@ -185,6 +383,7 @@ def run_isolated(input_path, mem_mb=None, timeout=None):
         if manifest.get("error"):
             return manifest
         npz = manifest.pop("vertices_npz", None)
+        manifest["vertices"] = manifest["faces"] = None
         if npz and os.path.exists(npz):
             with np.load(npz) as data:
                 manifest["vertices"] = data["vertices"] if "vertices" in data else None
@@ -192,8 +391,6 @@ def run_isolated(input_path, mem_mb=None, timeout=None):
         return manifest
     except subprocess.TimeoutExpired:
         return {"error": f"probe timed out after {timeout}s"}
-    except Exception as e:  # noqa: BLE001
-        return {"error": f"probe runner error: {e}"}
     finally:
         try:
             import shutil
@@ -202,21 +399,65 @@ def run_isolated(input_path, mem_mb=None, timeout=None):
             pass
 
 
+def run_isolated(input_path, mem_mb=None, timeout=None, cancel_event=None):
+    """Run probe_fbx() in a memory-capped child process.
+
+    Returns a manifest dict with in-memory `vertices`/`faces` arrays, or
+    {"error": ...} on any failure — the converter treats an error as "skip
+    the probe, use FBX2glTF only". Setting cancel_event kills the child and
+    frees its fbx_probe slot.
+    """
+    timeout = timeout or DEFAULT_TIMEOUT
+    try:
+        ctx = _pool_context()
+        if ctx is None:
+            return _run_subprocess(input_path, mem_mb, timeout, cancel_event)
+        # Same slot/memory admission as the other heavy tools; the probe is
+        # optional, so it never queues longer than its own timeout.
+        with tool_slot("fbx_probe", cancel_event, admission_timeout=timeout) as queued:
+            start = time.monotonic()
+            manifest = _run_pooled(
+                ctx, input_path, mem_mb or DEFAULT_MEM_MB, timeout, cancel_event
+            )
+        error = manifest.get("error") or ""
+        record(ToolResult(
+            tool="fbx_probe",
+            args=[input_path],
+            returncode=1 if error else 0,
+            stdout="",
+            stderr=error,
+            duration=time.monotonic() - start,
+            queued=queued,
+            peak_rss_mb=manifest.pop("peak_rss_mb", None),
+            timed_out=error.startswith("probe timed out"),
+        ))
+        return manifest
+    except ToolCancelled:
+        return {"error": "probe cancelled"}
+    except Exception as e:  # noqa: BLE001
+        return {"error": f"probe runner error: {e}"}
+
+
 def _main():
-    input_path, work_dir, out_json = sys.argv[1], sys.argv[2], sys.argv[3]
-    mem_mb = int(os.environ.get("FBX_PROBE_MEM_MB", str(DEFAULT_MEM_MB)))
-    if mem_mb > 0:
-        # Opt-in hard cap. Off by default — a low virtual-AS limit breaks
-        # numpy's import; process isolation already contains OOM.
-        try:
-            import resource
+    import numpy as np
 
-            cap = mem_mb * 1024 * 1024
-            resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
-        except Exception:
-            pass
+    input_path, work_dir, out_json = sys.argv[1], sys.argv[2], sys.argv[3]
+    # Opt-in hard cap. Off by default — a low virtual-AS limit breaks
+    # numpy's import in a cold interpreter; process isolation already
+    # contains OOM.
+    _apply_mem_cap(int(os.environ.get("FBX_PROBE_MEM_MB", str(DEFAULT_MEM_MB))))
     try:
-        manifest = probe_fbx(input_path, work_dir)
+        manifest = probe_fbx(input_path)
+        vertices = manifest.pop("vertices", None)
+        faces = manifest.pop("faces", None)
+        manifest["vertices_npz"] = None
+        if vertices is not None:
+            npz_path = os.path.join(work_dir, "fbx_geometry.npz")
+            if faces is not None:
+                np.savez_compressed(npz_path, vertices=vertices, faces=faces)
+            else:
+                np.savez_compressed(npz_path, vertices=vertices)
+            manifest["vertices_npz"] = npz_path
         with open(out_json, "w") as fh:
             json.dump(manifest, fh)
         sys.exit(0)
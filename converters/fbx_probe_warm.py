@@ -0,0 +1,20 @@
+"""Preload target for the FBX probe forkserver (see fbx_probe._pool_context).
+
+Imported once in the warm parent so every forked probe child starts with
+numpy, the converter helpers and, when libassimp is installed, pyassimp
+already loaded. pyassimp raises AssimpError — a BaseException, not an
+ImportError — when the native library is missing, which would take the
+forkserver down with it, so that import is guarded here instead of being
+listed in the preload directly. Children then just fail the probe as before.
+"""
+
+import numpy  # noqa: F401
+
+from . import base_converter, fbx_converter, fbx_probe  # noqa: F401
+
+fbx_converter._ensure_assimp_library_path()
+try:
+    import pyassimp  # noqa: F401
+    from pyassimp import postprocess  # noqa: F401
+except BaseException:  # noqa: BLE001
+    pass
@@ -6,8 +6,8 @@ The step is intentionally fail-safe: if gltfpack is missing, errors, or does not
 produce a smaller file, the original GLB is left completely untouched so the
 conversion pipeline can never regress.
 
-NOTE: gltfpack output uses KHR_meshopt_compression / KHR_mesh_quantization, which
-<model-viewer> decodes natively. Verify a few representative models in the viewer
+NOTE: gltfpack output uses meshopt compression / KHR_mesh_quantization, which
+<model-viewer> decodes natively (the edit paths decode it with meshopt_decoder). Verify a few representative models in the viewer
 and AR before turning this on in production.
 """
 
@@ -15,7 +15,8 @@ import os
 import shutil
 import logging
 import platform
-import subprocess
+
+from .tool_runner import run_tool
 
 logger = logging.getLogger(__name__)
 
@@ -29,26 +30,31 @@ def _safe_remove(path: str) -> None:
 
 
 def glb_requires_meshopt(glb_path: str) -> bool:
-    """Return True if the GLB requires KHR_meshopt_compression.
+    """Return True if the GLB requires EXT_/KHR_meshopt_compression.
 
     gltfpack output (when GLB_OPTIMIZE is on) uses meshopt compression, which
-    trimesh CANNOT decode. Editing such a file (slice / material / transform) would
-    silently corrupt it, so callers should refuse to edit when this returns True.
+    trimesh and pygltflib cannot read. Edit paths decode it first (see
+    converters.meshopt_decoder) and use this to decide whether to re-run
+    optimize_glb on the edited result.
     """
+    names = ("EXT_meshopt_compression", "KHR_meshopt_compression")
     try:
         if not glb_path or not os.path.exists(glb_path):
             return False
-        from pygltflib import GLTF2
-
-        gltf = GLTF2().load(glb_path)
-        required = list(getattr(gltf, "extensionsRequired", None) or [])
-        return "KHR_meshopt_compression" in required
+        # Only the JSON chunk is needed; a full parse would read the BIN too.
+        from .meshopt_decoder import read_glb_json_chunk
+
+        doc = read_glb_json_chunk(glb_path)
+        if doc is None:
+            raise ValueError("not a GLB")
+        required = doc.get("extensionsRequired") or []
+        return any(name in required for name in names)
     except Exception:
         # Dependency-light fallback: scan the GLB JSON chunk for the extension name.
         try:
             with open(glb_path, "rb") as f:
                 head = f.read(262144)
-            return b"KHR_meshopt_compression" in head
+            return any(name.encode() in head for name in names)
         except Exception:
             return False
 
@@ -97,7 +103,7 @@ def optimize_glb(glb_path: str, timeout: int = 300) -> bool:
     cmd = cmd_base + ["-i", glb_path, "-o", tmp_out, "-cc", "-kn", "-ke", "-km"]
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        result = run_tool("gltfpack", cmd, timeout=timeout)
     except Exception as e:
         logger.warning(f"gltfpack failed to run: {e}; keeping original GLB")
         _safe_remove(tmp_out)
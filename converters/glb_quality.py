@@ -10,6 +10,9 @@ Ported from academic_ar. Three layers, all idempotent:
 3. validate_glb_quality — sanity gate (parses, has meshes/POSITION/materials,
    no dangling external texture refs). Used in WARN mode by default so a
    borderline-but-viewable model still publishes; strict mode raises.
+
+compact_gltf/compact_glb sit alongside: a reachability GC that glb_modifier
+and version_manager run so edits that append buffers don't accumulate.
 """
 
 from __future__ import annotations
@@ -48,15 +51,368 @@ def _mime_for(path: Path) -> str:
     return mime or "image/png"
 
 
-def _append_blob(gltf: GLTF2, payload: bytes) -> int:
-    blob = gltf.binary_blob() or b""
-    padding = b"\x00" * ((4 - (len(blob) % 4)) % 4)
-    offset = len(blob) + len(padding)
-    gltf.set_binary_blob(blob + padding + payload)
+class BlobBuilder:
+    """Append payloads to a GLB's BIN chunk with a single final copy.
+
+    Concatenating onto gltf.binary_blob() per image re-copies the whole blob
+    every time (quadratic in texture count, and FBX exports routinely carry
+    dozens of maps). The builder keeps the existing blob as a memoryview plus
+    a list of appended segments, and joins them exactly once in commit().
+    """
+
+    def __init__(self, gltf: GLTF2):
+        self.gltf = gltf
+        blob = gltf.binary_blob() or b""
+        self._parts = [memoryview(blob)] if blob else []
+        self._size = len(blob)
+        self._dirty = False
+
+    def _pad(self) -> None:
+        padding = (4 - (self._size % 4)) % 4
+        if padding:
+            self._parts.append(b"\x00" * padding)
+            self._size += padding
+
+    def append(self, payload: bytes) -> int:
+        """Queue payload at the next 4-byte aligned offset; return that offset."""
+        self._pad()
+        offset = self._size
+        self._parts.append(memoryview(payload))
+        self._size += len(payload)
+        self._dirty = True
+        return offset
+
+    def add_image(self, image, payload: bytes, mime_type: str) -> int:
+        """Point `image` at a new bufferView holding payload; return its index."""
+        offset = self.append(payload)
+        if self.gltf.bufferViews is None:
+            self.gltf.bufferViews = []
+        self.gltf.bufferViews.append(
+            BufferView(buffer=0, byteOffset=offset, byteLength=len(payload))
+        )
+        image.bufferView = len(self.gltf.bufferViews) - 1
+        image.mimeType = mime_type
+        image.uri = None
+        return image.bufferView
+
+    def commit(self) -> bool:
+        """Write the assembled blob back to the GLTF; False if nothing changed."""
+        if not self._dirty:
+            return False
+        self._pad()
+        self.gltf.set_binary_blob(b"".join(self._parts))
+        if not self.gltf.buffers:
+            self.gltf.buffers = [Buffer(byteLength=0)]
+        self.gltf.buffers[0].byteLength = self._size
+        self._parts = [memoryview(self.gltf.binary_blob())]
+        self._dirty = False
+        return True
+
+
+def repack_binary(gltf: GLTF2, replace: dict = None, drop=None) -> int:
+    """Rebuild buffer 0's BIN chunk from its bufferViews.
+
+    `replace` maps bufferView index -> new bytes; views in `drop` are removed
+    and every accessor/image reference is renumbered. Bytes no bufferView
+    points at (superseded textures appended by earlier edits, exporter
+    padding) are left behind. Returns the new blob size.
+
+    Only for single-buffer GLBs without bufferView extensions (meshopt/draco
+    keep their own offsets); callers check that first.
+    """
+    replace = replace or {}
+    drop = set(drop or ())
+    blob = memoryview(gltf.binary_blob() or b"")
+    views = gltf.bufferViews or []
+
+    parts, size = [], 0
+    kept, new_index = [], {}
+    for index, view in enumerate(views):
+        if index in drop:
+            continue
+        if index in replace:
+            data = memoryview(replace[index])
+        else:
+            start = view.byteOffset or 0
+            data = blob[start : start + view.byteLength]
+        padding = (4 - (size % 4)) % 4
+        if padding:
+            parts.append(b"\x00" * padding)
+            size += padding
+        view.byteOffset = size
+        view.byteLength = len(data)
+        parts.append(data)
+        size += len(data)
+        new_index[index] = len(kept)
+        kept.append(view)
+    padding = (4 - (size % 4)) % 4
+    if padding:
+        parts.append(b"\x00" * padding)
+        size += padding
+
+    def _remap(index):
+        if index is None:
+            return None
+        if index not in new_index:
+            raise ValueError(f"bufferView {index} is dropped but still referenced")
+        return new_index[index]
+
+    for accessor in gltf.accessors or []:
+        accessor.bufferView = _remap(accessor.bufferView)
+        sparse = accessor.sparse
+        if sparse is not None:
+            sparse.indices.bufferView = _remap(sparse.indices.bufferView)
+            sparse.values.bufferView = _remap(sparse.values.bufferView)
+    for image in gltf.images or []:
+        image.bufferView = _remap(image.bufferView)
+
+    gltf.bufferViews = kept
+    gltf.set_binary_blob(b"".join(parts))
     if not gltf.buffers:
         gltf.buffers = [Buffer(byteLength=0)]
-    gltf.buffers[0].byteLength = len(gltf.binary_blob() or b"")
-    return offset
+    gltf.buffers[0].byteLength = size
+    return size
+
+
+def _get(holder, key):
+    return holder.get(key) if isinstance(holder, dict) else getattr(holder, key, None)
+
+
+def _set(holder, key, value):
+    if isinstance(holder, dict):
+        holder[key] = value
+    else:
+        setattr(holder, key, value)
+
+
+def _texture_sources(texture):
+    """Yield (holder, key) pairs that reference an image from a texture."""
+    yield texture, "source"
+    for ext in (texture.extensions or {}).values():
+        if isinstance(ext, dict) and "source" in ext:
+            yield ext, "source"
+
+
+def _texture_infos(material):
+    """Yield every textureInfo (object or dict) a material points through."""
+    pbr = material.pbrMetallicRoughness
+    candidates = [material.normalTexture, material.occlusionTexture, material.emissiveTexture]
+    if pbr is not None:
+        candidates += [_get(pbr, "baseColorTexture"), _get(pbr, "metallicRoughnessTexture")]
+    for info in candidates:
+        if info is not None and _get(info, "index") is not None:
+            yield info
+
+    def walk(node):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                if key.endswith("Texture") and "index" in value:
+                    yield value
+                else:
+                    yield from walk(value)
+
+    # KHR_materials_* extensions (clearcoat, sheen, transmission, ...).
+    yield from walk(material.extensions or {})
+
+
+# Extensions whose index references compact_gltf knows how to follow. Any
+# other extension might point at accessors/bufferViews we'd drop, so the
+# file is left alone.
+_COMPACT_SAFE_EXTENSIONS = {
+    "KHR_texture_transform",
+    "KHR_lights_punctual",
+    "KHR_mesh_quantization",
+    "KHR_materials_unlit",
+    "KHR_materials_emissive_strength",
+    "KHR_materials_clearcoat",
+    "KHR_materials_sheen",
+    "KHR_materials_transmission",
+    "KHR_materials_volume",
+    "KHR_materials_ior",
+    "KHR_materials_specular",
+    "KHR_materials_iridescence",
+    "KHR_materials_anisotropy",
+    "EXT_texture_webp",
+    "EXT_mesh_gpu_instancing",
+}
+
+
+def _keep(items, used):
+    """Filter a glTF array to `used` indices; returns (kept, old->new map)."""
+    mapping, kept = {}, []
+    for index, item in enumerate(items or []):
+        if index in used:
+            mapping[index] = len(kept)
+            kept.append(item)
+    return kept, mapping
+
+
+def _attribute_maps(primitive):
+    """Every name->accessor map on a primitive (attributes + morph targets)."""
+    yield primitive.attributes
+    for target in primitive.targets or []:
+        yield target
+
+
+def compact_gltf(gltf: GLTF2) -> "dict | None":
+    """Drop everything unreachable from the scene graph and repack BIN.
+
+    Reachability: nodes -> meshes (plus skins/animations) -> accessors and
+    materials -> textures -> images/samplers -> bufferViews. All nodes are
+    roots: hotspots, camera views and animation channels address them by
+    index, and an unparented node is cheap. Unreachable meshes, accessors,
+    materials, textures, images, samplers and bufferViews are removed, indices
+    are remapped, and the BIN chunk is rebuilt tight (see repack_binary) —
+    which also sheds bytes nothing pointed at any more.
+
+    Returns counts of what was dropped, or None if nothing changed or the
+    file uses extensions/buffers this pass can't follow.
+    """
+    if any(ext not in _COMPACT_SAFE_EXTENSIONS for ext in gltf.extensionsUsed or []):
+        return None
+    if len(gltf.buffers or []) > 1 or any(
+        (bv.buffer or 0) != 0 for bv in gltf.bufferViews or []
+    ):
+        return None
+    if any(image.bufferView is None and image.uri and not image.uri.startswith("data:")
+           for image in gltf.images or []):
+        return None  # external files: not ours to judge
+
+    nodes = gltf.nodes or []
+    used_meshes = {n.mesh for n in nodes if n.mesh is not None}
+    used_accessors, used_materials = set(), set()
+    for index in used_meshes:
+        for prim in gltf.meshes[index].primitives or []:
+            for attrs in _attribute_maps(prim):
+                used_accessors.update(
+                    v for v in (vars(attrs) if not isinstance(attrs, dict) else attrs).values()
+                    if v is not None
+                )
+            if prim.indices is not None:
+                used_accessors.add(prim.indices)
+            if prim.material is not None:
+                used_materials.add(prim.material)
+    for skin in gltf.skins or []:
+        if skin.inverseBindMatrices is not None:
+            used_accessors.add(skin.inverseBindMatrices)
+    for animation in gltf.animations or []:
+        for sampler in animation.samplers or []:
+            used_accessors.update((sampler.input, sampler.output))
+    for node in nodes:
+        instancing = (node.extensions or {}).get("EXT_mesh_gpu_instancing")
+        if instancing:
+            used_accessors.update((instancing.get("attributes") or {}).values())
+
+    used_textures = set()
+    for index in used_materials:
+        used_textures.update(_get(info, "index") for info in _texture_infos(gltf.materials[index]))
+    used_images, used_samplers = set(), set()
+    for index in used_textures:
+        texture = gltf.textures[index]
+        used_images.update(
+            _get(h, k) for h, k in _texture_sources(texture) if _get(h, k) is not None
+        )
+        if texture.sampler is not None:
+            used_samplers.add(texture.sampler)
+
+    used_views = set()
+    for index in used_accessors:
+        accessor = gltf.accessors[index]
+        if accessor.bufferView is not None:
+            used_views.add(accessor.bufferView)
+        if accessor.sparse is not None:
+            used_views.update((accessor.sparse.indices.bufferView, accessor.sparse.values.bufferView))
+    for index in used_images:
+        if gltf.images[index].bufferView is not None:
+            used_views.add(gltf.images[index].bufferView)
+
+    blob_before = len(gltf.binary_blob() or b"")
+    counts = {
+        "meshes": len(gltf.meshes or []) - len(used_meshes),
+        "accessors": len(gltf.accessors or []) - len(used_accessors),
+        "materials": len(gltf.materials or []) - len(used_materials),
+        "textures": len(gltf.textures or []) - len(used_textures),
+        "images": len(gltf.images or []) - len(used_images),
+        "samplers": len(gltf.samplers or []) - len(used_samplers),
+        "bufferViews": len(gltf.bufferViews or []) - len(used_views),
+    }
+
+    gltf.meshes, mesh_map = _keep(gltf.meshes, used_meshes)
+    gltf.accessors, acc_map = _keep(gltf.accessors, used_accessors)
+    gltf.materials, mat_map = _keep(gltf.materials, used_materials)
+    gltf.textures, tex_map = _keep(gltf.textures, used_textures)
+    gltf.images, img_map = _keep(gltf.images, used_images)
+    gltf.samplers, smp_map = _keep(gltf.samplers, used_samplers)
+
+    for node in nodes:
+        if node.mesh is not None:
+            node.mesh = mesh_map[node.mesh]
+        instancing = (node.extensions or {}).get("EXT_mesh_gpu_instancing")
+        if instancing:
+            attrs = instancing.get("attributes") or {}
+            for name, index in attrs.items():
+                attrs[name] = acc_map[index]
+    for mesh in gltf.meshes:
+        for prim in mesh.primitives or []:
+            for attrs in _attribute_maps(prim):
+                names = attrs.keys() if isinstance(attrs, dict) else list(vars(attrs))
+                for name in names:
+                    if _get(attrs, name) is not None:
+                        _set(attrs, name, acc_map[_get(attrs, name)])
+            if prim.indices is not None:
+                prim.indices = acc_map[prim.indices]
+            if prim.material is not None:
+                prim.material = mat_map[prim.material]
+    for skin in gltf.skins or []:
+        if skin.inverseBindMatrices is not None:
+            skin.inverseBindMatrices = acc_map[skin.inverseBindMatrices]
+    for animation in gltf.animations or []:
+        for sampler in animation.samplers or []:
+            sampler.input = acc_map[sampler.input]
+            sampler.output = acc_map[sampler.output]
+    for material in gltf.materials:
+        for info in _texture_infos(material):
+            _set(info, "index", tex_map[_get(info, "index")])
+    for texture in gltf.textures:
+        for holder, key in _texture_sources(texture):
+            if _get(holder, key) is not None:
+                _set(holder, key, img_map[_get(holder, key)])
+        if texture.sampler is not None:
+            texture.sampler = smp_map[texture.sampler]
+
+    drop_views = set(range(len(gltf.bufferViews or []))) - used_views
+    blob_after = repack_binary(gltf, drop=drop_views) if gltf.bufferViews else 0
+    if not any(counts.values()) and blob_after >= blob_before:
+        return None
+    counts["bytes_saved"] = blob_before - blob_after
+    return counts
+
+
+def compact_glb(glb_path: str, output_path: str = None) -> "dict | None":
+    """Run compact_gltf on a GLB file, rewriting it atomically if it shrank.
+
+    With output_path the compacted copy is written there instead and
+    glb_path is left untouched; nothing is written when there was nothing
+    to drop.
+    """
+    try:
+        gltf = _load_glb(glb_path)
+    except GLBQualityError:
+        return None
+    stats = compact_gltf(gltf)
+    if stats is None:
+        return None
+    target = output_path or glb_path
+    # pygltflib picks GLB vs JSON output from the extension.
+    tmp_path = f"{target}.compact.{os.getpid()}.glb"
+    try:
+        gltf.save(tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logger.info(f"Compacted {glb_path} -> {target}: {stats}")
+    return stats
 
 
 def _find_texture(uri: str, search_dirs: list) -> "Path | None":
@@ -90,10 +446,7 @@ def embed_external_textures(glb_path: str, search_dirs: list = None) -> bool:
         return False
 
     search_dirs = search_dirs or [os.path.dirname(glb_path)]
-    if gltf.bufferViews is None:
-        gltf.bufferViews = []
-
-    changed = False
+    builder = BlobBuilder(gltf)
     for image in gltf.images:
         uri = image.uri
         if not uri or uri.startswith("data:") or image.bufferView is not None:
@@ -102,15 +455,9 @@ def embed_external_textures(glb_path: str, search_dirs: list = None) -> bool:
         if not texture_path:
             logger.warning(f"External texture not found, leaving as-is: {uri}")
             continue
-        payload = texture_path.read_bytes()
-        offset = _append_blob(gltf, payload)
-        view = BufferView(buffer=0, byteOffset=offset, byteLength=len(payload))
-        image.bufferView = len(gltf.bufferViews)
-        image.mimeType = _mime_for(texture_path)
-        image.uri = None
-        gltf.bufferViews.append(view)
-        changed = True
+        builder.add_image(image, texture_path.read_bytes(), _mime_for(texture_path))
 
+    changed = builder.commit()
     if changed:
         gltf.save(glb_path)
     return changed
@@ -0,0 +1,746 @@
+"""
+Meshopt decoder (EXT_meshopt_compression / KHR_meshopt_compression) in NumPy.
+
+gltfpack output (GLB_OPTIMIZE=true) stores vertex and index data meshopt-
+compressed, and neither pygltflib nor trimesh can read it, so the edit paths
+used to refuse optimized models. This module decodes the compressed
+bufferViews back into a plain BIN chunk on load:
+
+- vertex codec v0 and v1 (byte-plane deltas, 2/4/8-bit groups with
+  sentinels, v1 control bytes and 16-bit/XOR channels),
+- triangle index codec v0/v1 (edge/vertex FIFOs) and the index-sequence
+  codec,
+- OCTAHEDRAL, QUATERNION and EXPONENTIAL filters.
+
+It is a port of the reference scalar decoders in meshoptimizer's
+vertexcodec.cpp / indexcodec.cpp / vertexfilter.cpp; the byte-group parsing
+and the index codec are inherently sequential and run in Python, the delta
+reconstruction and filters are vectorised.
+
+decode_gltf() only undoes the compression. For trimesh-based paths (slicer,
+LOD, version metadata) dequantize_gltf() additionally turns
+KHR_mesh_quantization integer attributes back into floats and bakes the
+per-material KHR_texture_transform gltfpack uses to dequantize UVs, since
+trimesh ignores both.
+"""
+
+import base64
+import io
+import json
+import logging
+import os
+import struct
+
+import numpy as np
+from pygltflib import GLTF2, BufferView
+
+from .glb_quality import BlobBuilder, _get, _set, _texture_infos, compact_gltf, repack_binary
+
+logger = logging.getLogger(__name__)
+
+MESHOPT_EXTENSIONS = ("EXT_meshopt_compression", "KHR_meshopt_compression")
+_JSON_CHUNK = 0x4E4F534A
+
+_VERTEX_HEADER = 0xA0
+_INDEX_HEADER = 0xE0
+_SEQUENCE_HEADER = 0xD0
+_BLOCK_SIZE_BYTES = 8192
+_BLOCK_MAX_SIZE = 256
+_GROUP = 16
+_BITS_V0 = (0, 2, 4, 8)
+_BITS_V1 = (0, 1, 2, 4, 8)
+
+# Per-byte unpack tables for the 1/2/4-bit groups (1-bit groups are stored
+# LSB first, the others MSB first).
+_UNPACK = {
+    1: [tuple((b >> i) & 1 for i in range(8)) for b in range(256)],
+    2: [(b >> 6, (b >> 4) & 3, (b >> 2) & 3, b & 3) for b in range(256)],
+    4: [(b >> 4, b & 15) for b in range(256)],
+}
+
+
+class MeshoptDecodeError(ValueError):
+    """Raised when a meshopt stream is malformed or uses an unknown version."""
+
+
+# ── vertex codec ──────────────────────────────────────────────────────────
+
+
+def _block_size(stride):
+    result = (_BLOCK_SIZE_BYTES // stride) & ~(_GROUP - 1)
+    return min(result, _BLOCK_MAX_SIZE)
+
+
+def _decode_bytes(data, pos, size, bits_table):
+    """Decode `size` (multiple of 16) bytes of byte groups; returns (pos, bytes)."""
+    groups = size // _GROUP
+    header_size = (groups + 3) // 4
+    header = data[pos : pos + header_size]
+    pos += header_size
+    out = bytearray(size)
+    end = len(data)
+    for g in range(groups):
+        bits = bits_table[(header[g // 4] >> ((g % 4) * 2)) & 3]
+        if bits == 0:
+            continue
+        if bits == 8:
+            out[g * _GROUP : (g + 1) * _GROUP] = data[pos : pos + _GROUP]
+            pos += _GROUP
+        else:
+            nbytes = bits * 2
+            table = _UNPACK[bits]
+            values = []
+            for byte in data[pos : pos + nbytes]:
+                values.extend(table[byte])
+            var = pos + nbytes
+            sentinel = (1 << bits) - 1
+            for i, value in enumerate(values):
+                if value == sentinel:
+                    values[i] = data[var]
+                    var += 1
+            out[g * _GROUP : (g + 1) * _GROUP] = bytes(values)
+            pos = var
+        if pos > end:
+            raise MeshoptDecodeError("vertex stream truncated")
+    return pos, out
+
+
+def _unzigzag(values):
+    return (values >> 1) ^ (0 - (values & 1))
+
+
+def _rotate32(values, r):
+    if r == 0:
+        return values
+    return (values << np.uint32(r)) | (values >> np.uint32(32 - r))
+
+
+def _decode_vertex_block(data, pos, out, stride, last, channels, version):
+    count = len(out)
+    aligned = (count + _GROUP - 1) & ~(_GROUP - 1)
+    control = b""
+    if version == 1:
+        control = data[pos : pos + stride // 4]
+        pos += stride // 4
+
+    for k in range(0, stride, 4):
+        ctrl_byte = control[k // 4] if version == 1 else 0
+        planes = np.zeros((4, count), dtype=np.uint8)
+        for j in range(4):
+            ctrl = (ctrl_byte >> (j * 2)) & 3
+            if ctrl == 3:  # literal
+                if pos + count > len(data):
+                    raise MeshoptDecodeError("vertex stream truncated")
+                planes[j] = np.frombuffer(data, np.uint8, count, pos)
+                pos += count
+            elif ctrl == 2:  # all zero
+                continue
+            else:
+                bits = _BITS_V0 if version == 0 else _BITS_V1[ctrl : ctrl + 4]
+                pos, raw = _decode_bytes(data, pos, aligned, bits)
+                planes[j] = np.frombuffer(raw, np.uint8, count)
+
+        channel = channels[k // 4] if version == 1 else 0
+        mode = channel & 3
+        base = last[k : k + 4]
+        if mode == 0:  # bytewise add deltas
+            deltas = _unzigzag(planes.T)
+            out[:, k : k + 4] = np.cumsum(deltas, axis=0, dtype=np.uint8) + base
+        elif mode == 1:  # 16-bit add deltas
+            lanes = planes.astype(np.uint16)
+            words = np.stack([lanes[0] | (lanes[1] << 8), lanes[2] | (lanes[3] << 8)], axis=1)
+            start = base.astype(np.uint16)
+            start = np.array([start[0] | (start[1] << 8), start[2] | (start[3] << 8)], np.uint16)
+            values = np.cumsum(_unzigzag(words), axis=0, dtype=np.uint16) + start
+            out[:, k : k + 4] = values.astype("<u2").view(np.uint8).reshape(count, 4)
+        elif mode == 2:  # 32-bit xor deltas with rotation
+            lanes = planes.astype(np.uint32)
+            words = lanes[0] | (lanes[1] << 8) | (lanes[2] << 16) | (lanes[3] << 24)
+            words = _rotate32(words, (32 - (channel >> 4)) & 31)
+            start = np.frombuffer(base.tobytes(), "<u4")[0]
+            values = np.bitwise_xor.accumulate(words) ^ start
+            out[:, k : k + 4] = values.astype("<u4").view(np.uint8).reshape(count, 4)
+        else:
+            raise MeshoptDecodeError(f"invalid channel mode {channel}")
+
+    last[:] = out[-1]
+    return pos
+
+
+def decode_vertex_buffer(data, count, stride):
+    """Decode a meshopt vertex stream into count*stride bytes."""
+    data = bytes(data)
+    if stride <= 0 or stride > 256 or stride % 4:
+        raise MeshoptDecodeError(f"unsupported vertex stride {stride}")
+    if not data or (data[0] & 0xF0) != _VERTEX_HEADER:
+        raise MeshoptDecodeError("not a meshopt vertex stream")
+    version = data[0] & 0x0F
+    if version > 1:
+        raise MeshoptDecodeError(f"unsupported vertex codec version {version}")
+
+    tail_size = stride + (stride // 4 if version == 1 else 0)
+    tail_pad = max(tail_size, 32 if version == 0 else 24)
+    if len(data) - 1 < tail_pad:
+        raise MeshoptDecodeError("vertex stream truncated")
+    tail = data[len(data) - tail_size :]
+    last = np.frombuffer(tail[:stride], np.uint8).copy()
+    channels = tail[stride:]
+
+    out = np.empty((count, stride), dtype=np.uint8)
+    block = _block_size(stride)
+    pos = 1
+    for start in range(0, count, block):
+        pos = _decode_vertex_block(
+            data, pos, out[start : start + block], stride, last, channels, version
+        )
+    if len(data) - pos != tail_pad:
+        raise MeshoptDecodeError("vertex stream has trailing data")
+    return out.tobytes()
+
+
+# ── index codecs ──────────────────────────────────────────────────────────
+
+
+def _decode_vbyte(data, pos):
+    lead = data[pos]
+    pos += 1
+    if lead < 128:
+        return lead, pos
+    result, shift = lead & 127, 7
+    for _ in range(4):
+        group = data[pos]
+        pos += 1
+        result |= (group & 127) << shift
+        shift += 7
+        if group < 128:
+            break
+    return result & 0xFFFFFFFF, pos
+
+
+def _decode_index(data, pos, last):
+    v, pos = _decode_vbyte(data, pos)
+    delta = (v >> 1) ^ (-(v & 1) & 0xFFFFFFFF)
+    return (last + delta) & 0xFFFFFFFF, pos
+
+
+def decode_index_buffer(data, count, index_size):
+    """Decode a meshopt triangle index stream (mode TRIANGLES)."""
+    data = bytes(data)
+    if count % 3 or index_size not in (2, 4):
+        raise MeshoptDecodeError("invalid triangle index stream parameters")
+    if len(data) < 1 + count // 3 + 16:
+        raise MeshoptDecodeError("index stream truncated")
+    if (data[0] & 0xF0) != _INDEX_HEADER:
+        raise MeshoptDecodeError("not a meshopt index stream")
+    version = data[0] & 0x0F
+    if version > 1:
+        raise MeshoptDecodeError(f"unsupported index codec version {version}")
+
+    edge = [[0xFFFFFFFF, 0xFFFFFFFF] for _ in range(16)]
+    vert = [0xFFFFFFFF] * 16
+    eoff = voff = 0
+    nxt = last = 0
+    fecmax = 13 if version >= 1 else 15
+    code = 1
+    pos = 1 + count // 3
+    safe_end = len(data) - 16
+    codeaux = data[safe_end:]
+    out = [0] * count
+
+    for i in range(0, count, 3):
+        if pos > safe_end:
+            raise MeshoptDecodeError("index stream truncated")
+        codetri = data[code]
+        code += 1
+        if codetri < 0xF0:
+            fe = codetri >> 4
+            a, b = edge[(eoff - 1 - fe) & 15]
+            fec = codetri & 15
+            if fec < fecmax:
+                if fec == 0:
+                    c = nxt
+                    nxt += 1
+                else:
+                    c = vert[(voff - 1 - fec) & 15]
+                vert[voff] = c
+                voff = (voff + (fec == 0)) & 15
+            else:
+                if fec != 15:
+                    c = (last + (fec - (fec ^ 3))) & 0xFFFFFFFF
+                else:
+                    c, pos = _decode_index(data, pos, last)
+                last = c
+                vert[voff] = c
+                voff = (voff + 1) & 15
+            out[i : i + 3] = (a, b, c)
+            edge[eoff] = [c, b]
+            eoff = (eoff + 1) & 15
+            edge[eoff] = [a, c]
+            eoff = (eoff + 1) & 15
+        elif codetri < 0xFE:
+            aux = codeaux[codetri & 15]
+            feb, fec = aux >> 4, aux & 15
+            a = nxt
+            nxt += 1
+            if feb == 0:
+                b = nxt
+                nxt += 1
+            else:
+                b = vert[(voff - feb) & 15]
+            if fec == 0:
+                c = nxt
+                nxt += 1
+            else:
+                c = vert[(voff - fec) & 15]
+            out[i : i + 3] = (a, b, c)
+            vert[voff] = a
+            voff = (voff + 1) & 15
+            vert[voff] = b
+            voff = (voff + (feb == 0)) & 15
+            vert[voff] = c
+            voff = (voff + (fec == 0)) & 15
+            edge[eoff] = [b, a]
+            eoff = (eoff + 1) & 15
+            edge[eoff] = [c, b]
+            eoff = (eoff + 1) & 15
+            edge[eoff] = [a, c]
+            eoff = (eoff + 1) & 15
+        else:
+            aux = data[pos]
+            pos += 1
+            fea = 0 if codetri == 0xFE else 15
+            feb, fec = aux >> 4, aux & 15
+            if aux == 0:
+                nxt = 0  # reset code
+            a = b = c = 0
+            if fea == 0:
+                a = nxt
+                nxt += 1
+            if feb == 0:
+                b = nxt
+                nxt += 1
+            else:
+                b = vert[(voff - feb) & 15]
+            if fec == 0:
+                c = nxt
+                nxt += 1
+            else:
+                c = vert[(voff - fec) & 15]
+            if fea == 15:
+                a, pos = _decode_index(data, pos, last)
+                last = a
+            if feb == 15:
+                b, pos = _decode_index(data, pos, last)
+                last = b
+            if fec == 15:
+                c, pos = _decode_index(data, pos, last)
+                last = c
+            out[i : i + 3] = (a, b, c)
+            vert[voff] = a
+            voff = (voff + 1) & 15
+            vert[voff] = b
+            voff = (voff + (feb == 0 or feb == 15)) & 15
+            vert[voff] = c
+            voff = (voff + (fec == 0 or fec == 15)) & 15
+            edge[eoff] = [b, a]
+            eoff = (eoff + 1) & 15
+            edge[eoff] = [c, b]
+            eoff = (eoff + 1) & 15
+            edge[eoff] = [a, c]
+            eoff = (eoff + 1) & 15
+
+    if pos != safe_end:
+        raise MeshoptDecodeError("index stream has trailing data")
+    dtype = "<u2" if index_size == 2 else "<u4"
+    return np.array(out, dtype=np.uint64).astype(dtype).tobytes()
+
+
+def decode_index_sequence(data, count, index_size):
+    """Decode a meshopt index sequence stream (mode INDICES)."""
+    data = bytes(data)
+    if index_size not in (2, 4):
+        raise MeshoptDecodeError("invalid index size")
+    if len(data) < 1 + count + 4:
+        raise MeshoptDecodeError("index sequence truncated")
+    if (data[0] & 0xF0) != _SEQUENCE_HEADER:
+        raise MeshoptDecodeError("not a meshopt index sequence")
+    if (data[0] & 0x0F) > 1:
+        raise MeshoptDecodeError(f"unsupported index codec version {data[0] & 0x0F}")
+
+    safe_end = len(data) - 4
+    last = [0, 0]
+    out = [0] * count
+    pos = 1
+    for i in range(count):
+        if pos >= safe_end:
+            raise MeshoptDecodeError("index sequence truncated")
+        v, pos = _decode_vbyte(data, pos)
+        current = v & 1
+        v >>= 1
+        delta = (v >> 1) ^ (-(v & 1) & 0xFFFFFFFF)
+        last[current] = (last[current] + delta) & 0xFFFFFFFF
+        out[i] = last[current]
+    if pos != safe_end:
+        raise MeshoptDecodeError("index sequence has trailing data")
+    dtype = "<u2" if index_size == 2 else "<u4"
+    return np.array(out, dtype=np.uint64).astype(dtype).tobytes()
+
+
+# ── filters ───────────────────────────────────────────────────────────────
+
+
+def _round_signed(values):
+    return np.trunc(values + np.where(values >= 0, np.float32(0.5), np.float32(-0.5)))
+
+
+def filter_octahedral(raw, count, stride):
+    """Octahedral-encoded normals/tangents (4 x int8 or 4 x int16)."""
+    if stride not in (4, 8):
+        raise MeshoptDecodeError("OCTAHEDRAL filter needs stride 4 or 8")
+    dtype = np.dtype("<i1") if stride == 4 else np.dtype("<i2")
+    data = np.frombuffer(raw, dtype, count * 4).reshape(count, 4).copy()
+    top = np.float32((1 << (dtype.itemsize * 8 - 1)) - 1)
+    x = data[:, 0].astype(np.float32)
+    y = data[:, 1].astype(np.float32)
+    z = data[:, 2].astype(np.float32) - np.abs(x) - np.abs(y)
+    t = np.minimum(z, np.float32(0))
+    x += np.where(x >= 0, t, -t)
+    y += np.where(y >= 0, t, -t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = top / np.sqrt(x * x + y * y + z * z)
+        for col, comp in enumerate((x, y, z)):
+            data[:, col] = _round_signed(comp * s).astype(np.int32).astype(dtype)
+    return data.tobytes()
+
+
+def filter_quaternion(raw, count, stride):
+    """Quaternions stored as 3 components + (max index | scale) in int16x4."""
+    if stride != 8:
+        raise MeshoptDecodeError("QUATERNION filter needs stride 8")
+    data = np.frombuffer(raw, "<i2", count * 4).reshape(count, 4).copy()
+    ss = np.float32(1.0 / np.sqrt(2.0)) / (data[:, 3] | 3).astype(np.float32)
+    x = data[:, 0].astype(np.float32) * ss
+    y = data[:, 1].astype(np.float32) * ss
+    z = data[:, 2].astype(np.float32) * ss
+    w = np.sqrt(np.maximum(np.float32(1) - x * x - y * y - z * z, np.float32(0)))
+    scale = np.float32(32767)
+    xf, yf, zf = (_round_signed(c * scale).astype(np.int16) for c in (x, y, z))
+    wf = np.trunc(w * scale + np.float32(0.5)).astype(np.int16)
+    qc = (data[:, 3] & 3).astype(np.int64)
+    rows = np.arange(count)
+    out = np.empty_like(data)
+    out[rows, (qc + 1) & 3] = xf
+    out[rows, (qc + 2) & 3] = yf
+    out[rows, (qc + 3) & 3] = zf
+    out[rows, qc] = wf
+    return out.tobytes()
+
+
+def filter_exponential(raw, count, stride):
+    """Shared-exponent floats: 24-bit mantissa + 8-bit exponent per component."""
+    if stride % 4:
+        raise MeshoptDecodeError("EXPONENTIAL filter needs a stride multiple of 4")
+    v = np.frombuffer(raw, "<u4", count * stride // 4).copy()
+    mantissa = (v << np.uint32(8)).view(np.int32) >> 8
+    exponent = v.view(np.int32) >> 24
+    scale = ((exponent + 127).astype(np.uint32) << np.uint32(23)).view(np.float32)
+    return (scale * mantissa.astype(np.float32)).view(np.uint32).tobytes()
+
+
+_FILTERS = {
+    "OCTAHEDRAL": filter_octahedral,
+    "QUATERNION": filter_quaternion,
+    "EXPONENTIAL": filter_exponential,
+}
+
+
+def decode_stream(data, count, stride, mode, filter_name="NONE"):
+    """Decode one compressed bufferView payload (extension fields as given)."""
+    if mode == "ATTRIBUTES":
+        raw = decode_vertex_buffer(data, count, stride)
+    elif mode == "TRIANGLES":
+        raw = decode_index_buffer(data, count, stride)
+    elif mode == "INDICES":
+        raw = decode_index_sequence(data, count, stride)
+    else:
+        raise MeshoptDecodeError(f"unknown meshopt mode {mode}")
+    if filter_name and filter_name != "NONE":
+        if mode != "ATTRIBUTES" or filter_name not in _FILTERS:
+            raise MeshoptDecodeError(f"unsupported meshopt filter {filter_name}")
+        raw = _FILTERS[filter_name](raw, count, stride)
+    return raw
+
+
+# ── glTF integration ──────────────────────────────────────────────────────
+
+
+def _buffer_bytes(gltf, index):
+    if index == 0 and not (gltf.buffers[0].uri or ""):
+        return gltf.binary_blob() or b""
+    uri = gltf.buffers[index].uri or ""
+    if uri.startswith("data:"):
+        return base64.b64decode(uri.split(",", 1)[1])
+    raise MeshoptDecodeError(f"buffer {index} is not embedded in the GLB")
+
+
+def _drop_extension(gltf, name):
+    gltf.extensionsUsed = [n for n in gltf.extensionsUsed or [] if n != name]
+    gltf.extensionsRequired = [n for n in gltf.extensionsRequired or [] if n != name]
+
+
+def decode_gltf(gltf):
+    """Decode every meshopt-compressed bufferView in place.
+
+    The decoded bytes replace the fallback buffer the views pointed at; the
+    compressed streams are dropped when the BIN chunk is repacked. Returns
+    the number of bufferViews decoded (0 = file wasn't compressed).
+    """
+    replace = {}
+    cache = {}
+    for index, view in enumerate(gltf.bufferViews or []):
+        exts = view.extensions or {}
+        name = next((n for n in MESHOPT_EXTENSIONS if n in exts), None)
+        if name is None:
+            continue
+        ext = exts[name]
+        source = ext.get("buffer", 0)
+        if source not in cache:
+            cache[source] = _buffer_bytes(gltf, source)
+        start = ext.get("byteOffset", 0)
+        payload = cache[source][start : start + ext["byteLength"]]
+        replace[index] = decode_stream(
+            payload, ext["count"], ext["byteStride"], ext.get("mode", "ATTRIBUTES"),
+            ext.get("filter", "NONE"),
+        )
+        view.extensions = {k: v for k, v in exts.items() if k != name}
+    if not replace:
+        return 0
+
+    for view in gltf.bufferViews:
+        if view.buffer != 0:
+            # Every non-zero buffer in a gltfpack GLB is a data-less fallback.
+            view.buffer = 0
+    repack_binary(gltf, replace=replace)
+    gltf.buffers = gltf.buffers[:1]
+    for name in MESHOPT_EXTENSIONS:
+        _drop_extension(gltf, name)
+    logger.info(f"Decoded {len(replace)} meshopt-compressed bufferViews")
+    return len(replace)
+
+
+_COMPONENTS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+_COMPONENT_DTYPES = {5120: "<i1", 5121: "<u1", 5122: "<i2", 5123: "<u2", 5125: "<u4", 5126: "<f4"}
+_FLOAT = 5126
+
+
+def read_accessor(gltf, accessor, blob=None):
+    """Accessor data as a (count, components) array (copy, native dtype)."""
+    blob = gltf.binary_blob() if blob is None else blob
+    dtype = np.dtype(_COMPONENT_DTYPES[accessor.componentType])
+    comps = _COMPONENTS[accessor.type]
+    if accessor.bufferView is None:
+        return np.zeros((accessor.count, comps), dtype)
+    view = gltf.bufferViews[accessor.bufferView]
+    stride = view.byteStride or dtype.itemsize * comps
+    offset = (view.byteOffset or 0) + (accessor.byteOffset or 0)
+    arr = np.ndarray(
+        (accessor.count, comps), dtype=dtype, buffer=blob, offset=offset,
+        strides=(stride, dtype.itemsize),
+    )
+    return arr.copy()
+
+
+def _to_float(values, accessor):
+    if not accessor.normalized:
+        return values.astype(np.float32)
+    info = np.iinfo(values.dtype)
+    out = values.astype(np.float32) / np.float32(info.max)
+    return np.maximum(out, np.float32(-1)) if info.min < 0 else out
+
+
+def _bake_texture_transforms(gltf, uv_accessors):
+    """Fold per-material KHR_texture_transform into TEXCOORD_0 data.
+
+    Only when every primitive sharing the accessor uses one transform on all
+    its material's textures (gltfpack's UV dequantization). Returns the set of
+    baked accessor indices and the arrays to write back.
+    """
+    users = {}
+    for mesh in gltf.meshes or []:
+        for prim in mesh.primitives or []:
+            acc = getattr(prim.attributes, "TEXCOORD_0", None)
+            if acc in uv_accessors:
+                users.setdefault(acc, []).append(prim.material)
+
+    baked = {}
+    for acc, materials in users.items():
+        transforms = []
+        infos = []
+        for mat_index in set(materials):
+            if mat_index is None:
+                continue
+            for info in _texture_infos(gltf.materials[mat_index]):
+                if (_get(info, "texCoord") or 0) != 0:
+                    continue
+                transforms.append(((_get(info, "extensions") or {}).get("KHR_texture_transform")))
+                infos.append(info)
+        if not transforms or transforms[0] is None or any(t != transforms[0] for t in transforms):
+            continue
+        t = transforms[0]
+        if "texCoord" in t:
+            continue
+        ox, oy = t.get("offset", [0.0, 0.0])
+        sx, sy = t.get("scale", [1.0, 1.0])
+        r = t.get("rotation", 0.0)
+        uv = uv_accessors[acc]
+        u, v = uv[:, 0].astype(np.float64), uv[:, 1].astype(np.float64)
+        baked[acc] = np.stack([
+            np.cos(r) * sx * u + np.sin(r) * sy * v + ox,
+            -np.sin(r) * sx * u + np.cos(r) * sy * v + oy,
+        ], axis=1).astype(np.float32)
+        for info in infos:
+            exts = dict(_get(info, "extensions") or {})
+            exts.pop("KHR_texture_transform", None)
+            _set(info, "extensions", exts)
+    return baked
+
+
+def dequantize_gltf(gltf):
+    """Convert quantized vertex attributes back to float32.
+
+    Returns the number of accessors rewritten. Old bufferViews are left for
+    compact_gltf to drop.
+    """
+    targets = {}
+    for mesh in gltf.meshes or []:
+        for prim in mesh.primitives or []:
+            maps = [prim.attributes] + list(prim.targets or [])
+            for attrs in maps:
+                items = attrs.items() if isinstance(attrs, dict) else vars(attrs).items()
+                for name, index in items:
+                    if index is None or name.startswith("JOINTS_"):
+                        continue
+                    accessor = gltf.accessors[index]
+                    if accessor.componentType != _FLOAT:
+                        targets[index] = name
+    if not targets:
+        return 0
+
+    blob = gltf.binary_blob() or b""
+    values = {}
+    for index in targets:
+        accessor = gltf.accessors[index]
+        values[index] = _to_float(read_accessor(gltf, accessor, blob), accessor)
+    uv_accessors = {i: v for i, v in values.items() if targets[i] == "TEXCOORD_0"}
+    values.update(_bake_texture_transforms(gltf, uv_accessors))
+
+    builder = BlobBuilder(gltf)
+    for index, data in values.items():
+        accessor = gltf.accessors[index]
+        data = np.ascontiguousarray(data, dtype="<f4")
+        offset = builder.append(data.tobytes())
+        gltf.bufferViews.append(BufferView(buffer=0, byteOffset=offset, byteLength=data.nbytes))
+        accessor.bufferView = len(gltf.bufferViews) - 1
+        accessor.byteOffset = 0
+        accessor.componentType = _FLOAT
+        accessor.normalized = None
+        if accessor.min is not None or targets[index] == "POSITION":
+            accessor.min = data.min(axis=0).tolist() if len(data) else accessor.min
+            accessor.max = data.max(axis=0).tolist() if len(data) else accessor.max
+    builder.commit()
+    _drop_extension(gltf, "KHR_mesh_quantization")
+    still_transformed = any(
+        "KHR_texture_transform" in (_get(info, "extensions") or {})
+        for material in gltf.materials or []
+        for info in _texture_infos(material)
+    )
+    if not still_transformed:
+        _drop_extension(gltf, "KHR_texture_transform")
+    return len(values)
+
+
+def requires_decoding(gltf):
+    """True if the edit paths can't read this glTF's vertex data as floats."""
+    used = set(gltf.extensionsUsed or [])
+    return bool(used & (set(MESHOPT_EXTENSIONS) | {"KHR_mesh_quantization"}))
+
+
+def decode_for_editing(gltf):
+    """decode_gltf + dequantize_gltf; returns True if the glTF changed."""
+    if not requires_decoding(gltf):
+        return False
+    changed = decode_gltf(gltf)
+    if "KHR_mesh_quantization" in (gltf.extensionsUsed or []):
+        changed += dequantize_gltf(gltf)
+    return bool(changed)
+
+
+def decode_glb_file(src_path, dst_path=None):
+    """Write an uncompressed, float-attribute copy of src_path.
+
+    Writes in place when dst_path is None (atomically). Returns True if
+    anything was decoded; False leaves the file alone.
+    """
+    gltf = GLTF2().load(src_path)
+    if not decode_for_editing(gltf):
+        return False
+    compact_gltf(gltf)
+    dst_path = dst_path or src_path
+    # pygltflib picks GLB vs JSON output from the extension.
+    tmp_path = f"{dst_path}.decode.{os.getpid()}.glb"
+    try:
+        gltf.save(tmp_path)
+        os.replace(tmp_path, dst_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+
+def read_glb_json_chunk(glb_path):
+    """The parsed JSON chunk of a GLB without touching its BIN chunk, or
+    None if the file isn't a well-formed GLB."""
+    try:
+        with open(glb_path, "rb") as fh:
+            header = fh.read(20)
+            if len(header) < 20 or header[:4] != b"glTF":
+                return None
+            length, chunk_type = struct.unpack_from("<II", header, 12)
+            if chunk_type != _JSON_CHUNK:
+                return None
+            return json.loads(fh.read(length))
+    except (OSError, ValueError):
+        return None
+
+
+def file_requires_decoding(glb_path):
+    """requires_decoding from the JSON chunk alone; True when unsure."""
+    doc = read_glb_json_chunk(glb_path)
+    if doc is None:
+        return True
+    used = set(doc.get("extensionsUsed") or [])
+    return bool(used & (set(MESHOPT_EXTENSIONS) | {"KHR_mesh_quantization"}))
+
+
+def decoded_glb_bytes(glb_path):
+    """GLB bytes trimesh can load: decoded if needed, else the file as-is."""
+    if file_requires_decoding(glb_path):
+        gltf = GLTF2().load(glb_path)
+        if decode_for_editing(gltf):
+            compact_gltf(gltf)
+            return b"".join(gltf.save_to_bytes())
+    with open(glb_path, "rb") as fh:
+        return fh.read()
+
+
+def load_trimesh(glb_path, **kwargs):
+    """trimesh.load for a GLB that may be meshopt-compressed or quantized.
+
+    Plain GLBs (the default; GLB_OPTIMIZE is off) go straight to trimesh
+    without a pygltflib parse.
+    """
+    import trimesh
+
+    if not file_requires_decoding(glb_path):
+        return trimesh.load(glb_path, file_type="glb", **kwargs)
+    return trimesh.load(io.BytesIO(decoded_glb_bytes(glb_path)), file_type="glb", **kwargs)
@@ -11,6 +11,7 @@ import platform
 import shutil
 from typing import Optional, List
 from .base_converter import BaseConverter, hex_to_linear_rgb
+from .tool_runner import run_tool
 
 
 # Material/texture directive keys in OBJ/MTL that reference external files.
@@ -247,12 +248,11 @@ class OBJConverter(BaseConverter):
 
             # Run the command
             self.log_operation(f"Running conversion command: {' '.join(cmd)}")
-            result = subprocess.run(
+            result = run_tool(
+                "obj2gltf",
                 cmd,
-                capture_output=True,
-                text=True,
-                cwd=obj_dir,  # Run in the OBJ directory
                 timeout=300,
+                cwd=obj_dir,  # Run in the OBJ directory
             )  # 5 minute timeout
 
             # Log output
@@ -0,0 +1,318 @@
+"""
+Pre-flight complexity estimate for uploaded models.
+
+Oversized models used to be discovered only after a full load: STLConverter
+checks MAX_MESH_FACES after trimesh.load, version_manager checks the vertex
+cap after concatenating the whole scene, and a huge FBX simply ran until the
+stall timeout. This module sizes a file by reading as little of it as
+possible — the binary STL header, a streaming count of OBJ `v`/`f` lines,
+the binary FBX node headers (array lengths only, never the data), or the
+GLB JSON chunk — so the upload route can reject or route a job before any
+expensive work starts.
+
+The estimate is deliberately conservative about rejecting: where a count is
+approximate (FBX polygons) the lower bound is used, so a model is never
+refused on a guess.
+"""
+
+import json
+import os
+import re
+import struct
+
+from .stl_converter import MAX_MESH_FACES
+
+# Hard caps; a job above any of them is refused at upload time.
+MAX_TRIANGLES = int(os.environ.get("PREFLIGHT_MAX_TRIANGLES", 10_000_000))
+# Three unshared corners per triangle at the triangle cap.
+MAX_VERTICES = int(os.environ.get("PREFLIGHT_MAX_VERTICES", 30_000_000))
+MAX_PEAK_MEM_MB = int(os.environ.get("PREFLIGHT_MAX_MEM_MB", 4096))
+# Above these a job is routed to the "heavy" lane (see worker.WORKER_LANES).
+HEAVY_TRIANGLES = int(os.environ.get("PREFLIGHT_HEAVY_TRIANGLES", 1_000_000))
+HEAVY_MEM_MB = int(os.environ.get("PREFLIGHT_HEAVY_MEM_MB", 1024))
+# Same env var as version_manager's "skipping version" check: models it
+# considers too large to snapshot convert on the heavy lane.
+HEAVY_VERTICES = int(os.environ.get("MAX_MODEL_VERTICES", 5_000_000))
+
+# Rough peak working set while trimesh/pygltflib hold the mesh plus the
+# converter's copies (normals, merges, concatenation, GLB export).
+_BYTES_PER_VERTEX = 160
+_BYTES_PER_TRIANGLE = 96
+_BASE_MB = 200
+_FORMAT_FACTOR = {"fbx": 2.0, "obj": 1.5, "stl": 1.0, "glb": 1.0, "gltf": 1.0}
+
+_CHUNK = 4 * 1024 * 1024
+_FBX_MAGIC = b"Kaydara FBX Binary  \x00"
+
+
+class PreflightRejected(ValueError):
+    """The upload is too large/complex to convert on this deployment."""
+
+    def __init__(self, message, estimate=None):
+        super().__init__(message)
+        self.estimate = estimate
+
+
+def _estimate_stl(path, size):
+    with open(path, "rb") as fh:
+        head = fh.read(84)
+    if len(head) == 84:
+        (count,) = struct.unpack_from("<I", head, 80)
+        if 84 + 50 * count == size:
+            # Binary STL: triangle count is exact; trimesh merges the shared
+            # corners, leaving roughly half as many vertices as triangles.
+            return {"triangles": count, "vertices": count // 2 + 2, "exact": True,
+                    "method": "stl-binary-header"}
+    triangles = _count_pattern(path, b"endfacet")
+    return {"triangles": triangles, "vertices": triangles // 2 + 2, "exact": True,
+            "method": "stl-ascii-scan"}
+
+
+def _count_pattern(path, pattern):
+    """Occurrences of a fixed byte pattern, streamed in chunks."""
+    count = 0
+    tail = b""
+    keep = len(pattern) - 1
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            buf = tail + chunk
+            count += buf.count(pattern)
+            tail = buf[-keep:] if keep else b""
+    return count
+
+
+def _estimate_obj(path, size):
+    vertices = faces = 0
+    sample_corners, sample_faces = 0, 0
+    tail = b"\n"  # so a `v` on the very first line still matches b"\nv "
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            buf = tail + chunk
+            vertices += buf.count(b"\nv ") + buf.count(b"\nv\t")
+            faces += buf.count(b"\nf ") + buf.count(b"\nf\t")
+            if sample_faces < 2000:
+                for line in re.findall(rb"\nf[ \t]([^\n]*)", buf)[:2000]:
+                    sample_corners += len(line.split())
+                    sample_faces += 1
+            tail = buf[-2:]
+    avg_corners = (sample_corners / sample_faces) if sample_faces else 3.0
+    triangles = int(faces * max(1.0, avg_corners - 2))
+    # Triangles are extrapolated from the corner count of the sampled faces.
+    return {"triangles": triangles, "vertices": vertices, "exact": False,
+            "method": "obj-line-count"}
+
+
+def _fbx_read_node(fh, wide):
+    """Read one binary FBX node header; returns (end, name, props_end) or None."""
+    fmt = "<QQQB" if wide else "<IIIB"
+    raw = fh.read(struct.calcsize(fmt))
+    if len(raw) < struct.calcsize(fmt):
+        return None
+    end, _num_props, prop_len, name_len = struct.unpack(fmt, raw)
+    if end == 0:
+        return None  # null record: end of this nested list
+    name = fh.read(name_len).decode("ascii", "replace")
+    return end, name, fh.tell() + prop_len
+
+
+def _fbx_array_length(fh):
+    """Element count of the node's first property if it is an array."""
+    kind = fh.read(1)
+    if kind not in (b"d", b"f", b"i", b"l", b"b"):
+        return None
+    length, _encoding, _compressed = struct.unpack("<III", fh.read(12))
+    return length
+
+
+def _estimate_fbx_binary(path, version):
+    wide = version >= 7500
+    counts = {"Geometry": 0, "Model": 0, "Material": 0, "Texture": 0, "Video": 0}
+    control_points = polygon_indices = 0
+    size = os.path.getsize(path)
+
+    def walk(fh, stop, depth, path_names):
+        nonlocal control_points, polygon_indices
+        while fh.tell() < stop:
+            node = _fbx_read_node(fh, wide)
+            if node is None:
+                return
+            end, name, props_end = node
+            if end > size:
+                return
+            if depth == 1 and name in counts and path_names == ("Objects",):
+                counts[name] += 1
+            if path_names == ("Objects", "Geometry") and name in ("Vertices", "PolygonVertexIndex"):
+                length = _fbx_array_length(fh) or 0
+                if name == "Vertices":
+                    control_points += length // 3
+                else:
+                    polygon_indices += length
+            elif (depth == 0 and name == "Objects") or (
+                depth == 1 and name == "Geometry" and path_names == ("Objects",)
+            ):
+                fh.seek(props_end)
+                walk(fh, end, depth + 1, path_names + (name,))
+            fh.seek(end)
+
+    with open(path, "rb") as fh:
+        fh.seek(27)
+        walk(fh, size, 0, ())
+    # A polygon of n corners yields n-2 triangles, so the index count is at
+    # least 3 per triangle; len/3 is the lower bound (exact for triangulated
+    # exports, half the truth for all-quad meshes).
+    return {"triangles": polygon_indices // 3, "vertices": control_points, "exact": False,
+            "method": "fbx-binary-nodes", "fbx_version": version, "nodes": counts}
+
+
+def _estimate_fbx_ascii(path):
+    pattern = re.compile(rb"(Vertices|PolygonVertexIndex): \*(\d+)")
+    totals = {b"Vertices": 0, b"PolygonVertexIndex": 0}
+    tail = b""
+    with open(path, "rb") as fh:
+        chunk = fh.read(_CHUNK)
+        while chunk:
+            nxt = fh.read(_CHUNK)
+            buf = tail + chunk
+            for m in pattern.finditer(buf):
+                if m.end() <= len(tail):
+                    continue  # fully inside the carried tail: already counted
+                if nxt and m.end() == len(buf):
+                    continue  # digits may continue in the next chunk
+                totals[m.group(1)] += int(m.group(2))
+            tail = buf[-64:]
+            chunk = nxt
+    return {"triangles": totals[b"PolygonVertexIndex"] // 3,
+            "vertices": totals[b"Vertices"] // 3, "exact": False,
+            "method": "fbx-ascii-scan"}
+
+
+def _estimate_fbx(path, size):
+    with open(path, "rb") as fh:
+        head = fh.read(27)
+    if head.startswith(_FBX_MAGIC) and len(head) == 27:
+        (version,) = struct.unpack_from("<I", head, 23)
+        return _estimate_fbx_binary(path, version)
+    return _estimate_fbx_ascii(path)
+
+
+def _gltf_counts(doc):
+    accessors = doc.get("accessors") or []
+    seen_positions, seen_indices = set(), set()
+    vertices = triangles = 0
+    for mesh in doc.get("meshes") or []:
+        for prim in mesh.get("primitives") or []:
+            pos = (prim.get("attributes") or {}).get("POSITION")
+            if pos is None or pos >= len(accessors):
+                continue
+            count = int(accessors[pos].get("count") or 0)
+            if pos not in seen_positions:
+                seen_positions.add(pos)
+                vertices += count
+            if prim.get("mode", 4) != 4:
+                continue
+            idx = prim.get("indices")
+            if idx is not None and idx < len(accessors):
+                if idx not in seen_indices:
+                    seen_indices.add(idx)
+                    triangles += int(accessors[idx].get("count") or 0) // 3
+            else:
+                triangles += count // 3
+    return vertices, triangles
+
+
+def _estimate_glb(path, size):
+    with open(path, "rb") as fh:
+        header = fh.read(20)
+        if len(header) < 20 or header[:4] != b"glTF":
+            raise ValueError("not a GLB file")
+        json_len, chunk_type = struct.unpack_from("<I4s", header, 12)
+        if chunk_type != b"JSON" or json_len > size:
+            raise ValueError("GLB JSON chunk missing")
+        doc = json.loads(fh.read(json_len))
+    vertices, triangles = _gltf_counts(doc)
+    return {"triangles": triangles, "vertices": vertices, "exact": True,
+            "method": "glb-json-chunk"}
+
+
+def _estimate_gltf(path, size):
+    with open(path, "rb") as fh:
+        doc = json.load(fh)
+    vertices, triangles = _gltf_counts(doc)
+    return {"triangles": triangles, "vertices": vertices, "exact": True,
+            "method": "gltf-json"}
+
+
+_ESTIMATORS = {
+    "stl": _estimate_stl,
+    "obj": _estimate_obj,
+    "fbx": _estimate_fbx,
+    "glb": _estimate_glb,
+    "gltf": _estimate_gltf,
+}
+
+
+def estimate_complexity(path, ext=None):
+    """Estimate triangles, vertices and peak conversion memory for a model.
+
+    Returns a dict {format, file_bytes, triangles, vertices, peak_mem_mb,
+    exact, method, ...}. Raises ValueError for unknown formats or files the
+    header reader can't make sense of (callers treat that as "no estimate").
+    """
+    fmt = (ext or os.path.splitext(path)[1]).lower().lstrip(".")
+    estimator = _ESTIMATORS.get(fmt)
+    if estimator is None:
+        raise ValueError(f"no pre-flight estimator for .{fmt}")
+    size = os.path.getsize(path)
+    estimate = estimator(path, size)
+    mesh_bytes = (estimate["vertices"] * _BYTES_PER_VERTEX
+                  + estimate["triangles"] * _BYTES_PER_TRIANGLE)
+    # Textures and other payload ride along in the file itself.
+    estimate["peak_mem_mb"] = int(
+        _BASE_MB + (_FORMAT_FACTOR[fmt] * mesh_bytes + 2 * size) / (1024 * 1024)
+    )
+    estimate["format"] = fmt
+    estimate["file_bytes"] = size
+    return estimate
+
+
+def size_only_mem_mb(size, fmt):
+    """Peak-memory guess from the file size and format alone.
+
+    For jobs whose headers couldn't be read; binary meshes carry roughly a
+    quarter of their in-memory footprint on disk.
+    """
+    factor = _FORMAT_FACTOR.get((fmt or "").lower().lstrip("."), 2.0)
+    return int(_BASE_MB + (factor * 4 * size + 2 * size) / (1024 * 1024))
+
+
+def assess(estimate):
+    """Pick a lane for an estimate, or raise PreflightRejected.
+
+    Returns "heavy" or "standard" (stored as ConversionJob.lane).
+    """
+    max_triangles = MAX_TRIANGLES
+    if estimate.get("format") == "stl":
+        max_triangles = min(max_triangles, MAX_MESH_FACES)
+    if estimate["triangles"] > max_triangles:
+        raise PreflightRejected(
+            f"Model has about {estimate['triangles']:,} triangles; "
+            f"the limit is {max_triangles:,}. Please decimate it before uploading.",
+            estimate,
+        )
+    if estimate["vertices"] > MAX_VERTICES:
+        raise PreflightRejected(
+            f"Model has about {estimate['vertices']:,} vertices; "
+            f"the limit is {MAX_VERTICES:,}. Please decimate it before uploading.",
+            estimate,
+        )
+    if estimate["peak_mem_mb"] > MAX_PEAK_MEM_MB:
+        raise PreflightRejected(
+            f"Converting this model would need about {estimate['peak_mem_mb']:,} MB "
+            f"of memory; the limit is {MAX_PEAK_MEM_MB:,} MB.",
+            estimate,
+        )
+    if (estimate["triangles"] > HEAVY_TRIANGLES
+            or estimate["vertices"] > HEAVY_VERTICES
+            or estimate["peak_mem_mb"] > HEAVY_MEM_MB):
+        return "heavy"
+    return "standard"
@@ -0,0 +1,285 @@
+"""
+Texture stage: cap, re-encode and dedupe the images embedded in a GLB.
+
+finalize_glb packs every texture into the BIN chunk but leaves it exactly as
+the exporter wrote it — an FBX with a dozen 8K PNGs ships a dozen 8K PNGs,
+which is both the download and (decoded, at 4 bytes/texel plus mips) the GPU
+memory of the model. This stage:
+
+1. drops byte-identical images (hash of the encoded payload) and points
+   their textures at the first copy;
+2. decodes each remaining image once with Pillow and caps it at
+   TEXTURE_MAX_SIDE, then scales everything down together if the total still
+   exceeds TEXTURE_BUDGET_MPX;
+3. re-encodes opaque images as JPEG (or WebP via EXT_texture_webp when
+   TEXTURE_FORMAT=webp); images with real alpha stay PNG and normal maps stay
+   lossless, since block artefacts there show up as lighting noise;
+4. repacks the BIN chunk so the replaced payloads are actually gone.
+
+Like glb_optimizer it is fail-safe: any error leaves the GLB untouched, and
+a re-encode that isn't smaller (and wasn't resized) keeps the original bytes.
+Meshopt/draco-compressed GLBs are skipped — their bufferViews carry offsets
+this repacker doesn't rewrite.
+"""
+
+import hashlib
+import io
+import logging
+import os
+
+from pygltflib import GLTF2
+from PIL import Image
+
+from .glb_quality import _get, _set, _texture_sources, repack_binary
+
+logger = logging.getLogger(__name__)
+
+TEXTURE_OPTIMIZE = os.environ.get("TEXTURE_OPTIMIZE", "true").lower() in ("true", "1", "yes")
+TEXTURE_MAX_SIDE = int(os.environ.get("TEXTURE_MAX_SIDE", 2048))
+# Total texels (millions) across all images after dedupe; 32 MPx is ~170 MB
+# of RGBA8 with mips — comfortable on phones doing AR.
+TEXTURE_BUDGET_MPX = float(os.environ.get("TEXTURE_BUDGET_MPX", 32))
+TEXTURE_FORMAT = os.environ.get("TEXTURE_FORMAT", "jpeg").strip().lower()
+TEXTURE_QUALITY = int(os.environ.get("TEXTURE_QUALITY", 85))
+
+_SKIP_EXTENSIONS = {
+    "EXT_meshopt_compression",
+    "KHR_meshopt_compression",
+    "KHR_draco_mesh_compression",
+    "KHR_texture_basisu",
+}
+_WEBP_EXT = "EXT_texture_webp"
+_MIN_SIDE = 64
+
+
+def alpha_profile(pil):
+    """Inspect a decoded image's alpha channel.
+
+    Returns (has_transparency, mostly_binary):
+    - has_transparency: any meaningfully transparent pixel exists
+    - mostly_binary: alpha is essentially on/off (foliage cutout) rather than
+      gradual (glass/fades), so MASK renders it better than BLEND
+    """
+    if pil.mode not in ("RGBA", "LA", "PA") and "transparency" not in pil.info:
+        return False, False
+    alpha = pil.convert("RGBA").getchannel("A")
+    lo, _ = alpha.getextrema()
+    if lo >= 250:
+        return False, False
+    hist = alpha.histogram()
+    total = sum(hist) or 1
+    partial = sum(hist[16:240])  # neither fully transparent nor fully opaque
+    # Foliage cutouts are dominated by fully-transparent/fully-opaque texels;
+    # partial alpha appears only on antialiased edges (typically 5-15%). Truly
+    # gradual textures (glass, fades) have large smooth partial regions. MASK
+    # must win for cutouts: BLEND disables depth sorting, so dense foliage
+    # blends against the background instead of the leaves behind it and the
+    # whole canopy washes out.
+    return True, (partial / total) < 0.25
+
+
+def encode_texture(pil, keep_alpha=False, lossless=False, fmt=None):
+    """Encode a decoded image for embedding; returns (bytes, mime_type)."""
+    fmt = fmt or TEXTURE_FORMAT
+    buf = io.BytesIO()
+    if fmt == "webp":
+        mode = "RGBA" if keep_alpha else "RGB"
+        pil.convert(mode).save(buf, format="WEBP", quality=TEXTURE_QUALITY,
+                               lossless=lossless, method=4)
+        return buf.getvalue(), "image/webp"
+    if keep_alpha or lossless:
+        mode = "RGBA" if keep_alpha else "RGB"
+        pil.convert(mode).save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "image/png"
+    mode = "L" if pil.mode in ("L", "I;16", "I") else "RGB"
+    pil.convert(mode).save(buf, format="JPEG", quality=TEXTURE_QUALITY, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+def _lossless_images(gltf):
+    """Images used as normal maps (kept lossless)."""
+    lossless = set()
+    textures = gltf.textures or []
+    for material in gltf.materials or []:
+        info = material.normalTexture
+        if info is not None and info.index is not None and info.index < len(textures):
+            for holder, key in _texture_sources(textures[info.index]):
+                if _get(holder, key) is not None:
+                    lossless.add(_get(holder, key))
+    return lossless
+
+
+def _target_sizes(sizes, max_side, budget_mpx):
+    """Per-image target sizes: side cap first, then one shared budget scale."""
+    targets = {}
+    for idx, (w, h) in sizes.items():
+        scale = min(1.0, max_side / max(w, h))
+        targets[idx] = (w * scale, h * scale)
+    total = sum(w * h for w, h in targets.values())
+    budget = budget_mpx * 1_000_000
+    shared = (budget / total) ** 0.5 if total > budget else 1.0
+    out = {}
+    for idx, (w, h) in targets.items():
+        tw = max(min(_MIN_SIDE, sizes[idx][0]), int(round(w * shared)))
+        th = max(min(_MIN_SIDE, sizes[idx][1]), int(round(h * shared)))
+        out[idx] = (tw, th)
+    return out
+
+
+def optimize_gltf_textures(gltf, max_side=None, budget_mpx=None, fmt=None):
+    """Run the texture stage on a loaded GLTF2 in place.
+
+    Returns a stats dict, or None when there was nothing to do (no embedded
+    images, or a compressed layout this stage doesn't touch).
+    """
+    max_side = max_side or TEXTURE_MAX_SIDE
+    budget_mpx = budget_mpx or TEXTURE_BUDGET_MPX
+    fmt = fmt or TEXTURE_FORMAT
+    images = gltf.images or []
+    if not images:
+        return None
+    if _SKIP_EXTENSIONS & set(gltf.extensionsUsed or []):
+        logger.info("Texture stage skipped: compressed GLB layout")
+        return None
+    if any((bv.buffer or 0) != 0 for bv in gltf.bufferViews or []):
+        logger.info("Texture stage skipped: multi-buffer GLB")
+        return None
+
+    blob = gltf.binary_blob() or b""
+    payloads = {}
+    for idx, image in enumerate(images):
+        if image.bufferView is None:
+            continue  # data:/external URIs are finalize_glb's business
+        bv = gltf.bufferViews[image.bufferView]
+        start = bv.byteOffset or 0
+        payloads[idx] = blob[start : start + bv.byteLength]
+    if not payloads:
+        return None
+    bytes_before = sum(len(p) for p in payloads.values())
+
+    # 1. Dedupe byte-identical payloads.
+    canonical, remap = {}, {}
+    for idx, payload in payloads.items():
+        digest = hashlib.sha256(payload).digest()
+        if digest in canonical:
+            remap[idx] = canonical[digest]
+        else:
+            canonical[digest] = idx
+    for texture in gltf.textures or []:
+        for holder, key in _texture_sources(texture):
+            src = _get(holder, key)
+            if src in remap:
+                _set(holder, key, remap[src])
+
+    # 2. Decode each unique image once.
+    decoded = {}
+    for idx in canonical.values():
+        try:
+            pil = Image.open(io.BytesIO(payloads[idx]))
+            pil.load()
+            decoded[idx] = pil
+        except Exception as exc:
+            logger.warning(f"Texture {idx} could not be decoded, keeping as-is: {exc}")
+
+    targets = _target_sizes({i: p.size for i, p in decoded.items()}, max_side, budget_mpx)
+    lossless = _lossless_images(gltf)
+    replace, resized, reencoded = {}, 0, 0
+    webp_images = set()
+    for idx, pil in decoded.items():
+        image = images[idx]
+        target = targets[idx]
+        was_resized = target != pil.size
+        has_alpha, _ = alpha_profile(pil)
+        if was_resized:
+            pil = pil.resize(target, Image.Resampling.LANCZOS)
+        current = (image.mimeType or "").lower()
+        if not was_resized and not has_alpha and current == "image/jpeg" and fmt != "webp":
+            continue  # already lossy at size: don't add generation loss
+        data, mime = encode_texture(pil, keep_alpha=has_alpha, lossless=idx in lossless, fmt=fmt)
+        if not was_resized and len(data) >= len(payloads[idx]):
+            continue
+        replace[image.bufferView] = data
+        image.mimeType = mime
+        resized += was_resized
+        reencoded += 1
+        if mime == "image/webp":
+            webp_images.add(idx)
+
+    if not replace and not remap:
+        return None
+
+    if webp_images:
+        # WebP isn't a core glTF image type: reference it through
+        # EXT_texture_webp and require the extension (no PNG fallback kept).
+        for texture in gltf.textures or []:
+            if texture.source in webp_images:
+                texture.extensions = dict(texture.extensions or {})
+                texture.extensions[_WEBP_EXT] = {"source": texture.source}
+                texture.source = None
+        for attr in ("extensionsUsed", "extensionsRequired"):
+            names = list(getattr(gltf, attr) or [])
+            if _WEBP_EXT not in names:
+                names.append(_WEBP_EXT)
+            setattr(gltf, attr, names)
+
+    # 3. Remove the duplicate images and their bufferViews, then repack.
+    drop_views = {images[idx].bufferView for idx in remap}
+    drop_views -= {images[idx].bufferView for idx in range(len(images)) if idx not in remap}
+    if remap:
+        new_index, kept = {}, []
+        for idx, image in enumerate(images):
+            if idx in remap:
+                continue
+            new_index[idx] = len(kept)
+            kept.append(image)
+        for texture in gltf.textures or []:
+            for holder, key in _texture_sources(texture):
+                src = _get(holder, key)
+                if src is not None:
+                    _set(holder, key, new_index[src])
+        gltf.images = kept
+    repack_binary(gltf, replace=replace, drop=drop_views)
+
+    bytes_after = sum(
+        gltf.bufferViews[img.bufferView].byteLength
+        for img in gltf.images if img.bufferView is not None
+    )
+    return {
+        "images_before": len(images),
+        "images_after": len(gltf.images),
+        "deduped": len(remap),
+        "resized": resized,
+        "reencoded": reencoded,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+    }
+
+
+def optimize_textures(glb_path):
+    """Run the texture stage on a GLB file in place.
+
+    Returns the stats dict when the file was rewritten, else None (disabled,
+    nothing to do, or failed — the original is then left untouched).
+    """
+    if not TEXTURE_OPTIMIZE or not glb_path or not os.path.exists(glb_path):
+        return None
+    tmp_path = glb_path + ".tex.glb"
+    try:
+        gltf = GLTF2().load(glb_path)
+        stats = optimize_gltf_textures(gltf)
+        if stats is None:
+            return None
+        gltf.save(tmp_path)
+        # Atomic swap: viewer requests never see a half-written GLB
+        os.replace(tmp_path, glb_path)
+    except Exception as exc:
+        logger.warning(f"Texture stage failed for {glb_path}: {exc}; keeping original GLB")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    logger.info(
+        f"Textures optimized: {stats['images_before']} -> {stats['images_after']} images, "
+        f"{stats['bytes_before']} -> {stats['bytes_after']} bytes "
+        f"({stats['resized']} resized, {stats['deduped']} duplicates removed)"
+    )
+    return stats
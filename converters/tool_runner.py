@@ -0,0 +1,432 @@
+"""
+Shared runner for the heavy external tools (FBX2glTF, obj2gltf, Blender,
+gltfpack and the FBX metadata probe).
+
+Each tool used to be started through its own subprocess.run() with a
+hard-coded timeout, so a burst of uploads simply started as many converters
+as there were requests and the container OOM'd. Everything now goes through
+run_tool() / tool_slot(), which give:
+
+- per-tool concurrency slots shared by every thread *and* every process on
+  the host (web workers plus worker.py) — implemented as flock'ed slot files,
+  with an in-process semaphore fallback where fcntl is unavailable;
+- a memory admission check: while other tools are running, a tool only
+  starts once the host/cgroup has its estimated working set available,
+  otherwise it waits (bounded) in line. With nothing else running it is
+  always admitted, since waiting can't free any memory;
+- cancellation through a threading.Event (passed in, or set for a whole
+  job with cancel_scope()), plus cancel_running() for shutdown;
+- per-invocation telemetry (queue wait, duration, exit code, peak RSS from
+  wait4 rusage) kept in a small ring buffer and logged;
+- stdout/stderr captured with a size cap so a chatty tool can't balloon the
+  parent, keeping the tail where the error usually is.
+
+Limits are read from the environment per tool, e.g. TOOL_CONCURRENCY_BLENDER=1
+or TOOL_MEM_MB_FBX2GLTF=1500.
+"""
+
+import collections
+import contextlib
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# (concurrency, estimated peak MB) per tool; overridable via env.
+_DEFAULT_LIMITS = {
+    "fbx2gltf": (2, 1024),
+    "obj2gltf": (2, 768),
+    "blender": (1, 1536),
+    "gltfpack": (2, 512),
+    "fbx_probe": (2, 1024),
+}
+# Keep this much memory free on top of a tool's estimate before admitting it.
+MEM_HEADROOM_MB = int(os.environ.get("TOOL_MEM_HEADROOM_MB", "256"))
+# How long a tool may wait for a slot / for memory before giving up.
+ADMISSION_TIMEOUT = float(os.environ.get("TOOL_ADMISSION_TIMEOUT", "600"))
+# Bytes of stdout/stderr kept per invocation (the tail is kept).
+OUTPUT_LIMIT = int(os.environ.get("TOOL_OUTPUT_LIMIT", str(64 * 1024)))
+SLOT_DIR = os.environ.get(
+    "TOOL_SLOT_DIR", os.path.join(tempfile.gettempdir(), "web_ar_tool_slots")
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: process-local semaphores only
+    fcntl = None
+
+
+class ToolAdmissionError(RuntimeError):
+    """No slot or not enough memory within the admission timeout."""
+
+
+class ToolCancelled(RuntimeError):
+    """The invocation was cancelled before or while it ran."""
+
+
+@dataclass
+class ToolResult:
+    """Outcome of one tool invocation (CompletedProcess-compatible fields)."""
+
+    tool: str
+    args: list
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    queued: float
+    peak_rss_mb: float = None
+    timed_out: bool = False
+    cancelled: bool = False
+
+
+def tool_limits(tool):
+    """(max concurrent, estimated MB) for a tool, env overrides applied."""
+    concurrency, mem_mb = _DEFAULT_LIMITS.get(tool, (2, 512))
+    key = tool.upper()
+    concurrency = int(os.environ.get(f"TOOL_CONCURRENCY_{key}", concurrency))
+    mem_mb = int(os.environ.get(f"TOOL_MEM_MB_{key}", mem_mb))
+    return max(1, concurrency), max(0, mem_mb)
+
+
+def available_memory_mb():
+    """Memory the next child can use: min(host MemAvailable, cgroup headroom).
+
+    Returns None when neither source is readable (admission then passes).
+    """
+    candidates = []
+    try:
+        with open("/proc/meminfo") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    candidates.append(int(line.split()[1]) / 1024)
+                    break
+    except OSError:
+        pass
+    for limit_path, usage_path in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+        (
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+            "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+        ),
+    ):
+        try:
+            with open(limit_path) as fh:
+                raw = fh.read().strip()
+            if raw == "max":
+                continue
+            limit = int(raw)
+            if limit >= 1 << 60:  # cgroup v1 "unlimited"
+                continue
+            with open(usage_path) as fh:
+                usage = int(fh.read().strip())
+            candidates.append(max(0, limit - usage) / (1024 * 1024))
+            break
+        except (OSError, ValueError):
+            continue
+    return min(candidates) if candidates else None
+
+
+_state_lock = threading.Lock()
+_local_semaphores = {}
+_running = collections.Counter()
+_waiting = collections.Counter()
+_live_procs = {}
+_recent = collections.deque(maxlen=200)
+_scope = threading.local()
+
+
+@contextlib.contextmanager
+def cancel_scope(cancel_event):
+    """Make cancel_event the default for every tool this thread runs.
+
+    worker.py wraps a job in its lease's event, so a lost lease kills the
+    job's running tool without threading the event through each converter.
+    """
+    previous = getattr(_scope, "cancel_event", None)
+    _scope.cancel_event = cancel_event
+    try:
+        yield
+    finally:
+        _scope.cancel_event = previous
+
+
+def _local_semaphore(tool, concurrency):
+    with _state_lock:
+        sem = _local_semaphores.get(tool)
+        if sem is None:
+            sem = threading.BoundedSemaphore(concurrency)
+            _local_semaphores[tool] = sem
+        return sem
+
+
+def _try_file_slot(tool, concurrency):
+    """Grab the first free flock'ed slot file; return the open fd or None."""
+    os.makedirs(SLOT_DIR, exist_ok=True)
+    for i in range(concurrency):
+        fd = os.open(os.path.join(SLOT_DIR, f"{tool}.{i}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except OSError:
+            os.close(fd)
+    return None
+
+
+def _others_running(own_fd=None):
+    """Whether any tool slot other than our own is held on this host."""
+    with _state_lock:
+        if sum(_running.values()):
+            return True
+    if fcntl is None or not os.path.isdir(SLOT_DIR):
+        return False
+    own = os.fstat(own_fd).st_ino if own_fd is not None else None
+    for name in os.listdir(SLOT_DIR):
+        if not name.endswith(".lock"):
+            continue
+        try:
+            fd = os.open(os.path.join(SLOT_DIR, name), os.O_RDWR)
+        except OSError:
+            continue
+        try:
+            if os.fstat(fd).st_ino == own:
+                continue
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True  # someone holds it
+        finally:
+            os.close(fd)  # also drops the probe lock, if we got it
+    return False
+
+
+@contextlib.contextmanager
+def tool_slot(tool, cancel_event=None, admission_timeout=None):
+    """Hold one of `tool`'s concurrency slots with memory admitted.
+
+    Yields the seconds spent queueing. Raises ToolAdmissionError when no slot
+    or memory frees up within the admission timeout, ToolCancelled if
+    cancel_event fires while waiting.
+    """
+    if cancel_event is None:
+        cancel_event = getattr(_scope, "cancel_event", None)
+    concurrency, mem_mb = tool_limits(tool)
+    deadline = time.monotonic() + (
+        ADMISSION_TIMEOUT if admission_timeout is None else admission_timeout
+    )
+    start = time.monotonic()
+    sem = _local_semaphore(tool, concurrency)
+    fd = None
+    have_sem = False
+    delay = 0.05
+    with _state_lock:
+        _waiting[tool] += 1
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ToolCancelled(f"{tool} cancelled while queued")
+            if not have_sem:
+                have_sem = sem.acquire(blocking=False)
+            if have_sem and fd is None and fcntl is not None:
+                fd = _try_file_slot(tool, concurrency)
+            if have_sem and (fd is not None or fcntl is None):
+                free = available_memory_mb()
+                if free is None or free - MEM_HEADROOM_MB >= mem_mb:
+                    break
+                if not _others_running(fd):
+                    # Nothing to wait for: the estimate may simply exceed
+                    # this container, and the baseline ran such tools fine.
+                    break
+                reason = f"{free:.0f} MB free, needs {mem_mb} + {MEM_HEADROOM_MB} MB"
+            else:
+                reason = f"all {concurrency} slots busy"
+            if time.monotonic() >= deadline:
+                raise ToolAdmissionError(f"{tool} not admitted: {reason}")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        if have_sem:
+            sem.release()
+        with _state_lock:
+            _waiting[tool] -= 1
+        raise
+
+    queued = time.monotonic() - start
+    with _state_lock:
+        _waiting[tool] -= 1
+        _running[tool] += 1
+    try:
+        yield queued
+    finally:
+        with _state_lock:
+            _running[tool] -= 1
+        if fd is not None:
+            os.close(fd)  # closing the fd drops the flock
+        sem.release()
+
+
+def _drain(stream, sink):
+    """Read a pipe to EOF, keeping at most OUTPUT_LIMIT trailing bytes."""
+    buf = bytearray()
+    truncated = False
+    for chunk in iter(lambda: stream.read(65536), b""):
+        buf += chunk
+        if len(buf) > 2 * OUTPUT_LIMIT:
+            del buf[:-OUTPUT_LIMIT]
+            truncated = True
+    stream.close()
+    if truncated or len(buf) > OUTPUT_LIMIT:
+        sink.append(b"[...truncated...]\n" + bytes(buf[-OUTPUT_LIMIT:]))
+    else:
+        sink.append(bytes(buf))
+
+
+def _wait(proc, deadline, cancel_event):
+    """Poll the child until exit, timeout or cancel; return (state, ru_maxrss)."""
+    delay = 0.01
+    while True:
+        if hasattr(os, "wait4"):
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                return "done", rusage.ru_maxrss
+        elif proc.poll() is not None:
+            return "done", None
+        if cancel_event is not None and cancel_event.is_set():
+            return "cancelled", None
+        if deadline is not None and time.monotonic() >= deadline:
+            return "timeout", None
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+
+def _reap_killed(proc):
+    proc.kill()
+    if hasattr(os, "wait4"):
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            return rusage.ru_maxrss
+        except ChildProcessError:
+            pass
+    proc.wait()
+    return None
+
+
+def record(result):
+    """Keep `result` in the telemetry ring buffer and log it."""
+    _recent.append(result)
+    rss = f"{result.peak_rss_mb:.0f} MB" if result.peak_rss_mb is not None else "n/a"
+    logger.info(
+        f"tool {result.tool}: exit {result.returncode} in {result.duration:.1f}s "
+        f"(queued {result.queued:.1f}s, peak RSS {rss}"
+        f"{', timed out' if result.timed_out else ''}"
+        f"{', cancelled' if result.cancelled else ''})"
+    )
+
+
+def run_tool(tool, cmd, timeout, cwd=None, env=None, cancel_event=None,
+             admission_timeout=None):
+    """Run an external tool under its slot/memory limits and collect metrics.
+
+    Returns a ToolResult (returncode/stdout/stderr like CompletedProcess, text
+    decoded). Raises subprocess.TimeoutExpired after killing a child that
+    overran `timeout`, ToolCancelled if cancel_event fired, and
+    ToolAdmissionError if the tool never got a slot.
+    """
+    if cancel_event is None:
+        cancel_event = getattr(_scope, "cancel_event", None)
+    with tool_slot(tool, cancel_event, admission_timeout) as queued:
+        start = time.monotonic()
+        proc = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        with _state_lock:
+            _live_procs[proc.pid] = (tool, proc)
+        out, err = [], []
+        readers = [
+            threading.Thread(target=_drain, args=(proc.stdout, out), daemon=True),
+            threading.Thread(target=_drain, args=(proc.stderr, err), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            deadline = start + timeout if timeout else None
+            state, maxrss = _wait(proc, deadline, cancel_event)
+            if state != "done":
+                maxrss = _reap_killed(proc)
+        finally:
+            with _state_lock:
+                _live_procs.pop(proc.pid, None)
+        for reader in readers:
+            reader.join(5)
+
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = None
+    if maxrss:
+        peak = maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+    result = ToolResult(
+        tool=tool,
+        args=list(cmd),
+        returncode=proc.returncode,
+        stdout=(out[0] if out else b"").decode("utf-8", "replace"),
+        stderr=(err[0] if err else b"").decode("utf-8", "replace"),
+        duration=time.monotonic() - start,
+        queued=queued,
+        peak_rss_mb=peak,
+        timed_out=state == "timeout",
+        cancelled=state == "cancelled",
+    )
+    record(result)
+    if result.timed_out:
+        raise subprocess.TimeoutExpired(cmd, timeout, output=result.stdout, stderr=result.stderr)
+    if result.cancelled:
+        raise ToolCancelled(f"{tool} cancelled")
+    return result
+
+
+def cancel_running(tool=None):
+    """Kill in-flight children (all, or only `tool`); returns how many."""
+    with _state_lock:
+        procs = list(_live_procs.values())
+    killed = 0
+    for name, proc in procs:
+        if tool is None or name == tool:
+            try:
+                proc.kill()
+                killed += 1
+            except OSError:
+                pass
+    return killed
+
+
+def stats():
+    """Running/queued counts and recent per-tool telemetry for diagnostics."""
+    with _state_lock:
+        running = dict(_running)
+        waiting = dict(_waiting)
+    tools = {}
+    for result in list(_recent):
+        entry = tools.setdefault(
+            result.tool, {"runs": 0, "failures": 0, "total_seconds": 0.0, "max_rss_mb": 0.0}
+        )
+        entry["runs"] += 1
+        entry["failures"] += int(result.returncode != 0)
+        entry["total_seconds"] += result.duration
+        entry["max_rss_mb"] = max(entry["max_rss_mb"], result.peak_rss_mb or 0.0)
+    for name, entry in tools.items():
+        entry["avg_seconds"] = round(entry.pop("total_seconds") / entry["runs"], 3)
+        entry["limits"] = dict(zip(("concurrency", "mem_mb"), tool_limits(name)))
+    return {"running": running, "waiting": waiting, "tools": tools}
@@ -0,0 +1,152 @@
+"""
+Edit Queue
+Per-model serialized, coalescing queue for model edits.
+
+save_modifications used to run the whole edit in the request thread:
+backup, modify_glb, dimension reload, USDZ/LOD kick-off and a version
+snapshot. A large model held a gunicorn thread for tens of seconds, and two
+saves on the same model raced on model.glb. Edits are now submitted here
+and the request returns a job id to poll.
+
+Each model has one pending list and at most one drain running. A drain
+takes everything queued so far and applies it as one batch, so a burst of
+saves becomes one load, one write, one version and one USDZ/LOD refresh.
+The edits are still applied in submission order. Drains run on a small
+thread pool (EDIT_WORKERS) and hold model_write_lock(), a flock on the
+model directory. Anything else that rewrites model.glb (slice, restore)
+takes the same lock, so other processes can't interleave either.
+
+Job status lives in the shared-state store so any worker can answer a
+poll, and records the model and submitting user so the status endpoint
+can check who is asking. A batch that fails as a whole is retried one
+edit at a time, so one bad edit fails only its own job. Pending edits are
+in memory only; a process that dies loses its
+queued (not yet applied) edits, and their jobs expire unanswered.
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from shared_state import get_state
+
+logger = logging.getLogger(__name__)
+
+EDIT_WORKERS = int(os.environ.get("EDIT_WORKERS", 2))
+# How long finished job records stay pollable.
+EDIT_JOB_TTL_SECONDS = int(os.environ.get("EDIT_JOB_TTL_SECONDS", 3600))
+
+try:
+    import fcntl
+except ImportError:  # Windows: process-local locking only
+    fcntl = None
+
+_lock = threading.Lock()
+_pending = {}  # model_id -> [(job_id, modifications)]
+_draining = set()  # model ids with a drain scheduled or running
+_model_locks = {}
+_executor = None
+
+
+def _job_key(job_id):
+    return f"edit-job:{job_id}"
+
+
+def _set_status(job_id, **fields):
+    state = get_state()
+    record = state.get(_job_key(job_id)) or {"job_id": job_id}
+    record.update(fields, updated_at=time.time())
+    state.set(_job_key(job_id), record, ttl=EDIT_JOB_TTL_SECONDS)
+    return record
+
+
+def job_status(job_id):
+    """The job's status record, or None for unknown/expired ids."""
+    return get_state().get(_job_key(job_id))
+
+
+@contextlib.contextmanager
+def model_write_lock(model_dir):
+    """Exclusive right to rewrite model.glb in model_dir (threads + processes)."""
+    with _lock:
+        local = _model_locks.setdefault(model_dir, threading.Lock())
+    with local:
+        if fcntl is None or not os.path.isdir(model_dir):
+            yield
+            return
+        fd = os.open(os.path.join(model_dir, ".edit.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # closing the fd drops the flock
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=EDIT_WORKERS, thread_name_prefix="edit")
+    return _executor
+
+
+def submit(model_id, modifications, apply_batch, user_id=None):
+    """Queue one edit; returns its job id.
+
+    apply_batch(model_id, [modifications, ...]) runs on the pool with every
+    edit queued for the model at that moment, and returns a dict merged into
+    each job's record. It must only raise when it left the model unchanged:
+    a failed batch of several edits is replayed one edit at a time.
+    """
+    job_id = str(uuid.uuid4())
+    _set_status(job_id, model_id=model_id, user_id=user_id, status="queued", error=None)
+    with _lock:
+        _pending.setdefault(model_id, []).append((job_id, modifications))
+        schedule = model_id not in _draining
+        if schedule:
+            _draining.add(model_id)
+    if schedule:
+        _pool().submit(_drain, model_id, apply_batch)
+    return job_id
+
+
+def _drain(model_id, apply_batch):
+    while True:
+        with _lock:
+            batch = _pending.pop(model_id, [])
+            if not batch:
+                _draining.discard(model_id)
+                return
+        try:
+            _apply(model_id, batch, apply_batch)
+        except Exception as e:
+            # Only status bookkeeping gets here (e.g. shared state down);
+            # keep draining so the model isn't left marked as draining.
+            logger.error(f"[edit_queue - {model_id}] status update failed: {e}", exc_info=True)
+
+
+def _apply(model_id, batch, apply_batch):
+    job_ids = [job_id for job_id, _ in batch]
+    for job_id in job_ids:
+        _set_status(job_id, status="running", batch_size=len(batch))
+    try:
+        result = apply_batch(model_id, [mods for _, mods in batch]) or {}
+    except Exception as e:
+        if len(batch) > 1:
+            logger.warning(
+                f"[edit_queue - {model_id}] batch of {len(batch)} failed ({e}); "
+                f"applying its edits one at a time"
+            )
+            for item in batch:
+                _apply(model_id, [item], apply_batch)
+            return
+        logger.error(f"[edit_queue - {model_id}] edit failed: {e}", exc_info=True)
+        _set_status(job_ids[0], status="failed", error=str(e)[:500])
+        return
+    if len(batch) > 1:
+        logger.info(f"[edit_queue - {model_id}] coalesced {len(batch)} edits into one write")
+    for job_id in job_ids:
+        _set_status(job_id, status="completed", **result)
@@ -4,19 +4,30 @@ Applies material and transform modifications to GLB files
 Preserves animations, skins, and all other GLB features
 """
 
+import copy
 import numpy as np
 import logging
 from pathlib import Path
 from pygltflib import (
     GLTF2, Image as GLTFImage, Texture, Sampler, TextureInfo,
-    Material, PbrMetallicRoughness,
+    Material, Node, PbrMetallicRoughness, Scene,
 )
+import json
 import os
 import struct
 import base64
 from PIL import Image
 import io
 
+from converters.base_converter import hex_to_linear_rgb
+from converters.glb_quality import BlobBuilder, compact_gltf
+from converters.meshopt_decoder import decode_for_editing
+from converters.texture_optimizer import (
+    TEXTURE_MAX_SIDE,
+    encode_texture,
+    optimize_gltf_textures,
+)
+
 logger = logging.getLogger(__name__)
 
 # DoS guards for untrusted input.
@@ -352,23 +363,15 @@ def apply_texture_modifications(gltf, texture_data_base64, tint_rgba=None):
         elif img.mode != 'RGB':
             img = img.convert('RGB')
 
-        max_size = 2048
+        max_size = TEXTURE_MAX_SIDE
         if img.width > max_size or img.height > max_size:
             img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
             logger.info(f"Resized image to: {img.size}")
 
-        buf = io.BytesIO()
-        img.save(buf, format='PNG', optimize=True)
-        image_bytes = buf.getvalue()
-        logger.info(f"Optimized texture: {len(image_bytes)} bytes")
-
-        # ── Embed image in binary buffer (not data URI) ──
-        blob = gltf.binary_blob() or b""
-        img_offset = len(blob)
-        new_blob = blob + image_bytes
-        gltf.set_binary_blob(new_blob)
-        if gltf.buffers:
-            gltf.buffers[0].byteLength = len(new_blob)
+        # Alpha was flattened above, so a core-glTF JPEG is always safe here;
+        # the texture stage below switches it to WebP if that is configured.
+        image_bytes, image_mime = encode_texture(img, fmt="jpeg")
+        logger.info(f"Optimized texture: {len(image_bytes)} bytes ({image_mime})")
 
         # Initialize arrays
         if gltf.images is None:
@@ -380,16 +383,11 @@ def apply_texture_modifications(gltf, texture_data_base64, tint_rgba=None):
         if gltf.bufferViews is None:
             gltf.bufferViews = []
 
-        # BufferView for the image
-        from pygltflib import BufferView as BV
-        img_bv = BV(buffer=0, byteOffset=img_offset, byteLength=len(image_bytes))
-        img_bv_index = len(gltf.bufferViews)
-        gltf.bufferViews.append(img_bv)
-
-        # Image referencing the bufferView (no uri)
+        # ── Embed image in binary buffer (not data URI) ──
         gltf_image = GLTFImage()
-        gltf_image.bufferView = img_bv_index
-        gltf_image.mimeType = "image/png"
+        builder = BlobBuilder(gltf)
+        img_bv_index = builder.add_image(gltf_image, image_bytes, image_mime)
+        builder.commit()
         image_index = len(gltf.images)
         gltf.images.append(gltf_image)
         logger.info(f"Embedded image in buffer: {len(image_bytes)} bytes at bv[{img_bv_index}]")
@@ -443,6 +441,163 @@ def apply_texture_modifications(gltf, texture_data_base64, tint_rgba=None):
         return gltf
 
 
+# Viewer transform edits (and upload-time recentering) are carried by one
+# node wrapping the default scene's roots instead of being baked into every
+# vertex: an edit then only rewrites that node's matrix, whatever the model
+# size, and repeated edits compose matrices instead of accumulating float
+# error in the geometry. bake_transforms() folds it into the vertex data
+# when a caller explicitly asks for that.
+EDIT_ROOT_NAME = "web_ar_edit_root"
+_EDIT_ROOT_MARKER = "web_ar_edit_root"
+
+# Divisors for normalized integer POSITION accessors (KHR_mesh_quantization).
+_NORMALIZED_MAX = {5120: 127.0, 5121: 255.0, 5122: 32767.0, 5123: 65535.0}
+
+
+class _NeedsGeometry(Exception):
+    """Raised on the JSON-only path when bounds need vertex data after all."""
+
+
+def _local_matrix(node):
+    if node.matrix is not None:
+        return np.array(node.matrix, dtype=float).reshape(4, 4).T
+    x, y, z, w = node.rotation or [0.0, 0.0, 0.0, 1.0]
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.array(node.scale or [1.0, 1.0, 1.0], dtype=float)
+    matrix[:3, 3] = node.translation or [0.0, 0.0, 0.0]
+    return matrix
+
+
+def _translation(offset):
+    matrix = np.eye(4)
+    matrix[:3, 3] = offset
+    return matrix
+
+
+def _scene_roots(gltf):
+    if gltf.scenes:
+        return list(gltf.scenes[gltf.scene or 0].nodes or [])
+    children = {c for node in gltf.nodes or [] for c in node.children or []}
+    return [i for i in range(len(gltf.nodes or [])) if i not in children]
+
+
+def _mesh_instances(gltf, roots):
+    """(mesh index, matrix from mesh space to the roots' parent space) per mesh node."""
+    stack = [(i, np.eye(4)) for i in roots]
+    while stack:
+        index, parent = stack.pop()
+        node = gltf.nodes[index]
+        world = parent @ _local_matrix(node)
+        stack.extend((c, world) for c in node.children or [])
+        if node.mesh is not None:
+            yield node.mesh, world
+
+
+def _accessor_view(gltf, blob, index, width):
+    """Writable float32 (count, width) view of an accessor inside blob."""
+    accessor = gltf.accessors[index]
+    if accessor.bufferView is None or accessor.sparse is not None or accessor.componentType != 5126:
+        raise ValueError(f"accessor {index} is not plain float data")
+    view = gltf.bufferViews[accessor.bufferView]
+    if view.buffer != 0 or gltf.buffers[0].uri:
+        raise ValueError(f"accessor {index} is not in the GLB binary chunk")
+    return np.ndarray(
+        shape=(accessor.count, width), dtype='<f4', buffer=blob,
+        offset=(view.byteOffset or 0) + (accessor.byteOffset or 0),
+        strides=(view.byteStride or 4 * width, 4),
+    )
+
+
+def _position_bounds(gltf, index):
+    accessor = gltf.accessors[index]
+    if accessor.min is not None and accessor.max is not None:
+        lo = np.array(accessor.min[:3], dtype=float)
+        hi = np.array(accessor.max[:3], dtype=float)
+        if accessor.normalized:
+            scale = _NORMALIZED_MAX.get(accessor.componentType, 1.0)
+            lo, hi = np.maximum(lo / scale, -1.0), hi / scale
+        return lo, hi
+    blob = gltf.binary_blob()
+    if not blob:
+        raise _NeedsGeometry(f"POSITION accessor {index} has no min/max")
+    points = _accessor_view(gltf, bytearray(blob), index, 3)
+    if not len(points):
+        return None
+    return points.min(axis=0).astype(float), points.max(axis=0).astype(float)
+
+
+def scene_bounds(gltf):
+    """(2, 3) world-space bounds of the default scene, or None without geometry.
+
+    Taken from POSITION accessor min/max (read from the data only when an
+    accessor lacks them) under each node's transform, edit root included.
+    """
+    corners = []
+    for mesh_index, world in _mesh_instances(gltf, _scene_roots(gltf)):
+        for primitive in gltf.meshes[mesh_index].primitives or []:
+            position = getattr(primitive.attributes, 'POSITION', None)
+            if position is None:
+                continue
+            bounds = _position_bounds(gltf, position)
+            if bounds is None:
+                continue
+            lo, hi = bounds
+            box = np.array([[x, y, z, 1.0] for x in (lo[0], hi[0])
+                            for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+            corners.append((box @ world.T)[:, :3])
+    if not corners:
+        return None
+    points = np.vstack(corners)
+    return np.array([points.min(axis=0), points.max(axis=0)])
+
+
+def glb_bounds(path):
+    """scene_bounds of a GLB file from its JSON chunk alone.
+
+    None when the file has no geometry or an accessor lacks min/max (the
+    caller then has to measure the vertices).
+    """
+    doc, _ = read_glb_json(path)
+    try:
+        return scene_bounds(GLTF2.from_json(json.dumps(doc)))
+    except _NeedsGeometry:
+        return None
+
+
+def _edit_root(gltf):
+    """Index of the node wrapping the default scene's roots, created on first use."""
+    roots = _scene_roots(gltf)
+    if len(roots) == 1 and (gltf.nodes[roots[0]].extras or {}).get(_EDIT_ROOT_MARKER):
+        return roots[0]
+    # trimesh (our own loader for bounds, slicing, LODs) treats a node named
+    # "world" as its base frame and drops that node's transform once it's no
+    # longer the scene root; trimesh exports name their root exactly that.
+    for node in gltf.nodes:
+        if node.name == "world":
+            node.name = "world_node"
+    gltf.nodes.append(Node(name=EDIT_ROOT_NAME, children=roots, extras={_EDIT_ROOT_MARKER: True}))
+    index = len(gltf.nodes) - 1
+    if gltf.scenes:
+        gltf.scenes[gltf.scene or 0].nodes = [index]
+    else:
+        gltf.scenes = [Scene(nodes=[index])]
+        gltf.scene = 0
+    return index
+
+
+def _compose_root(gltf, edit):
+    """Apply the 4x4 edit on top of the edit root's current matrix."""
+    node = gltf.nodes[_edit_root(gltf)]
+    matrix = edit @ _local_matrix(node)
+    node.translation = node.rotation = node.scale = None
+    node.matrix = None if np.allclose(matrix, np.eye(4)) else [float(v) for v in matrix.T.flatten()]
+
+
 def normalize_model_to_center(gltf):
     """
     Normalize model by moving its center to origin (0, 0, 0)
@@ -451,70 +606,22 @@ def normalize_model_to_center(gltf):
     Note: Basis correction (Z-up to Y-up) is applied only when rotation is applied
     via apply_transform_modifications, not during initial normalization.
     This keeps the model in its original orientation on upload.
+
+    The offset goes on the edit root node; vertex data is not touched.
     
     Returns:
         GLTF2: Modified GLTF object
     """
     logger.info("Normalizing model to center origin")
-    
-    # Calculate current center
-    center_x, center_y, center_z = calculate_model_center(gltf)
-    
     try:
-        # Move all vertices to center the model at origin
-        for mesh_idx, mesh in enumerate(gltf.meshes):
-            if not mesh.primitives:
-                continue
-            
-            for prim_idx, primitive in enumerate(mesh.primitives):
-                if primitive.attributes is None:
-                    continue
-                
-                # Get POSITION accessor
-                if hasattr(primitive.attributes, 'POSITION') and primitive.attributes.POSITION is not None:
-                    pos_accessor_idx = primitive.attributes.POSITION
-                    accessor = gltf.accessors[pos_accessor_idx]
-                    buffer_view = gltf.bufferViews[accessor.bufferView]
-                    buffer = gltf.buffers[buffer_view.buffer]
-                    
-                    # Get binary data
-                    if buffer.uri and buffer.uri.startswith('data:'):
-                        data_start = buffer.uri.find(',') + 1
-                        binary_data = base64.b64decode(buffer.uri[data_start:])
-                    elif hasattr(gltf, 'binary_blob') and gltf.binary_blob():
-                        binary_data = gltf.binary_blob()
-                    else:
-                        continue
-                    
-                    # Parse and translate vertices
-                    offset = buffer_view.byteOffset if buffer_view.byteOffset else 0
-                    offset += accessor.byteOffset if accessor.byteOffset else 0
-                    vertex_count = accessor.count
-                    stride = buffer_view.byteStride if buffer_view.byteStride else 12
-                    
-                    new_data = bytearray(binary_data)
-                    for i in range(vertex_count):
-                        pos = offset + i * stride
-                        x, y, z = struct.unpack_from('fff', binary_data, pos)
-                        
-                        # Translate to origin
-                        x -= center_x
-                        y -= center_y
-                        z -= center_z
-                        
-                        struct.pack_into('fff', new_data, pos, x, y, z)
-                    
-                    # Update buffer
-                    if buffer.uri and buffer.uri.startswith('data:'):
-                        buffer.uri = 'data:application/octet-stream;base64,' + base64.b64encode(bytes(new_data)).decode('utf-8')
-                    else:
-                        gltf.set_binary_blob(bytes(new_data))
-                    
-                    logger.info(f"Translated {vertex_count} vertices in mesh {mesh_idx}, primitive {prim_idx}")
-        
+        if not gltf.nodes:
+            return gltf
+        center = np.array(calculate_model_center(gltf))
+        if np.allclose(center, 0.0):
+            return gltf
+        _compose_root(gltf, _translation(-center))
         logger.info("✅ Model normalized to center origin")
         return gltf
-        
     except Exception as e:
         logger.error(f"Failed to normalize model: {e}", exc_info=True)
         return gltf
@@ -522,69 +629,17 @@ def normalize_model_to_center(gltf):
 
 def calculate_model_center(gltf):
     """
-    Calculate the center point of the model's bounding box
+    Calculate the center point of the model's world-space bounding box
     
     Returns:
         tuple: (center_x, center_y, center_z)
     """
-    if not gltf.meshes:
-        return (0.0, 0.0, 0.0)
-    
-    min_x = min_y = min_z = float('inf')
-    max_x = max_y = max_z = float('-inf')
-    
-    try:
-        for mesh in gltf.meshes:
-            if not mesh.primitives:
-                continue
-            
-            for primitive in mesh.primitives:
-                if primitive.attributes is None:
-                    continue
-                
-                # Get POSITION accessor
-                if hasattr(primitive.attributes, 'POSITION') and primitive.attributes.POSITION is not None:
-                    pos_accessor_idx = primitive.attributes.POSITION
-                    accessor = gltf.accessors[pos_accessor_idx]
-                    buffer_view = gltf.bufferViews[accessor.bufferView]
-                    buffer = gltf.buffers[buffer_view.buffer]
-                    
-                    # Get binary data
-                    if buffer.uri and buffer.uri.startswith('data:'):
-                        data_start = buffer.uri.find(',') + 1
-                        binary_data = base64.b64decode(buffer.uri[data_start:])
-                    elif hasattr(gltf, 'binary_blob') and gltf.binary_blob():
-                        binary_data = gltf.binary_blob()
-                    else:
-                        continue
-                    
-                    # Parse vertex positions
-                    offset = buffer_view.byteOffset if buffer_view.byteOffset else 0
-                    offset += accessor.byteOffset if accessor.byteOffset else 0
-                    vertex_count = accessor.count
-                    stride = buffer_view.byteStride if buffer_view.byteStride else 12
-                    
-                    for i in range(vertex_count):
-                        pos = offset + i * stride
-                        x, y, z = struct.unpack_from('fff', binary_data, pos)
-                        
-                        min_x = min(min_x, x)
-                        min_y = min(min_y, y)
-                        min_z = min(min_z, z)
-                        max_x = max(max_x, x)
-                        max_y = max(max_y, y)
-                        max_z = max(max_z, z)
-        
-        center_x = (min_x + max_x) / 2.0
-        center_y = (min_y + max_y) / 2.0
-        center_z = (min_z + max_z) / 2.0
-        
-        logger.info(f"Model center calculated: ({center_x:.3f}, {center_y:.3f}, {center_z:.3f})")
-        return (center_x, center_y, center_z)
-        
-    except Exception as e:
-        logger.error(f"Failed to calculate model center: {e}")
+    bounds = scene_bounds(gltf) if gltf.meshes else None
+    if bounds is None:
         return (0.0, 0.0, 0.0)
+    center_x, center_y, center_z = (float(c) for c in bounds.mean(axis=0))
+    logger.info(f"Model center calculated: ({center_x:.3f}, {center_y:.3f}, {center_z:.3f})")
+    return (center_x, center_y, center_z)
 
 
 def create_rotation_matrix(rx, ry, rz):
@@ -638,141 +693,127 @@ def create_rotation_matrix(rx, ry, rz):
 def apply_transform_modifications(gltf, transform_mods):
     """
     Apply transform modifications to GLTF with model center as pivot
-    - Scale: Applied to mesh vertices around model center
-    - Rotation: Applied to node transforms around model center
+
+    Scale and rotation are composed onto the edit root node's matrix; the
+    geometry is only rewritten when transform_mods has 'bake' set (see
+    bake_transforms).
     
     Args:
         gltf: GLTF2 object
-        transform_mods: dict with 'scale' and 'rotation' (x, y, z in degrees)
+        transform_mods: dict with 'scale', 'rotation' (x, y, z in degrees)
+            and optionally 'bake'
     """
     logger.info(f"Applying transform modifications: {transform_mods}")
-    
-    # Calculate model center to use as pivot
-    center_x, center_y, center_z = calculate_model_center(gltf)
-    logger.info(f"Using model center as pivot: ({center_x:.3f}, {center_y:.3f}, {center_z:.3f})")
-    
-    # Get rotation parameters
+
     rotation = transform_mods.get('rotation', {})
     rx = np.radians(float(rotation.get('x', 0)))
     ry = np.radians(float(rotation.get('y', 0)))
     rz = np.radians(float(rotation.get('z', 0)))
     has_rotation = (rx != 0 or ry != 0 or rz != 0)
-    
-    # Calculate rotation matrix if needed
-    rotation_matrix = None
-    if has_rotation:
-        rotation_matrix = euler_to_rotation_matrix(rx, ry, rz)
-        logger.info(f"Rotation matrix calculated for ({rotation.get('x', 0)}°, {rotation.get('y', 0)}°, {rotation.get('z', 0)}°)")
-    
-    # Apply scale and rotation to mesh vertices (permanent geometry change)
     scale_factor = float(transform_mods.get('scale', 1.0))
-    
-    if (scale_factor != 1.0 or has_rotation) and gltf.meshes:
-            transforms = []
-            if has_rotation:
-                transforms.append(f"rotation ({rotation.get('x', 0)}°, {rotation.get('y', 0)}°, {rotation.get('z', 0)}°)")
-            if scale_factor != 1.0:
-                transforms.append(f"scale {scale_factor}")
-            logger.info(f"Applying {' and '.join(transforms)} to mesh vertices")
-            try:
-                for mesh_idx, mesh in enumerate(gltf.meshes):
-                    if not mesh.primitives:
-                        continue
-                    
-                    for prim_idx, primitive in enumerate(mesh.primitives):
-                        if primitive.attributes is None:
-                            continue
-                        
-                        # Get POSITION accessor
-                        if hasattr(primitive.attributes, 'POSITION') and primitive.attributes.POSITION is not None:
-                            pos_accessor_idx = primitive.attributes.POSITION
-                            accessor = gltf.accessors[pos_accessor_idx]
-                            buffer_view = gltf.bufferViews[accessor.bufferView]
-                            buffer = gltf.buffers[buffer_view.buffer]
-                            
-                            # Get binary data
-                            import base64
-                            if buffer.uri and buffer.uri.startswith('data:'):
-                                # Data URI (embedded as base64)
-                                data_start = buffer.uri.find(',') + 1
-                                binary_data = base64.b64decode(buffer.uri[data_start:])
-                            elif hasattr(gltf, 'binary_blob') and gltf.binary_blob():
-                                # GLB binary chunk
-                                binary_data = gltf.binary_blob()
-                            else:
-                                logger.warning(f"Cannot scale: buffer {buffer_view.buffer} has no accessible data")
-                                continue
-                            
-                            # Parse vertex positions
-                            import struct
-                            offset = buffer_view.byteOffset if buffer_view.byteOffset else 0
-                            offset += accessor.byteOffset if accessor.byteOffset else 0
-                            
-                            # Read and scale vertices
-                            vertex_count = accessor.count
-                            stride = buffer_view.byteStride if buffer_view.byteStride else 12  # 3 floats
-                            
-                            new_data = bytearray(binary_data)
-                            for i in range(vertex_count):
-                                pos = offset + i * stride
-                                # Read XYZ
-                                x, y, z = struct.unpack_from('fff', binary_data, pos)
-                                
-                                # Transform around model center (pivot)
-                                # 1. Translate to origin (relative to center)
-                                x -= center_x
-                                y -= center_y
-                                z -= center_z
-                                
-                                # 2. Apply rotation (if any)
-                                if rotation_matrix is not None:
-                                    vertex = np.array([x, y, z])
-                                    rotated = rotation_matrix @ vertex
-                                    x, y, z = rotated[0], rotated[1], rotated[2]
-                                
-                                # 3. Apply scale
-                                if scale_factor != 1.0:
-                                    x *= scale_factor
-                                    y *= scale_factor
-                                    z *= scale_factor
-                                
-                                # 4. Translate back
-                                x += center_x
-                                y += center_y
-                                z += center_z
-                                
-                                # Write back
-                                struct.pack_into('fff', new_data, pos, x, y, z)
-                            
-                            # Update buffer based on type
-                            if buffer.uri and buffer.uri.startswith('data:'):
-                                # Update data URI
-                                buffer.uri = 'data:application/octet-stream;base64,' + base64.b64encode(bytes(new_data)).decode('utf-8')
-                            else:
-                                # Update GLB binary chunk
-                                gltf.set_binary_blob(bytes(new_data))
-                            
-                            transform_desc = []
-                            if has_rotation:
-                                transform_desc.append(f"rotated ({rotation.get('x', 0)}°, {rotation.get('y', 0)}°, {rotation.get('z', 0)}°)")
-                            if scale_factor != 1.0:
-                                transform_desc.append(f"scaled {scale_factor}x")
-                            logger.info(f"Transformed {vertex_count} vertices ({', '.join(transform_desc)}) in mesh {mesh_idx}, primitive {prim_idx}")
-                
-                result_desc = []
-                if has_rotation:
-                    result_desc.append(f"rotated ({rotation.get('x', 0)}°, {rotation.get('y', 0)}°, {rotation.get('z', 0)}°)")
-                if scale_factor != 1.0:
-                    result_desc.append(f"scaled by {scale_factor}")
-                logger.info(f"✅ Geometry transformed: {', '.join(result_desc) if result_desc else 'no changes'}")
-            except Exception as e:
-                logger.error(f"Failed to transform geometry: {e}", exc_info=True)
-    
-    logger.info("Transform modifications applied (rotation and scale baked into vertices)")
-    
+
+    if (scale_factor != 1.0 or has_rotation) and gltf.nodes:
+        center = np.array(calculate_model_center(gltf))
+        logger.info(f"Using model center as pivot: ({center[0]:.3f}, {center[1]:.3f}, {center[2]:.3f})")
+        linear = np.eye(4)
+        linear[:3, :3] = scale_factor * (euler_to_rotation_matrix(rx, ry, rz) if has_rotation else np.eye(3))
+        _compose_root(gltf, _translation(center) @ linear @ _translation(-center))
+        logger.info(
+            f"Transform set on root node: rotation ({rotation.get('x', 0)}°, "
+            f"{rotation.get('y', 0)}°, {rotation.get('z', 0)}°), scale {scale_factor}"
+        )
+
+    if transform_mods.get('bake'):
+        bake_transforms(gltf)
     return gltf
 
 
+def bake_transforms(gltf):
+    """Fold the edit root's matrix into the vertex data and reset it.
+
+    Each mesh gets N⁻¹·E·N (E the root matrix, N the mesh's transform below
+    the root), so nodes below the root keep their own transforms. Skinned
+    or animated models, meshes instanced under different transforms and
+    non-float vertex data are left as they are. Returns True if baked.
+
+    Morph-target NORMAL/TANGENT deltas are mapped like their base attribute
+    but not normalized: the renderer adds them to the base and normalizes
+    the sum, so each delta is divided by its base vector's stretch to keep
+    that sum pointing where E applied to the morphed vector would.
+    """
+    roots = _scene_roots(gltf)
+    if not (len(roots) == 1 and (gltf.nodes[roots[0]].extras or {}).get(_EDIT_ROOT_MARKER)):
+        return False
+    root = gltf.nodes[roots[0]]
+    edit = _local_matrix(root)
+    if np.allclose(edit, np.eye(4)):
+        return False
+    if gltf.skins or gltf.animations:
+        logger.info("Not baking transforms: skinned/animated model keeps its root matrix")
+        return False
+
+    def attribute(attrs, name):
+        return attrs.get(name) if isinstance(attrs, dict) else getattr(attrs, name, None)
+
+    jobs = {}  # accessor -> (kind, matrix, base accessor of a morph delta)
+    for mesh_index, below in _mesh_instances(gltf, root.children or []):
+        matrix = np.linalg.inv(below) @ edit @ below
+        for primitive in gltf.meshes[mesh_index].primitives or []:
+            base = primitive.attributes
+            sources = [(base, (('POSITION', 'point'), ('NORMAL', 'normal'), ('TANGENT', 'tangent')))]
+            for target in primitive.targets or []:
+                sources.append((target, (('POSITION', 'vector'), ('NORMAL', 'normal_delta'),
+                                         ('TANGENT', 'tangent_delta'))))
+            for attrs, kinds in sources:
+                for name, kind in kinds:
+                    index = attribute(attrs, name)
+                    if index is None:
+                        continue
+                    if index in jobs and not np.allclose(jobs[index][1], matrix):
+                        logger.warning("Not baking transforms: geometry shared under different transforms")
+                        return False
+                    jobs[index] = (kind, matrix, attribute(base, name) if attrs is not base else None)
+
+    blob = bytearray(gltf.binary_blob() or b"")
+    try:
+        views = {index: _accessor_view(gltf, blob, index, 4 if kind == 'tangent' else 3)
+                 for index, (kind, _, _) in jobs.items()}
+    except ValueError as e:
+        logger.warning(f"Not baking transforms: {e}")
+        return False
+
+    # Deltas first: they are scaled by their base vectors as stored now.
+    ordered = sorted(jobs.items(), key=lambda job: not job[1][0].endswith('_delta'))
+    for index, (kind, matrix, base) in ordered:
+        data, linear = views[index], matrix[:3, :3]
+        if kind.endswith('_delta'):
+            xform = np.linalg.inv(linear) if kind == 'normal_delta' else linear.T
+            stretch = 1.0
+            if base in views and len(views[base]) == len(data):
+                stretch = np.linalg.norm(views[base][:, :3] @ xform, axis=1, keepdims=True)
+                stretch = np.where(stretch > 0, stretch, 1.0)
+            data[:] = (data @ xform) / stretch
+        elif kind == 'point':
+            data[:] = data @ linear.T + matrix[:3, 3]
+            accessor = gltf.accessors[index]
+            if len(data):
+                accessor.min = [float(v) for v in data.min(axis=0)]
+                accessor.max = [float(v) for v in data.max(axis=0)]
+        elif kind == 'vector':
+            data[:] = data @ linear.T
+        else:
+            xyz = data[:, :3] @ (np.linalg.inv(linear) if kind == 'normal' else linear.T)
+            length = np.linalg.norm(xyz, axis=1, keepdims=True)
+            data[:, :3] = xyz / np.where(length > 0, length, 1.0)
+            if kind == 'tangent' and np.linalg.det(linear) < 0:
+                data[:, 3] *= -1
+
+    gltf.set_binary_blob(bytes(blob))
+    root.matrix = root.translation = root.rotation = root.scale = None
+    logger.info(f"Baked root transform into {len(jobs)} accessor(s)")
+    return True
+
+
 def euler_to_quaternion(rx, ry, rz):
     """
     Convert Euler angles (in radians) to quaternion (x, y, z, w)
@@ -801,6 +842,73 @@ def euler_to_quaternion(rx, ry, rz):
     return [x, y, z, w]
 
 
+# Material keys that only change JSON-level fields (factors, alphaMode,
+# doubleSided). A texture adds image bytes to the BIN chunk.
+_JSON_MATERIAL_KEYS = {'color', 'opacity', 'metalness', 'roughness', 'tint_textures'}
+
+
+def is_json_only_edit(modifications):
+    """True if the edit can be applied to the JSON chunk alone.
+
+    Material factors and transforms (carried by the edit root node) qualify;
+    textures and baking transforms into the geometry don't.
+    """
+    if set(modifications) - {'material', 'transform'}:
+        return False
+    material = modifications.get('material') or {}
+    transform = modifications.get('transform') or {}
+    return set(material) <= _JSON_MATERIAL_KEYS and not transform.get('bake')
+
+
+def _modify_glb_json(input_path, output_path, batch):
+    """modify_glb for JSON-only edits: the BIN chunk is copied, never parsed.
+
+    The JSON chunk still goes through pygltflib (without its binary blob) so
+    the rules are exactly those of the full path. Raises _NeedsGeometry when
+    a transform pivot can't be found from accessor min/max alone.
+    """
+    def patch(doc):
+        gltf = GLTF2.from_json(json.dumps(doc))
+        for modifications in batch:
+            if 'material' in modifications:
+                apply_material_modifications(gltf, modifications['material'])
+            if 'transform' in modifications:
+                apply_transform_modifications(gltf, modifications['transform'])
+        doc.clear()
+        doc.update(json.loads(gltf.gltf_to_json(separators=(',', ':'), indent=None)))
+        return True
+
+    patch_glb_json(input_path, output_path, patch)
+    logger.info(f"Applied {len(batch)} JSON-only edit(s) to {output_path} without touching the BIN chunk")
+    return True
+
+
+def _compacted(gltf):
+    """compact_gltf on a copy, returned only if it succeeded.
+
+    compact_gltf remaps indices in place, so a failure midway would leave
+    the document inconsistent; the original is kept (and saved
+    uncompacted) instead. The BIN blob is immutable bytes and is shared
+    with the copy rather than duplicated.
+    """
+    blob = gltf.binary_blob()
+    gltf.set_binary_blob(None)
+    try:
+        candidate = copy.deepcopy(gltf)
+    finally:
+        gltf.set_binary_blob(blob)
+    candidate.set_binary_blob(blob)
+    try:
+        compacted = compact_gltf(candidate)
+    except Exception as ce:
+        logger.warning(f"GLB compaction skipped: {ce}")
+        return gltf
+    if not compacted:
+        return gltf
+    logger.info(f"Compacted GLB before export: {compacted}")
+    return candidate
+
+
 def modify_glb(input_path, output_path, modifications):
     """
     Main function to modify a GLB file
@@ -809,16 +917,33 @@ def modify_glb(input_path, output_path, modifications):
     Args:
         input_path: Path to input GLB file
         output_path: Path to output GLB file
-        modifications: dict with 'material' and 'transform' keys
+        modifications: dict with 'material' and 'transform' keys, or a
+            list of such dicts applied in order. When every edit only
+            touches JSON-level fields (see is_json_only_edit) the BIN chunk
+            is copied through instead of being parsed and re-serialized.
     
     Returns:
         bool: True if successful, False otherwise
     """
+    # A list is a batch of queued edits: apply them in order to the one
+    # loaded document so the whole batch costs a single load and write.
+    batch = modifications if isinstance(modifications, list) else [modifications]
     try:
+        if all(is_json_only_edit(mods) for mods in batch):
+            try:
+                return _modify_glb_json(input_path, output_path, batch)
+            except _NeedsGeometry as e:
+                logger.info(f"JSON-only edit needs the geometry ({e}); loading the full GLB")
+
         logger.info(f"Loading GLB from {input_path}")
         
         # Load the GLB file using pygltflib
         gltf = GLTF2().load(input_path)
+
+        # gltfpack output: the steps below read and write plain float32
+        # vertex data, so undo meshopt compression and quantization first.
+        if decode_for_editing(gltf):
+            logger.info("Decoded meshopt/quantized geometry for editing")
         
         logger.info(f"Loaded GLB:")
         logger.info(f"  - Nodes: {len(gltf.nodes) if gltf.nodes else 0}")
@@ -827,28 +952,41 @@ def modify_glb(input_path, output_path, modifications):
         logger.info(f"  - Animations: {len(gltf.animations) if gltf.animations else 0}")
         logger.info(f"  - Skins: {len(gltf.skins) if gltf.skins else 0}")
         
-        # Apply material modifications
-        if 'material' in modifications:
-            mat_mods = modifications['material']
-            gltf = apply_material_modifications(gltf, mat_mods)
-
-            # Apply texture if provided. Pass the user's tint through so the
-            # texture step doesn't clobber an explicitly chosen color.
-            if mat_mods.get('texture'):
-                tint_rgba = None
-                if mat_mods.get('tint_textures') and mat_mods.get('color'):
+        for modifications in batch:
+            # Apply material modifications
+            if 'material' in modifications:
+                mat_mods = modifications['material']
+                gltf = apply_material_modifications(gltf, mat_mods)
+
+                # Apply texture if provided. Pass the user's tint through so the
+                # texture step doesn't clobber an explicitly chosen color.
+                if mat_mods.get('texture'):
+                    tint_rgba = None
+                    if mat_mods.get('tint_textures') and mat_mods.get('color'):
+                        try:
+                            raw = mat_mods['color']
+                            rgb = tuple(float(c) for c in raw[:3]) if isinstance(raw, (list, tuple)) else hex_to_rgb(raw)
+                            tint_rgba = list(rgb) + [float(mat_mods.get('opacity', 1.0))]
+                        except Exception as te:
+                            logger.warning(f"Could not derive texture tint from color: {te}")
+                    gltf = apply_texture_modifications(gltf, mat_mods['texture'], tint_rgba=tint_rgba)
+                    # Re-applying a texture appends identical bytes; the texture
+                    # stage folds those duplicates and repacks the BIN chunk.
                     try:
-                        raw = mat_mods['color']
-                        rgb = tuple(float(c) for c in raw[:3]) if isinstance(raw, (list, tuple)) else hex_to_rgb(raw)
-                        tint_rgba = list(rgb) + [float(mat_mods.get('opacity', 1.0))]
+                        stats = optimize_gltf_textures(gltf)
+                        if stats:
+                            logger.info(f"Texture stage after edit: {stats}")
                     except Exception as te:
-                        logger.warning(f"Could not derive texture tint from color: {te}")
-                gltf = apply_texture_modifications(gltf, mat_mods['texture'], tint_rgba=tint_rgba)
-        
-        # Apply transform modifications
-        if 'transform' in modifications:
-            gltf = apply_transform_modifications(gltf, modifications['transform'])
+                        logger.warning(f"Texture stage skipped after edit: {te}")
         
+            # Apply transform modifications
+            if 'transform' in modifications:
+                gltf = apply_transform_modifications(gltf, modifications['transform'])
+
+        # Edits only ever append (new textures, materials, baked buffers);
+        # drop whatever is no longer reachable so the file doesn't grow per edit.
+        gltf = _compacted(gltf)
+
         # Export modified GLB
         logger.info(f"Exporting modified GLB to {output_path}")
         gltf.save(output_path)
@@ -857,14 +995,6 @@ def modify_glb(input_path, output_path, modifications):
         if Path(output_path).exists():
             file_size = Path(output_path).stat().st_size
             logger.info(f"Successfully exported GLB ({file_size} bytes)")
-            
-            # Verify animations are preserved
-            gltf_verify = GLTF2().load(output_path)
-            if gltf_verify.animations:
-                logger.info(f"✅ Animations preserved: {len(gltf_verify.animations)} animations")
-            if gltf_verify.skins:
-                logger.info(f"✅ Skins preserved: {len(gltf_verify.skins)} skins")
-            
             return True
         else:
             logger.error("Output file was not created")
@@ -873,3 +1003,149 @@ def modify_glb(input_path, output_path, modifications):
     except Exception as e:
         logger.error(f"Error modifying GLB: {e}", exc_info=True)
         return False
+
+
+# ---------------------------------------------------------------------------
+# JSON-chunk-only edits
+#
+# Material factors live in the GLB's JSON chunk; the BIN chunk (geometry and
+# textures) is most of the file and doesn't change. These helpers rewrite
+# just the JSON chunk and copy the rest of the file through untouched, so
+# the cost doesn't depend on model size.
+# ---------------------------------------------------------------------------
+
+def read_glb_json(path):
+    """(parsed JSON chunk, byte offset where the chunks after it start)."""
+    with open(path, 'rb') as fh:
+        header = fh.read(20)
+        if len(header) < 20 or header[:4] != b'glTF':
+            raise ValueError(f"{path} is not a GLB file")
+        json_len, chunk_type = struct.unpack_from('<I4s', header, 12)
+        if chunk_type != b'JSON':
+            raise ValueError(f"{path} has no leading JSON chunk")
+        doc = json.loads(fh.read(json_len))
+    return doc, 20 + json_len
+
+
+def _copy_range(src, dst, offset, length):
+    """Copy length bytes of src from offset to dst's current position.
+
+    copy_file_range/sendfile keep the bytes in the kernel (and may reflink on
+    filesystems that support it); plain reads are the portable fallback.
+    """
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    dst_offset = dst.tell()
+    for name in ('copy_file_range', 'sendfile'):
+        call = getattr(os, name, None)
+        if call is None:
+            continue
+        copied = 0
+        try:
+            while copied < length:
+                if name == 'copy_file_range':
+                    n = call(src_fd, dst_fd, length - copied, offset + copied, dst_offset + copied)
+                else:
+                    os.lseek(dst_fd, dst_offset + copied, os.SEEK_SET)
+                    n = call(dst_fd, src_fd, offset + copied, length - copied)
+                if n == 0:
+                    break
+                copied += n
+        except OSError:
+            # Unsupported between these files (e.g. cross-device on old
+            # kernels); fall through to the next method from the start.
+            continue
+        if copied == length:
+            dst.seek(dst_offset + length)
+            return
+    src.seek(offset)
+    dst.seek(dst_offset)
+    remaining = length
+    while remaining:
+        block = src.read(min(remaining, 1024 * 1024))
+        if not block:
+            raise ValueError("GLB ended before its last chunk")
+        dst.write(block)
+        remaining -= len(block)
+
+
+def patch_glb_json(input_path, output_path, patch):
+    """Apply patch(doc) to the JSON chunk and write the result to output_path.
+
+    Everything after the JSON chunk is copied byte for byte. output_path may
+    equal input_path; the file is replaced atomically either way. Returns
+    whatever patch() returned; a falsy result means nothing changed, and
+    when input_path == output_path the file is then left alone.
+    """
+    doc, tail_offset = read_glb_json(input_path)
+    changed = patch(doc)
+    if not changed and os.path.abspath(input_path) == os.path.abspath(output_path):
+        return changed
+
+    json_bytes = json.dumps(doc, separators=(',', ':')).encode()
+    json_bytes += b' ' * (-len(json_bytes) % 4)
+    tail_len = os.path.getsize(input_path) - tail_offset
+    total = 20 + len(json_bytes) + tail_len
+
+    tmp = f"{output_path}.tmp.{os.getpid()}"
+    try:
+        with open(input_path, 'rb') as src, open(tmp, 'wb') as dst:
+            dst.write(struct.pack('<4sII', b'glTF', 2, total))
+            dst.write(struct.pack('<I4s', len(json_bytes), b'JSON'))
+            dst.write(json_bytes)
+            dst.flush()
+            _copy_range(src, dst, tail_offset, tail_len)
+        os.replace(tmp, output_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return changed
+
+
+def recolor_gltf_json(doc, color, opacity=1.0):
+    """Set baseColorFactor on a raw glTF JSON dict, like an upload-time color.
+
+    Same rules as apply_material_modifications without tint_textures:
+    textured materials keep their artwork and MASK cutouts are left alone.
+    A model without materials gets one default material. Primitives that
+    carry a COLOR_0 attribute (the STL converter's way of coloring) stop
+    referencing it, since baseColorFactor would otherwise multiply the old
+    color; the unreferenced accessor stays in the BIN chunk until the next
+    full rewrite compacts it. Returns the number of materials recolored.
+    """
+    rgb = list(hex_to_linear_rgb(color)) if isinstance(color, str) else [float(c) for c in color[:3]]
+    opacity = float(opacity)
+    meshes = doc.get('meshes') or []
+
+    if not doc.get('materials'):
+        doc['materials'] = [{
+            'pbrMetallicRoughness': {'baseColorFactor': [1.0, 1.0, 1.0, 1.0],
+                                     'metallicFactor': 0.0, 'roughnessFactor': 1.0},
+            'doubleSided': True,
+        }]
+        for mesh in meshes:
+            for prim in mesh.get('primitives') or []:
+                prim.setdefault('material', 0)
+
+    recolored = set()
+    for i, material in enumerate(doc['materials']):
+        pbr = material.setdefault('pbrMetallicRoughness', {})
+        if material.get('alphaMode', 'OPAQUE') == 'MASK':
+            continue
+        if 'baseColorTexture' in pbr:
+            if opacity < 1.0:
+                base = pbr.get('baseColorFactor') or [1.0, 1.0, 1.0, 1.0]
+                pbr['baseColorFactor'] = base[:3] + [opacity]
+                material['alphaMode'] = 'BLEND'
+            continue
+        pbr['baseColorFactor'] = rgb + [opacity]
+        if opacity < 1.0:
+            material['alphaMode'] = 'BLEND'
+        elif material.get('alphaMode') == 'BLEND':
+            material.pop('alphaMode')
+        recolored.add(i)
+
+    for mesh in meshes:
+        for prim in mesh.get('primitives') or []:
+            if prim.get('material') in recolored:
+                (prim.get('attributes') or {}).pop('COLOR_0', None)
+    return len(recolored)
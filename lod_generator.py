@@ -0,0 +1,315 @@
+"""
+LOD Generator
+Builds decimated level-of-detail copies of a converted model so viewers can
+render a small file first and swap in the full model.glb when it arrives.
+
+Simplification is quadric-error vertex clustering (Lindstrom's out-of-core
+QEM) done entirely in NumPy: vertices are bucketed on a grid, each face's
+plane quadric is summed into its vertices' buckets, and every bucket
+collapses to the point minimising that summed quadric. Unlike edge-collapse
+QEM it needs no priority queue, so it stays vectorised on multi-million
+triangle scans. The grid resolution is bisected until the triangle count
+hits the requested ratio.
+
+Scene-aware like mesh_slicer: each geometry is simplified on its own and
+keeps its material; UV seams are kept apart by adding a UV bucket to the
+cluster key, and textures are downscaled with the level. Meshopt-compressed
+(gltfpack) sources are decoded first; animated/skinned GLBs are skipped
+(trimesh can't round-trip them) — the viewer then just loads model.glb.
+"""
+import os
+import logging
+import trimesh
+import numpy as np
+
+from converters.meshopt_decoder import load_trimesh
+
+logger = logging.getLogger(__name__)
+
+LOD_ENABLED = os.environ.get("LOD_ENABLED", "true").lower() in ("true", "1", "yes")
+# Fractions of the source triangle count, largest first; level N is
+# model_lod<N>.glb next to model.glb (level 0 is model.glb itself).
+LOD_RATIOS = [
+    float(r) for r in os.environ.get("LOD_RATIOS", "0.25,0.05").split(",") if r.strip()
+]
+# Below this many triangles the full model is already cheap to load.
+LOD_MIN_TRIANGLES = int(os.environ.get("LOD_MIN_TRIANGLES", 50_000))
+# Texture edge length used at ratio 1.0; scaled by sqrt(ratio) per level.
+LOD_TEXTURE_BASE = int(os.environ.get("LOD_TEXTURE_BASE", 2048))
+
+_TEXTURE_SLOTS = (
+    "baseColorTexture", "metallicRoughnessTexture", "normalTexture",
+    "occlusionTexture", "emissiveTexture",
+)
+
+
+def source_stamp(glb_path):
+    """Identity of the model.glb a LOD chain was built from."""
+    st = os.stat(glb_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def fresh_levels(glb_path, lods):
+    """LOD levels from `lods` metadata that still match glb_path, else [].
+
+    Any edit rewrites model.glb, which changes its stamp — a stale chain is
+    never served in place of the edited model.
+    """
+    if not lods or not lods.get("levels") or not os.path.exists(glb_path):
+        return []
+    if lods.get("source") != source_stamp(glb_path):
+        return []
+    model_dir = os.path.dirname(glb_path)
+    levels = [lvl for lvl in lods["levels"]
+              if os.path.exists(os.path.join(model_dir, lvl["filename"]))]
+    return levels if len(levels) == len(lods["levels"]) else []
+
+
+def _face_quadrics(vertices, faces):
+    """Area-weighted plane quadrics per face as (F, 10) upper-triangle terms."""
+    tri = vertices[faces]
+    normal = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    area2 = np.linalg.norm(normal, axis=1)
+    ok = area2 > 1e-20
+    n = np.zeros_like(normal)
+    n[ok] = normal[ok] / area2[ok, None]
+    d = -np.einsum("ij,ij->i", n, tri[:, 0])
+    a, b, c = n[:, 0], n[:, 1], n[:, 2]
+    w = 0.5 * area2
+    # Symmetric 4x4 p p^T with p = (a, b, c, d): 10 unique terms.
+    return np.stack(
+        [a * a, a * b, a * c, a * d, b * b, b * c, b * d, c * c, c * d, d * d], axis=1
+    ) * w[:, None]
+
+
+def _cluster(vertices, faces, grid, uv=None):
+    """One clustering pass at `grid` cells along the longest axis.
+
+    Returns (inverse, n_clusters, new_faces) where inverse maps each source
+    vertex to its cluster.
+    """
+    lo = vertices.min(axis=0)
+    span = float((vertices.max(axis=0) - lo).max()) or 1.0
+    cell = span / grid
+    ijk = np.floor((vertices - lo) / cell).astype(np.int64)
+    ijk = np.clip(ijk, 0, grid)
+    base = grid + 1
+    key = (ijk[:, 0] * base + ijk[:, 1]) * base + ijk[:, 2]
+    if uv is not None:
+        # Keep UV islands apart so seams don't smear textures together.
+        uv_cells = np.clip(np.floor(np.mod(uv, 1.0) * grid), 0, grid).astype(np.int64)
+        key = (key * base + uv_cells[:, 0]) * base + uv_cells[:, 1]
+    _, inverse = np.unique(key, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_clusters = int(inverse.max()) + 1 if len(inverse) else 0
+
+    new_faces = inverse[faces]
+    keep = (
+        (new_faces[:, 0] != new_faces[:, 1])
+        & (new_faces[:, 1] != new_faces[:, 2])
+        & (new_faces[:, 0] != new_faces[:, 2])
+    )
+    new_faces = new_faces[keep]
+    if len(new_faces):
+        # Drop faces that collapsed onto the same three clusters.
+        _, first = np.unique(np.sort(new_faces, axis=1), axis=0, return_index=True)
+        new_faces = new_faces[np.sort(first)]
+    return inverse, n_clusters, new_faces
+
+
+def _cluster_mean(values, inverse, n_clusters):
+    counts = np.bincount(inverse, minlength=n_clusters).astype(np.float64)
+    counts[counts == 0] = 1.0
+    return np.stack(
+        [np.bincount(inverse, weights=values[:, k], minlength=n_clusters) / counts
+         for k in range(values.shape[1])],
+        axis=1,
+    )
+
+
+def _optimal_positions(vertices, faces, inverse, n_clusters):
+    """Per cluster, the point minimising its summed quadric (mean if ill-posed)."""
+    fq = _face_quadrics(vertices, faces)
+    q = np.zeros((n_clusters, 10))
+    for corner in range(3):
+        cid = inverse[faces[:, corner]]
+        for k in range(10):
+            q[:, k] += np.bincount(cid, weights=fq[:, k], minlength=n_clusters)
+
+    A = np.empty((n_clusters, 3, 3))
+    A[:, 0, 0], A[:, 0, 1], A[:, 0, 2] = q[:, 0], q[:, 1], q[:, 2]
+    A[:, 1, 0], A[:, 1, 1], A[:, 1, 2] = q[:, 1], q[:, 4], q[:, 5]
+    A[:, 2, 0], A[:, 2, 1], A[:, 2, 2] = q[:, 2], q[:, 5], q[:, 7]
+    rhs = -np.stack([q[:, 3], q[:, 6], q[:, 8]], axis=1)
+
+    mean = _cluster_mean(vertices, inverse, n_clusters)
+    positions = mean.copy()
+    # Flat or creased-in-one-direction clusters have singular quadrics; the
+    # conditioning test keeps the solve to well-posed (corner-like) ones.
+    cond = np.linalg.cond(A)
+    good = np.isfinite(cond) & (cond < 1e4)
+    if good.any():
+        solved = np.linalg.solve(A[good], rhs[good][..., None])[..., 0]
+        # A solution far outside the cluster is an artefact; keep the mean.
+        spread = np.zeros(n_clusters)
+        np.maximum.at(spread, inverse, np.linalg.norm(vertices - mean[inverse], axis=1))
+        near = np.linalg.norm(solved - mean[good], axis=1) <= 2.0 * spread[good] + 1e-12
+        idx = np.flatnonzero(good)[near]
+        positions[idx] = solved[near]
+    return positions
+
+
+def simplify_mesh(vertices, faces, ratio, uv=None, colors=None):
+    """Quadric vertex-clustering decimation to about `ratio` of the faces.
+
+    Returns (vertices, faces, uv, colors) with attributes averaged per
+    cluster (None stays None). The result never has more faces than the
+    input.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    target = max(4, int(len(faces) * ratio))
+    if len(faces) <= target:
+        return vertices, faces, uv, colors
+
+    lo, hi = 2, 2048
+    best = None
+    while lo <= hi:
+        grid = (lo + hi) // 2
+        inverse, n_clusters, new_faces = _cluster(vertices, faces, grid, uv)
+        if len(new_faces) > target:
+            hi = grid - 1
+        else:
+            best = (inverse, n_clusters, new_faces)
+            lo = grid + 1
+    if best is None:
+        best = _cluster(vertices, faces, 2, uv)
+    inverse, n_clusters, new_faces = best
+
+    positions = _optimal_positions(vertices, faces, inverse, n_clusters)
+    used = np.unique(new_faces)
+    remap = np.full(n_clusters, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+
+    def _reduce(values):
+        if values is None:
+            return None
+        values = np.asarray(values)
+        return _cluster_mean(values.astype(np.float64), inverse, n_clusters)[used].astype(values.dtype)
+
+    return positions[used], remap[new_faces], _reduce(uv), _reduce(colors)
+
+
+def _scaled_material(material, max_side):
+    """Copy of a trimesh material with every texture capped at max_side px."""
+    if material is None:
+        return None
+    material = material.copy()
+    for slot in _TEXTURE_SLOTS + ("image",):
+        image = getattr(material, slot, None)
+        if image is None or not hasattr(image, "size"):
+            continue
+        if max(image.size) > max_side:
+            image = image.copy()
+            image.thumbnail((max_side, max_side))
+            setattr(material, slot, image)
+    return material
+
+
+def _simplify_geometry(geom, ratio, max_side):
+    if not isinstance(geom, trimesh.Trimesh) or len(geom.faces) < 64:
+        return geom
+    visual = geom.visual
+    uv = colors = None
+    material = None
+    if visual.kind == "texture" and getattr(visual, "uv", None) is not None:
+        uv = np.asarray(visual.uv)
+        material = _scaled_material(visual.material, max_side)
+    elif visual.kind == "vertex":
+        colors = np.asarray(visual.vertex_colors)
+    elif visual.kind == "texture":
+        material = _scaled_material(getattr(visual, "material", None), max_side)
+
+    v, f, uv2, colors2 = simplify_mesh(geom.vertices, geom.faces, ratio, uv=uv, colors=colors)
+    if uv2 is not None:
+        new_visual = trimesh.visual.TextureVisuals(uv=uv2, material=material)
+    elif colors2 is not None:
+        new_visual = trimesh.visual.ColorVisuals(vertex_colors=colors2)
+    elif material is not None:
+        new_visual = trimesh.visual.TextureVisuals(material=material)
+    else:
+        new_visual = None
+    out = trimesh.Trimesh(vertices=v, faces=f, visual=new_visual, process=False)
+    if new_visual is None and visual.kind == "face":
+        # Per-face colors don't survive clustering; keep the dominant one.
+        out.visual.face_colors = np.asarray(visual.face_colors)[0]
+    return out
+
+
+def _unsupported_reason(glb_path):
+    from pygltflib import GLTF2
+
+    gltf = GLTF2().load(glb_path)
+    if gltf.animations or gltf.skins:
+        return "animated/skinned"
+    return None
+
+
+def build_lod_chain(glb_path, ratios=None):
+    """Write model_lod<N>.glb files next to glb_path.
+
+    Returns the metadata stored on UserModel.lods:
+        {"source": source_stamp, "triangles": n,
+         "levels": [{"level", "ratio", "filename", "triangles", "bytes"}]}
+    smallest level last. Returns None when the model is too small or of a
+    kind that can't be simplified safely (the viewer then loads model.glb).
+    """
+    ratios = sorted(ratios or LOD_RATIOS, reverse=True)
+    reason = _unsupported_reason(glb_path)
+    if reason:
+        logger.info(f"LOD chain skipped for {glb_path}: {reason}")
+        return None
+
+    scene = load_trimesh(glb_path, force="scene")
+    total = sum(len(g.faces) for g in scene.geometry.values() if isinstance(g, trimesh.Trimesh))
+    if total < LOD_MIN_TRIANGLES:
+        logger.info(f"LOD chain skipped for {glb_path}: only {total} triangles")
+        return None
+
+    stamp = source_stamp(glb_path)
+    model_dir = os.path.dirname(glb_path)
+    levels = []
+    for level, ratio in enumerate(ratios, start=1):
+        max_side = max(128, int(LOD_TEXTURE_BASE * ratio ** 0.5))
+        lod = scene.copy()
+        for name, geom in list(scene.geometry.items()):
+            lod.geometry[name] = _simplify_geometry(geom, ratio, max_side)
+        filename = f"model_lod{level}.glb"
+        out_path = os.path.join(model_dir, filename)
+        tmp_path = f"{out_path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as fh:
+            fh.write(lod.export(file_type="glb"))
+        os.replace(tmp_path, out_path)
+        triangles = sum(len(g.faces) for g in lod.geometry.values() if isinstance(g, trimesh.Trimesh))
+        levels.append({
+            "level": level,
+            "ratio": ratio,
+            "filename": filename,
+            "triangles": triangles,
+            "bytes": os.path.getsize(out_path),
+        })
+        logger.info(
+            f"LOD {level} ({ratio:.0%}): {triangles}/{total} triangles, "
+            f"{levels[-1]['bytes']} bytes"
+        )
+    return {"source": stamp, "triangles": total, "levels": levels}
+
+
+def remove_lod_files(model_dir):
+    """Delete every model_lod*.glb in a model directory."""
+    for name in os.listdir(model_dir) if os.path.isdir(model_dir) else []:
+        if name.startswith("model_lod") and name.endswith(".glb"):
+            try:
+                os.remove(os.path.join(model_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,212 @@
+"""
+Mesh Cache
+Bounded LRU cache of world-space meshes parsed from GLB files.
+
+The slicer and the bounds endpoints used to re-parse model.glb through
+trimesh on every call and re-bake node transforms into fresh vertex
+copies, so an editor session (bounds, slice, bounds again) paid the
+parser several times for the same bytes. world_meshes() parses a file
+once and keeps the baked (name, Trimesh) list in memory.
+
+Entries are keyed by content hash, found through a (path, mtime, size)
+index, so an unchanged model.glb is a dictionary lookup, and a
+byte-identical copy (the slicer's decoded temp file) costs one read but
+no parse. Saving a new model.glb changes its mtime/size and the next
+lookup misses; writers call invalidate() as well so the stale arrays are
+freed right away. The cache is per process and bounded by
+MESH_CACHE_MAX_MB of array and decoded texture data.
+
+Cached meshes are shared: callers must not modify them in place.
+"""
+
+import collections
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+from converters.meshopt_decoder import load_trimesh
+
+logger = logging.getLogger(__name__)
+
+MESH_CACHE_MAX_MB = int(os.environ.get("MESH_CACHE_MAX_MB", 256))
+
+_HASH_BUFSIZE = 1024 * 1024
+
+
+@dataclass
+class WorldScene:
+    """World-space meshes of one GLB: [(node name, Trimesh)] plus bounds."""
+
+    meshes: list
+    bounds: object  # (2, 3) ndarray, or None when there's no geometry
+    nbytes: int
+
+
+_lock = threading.Lock()
+_entries = collections.OrderedDict()  # digest -> WorldScene, LRU order
+_by_path = {}  # abspath -> (mtime_ns, size, digest)
+_total_bytes = 0
+_counters = collections.Counter()
+
+
+def _iter_world_meshes(loaded):
+    """
+    Yield (name, mesh) pairs with node transforms baked in, WITHOUT
+    concatenating the scene — concatenation collapses every geometry
+    into one primitive and loses per-geometry materials.
+    """
+    if isinstance(loaded, trimesh.Trimesh):
+        yield 'mesh_0', loaded.copy()
+        return
+
+    seen = set()
+    for node_name in loaded.graph.nodes_geometry:
+        transform, geom_name = loaded.graph[node_name]
+        geom = loaded.geometry.get(geom_name)
+        if not isinstance(geom, trimesh.Trimesh):
+            continue
+        m = geom.copy()
+        if transform is not None:
+            m.apply_transform(transform)
+        # Unique node name per instance
+        name = node_name if node_name not in seen else f"{node_name}_{len(seen)}"
+        seen.add(name)
+        yield name, m
+
+
+def _image_nbytes(image):
+    # Decoded PIL size; the compressed bytes in the GLB are far smaller.
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+def _material_images(material):
+    if material is None:
+        return []
+    # PBRMaterial keeps its textures in _data; SimpleMaterial has .image.
+    fields = getattr(material, '_data', None) or vars(material)
+    return [v for v in fields.values() if isinstance(v, Image.Image)]
+
+
+def _mesh_nbytes(mesh, seen_images=None):
+    """Array bytes of a cached mesh, texture images included.
+
+    seen_images (ids) keeps an image shared by several meshes from being
+    counted more than once.
+    """
+    seen_images = set() if seen_images is None else seen_images
+    total = mesh.vertices.nbytes + mesh.faces.nbytes
+    visual = mesh.visual
+    uv = getattr(visual, 'uv', None)
+    if uv is not None:
+        total += np.asarray(uv).nbytes
+    for image in _material_images(getattr(visual, 'material', None)):
+        if id(image) not in seen_images:
+            seen_images.add(id(image))
+            total += _image_nbytes(image)
+    return total
+
+
+def _parse(path):
+    loaded = load_trimesh(path, force=None)
+    if not isinstance(loaded, (trimesh.Scene, trimesh.Trimesh)):
+        raise ValueError(f"Unexpected type from trimesh.load: {type(loaded)}")
+    meshes = list(_iter_world_meshes(loaded))
+    boxes = [m.bounds for _, m in meshes if len(m.vertices)]
+    bounds = None
+    if boxes:
+        stacked = np.vstack(boxes)
+        bounds = np.array([stacked.min(axis=0), stacked.max(axis=0)])
+    seen_images = set()
+    nbytes = sum(_mesh_nbytes(m, seen_images) for _, m in meshes)
+    return WorldScene(meshes, bounds, nbytes)
+
+
+def _digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(_HASH_BUFSIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _evict_locked(budget):
+    global _total_bytes
+    while _entries and _total_bytes > budget:
+        digest, scene = _entries.popitem(last=False)
+        _total_bytes -= scene.nbytes
+        for path in [p for p, key in _by_path.items() if key[2] == digest]:
+            del _by_path[path]
+        _counters["evictions"] += 1
+
+
+def world_meshes(path):
+    """World-space meshes of the GLB at path, parsed at most once per content."""
+    global _total_bytes
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _lock:
+        key = _by_path.get(path)
+        if key and key[:2] == (stat.st_mtime_ns, stat.st_size) and key[2] in _entries:
+            _entries.move_to_end(key[2])
+            _counters["hits"] += 1
+            return _entries[key[2]]
+
+    digest = _digest(path)
+    with _lock:
+        scene = _entries.get(digest)
+        if scene is not None:
+            _entries.move_to_end(digest)
+            _by_path[path] = (stat.st_mtime_ns, stat.st_size, digest)
+            _counters["content_hits"] += 1
+            return scene
+
+    # Parse outside the lock; two threads missing on the same file at once
+    # both parse, and the second insert simply wins.
+    scene = _parse(path)
+    budget = MESH_CACHE_MAX_MB * 1024 * 1024
+    with _lock:
+        _counters["misses"] += 1
+        if scene.nbytes <= budget:
+            previous = _entries.pop(digest, None)
+            if previous is not None:
+                _total_bytes -= previous.nbytes
+            _entries[digest] = scene
+            _total_bytes += scene.nbytes
+            _by_path[path] = (stat.st_mtime_ns, stat.st_size, digest)
+            _evict_locked(budget)
+    return scene
+
+
+def invalidate(path):
+    """Forget path; its entry is dropped unless another path shares the content."""
+    global _total_bytes
+    path = os.path.abspath(path)
+    with _lock:
+        key = _by_path.pop(path, None)
+        if key is None:
+            return
+        digest = key[2]
+        if not any(other[2] == digest for other in _by_path.values()):
+            scene = _entries.pop(digest, None)
+            if scene is not None:
+                _total_bytes -= scene.nbytes
+
+
+def clear():
+    global _total_bytes
+    with _lock:
+        _entries.clear()
+        _by_path.clear()
+        _total_bytes = 0
+
+
+def stats():
+    with _lock:
+        return dict(_counters, entries=len(_entries), bytes=_total_bytes)
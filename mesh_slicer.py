@@ -4,10 +4,10 @@ Handles 3D mesh slicing operations using trimesh.
 
 Scene-aware: each geometry in the scene is sliced separately (never
 concatenated), so multi-material models keep their per-primitive
-materials. Meshes that carry UVs or vertex/face colors are sliced with
-an attribute-preserving face mask (trimesh's plane cut cannot
-interpolate UVs — it would orphan every texture). Plain meshes get the
-clean geometric plane cut.
+materials. The cut itself is a vectorized kernel (_plane_cut): all
+vertex distances in one pass, triangles classified by sign pattern,
+straddling ones split in batch with UVs / vertex colors / normals
+interpolated at the cut. Plain meshes get a triangulated cap.
 
 A pygltflib material re-injection pass runs ONLY when the exported GLB
 ends up with no materials at all (e.g. vertex-color-only uploads).
@@ -17,6 +17,7 @@ import struct
 import logging
 import trimesh
 import numpy as np
+from mesh_cache import world_meshes
 from pygltflib import (
     GLTF2, BufferView, Image as GLTFImage,
     Material, PbrMetallicRoughness,
@@ -249,22 +250,25 @@ def _mesh_needs_attribute_preserve(mesh):
     return False
 
 
+def _boundary_eps(mesh):
+    # Scale the boundary epsilon to the model size. A fixed 1e-6 is meaningless
+    # for models in millimetres (extents in the thousands) and far too coarse
+    # for tiny models — both cause wrong keep/drop decisions at the cut plane.
+    extent = float(np.linalg.norm(mesh.extents)) if mesh.extents is not None else 1.0
+    return 1e-6 * max(extent, 1.0)
+
+
 def _facemask_slice(mesh, plane_origin, plane_normal):
     """
     Keep only faces whose vertices all lie on the kept side. No new
     vertices are created, so UVs, vertex colors, and material refs are
     carried over EXACTLY. The cut edge follows triangle boundaries
-    (slightly stepped on low-poly meshes) — the price of keeping
-    textures intact.
+    (slightly stepped on low-poly meshes). Last-resort fallback when
+    the plane cut fails.
     """
     vertices = mesh.vertices
     distances = np.dot(vertices - plane_origin, plane_normal)
-    # Scale the boundary epsilon to the model size. A fixed 1e-6 is meaningless
-    # for models in millimetres (extents in the thousands) and far too coarse
-    # for tiny models — both cause wrong keep/drop decisions at the cut plane.
-    extent = float(np.linalg.norm(mesh.extents)) if mesh.extents is not None else 1.0
-    eps = 1e-6 * max(extent, 1.0)
-    keep_mask = distances >= -eps
+    keep_mask = distances >= -_boundary_eps(mesh)
 
     face_mask = np.all(keep_mask[mesh.faces], axis=1)
     if not np.any(face_mask):
@@ -306,53 +310,227 @@ def _facemask_slice(mesh, plane_origin, plane_normal):
     return result
 
 
-def _slice_single_mesh(mesh, plane_origin, plane_normal):
+def _vertex_attributes(mesh):
+    """Per-vertex arrays a cut has to interpolate: {'uv'|'color'|'normal': array}."""
+    attrs = {}
+    n = len(mesh.vertices)
+    vis = getattr(mesh, 'visual', None)
+    if isinstance(vis, trimesh.visual.TextureVisuals):
+        uv = getattr(vis, 'uv', None)
+        if uv is not None and len(uv) == n:
+            attrs['uv'] = np.asarray(uv, dtype=np.float64)
+    elif isinstance(vis, trimesh.visual.ColorVisuals) and vis.kind == 'vertex':
+        attrs['color'] = np.asarray(vis.vertex_colors, dtype=np.float64)
+    # Only normals that came with the file; otherwise trimesh recomputes them.
+    if 'vertex_normals' in mesh._cache:
+        attrs['normal'] = np.asarray(mesh.vertex_normals, dtype=np.float64)
+    return attrs
+
+
+def _cap_faces(points, segments, plane_origin, plane_normal):
     """
-    Slice a single Trimesh object.
+    Triangulate the cross-section closed by the cut segments.
+    Loops are joined with shapely's linemerge and filled even-odd (nested
+    loops become holes), then ear-clipped. Returns (vertices, faces)
+    facing away from the kept side, or None.
+    """
+    from functools import reduce
+
+    from shapely.geometry import MultiLineString, Polygon
+    from shapely.ops import linemerge
+
+    to_2d = trimesh.geometry.plane_transform(origin=plane_origin, normal=-plane_normal)
+    to_3d = np.linalg.inv(to_2d)
+    flat = trimesh.transformations.transform_points(points, to_2d)[:, :2]
+    merged = linemerge(MultiLineString([flat[pair] for pair in segments]))
+    lines = getattr(merged, 'geoms', [merged])
+    rings = [Polygon(line.coords) for line in lines if line.is_ring and len(line.coords) >= 4]
+    rings = [ring.buffer(0) for ring in rings if ring.area > 0]
+    if not rings:
+        return None
+    region = reduce(lambda acc, ring: acc.symmetric_difference(ring), rings)
 
-    Textured / colored meshes use the attribute-preserving face mask
-    (trimesh's plane cut creates new vertices with no UV/color, which
-    is what used to wreck materials after Apply). Plain meshes get the
-    clean capped plane cut.
-    Returns sliced mesh or None if result is empty.
+    cap_vertices, cap_faces, offset = [], [], 0
+    for polygon in getattr(region, 'geoms', [region]):
+        if polygon.geom_type != 'Polygon' or polygon.is_empty:
+            continue
+        vn, fn = trimesh.creation.triangulate_polygon(polygon, engine='earcut')
+        cap_vertices.append(trimesh.transformations.transform_points(trimesh.util.stack_3D(vn), to_3d))
+        cap_faces.append(fn + offset)
+        offset += len(vn)
+    if not cap_faces:
+        return None
+    return np.vstack(cap_vertices), np.vstack(cap_faces)
+
+
+def _plane_cut(mesh, plane_origin, plane_normal, cap=False):
     """
-    vis = getattr(mesh, 'visual', None)
+    Vectorized plane cut keeping the side plane_normal points to.
+
+    Signed distances for every vertex at once; triangles are classified
+    by sign pattern (kept / dropped / straddling). Straddling triangles
+    are rotated so the lone vertex comes first (winding preserved) and
+    re-triangulated against cut vertices, one per distinct crossed edge,
+    whose UV / vertex color / normal are interpolated along the edge.
+    With cap=True the cross-section is closed (needs shapely + earcut;
+    skipped with a warning when unavailable).
+    Returns the sliced Trimesh, or None when nothing is kept.
+    """
+    vertices = np.asarray(mesh.vertices, dtype=np.float64)
+    faces = np.asarray(mesh.faces, dtype=np.int64)
+    eps = _boundary_eps(mesh)
+    d = (vertices - plane_origin) @ plane_normal
+    side = np.where(d > eps, 1, np.where(d < -eps, -1, 0)).astype(np.int8)
+
+    fs = side[faces]
+    has_pos = (fs > 0).any(axis=1)
+    has_neg = (fs < 0).any(axis=1)
+    whole = ~has_neg
+    straddle = has_pos & has_neg
+    if not whole.any() and not straddle.any():
+        return None
 
-    if _mesh_needs_attribute_preserve(mesh):
+    attrs = _vertex_attributes(mesh)
+    new_faces = [faces[whole]]
+    parents = [np.nonzero(whole)[0]]
+    extra_vertices = np.empty((0, 3))
+    extra_attrs = {k: np.empty((0,) + v.shape[1:]) for k, v in attrs.items()}
+
+    if straddle.any():
+        sfaces, sside = faces[straddle], fs[straddle]
+        parent_idx = np.nonzero(straddle)[0]
+        kept = sside >= 0
+        lone_kept = kept.sum(axis=1) == 1
+        # Rotate each triangle so its lone vertex (the single kept one, or
+        # the single dropped one) sits in column 0; cyclic order is kept.
+        lone = np.where(lone_kept[:, None], kept, ~kept)
+        shift = np.argmax(lone, axis=1)
+        cols = (shift[:, None] + np.arange(3)) % 3
+        tri = np.take_along_axis(sfaces, cols, axis=1)
+        a, b, c = tri[:, 0], tri[:, 1], tri[:, 2]
+
+        # Crossed edges: (a,b) and (a,c) in both cases — a is the lone
+        # vertex. One cut vertex per distinct undirected edge.
+        edges = np.concatenate([np.stack([a, b], 1), np.stack([a, c], 1)])
+        edges.sort(axis=1)
+        unique_edges, inverse = np.unique(edges, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        i, j = unique_edges[:, 0], unique_edges[:, 1]
+        t = d[i] / (d[i] - d[j])
+        # A crossed edge whose endpoint lies on the plane cuts at that
+        # endpoint: reuse it instead of making a coincident vertex.
+        on_i, on_j = side[i] == 0, side[j] == 0
+        cut_index = np.where(on_i, i, j)
+        created = ~(on_i | on_j)
+        ci, cj, ct = i[created], j[created], t[created][:, None]
+        cut_index[created] = len(vertices) + np.arange(created.sum())
+        extra_vertices = vertices[ci] + ct * (vertices[cj] - vertices[ci])
+        for key, values in attrs.items():
+            extra_attrs[key] = values[ci] + ct * (values[cj] - values[ci])
+
+        n = len(tri)
+        cut_ab, cut_ac = cut_index[inverse[:n]], cut_index[inverse[n:]]
+        one = lone_kept
+        # One vertex kept: a, ab, ac.
+        new_faces.append(np.stack([a[one], cut_ab[one], cut_ac[one]], 1))
+        parents.append(parent_idx[one])
+        # Two kept (b, c), a dropped: quad b, c, ac, ab as two triangles.
+        two = ~one
+        new_faces.append(np.stack([b[two], c[two], cut_ac[two]], 1))
+        new_faces.append(np.stack([b[two], cut_ac[two], cut_ab[two]], 1))
+        parents.extend([parent_idx[two], parent_idx[two]])
+
+    faces_out = np.vstack(new_faces)
+    parents = np.concatenate(parents)
+    ok = (faces_out[:, 0] != faces_out[:, 1]) & (faces_out[:, 1] != faces_out[:, 2]) \
+        & (faces_out[:, 0] != faces_out[:, 2])
+    faces_out, parents = faces_out[ok], parents[ok]
+    if len(faces_out) == 0:
+        return None
+
+    all_vertices = np.vstack([vertices, extra_vertices])
+    used = np.unique(faces_out)
+    remap = np.full(len(all_vertices), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    out_vertices = all_vertices[used]
+    out_faces = remap[faces_out]
+    out_attrs = {k: np.concatenate([v, extra_attrs[k]])[used] for k, v in attrs.items()}
+
+    cap_mesh = None
+    if cap:
+        # Section outline: on-plane edges used by exactly one kept face.
+        on_plane = np.concatenate([side == 0, np.ones(len(extra_vertices), dtype=bool)])
+        edges = trimesh.geometry.faces_to_edges(faces_out)
+        edges = edges[on_plane[edges].all(axis=1)]
+        edges.sort(axis=1)
+        segments = edges[trimesh.grouping.group_rows(edges, require_count=1)]
         try:
-            sliced = _facemask_slice(mesh, plane_origin, plane_normal)
-            if sliced is not None and len(sliced.vertices) > 0:
-                return sliced
+            if len(segments):
+                cap_mesh = _cap_faces(all_vertices, segments, plane_origin, plane_normal)
         except Exception as e:
-            logger.warning(f"Attribute-preserving slice failed ({e}); trying plane cut")
+            logger.warning(f"Cap triangulation skipped ({e}); leaving the section open")
+
+    kwargs = {}
+    if 'normal' in out_attrs:
+        normals = out_attrs['normal']
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        kwargs['vertex_normals'] = normals / np.where(lengths > 0, lengths, 1.0)
+    if cap_mesh is not None:
+        cap_vertices, cap_faces = cap_mesh
+        base = len(out_vertices)
+        out_vertices = np.vstack([out_vertices, cap_vertices])
+        out_faces = np.vstack([out_faces, cap_faces + base])
+        if 'vertex_normals' in kwargs:
+            kwargs['vertex_normals'] = np.vstack([
+                kwargs['vertex_normals'], np.tile(-plane_normal, (len(cap_vertices), 1))
+            ])
+    result = trimesh.Trimesh(vertices=out_vertices, faces=out_faces, process=False, **kwargs)
 
-    # --- Clean geometric cut, capped (needs shapely for cap triangulation) ---
+    vis = getattr(mesh, 'visual', None)
     try:
-        sliced = mesh.slice_plane(
-            plane_origin=plane_origin,
-            plane_normal=plane_normal,
-            cap=True,
-        )
-        if sliced is not None and len(getattr(sliced, 'vertices', [])) > 0:
-            _reattach_material(sliced, vis)
-            return sliced
-    except Exception as e:
-        logger.warning(f"slice_plane(cap=True) failed ({e}), trying cap=False")
+        if isinstance(vis, trimesh.visual.TextureVisuals):
+            uv = out_attrs.get('uv')
+            if uv is not None and cap_mesh is not None:
+                uv = np.vstack([uv, np.zeros((len(cap_mesh[0]), 2))])
+            result.visual = trimesh.visual.TextureVisuals(
+                uv=uv, material=getattr(vis, 'material', None)
+            )
+        elif isinstance(vis, trimesh.visual.ColorVisuals) and vis.kind == 'vertex':
+            colors = np.clip(np.round(out_attrs['color']), 0, 255).astype(np.uint8)
+            if cap_mesh is not None:
+                colors = np.vstack([colors, np.tile(colors.mean(axis=0).astype(np.uint8),
+                                                    (len(cap_mesh[0]), 1))])
+            result.visual = trimesh.visual.ColorVisuals(result, vertex_colors=colors)
+        elif isinstance(vis, trimesh.visual.ColorVisuals) and vis.kind == 'face':
+            colors = vis.face_colors[parents]
+            if cap_mesh is not None:
+                colors = np.vstack([colors, np.tile(colors[0], (len(cap_mesh[1]), 1))])
+            result.visual = trimesh.visual.ColorVisuals(result, face_colors=colors)
+    except Exception as ve:
+        logger.warning(f"Could not copy visual attributes: {ve}")
+    return result
+
 
-    # --- Same cut without a cap (open cross-section) ---
+def _slice_single_mesh(mesh, plane_origin, plane_normal):
+    """
+    Slice a single Trimesh object.
+
+    The vectorized plane cut interpolates UVs and colors at the cut, so
+    textured / colored meshes get an exact edge too; only plain meshes
+    are capped (a cap on a textured mesh would need UVs nobody
+    authored). The face mask is the fallback if the cut fails.
+    Returns sliced mesh or None if result is empty.
+    """
     try:
-        sliced = mesh.slice_plane(
-            plane_origin=plane_origin,
-            plane_normal=plane_normal,
-            cap=False,
+        sliced = _plane_cut(
+            mesh, plane_origin, plane_normal,
+            cap=not _mesh_needs_attribute_preserve(mesh),
         )
-        if sliced is not None and len(getattr(sliced, 'vertices', [])) > 0:
-            _reattach_material(sliced, vis)
+        if sliced is None or len(sliced.vertices) > 0:
             return sliced
     except Exception as e:
-        logger.warning(f"slice_plane(cap=False) failed ({e}), using face-mask fallback")
+        logger.warning(f"Plane cut failed ({e}), using face-mask fallback")
 
-    # --- Last resort for plain meshes too ---
     try:
         return _facemask_slice(mesh, plane_origin, plane_normal)
     except Exception as e:
@@ -360,55 +538,20 @@ def _slice_single_mesh(mesh, plane_origin, plane_normal):
         return None
 
 
-def _reattach_material(sliced, vis):
-    """slice_plane drops the visual; put the material reference back."""
-    try:
-        if isinstance(vis, trimesh.visual.TextureVisuals) and getattr(vis, 'material', None) is not None:
-            sliced.visual = trimesh.visual.TextureVisuals(material=vis.material)
-    except Exception as e:
-        logger.warning(f"Could not reattach material: {e}")
-
-
-def _iter_world_meshes(loaded):
-    """
-    Yield (name, mesh) pairs with node transforms baked in, WITHOUT
-    concatenating the scene — concatenation collapses every geometry
-    into one primitive and loses per-geometry materials.
-    """
-    if isinstance(loaded, trimesh.Trimesh):
-        yield 'mesh_0', loaded.copy()
-        return
-
-    seen = set()
-    for node_name in loaded.graph.nodes_geometry:
-        transform, geom_name = loaded.graph[node_name]
-        geom = loaded.geometry.get(geom_name)
-        if not isinstance(geom, trimesh.Trimesh):
-            continue
-        m = geom.copy()
-        if transform is not None:
-            m.apply_transform(transform)
-        # Unique node name per instance
-        name = node_name if node_name not in seen else f"{node_name}_{len(seen)}"
-        seen.add(name)
-        yield name, m
-
-
 def _slice_core(input_path, output_path, planes):
     """
     Shared pipeline for single- and multi-plane slicing.
 
-    1. pygltflib  → snapshot PBR materials (used only if export loses them)
-    2. trimesh    → slice each scene geometry separately, preserving visuals
-    3. pygltflib  → re-inject materials ONLY if the export has none
+    1. trimesh    → slice each scene geometry separately, preserving visuals
+    2. pygltflib  → if the export lost every material, read the originals
+                    from input_path and re-inject them
 
     Returns: {'success': bool, 'degenerate': bool, 'extents': list|None}
     """
-    mat_data = _extract_material_data(input_path)
-
-    loaded = trimesh.load(input_path, force=None)
-    if not isinstance(loaded, (trimesh.Scene, trimesh.Trimesh)):
-        logger.error(f"Unexpected type from trimesh.load: {type(loaded)}")
+    try:
+        scene = world_meshes(input_path)
+    except ValueError as e:
+        logger.error(str(e))
         return {"success": False, "degenerate": False, "extents": None}
 
     normalized = [
@@ -420,7 +563,8 @@ def _slice_core(input_path, output_path, planes):
 
     out_scene = trimesh.Scene()
     total_in, total_kept = 0, 0
-    for name, mesh in _iter_world_meshes(loaded):
+    # Cached meshes are shared — _slice_single_mesh only builds new ones.
+    for name, mesh in scene.meshes:
         total_in += 1
         current = mesh
         for origin, normal in normalized:
@@ -452,9 +596,13 @@ def _slice_core(input_path, output_path, planes):
 
     # Re-inject ONLY when the trimesh export carries no materials at all;
     # otherwise we would overwrite correct per-primitive assignments.
-    if mat_data and _exported_material_count(output_path) == 0:
-        logger.info("Export has no materials — re-injecting originals")
-        _inject_materials(output_path, mat_data)
+    # The material snapshot is a full pygltflib parse of the input, so it's
+    # only taken when it's actually needed.
+    if _exported_material_count(output_path) == 0:
+        mat_data = _extract_material_data(input_path)
+        if mat_data:
+            logger.info("Export has no materials — re-injecting originals")
+            _inject_materials(output_path, mat_data)
 
     logger.info(f"Exported sliced model: {os.path.getsize(output_path)} bytes")
     return {
@@ -521,26 +669,16 @@ def slice_mesh_multi(input_path, output_path, planes):
 def get_mesh_bounds(glb_path):
     """
     Get the bounding box of a mesh in mesh-space coordinates.
-    Always reads from file so repeated calls after slicing
-    return accurate bounds.
+    Served from the mesh cache, which re-parses whenever the file
+    changes, so repeated calls after slicing return accurate bounds.
 
     Returns:
         dict: {'min': [x,y,z], 'max': [x,y,z], 'center': [x,y,z]} or None
     """
     try:
-        loaded = trimesh.load(glb_path, force=None)
-
-        if isinstance(loaded, trimesh.Scene):
-            # dump(concatenate=True) applies all node transforms → world-space coordinates
-            combined = loaded.dump(concatenate=True)
-            if combined is None or len(getattr(combined, 'vertices', [])) == 0:
-                return None
-        elif isinstance(loaded, trimesh.Trimesh):
-            combined = loaded
-        else:
+        bounds = world_meshes(glb_path).bounds      # (2, 3), node transforms applied
+        if bounds is None:
             return None
-
-        bounds = combined.bounds      # (2, 3)
         # Geometric bounding-box center (NOT centroid/center-of-mass) so the slicer
         # slider starts at the visual middle of each axis for asymmetric meshes.
         center = (bounds[0] + bounds[1]) / 2.0
@@ -0,0 +1,31 @@
+"""add worker lease columns to conversion_job
+
+Revision ID: a3c5e7f90b12
+Revises: f1b7d2c94e58
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f90b12'
+down_revision = 'f1b7d2c94e58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversion_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('worker_id', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(
+            'ix_conversion_job_status_lease', ['status', 'lease_expires_at'], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('conversion_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversion_job_status_lease')
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('worker_id')
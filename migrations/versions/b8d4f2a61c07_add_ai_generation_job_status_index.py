@@ -0,0 +1,27 @@
+"""add (status, updated_at) index to ai_generation_job
+
+Revision ID: b8d4f2a61c07
+Revises: a3c5e7f90b12
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f2a61c07'
+down_revision = 'a3c5e7f90b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ai_generation_job', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_ai_generation_job_status_updated', ['status', 'updated_at'], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('ai_generation_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_ai_generation_job_status_updated')
@@ -0,0 +1,31 @@
+"""add pre-flight estimate + lane to conversion_job
+
+Revision ID: c7d2e9a41f30
+Revises: b41c0de66a01
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e9a41f30'
+down_revision = 'b41c0de66a01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversion_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('estimated_triangles', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('estimated_mem_mb', sa.Integer(), nullable=True))
+        batch_op.add_column(
+            sa.Column('lane', sa.String(length=10), nullable=False, server_default='standard')
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('conversion_job', schema=None) as batch_op:
+        batch_op.drop_column('lane')
+        batch_op.drop_column('estimated_mem_mb')
+        batch_op.drop_column('estimated_triangles')
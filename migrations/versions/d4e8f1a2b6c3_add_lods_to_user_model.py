@@ -0,0 +1,25 @@
+"""add lods metadata to user_model
+
+Revision ID: d4e8f1a2b6c3
+Revises: c7d2e9a41f30
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4e8f1a2b6c3'
+down_revision = 'c7d2e9a41f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_model', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('lods', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user_model', schema=None) as batch_op:
+        batch_op.drop_column('lods')
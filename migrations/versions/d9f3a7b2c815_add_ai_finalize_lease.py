@@ -0,0 +1,29 @@
+"""add finalize attempt count and lease to ai_generation_job
+
+Revision ID: d9f3a7b2c815
+Revises: b8d4f2a61c07
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd9f3a7b2c815'
+down_revision = 'b8d4f2a61c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ai_generation_job', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('finalize_attempts', sa.Integer(), nullable=False, server_default='0')
+        )
+        batch_op.add_column(sa.Column('finalize_lease_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('ai_generation_job', schema=None) as batch_op:
+        batch_op.drop_column('finalize_lease_expires_at')
+        batch_op.drop_column('finalize_attempts')
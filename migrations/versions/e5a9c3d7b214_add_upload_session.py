@@ -0,0 +1,45 @@
+"""add upload_session for resumable chunked uploads
+
+Revision ID: e5a9c3d7b214
+Revises: d4e8f1a2b6c3
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d7b214'
+down_revision = 'd4e8f1a2b6c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_session',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('total_size', sa.BigInteger(), nullable=False),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('offset', sa.BigInteger(), nullable=False),
+        sa.Column('expected_sha256', sa.String(length=64), nullable=True),
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.Column('options', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('upload_session', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_upload_session_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_upload_session_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('upload_session', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_session_updated_at'))
+        batch_op.drop_index(batch_op.f('ix_upload_session_status'))
+    op.drop_table('upload_session')
@@ -0,0 +1,49 @@
+"""add composite/partial indexes for the hot queries
+
+Revision ID: f1b7d2c94e58
+Revises: e5a9c3d7b214
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d2c94e58'
+down_revision = 'e5a9c3d7b214'
+branch_labels = None
+depends_on = None
+
+_LIVE = {
+    'sqlite_where': sa.text('deleted_at IS NULL'),
+    'postgresql_where': sa.text('deleted_at IS NULL'),
+}
+
+# (name, table, columns, partial-where kwargs)
+_INDEXES = [
+    ('ix_folder_user_parent', 'folder', ['user_id', 'parent_id'], {}),
+    ('ix_user_model_owner_folder_live', 'user_model', ['user_id', 'folder_id'], _LIVE),
+    ('ix_user_model_owner_recent_live', 'user_model', ['user_id', 'upload_date'], _LIVE),
+    ('ix_user_model_folder_recent_live', 'user_model', ['folder_id', 'upload_date'], _LIVE),
+    ('ix_user_model_owner_deleted', 'user_model', ['user_id', 'deleted_at'], {}),
+    ('ix_model_hotspot_model_created', 'model_hotspot', ['model_id', 'created_at'], {}),
+    ('ix_model_version_model_number', 'model_version', ['model_id', 'version_number'], {}),
+    ('ix_model_version_model_created', 'model_version', ['model_id', 'created_at'], {}),
+    ('ix_camera_view_model_created', 'camera_view', ['model_id', 'created_at'], {}),
+    ('ix_model_like_model_user', 'model_like', ['model_id', 'user_id'], {}),
+    ('ix_model_like_model_session', 'model_like', ['model_id', 'session_id'], {}),
+    ('ix_model_save_model_user', 'model_save', ['model_id', 'user_id'], {}),
+    ('ix_ai_generation_job_user_created', 'ai_generation_job', ['user_id', 'created_at'], {}),
+    ('ix_conversion_job_status_created', 'conversion_job', ['status', 'created_at'], {}),
+    ('ix_conversion_job_status_started', 'conversion_job', ['status', 'started_at'], {}),
+]
+
+
+def upgrade():
+    for name, table, columns, where in _INDEXES:
+        op.create_index(name, table, columns, unique=False, **where)
+
+
+def downgrade():
+    for name, table, _columns, _where in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
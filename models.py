@@ -5,6 +5,12 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+
+def _partial(condition):
+    """Index WHERE clause for both dialects we run on (SQLite, Postgres)."""
+    return {'sqlite_where': db.text(condition), 'postgresql_where': db.text(condition)}
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -24,6 +30,11 @@ class User(UserMixin, db.Model):
         return f'<User {self.username}>'
 
 class Folder(db.Model):
+    __table_args__ = (
+        # my_models: a user's folders under one parent (or at the root).
+        db.Index('ix_folder_user_parent', 'user_id', 'parent_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     slug = db.Column(db.String(100), nullable=False, unique=True)
@@ -64,6 +75,22 @@ class Folder(db.Model):
         return f'<Folder {self.name}>'
 
 class UserModel(db.Model):
+    # Listing queries only ever want live (non-trashed) models, so those
+    # indexes are partial: trash doesn't bloat them.
+    __table_args__ = (
+        # my_models: models in a folder (or at the root) for the owner.
+        db.Index('ix_user_model_owner_folder_live', 'user_id', 'folder_id',
+                 **_partial('deleted_at IS NULL')),
+        # View page: the owner's other models, newest first.
+        db.Index('ix_user_model_owner_recent_live', 'user_id', 'upload_date',
+                 **_partial('deleted_at IS NULL')),
+        # my_models: per-folder counts and cover previews, newest first.
+        db.Index('ix_user_model_folder_recent_live', 'folder_id', 'upload_date',
+                 **_partial('deleted_at IS NULL')),
+        # Trash listing and the retention purge.
+        db.Index('ix_user_model_owner_deleted', 'user_id', 'deleted_at'),
+    )
+
     id = db.Column(db.String(36), primary_key=True)  # Changed to String to support UUID
     filename = db.Column(db.String(255), nullable=False)
     usdz_filename = db.Column(db.String(255), nullable=True)  # Path to USDZ file for iOS AR
@@ -97,6 +124,9 @@ class UserModel(db.Model):
     view_count = db.Column(db.Integer, default=0)
     download_count = db.Column(db.Integer, default=0)
     share_count = db.Column(db.Integer, default=0)
+
+    # LOD chain metadata from lod_generator.build_lod_chain (None = no LODs)
+    lods = db.Column(db.JSON, nullable=True)
     
     # Version tracking
     versions = db.relationship('ModelVersion', backref='model', lazy=True, cascade='all, delete-orphan', order_by='ModelVersion.created_at.desc()')
@@ -135,6 +165,10 @@ class ModelHotspot(db.Model):
     Stores hotspots (annotations) for 3D models
     Each hotspot has a position, title, description, and optional camera view
     """
+    __table_args__ = (
+        db.Index('ix_model_hotspot_model_created', 'model_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     model_id = db.Column(db.String(36), db.ForeignKey('user_model.id'), nullable=False)
     
@@ -208,6 +242,12 @@ class ModelVersion(db.Model):
     Tracks version history of model modifications
     Each modification (transform, slice, material) creates a new version
     """
+    __table_args__ = (
+        # Latest version / lookup by number / history listing.
+        db.Index('ix_model_version_model_number', 'model_id', 'version_number'),
+        db.Index('ix_model_version_model_created', 'model_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     model_id = db.Column(db.String(36), db.ForeignKey('user_model.id'), nullable=False)
     version_number = db.Column(db.Integer, nullable=False)  # 1, 2, 3, etc.
@@ -253,6 +293,10 @@ class ModelVersion(db.Model):
 
 class CameraView(db.Model):
     """Saved camera views for 3D models"""
+    __table_args__ = (
+        db.Index('ix_camera_view_model_created', 'model_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     model_id = db.Column(db.String(36), db.ForeignKey('user_model.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -278,6 +322,12 @@ class CameraView(db.Model):
 
 
 class ModelLike(db.Model):
+    __table_args__ = (
+        # Like counts per model, and "did this user/session like it".
+        db.Index('ix_model_like_model_user', 'model_id', 'user_id'),
+        db.Index('ix_model_like_model_session', 'model_id', 'session_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     model_id = db.Column(db.String(36), db.ForeignKey('user_model.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -288,6 +338,10 @@ class ModelLike(db.Model):
 
 
 class ModelSave(db.Model):
+    __table_args__ = (
+        db.Index('ix_model_save_model_user', 'model_id', 'user_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     model_id = db.Column(db.String(36), db.ForeignKey('user_model.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -297,8 +351,15 @@ class ModelSave(db.Model):
 
 
 class AIGenerationJob(db.Model):
-    """Tracks an AI text/image -> 3D generation (Meshy) so the frontend can poll
-    status without a long-lived server thread (gunicorn multi-worker safe)."""
+    """Tracks an AI text/image -> 3D generation (Meshy). ai_poller advances
+    the row in the background; the frontend polls it from the DB."""
+    __table_args__ = (
+        # Daily generation quota: a user's jobs since a cutoff.
+        db.Index('ix_ai_generation_job_user_created', 'user_id', 'created_at'),
+        # ai_poller: in-flight jobs (and among them, dead finalizers).
+        db.Index('ix_ai_generation_job_status_updated', 'status', 'updated_at'),
+    )
+
     id = db.Column(db.String(36), primary_key=True)  # our job UUID
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     kind = db.Column(db.String(10), nullable=False)        # 'text' | 'image'
@@ -315,6 +376,11 @@ class AIGenerationJob(db.Model):
     model_id = db.Column(db.String(36), nullable=True)     # UserModel.id once ready
     error = db.Column(db.Text, nullable=True)
 
+    # ai_poller finalizer: download/register attempts so far, and the lease
+    # its heartbeat renews while one runs (expired = finalizer died).
+    finalize_attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    finalize_lease_expires_at = db.Column(db.DateTime, nullable=True)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -338,6 +404,18 @@ class ConversionJob(db.Model):
     the same row is processed inline in the request (status flows the same),
     so the frontend polling contract is identical in both modes.
     """
+    __table_args__ = (
+        # Worker claim: oldest pending job, optionally filtered by lane.
+        # Not partial: the claim binds status as a parameter, and neither
+        # SQLite nor a generic Postgres plan can match that to a
+        # status = 'pending' predicate.
+        db.Index('ix_conversion_job_status_created', 'status', 'created_at'),
+        # Stale 'processing' sweep for jobs without a lease (inline runs).
+        db.Index('ix_conversion_job_status_started', 'status', 'started_at'),
+        # Expired-lease sweep (worker.py).
+        db.Index('ix_conversion_job_status_lease', 'status', 'lease_expires_at'),
+    )
+
     id = db.Column(db.String(36), primary_key=True)  # job UUID == future model id
     job_type = db.Column(db.String(20), nullable=False, default='upload')
     status = db.Column(db.String(20), nullable=False, default='pending', index=True)
@@ -351,10 +429,23 @@ class ConversionJob(db.Model):
     attempts = db.Column(db.Integer, nullable=False, default=0)
     max_attempts = db.Column(db.Integer, nullable=False, default=2)
 
+    # Pre-flight size estimate (converters/preflight.py), taken at upload from
+    # file headers before any conversion work; the full estimate is also kept
+    # in payload['estimate']. lane: standard | heavy (worker WORKER_LANES).
+    estimated_triangles = db.Column(db.Integer, nullable=True)
+    estimated_mem_mb = db.Column(db.Integer, nullable=True)
+    lane = db.Column(db.String(10), nullable=False, default='standard', server_default='standard')
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     started_at = db.Column(db.DateTime, nullable=True)
     finished_at = db.Column(db.DateTime, nullable=True)
 
+    # Claim lease (worker.py): the claiming worker renews lease_expires_at
+    # from a heartbeat while the job runs; an expired lease means the worker
+    # is gone and the job can be reclaimed. NULL for inline (JOB_QUEUE off) runs.
+    worker_id = db.Column(db.String(64), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
     def to_dict(self):
         return {
             'job_id': self.id,
@@ -363,4 +454,39 @@ class ConversionJob(db.Model):
             'model_id': self.model_id,
             'error': self.error,
             'attempts': self.attempts,
+            'lane': self.lane,
+            'estimated_triangles': self.estimated_triangles,
+        }
+
+
+class UploadSession(db.Model):
+    """A resumable chunked upload (chunked_upload.py).
+
+    Bytes are staged at <TEMP_FOLDER>/<id>/<filename>; `offset` is how many
+    of them are committed. Once offset == total_size and the checksum
+    verifies, the file becomes a ConversionJob with the same id.
+    """
+    id = db.Column(db.String(36), primary_key=True)  # == ConversionJob.id
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    filename = db.Column(db.String(255), nullable=False)  # secure_filename()'d
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    offset = db.Column(db.BigInteger, nullable=False, default=0)
+    expected_sha256 = db.Column(db.String(64), nullable=True)  # client-declared
+    sha256 = db.Column(db.String(64), nullable=True)  # computed on completion
+    options = db.Column(db.JSON, nullable=True)  # upload form fields
+    status = db.Column(db.String(20), nullable=False, default='uploading', index=True)
+    # uploading | completed | failed
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'offset': self.offset,
+            'total_size': self.total_size,
+            'chunk_size': self.chunk_size,
+            'status': self.status,
         }
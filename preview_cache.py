@@ -0,0 +1,220 @@
+"""
+Preview Cache
+Bounded tmpfs cache for apply_modifications previews.
+
+apply_modifications used to write modified_<timestamp>.glb into the
+model's converted directory for every preview. Nothing deleted them, and
+the same edit previewed twice produced two full copies. Previews now live
+under PREVIEW_CACHE_DIR (on /dev/shm when the host has it), keyed by the
+model's content hash plus a canonical hash of the modifications. An
+identical request finds the finished file and skips modify_glb.
+
+The cache is a directory rather than process memory so the download
+request can be served by any worker on the host. Entries expire after
+PREVIEW_CACHE_TTL_SECONDS. The oldest are dropped once the directory
+exceeds its budget: PREVIEW_CACHE_MAX_MB, or less when the filesystem
+(tmpfs is RAM) has little room left. A hit refreshes the entry's mtime.
+
+When a build can't be written there (ENOSPC and the like), it goes to
+PREVIEW_FALLBACK_DIR on disk instead, under the same name, and lookups
+check both directories. Downloads open the file before answering, so an
+eviction running at the same moment can't pull it out from under them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+
+from config import TEMP_FOLDER
+from shared_state import get_state
+
+logger = logging.getLogger(__name__)
+
+_SHM_DIR = "/dev/shm"
+PREVIEW_CACHE_DIR = os.environ.get("PREVIEW_CACHE_DIR") or os.path.join(
+    _SHM_DIR if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK) else "/tmp",
+    "web_ar_previews",
+)
+PREVIEW_FALLBACK_DIR = os.environ.get("PREVIEW_FALLBACK_DIR") or os.path.join(
+    TEMP_FOLDER, "previews"
+)
+PREVIEW_CACHE_MAX_MB = int(os.environ.get("PREVIEW_CACHE_MAX_MB", 512))
+# The cache keeps at most this share of the room it could use on its
+# filesystem (what it holds plus what is still free). On tmpfs that is RAM,
+# so the cache shrinks when the host runs short instead of growing to the
+# configured maximum regardless.
+PREVIEW_CACHE_FREE_SHARE = float(os.environ.get("PREVIEW_CACHE_FREE_SHARE", 0.5))
+PREVIEW_CACHE_TTL_SECONDS = int(os.environ.get("PREVIEW_CACHE_TTL_SECONDS", 3600))
+
+_FILENAME = re.compile(r"^[0-9a-f]{64}\.glb$")
+_HASH_BUFSIZE = 1024 * 1024
+
+_lock = threading.Lock()
+
+
+def content_digest(path):
+    """SHA-256 of the file, memoized per (path, mtime, size) in shared state."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+
+    def compute():
+        sha = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(_HASH_BUFSIZE), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    return get_state().cached(
+        f"content-sha256:{path}:{stat.st_mtime_ns}:{stat.st_size}",
+        PREVIEW_CACHE_TTL_SECONDS,
+        compute,
+    )
+
+
+def preview_key(glb_path, modifications):
+    canonical = json.dumps(modifications, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{content_digest(glb_path)}:{canonical}".encode()).hexdigest()
+
+
+def _dirs():
+    return [PREVIEW_CACHE_DIR] + (
+        [PREVIEW_FALLBACK_DIR] if PREVIEW_FALLBACK_DIR != PREVIEW_CACHE_DIR else []
+    )
+
+
+def _path(model_id, filename, root=None):
+    if os.path.basename(model_id) != model_id or not _FILENAME.match(filename):
+        return None
+    return os.path.join(root or PREVIEW_CACHE_DIR, model_id, filename)
+
+
+def lookup(model_id, filename):
+    """Path of a cached preview, or None (unknown, expired or malformed name)."""
+    for root in _dirs():
+        path = _path(model_id, filename, root)
+        if path is None:
+            return None
+        try:
+            if time.time() - os.path.getmtime(path) <= PREVIEW_CACHE_TTL_SECONDS:
+                return path
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def open_preview(model_id, filename):
+    """(open binary file, size) of a cached preview, or None.
+
+    The open handle keeps the bytes readable even if evict() unlinks the
+    file before the response has been sent.
+    """
+    path = lookup(model_id, filename)
+    if path is None:
+        return None
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    return fh, os.fstat(fh.fileno()).st_size
+
+
+def get_or_build(model_id, glb_path, modifications, build):
+    """(filename, hit) of the preview for these modifications of glb_path.
+
+    build(input_path, output_path, modifications) runs on a miss and must
+    return truthy on success; (None, False) is returned when it fails.
+    """
+    filename = f"{preview_key(glb_path, modifications)}.glb"
+    if _path(model_id, filename) is None:
+        raise ValueError(f"Invalid model id: {model_id}")
+    cached = lookup(model_id, filename)
+    if cached:
+        try:
+            os.utime(cached)
+            return filename, True
+        except FileNotFoundError:
+            pass  # evicted just now: build it again
+
+    error = None
+    for root in _dirs():
+        try:
+            built = _build(_path(model_id, filename, root), glb_path, modifications, build)
+        except OSError as e:
+            logger.warning(f"[preview_cache] could not write a preview under {root}: {e}")
+            error = e
+            continue
+        if not built:
+            return None, False
+        evict()
+        return filename, False
+    raise error
+
+
+def _build(path, glb_path, modifications, build):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        if not build(glb_path, tmp, modifications) or not os.path.exists(tmp):
+            return False
+        os.replace(tmp, path)
+        return True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _budget(root, cached_bytes):
+    budget = PREVIEW_CACHE_MAX_MB * 1024 * 1024
+    try:
+        free = shutil.disk_usage(root).free
+    except OSError:
+        return budget
+    return min(budget, int((cached_bytes + free) * PREVIEW_CACHE_FREE_SHARE))
+
+
+def evict(now=None):
+    """Drop expired previews, then the oldest until under the byte budget
+    (each cache directory has its own)."""
+    now = now or time.time()
+    with _lock:
+        for root in _dirs():
+            _evict(root, now)
+
+
+def _evict(cache_dir, now):
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            # ".tmp." files are builds in flight; only reap abandoned ones.
+            if now - stat.st_mtime > PREVIEW_CACHE_TTL_SECONDS:
+                _remove(path)
+            elif ".tmp." not in name:
+                entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    budget = _budget(cache_dir, total)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        _remove(path)
+        total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    try:
+        os.rmdir(os.path.dirname(path))  # only succeeds once the model dir is empty
+    except OSError:
+        pass
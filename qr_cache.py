@@ -0,0 +1,133 @@
+"""
+QR Cache
+Deterministic QR codes for model viewer links, rendered once and cached.
+
+generate_qr_code used to open its own DB session, render a PNG and write a
+fresh qr_<id>_<uuid>.png into the top-level converted folder on every call.
+Nothing deleted those files, and identical codes were rendered again and
+again. A QR code is now a pure function of (viewer URL, size, format), and
+the hash of those three is both its cache key and its ETag:
+
+- SVG is rendered as one run-length path, a few KB, and memoized in shared
+  state.
+- PNG is written once to converted/<model_id>/qr/<key>.png, so it goes
+  away with the model's directory. At most QR_MAX_PER_MODEL files are kept
+  there; the least recently written go first.
+
+Sizes are rounded up to one of QR_SIZES, so ?size= can't mint an unbounded
+number of cache entries. The URL comes from PUBLIC_BASE_URL when it is
+configured rather than from the request's Host header, for the same reason.
+
+The /qr route answers If-None-Match from the key alone. It needs neither
+the database nor a render.
+"""
+
+import hashlib
+import os
+import threading
+
+import qrcode
+
+from shared_state import get_state
+
+QR_SIZES = (128, 256, 512, 1024)
+QR_DEFAULT_SIZE = int(os.environ.get("QR_DEFAULT_SIZE", 512))
+QR_MAX_PER_MODEL = int(os.environ.get("QR_MAX_PER_MODEL", 8))
+QR_CACHE_TTL_SECONDS = int(os.environ.get("QR_CACHE_TTL_SECONDS", 86400))
+FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+
+# Bump when rendering changes so clients holding an old ETag re-fetch.
+_RENDER_VERSION = 1
+_BORDER = 4
+
+
+def quantize_size(size):
+    """The smallest of QR_SIZES at least `size` (the largest if none is)."""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        size = QR_DEFAULT_SIZE
+    return next((allowed for allowed in QR_SIZES if allowed >= size), QR_SIZES[-1])
+
+
+def cache_key(url, size, fmt):
+    return hashlib.sha256(f"{_RENDER_VERSION}\0{url}\0{size}\0{fmt}".encode()).hexdigest()[:32]
+
+
+def _matrix(url):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=_BORDER)
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr
+
+
+def render_svg(url, size):
+    """SVG with one path; horizontal runs of dark modules become one rect each."""
+    matrix = _matrix(url).get_matrix()  # includes the quiet-zone border
+    n = len(matrix)
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < n:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < n and row[x]:
+                x += 1
+            parts.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(parts)}"/></svg>'
+    )
+
+
+def render_png(url, size, path):
+    qr = _matrix(url)
+    modules = qr.modules_count + 2 * _BORDER
+    qr.box_size = max(1, size // modules)
+    tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        qr.make_image(fill_color="black", back_color="white").save(tmp, format="PNG")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def svg(url, size):
+    """(key, svg text) for a viewer URL."""
+    key = cache_key(url, size, "svg")
+    return key, get_state().cached(
+        f"qr-svg:{key}", QR_CACHE_TTL_SECONDS, lambda: render_svg(url, size)
+    )
+
+
+def png_path(model_dir, url, size):
+    """(key, path) of the cached PNG in model_dir, rendering it on a miss."""
+    key = cache_key(url, size, "png")
+    path = os.path.join(model_dir, "qr", f"{key}.png")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        render_png(url, size, path)
+        _prune(os.path.dirname(path), keep=path)
+    return key, path
+
+
+def _prune(directory, keep):
+    """Drop the oldest PNGs beyond QR_MAX_PER_MODEL (never `keep`)."""
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(".png") and path != keep:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+    for _, path in sorted(entries)[: max(0, len(entries) + 1 - QR_MAX_PER_MODEL)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,352 @@
+"""
+Shared State
+Small key/value store shared by every process serving the app.
+
+Rate-limit counters and hot caches used to live in process memory, so each
+gunicorn worker (and each replica) kept its own copy: two workers meant
+twice the allowed request rate and two cold caches. Everything that has to
+agree across processes goes through get_state() instead, which returns one
+backend selected by SHARED_STATE_URL:
+
+- sqlite:///path/to/file — default. One SQLite file in WAL mode, placed on
+  /dev/shm when the host has it, so it is effectively shared memory for all
+  workers on the machine. Not shared across machines.
+- redis://host:port/db — for several replicas. Needs the optional `redis`
+  package.
+- memory:// — per-process dict; single-process dev servers and tests.
+
+Values are JSON-encoded, keys may carry a TTL in seconds. The limiter reads
+the same store through the "shared://" storage scheme (SharedLimiterStorage).
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from limits.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+_SHM_DIR = "/dev/shm"
+_DEFAULT_DIR = (
+    _SHM_DIR if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK) else tempfile.gettempdir()
+)
+SHARED_STATE_URL = os.environ.get(
+    "SHARED_STATE_URL", "sqlite:///" + os.path.join(_DEFAULT_DIR, "web_ar_state.sqlite")
+)
+# Expired SQLite rows are purged on roughly every Nth write.
+_PURGE_EVERY = 500
+
+
+class SharedState:
+    """Backend interface. Missing or expired keys read as `default`."""
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """Set only if the key is absent; True when this call set it."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key, amount=1, ttl=None):
+        """Add to an integer counter and return the new value.
+
+        A missing/expired counter starts at `amount` with a fresh TTL; later
+        increments keep the original expiry (fixed window).
+        """
+        raise NotImplementedError
+
+    def expires_at(self, key):
+        """Epoch seconds the key expires at, or None (missing / no TTL)."""
+        raise NotImplementedError
+
+    def clear(self, prefix=""):
+        raise NotImplementedError
+
+    def cached(self, key, ttl, compute):
+        """Return the cached value for key, computing and storing it on a miss.
+
+        compute() results of None are not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl=ttl)
+        return value
+
+
+class MemoryState(SharedState):
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry and entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(key, time.time())
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            now = time.time()
+            if self._live(key, now) is not None:
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        with self._lock:
+            now = time.time()
+            entry = self._live(key, now)
+            if entry is None:
+                entry = (0, now + ttl if ttl else None)
+            value = int(entry[0]) + amount
+            self._data[key] = (value, entry[1])
+            return value
+
+    def expires_at(self, key):
+        with self._lock:
+            entry = self._live(key, time.time())
+        return entry[1] if entry else None
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class SQLiteState(SharedState):
+    """One SQLite file shared by all processes on the host.
+
+    Connections are per thread and per pid (gunicorn forks after import).
+    Durability is traded away (synchronous=OFF): the data is counters and
+    caches, and a lost write after a crash is harmless.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS shared_state ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _row(self, conn, key, now):
+        row = conn.execute(
+            "SELECT value, expires_at FROM shared_state WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        return row
+
+    def _wrote(self, conn, now):
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute("DELETE FROM shared_state WHERE expires_at <= ?", (now,))
+
+    def get(self, key, default=None):
+        row = self._row(self._conn(), key, time.time())
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        conn, now = self._conn(), time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl if ttl else None),
+        )
+        self._wrote(conn, now)
+
+    def add(self, key, value, ttl=None):
+        conn, now = self._conn(), time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._row(conn, key, now) is not None:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl if ttl else None),
+            )
+            return True
+        finally:
+            conn.execute("COMMIT")
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def incr(self, key, amount=1, ttl=None):
+        conn, now = self._conn(), time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so the
+        # read-modify-write below can't interleave with another process.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._row(conn, key, now)
+            if row is None:
+                value, expires_at = amount, now + ttl if ttl else None
+            else:
+                value, expires_at = int(json.loads(row[0])) + amount, row[1]
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._wrote(conn, now)
+        finally:
+            conn.execute("COMMIT")
+        return value
+
+    def expires_at(self, key):
+        row = self._row(self._conn(), key, time.time())
+        return row[1] if row else None
+
+    def clear(self, prefix=""):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._conn().execute(
+            "DELETE FROM shared_state WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",)
+        )
+
+
+class RedisState(SharedState):
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "SHARED_STATE_URL points at Redis but the 'redis' package is not installed"
+            ) from e
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key, default=None):
+        raw = self._redis.get(key)
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._redis.set(key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self._redis.set(
+            key, json.dumps(value), nx=True, px=int(ttl * 1000) if ttl else None
+        ))
+
+    def delete(self, key):
+        self._redis.delete(key)
+
+    def incr(self, key, amount=1, ttl=None):
+        pipe = self._redis.pipeline()
+        if ttl:
+            # Creates the counter with its TTL only if it doesn't exist yet.
+            pipe.set(key, 0, nx=True, px=int(ttl * 1000))
+        pipe.incrby(key, amount)
+        return int(pipe.execute()[-1])
+
+    def expires_at(self, key):
+        remaining = self._redis.pttl(key)
+        return time.time() + remaining / 1000 if remaining >= 0 else None
+
+    def clear(self, prefix=""):
+        keys = list(self._redis.scan_iter(match=prefix + "*"))
+        if keys:
+            self._redis.delete(*keys)
+
+
+def state_from_url(url):
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryState()
+    if parsed.scheme == "sqlite":
+        return SQLiteState(parsed.path)
+    if parsed.scheme in ("redis", "rediss"):
+        return RedisState(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    """The process-wide backend for SHARED_STATE_URL (created on first use)."""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = state_from_url(SHARED_STATE_URL)
+                logger.info(f"Shared state backend: {type(_state).__name__}")
+    return _state
+
+
+class SharedLimiterStorage(Storage):
+    """Flask-Limiter storage ("shared://") on top of get_state().
+
+    Supports the fixed-window strategy (the limiter's default), which only
+    needs an expiring counter.
+    """
+
+    STORAGE_SCHEME = ["shared"]
+    PREFIX = "ratelimit:"
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return (sqlite3.Error, OSError)
+
+    def incr(self, key, expiry, amount=1):
+        return get_state().incr(self.PREFIX + key, amount, ttl=expiry)
+
+    def get(self, key):
+        return int(get_state().get(self.PREFIX + key, 0))
+
+    def get_expiry(self, key):
+        return get_state().expires_at(self.PREFIX + key) or time.time()
+
+    def check(self):
+        try:
+            get_state().get(self.PREFIX + "healthcheck")
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        get_state().clear(self.PREFIX)
+
+    def clear(self, key):
+        get_state().delete(self.PREFIX + key)
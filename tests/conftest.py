@@ -1,3 +1,8 @@
+import os
+
+# Rate-limit counters must not leak between test runs via the on-disk store.
+os.environ.setdefault('SHARED_STATE_URL', 'memory://')
+
 import pytest
 from app import app, db
 from models import User, Folder
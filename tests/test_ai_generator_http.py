@@ -0,0 +1,127 @@
+"""ai_generator's HTTP client: one pooled keep-alive session, retries with
+Retry-After, no unsafe POST retries, and Range-resumed downloads."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ai_generator
+import config
+
+ASSET = bytes(range(256)) * 1024
+
+
+class Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    script = []  # (status, headers) answers to pop before the default
+    range_starts = []  # offsets to answer the next Range requests from, whatever was asked
+    seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, status, body=b"{}", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.do_GET()
+
+    def do_GET(self):
+        self.seen.append((self.command, self.path, self.client_address[1],
+                          self.headers.get("Range")))
+        if self.script:
+            status, headers = self.script.pop(0)
+            return self._answer(status, headers=headers)
+        if self.path == "/asset.glb":
+            return self._asset()
+        self._answer(200, json.dumps({"result": "task-1", "status": "SUCCEEDED"}).encode())
+
+    def _asset(self):
+        rng = self.headers.get("Range")
+        if rng is None:
+            # full length announced, connection dropped halfway
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(ASSET)))
+            self.end_headers()
+            self.wfile.write(ASSET[: len(ASSET) // 2])
+            self.close_connection = True
+            return
+        start = int(rng.split("=")[1].rstrip("-"))
+        if self.range_starts:
+            start = self.range_starts.pop(0)
+        self._answer(206, ASSET[start:],
+                     {"Content-Range": f"bytes {start}-{len(ASSET) - 1}/{len(ASSET)}"})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    Upstream.script, Upstream.seen, Upstream.range_starts = [], [], []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(config, "MESHY_API_KEY", "test-key")
+    monkeypatch.setattr(config, "MESHY_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(ai_generator, "_session", None)
+    sleeps = []
+    monkeypatch.setattr(ai_generator.time, "sleep", sleeps.append)
+    yield sleeps
+    server.shutdown()
+
+
+def test_calls_reuse_one_connection(upstream):
+    for _ in range(3):
+        ai_generator.get_task("text", "task-1")
+    assert len({port for _, _, port, _ in Upstream.seen}) == 1
+
+
+def test_get_retries_honoring_retry_after(upstream):
+    Upstream.script = [(429, {"Retry-After": "2"}), (503, {})]
+    assert ai_generator.get_task("text", "task-1")["status"] == "SUCCEEDED"
+    assert len(Upstream.seen) == 3
+    assert upstream[0] == 2.0
+    assert 0 <= upstream[1] <= config.MESHY_BACKOFF_SECONDS * 2
+
+
+def test_post_not_retried_after_it_may_have_run(upstream):
+    Upstream.script = [(500, {})]
+    with pytest.raises(ai_generator.MeshyError):
+        ai_generator.start_refine("preview-1")
+    assert len(Upstream.seen) == 1
+
+    Upstream.seen = []
+    Upstream.script = [(503, {"Retry-After": "0"})]
+    assert ai_generator.start_refine("preview-1") == "task-1"
+    assert len(Upstream.seen) == 2
+
+
+def test_download_resumes_with_range(upstream, tmp_path):
+    dest = tmp_path / "model.glb"
+    assert ai_generator.download(f"{config.MESHY_API_BASE}/asset.glb", str(dest))
+    assert dest.read_bytes() == ASSET
+    ranges = [rng for _, path, _, rng in Upstream.seen if path == "/asset.glb"]
+    assert ranges == [None, f"bytes={len(ASSET) // 2}-"]
+
+
+def test_download_restarts_on_misplaced_range(upstream, tmp_path):
+    dest = tmp_path / "model.glb"
+    Upstream.range_starts = [1000]  # a 206 that doesn't start where we stopped
+    assert ai_generator.download(f"{config.MESHY_API_BASE}/asset.glb", str(dest))
+    assert dest.read_bytes() == ASSET
+    ranges = [rng for _, path, _, rng in Upstream.seen if path == "/asset.glb"]
+    half = f"bytes={len(ASSET) // 2}-"
+    assert ranges == [None, half, None, half]
+
+
+def test_download_attempts_do_not_multiply(upstream, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MESHY_MAX_RETRIES", 2)
+    Upstream.script = [(500, {})] * 10
+    with pytest.raises(ai_generator.MeshyError):
+        ai_generator.download(f"{config.MESHY_API_BASE}/asset.glb", str(tmp_path / "model.glb"))
+    assert len(Upstream.seen) == 3
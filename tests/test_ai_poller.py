@@ -0,0 +1,180 @@
+"""The AI poller advances generation jobs against a local fake Meshy API:
+one list request per kind per round, finalization off the request path,
+and a status endpoint that never reaches Meshy."""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import trimesh
+
+import ai_poller
+import config
+from app import _finalize_ai_job, app
+from models import AIGenerationJob, User, UserModel, db
+
+GLB = trimesh.creation.box().export(file_type="glb")
+
+
+class FakeMeshy(BaseHTTPRequestHandler):
+    tasks = {}  # path prefix -> {task_id: task}
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.requests.append(("GET", self.path))
+        path = self.path.split("?")[0]
+        if path == "/files/model.glb":
+            return self._send(GLB, "model/gltf-binary")
+        prefix, _, task_id = path.rpartition("/")
+        if path in self.tasks:
+            return self._send(list(self.tasks[path].values()))
+        return self._send(self.tasks[prefix][task_id])
+
+    def do_POST(self):
+        self.requests.append(("POST", self.path))
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        task_id = "refine-" + body["preview_task_id"]
+        self.tasks["/v2/text-to-3d"][task_id] = {"id": task_id, "status": "IN_PROGRESS", "progress": 0}
+        self._send({"result": task_id})
+
+
+@pytest.fixture
+def meshy(monkeypatch):
+    FakeMeshy.tasks = {"/v2/text-to-3d": {}, "/v1/image-to-3d": {}}
+    FakeMeshy.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMeshy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(config, "MESHY_API_KEY", "test-key")
+    monkeypatch.setattr(config, "MESHY_API_BASE", base)
+    ai_poller._schedule.clear()
+    yield base
+    server.shutdown()
+
+
+@pytest.fixture
+def user(client):
+    user = User(username="poller", email="poller@test.com")
+    user.set_password("testpassword")
+    db.session.add(user)
+    db.session.commit()
+    client.post("/login", data={"username": "poller", "password": "testpassword"})
+    return user
+
+
+def _job(user, kind, stage, task_id, status="IN_PROGRESS", progress=10, **task):
+    column = {"preview": "meshy_preview_id", "refine": "meshy_refine_id", "image": "meshy_image_id"}
+    job = AIGenerationJob(id=str(uuid.uuid4()), user_id=user.id, kind=kind, stage=stage,
+                          status="generating", progress=0, **{column[stage]: task_id})
+    db.session.add(job)
+    db.session.commit()
+    path = "/v1/image-to-3d" if kind == "image" else "/v2/text-to-3d"
+    FakeMeshy.tasks[path][task_id] = dict(task, id=task_id, status=status, progress=progress)
+    return job.id
+
+
+def _round():
+    for future in ai_poller.poll_once(app, _finalize_ai_job):
+        future.result()
+    return [request for request in FakeMeshy.requests if request[1].startswith("/v")]
+
+
+def test_round_batches_checks_and_finalizes_off_request(client, meshy, user):
+    preview = _job(user, "text", "preview", "p1", status="SUCCEEDED", progress=100)
+    waiting = _job(user, "text", "preview", "p2")
+    image = _job(user, "image", "image", "i1", status="SUCCEEDED", progress=100,
+                 model_urls={"glb": f"{meshy}/files/model.glb"})
+
+    calls = _round()
+    gets = sorted(path.split("?")[0] for method, path in calls if method == "GET")
+    assert gets == ["/v1/image-to-3d", "/v2/text-to-3d"]  # one list per kind, no per-task GETs
+    assert [path for method, path in calls if method == "POST"] == ["/v2/text-to-3d"]
+
+    job = db.session.get(AIGenerationJob, preview)
+    assert job.stage == "refine" and job.meshy_refine_id == "refine-p1"
+    finished = db.session.get(AIGenerationJob, image)
+    model = db.session.get(UserModel, finished.model_id)
+    try:
+        assert finished.status == "ready" and model.user_id == user.id
+
+        seen = len(FakeMeshy.requests)
+        body = client.get(f"/api/generate-3d/{image}/status").get_json()
+        assert body["status"] == "ready" and body["viewer_url"].endswith(model.id)
+        body = client.get(f"/api/generate-3d/{waiting}/status").get_json()
+        assert body["status"] == "generating" and body["progress"] == 5
+        assert len(FakeMeshy.requests) == seen  # status reads never reach Meshy
+    finally:
+        shutil.rmtree(os.path.join(app.config["CONVERTED_FOLDER"], model.id), ignore_errors=True)
+
+
+def test_stalled_jobs_back_off(client, meshy, user):
+    moving = _job(user, "text", "preview", "p1")
+    stalled = _job(user, "text", "preview", "p2")
+    _round()
+    for _ in range(3):
+        FakeMeshy.tasks["/v2/text-to-3d"]["p1"]["progress"] += 10
+        ai_poller.poll_once(app, _finalize_ai_job, now=max(
+            next_check for next_check, _ in ai_poller._schedule.values()))
+    assert ai_poller._schedule[stalled][1] > ai_poller._schedule[moving][1]
+    assert ai_poller._schedule[moving][1] == ai_poller.AI_POLL_MIN_SECONDS
+
+    # a job that leaves "generating" drops out of the schedule
+    db.session.get(AIGenerationJob, stalled).status = "failed"
+    db.session.commit()
+    _round()
+    assert stalled not in ai_poller._schedule
+
+
+def test_finalize_gives_up_after_max_attempts(client, meshy, user, monkeypatch):
+    monkeypatch.setattr(ai_poller, "AI_FINALIZE_MAX_ATTEMPTS", 2)
+    job_id = _job(user, "image", "image", "i1", status="SUCCEEDED", progress=100,
+                  model_urls={"glb": f"{meshy}/files/model.glb"})
+
+    def broken(job, task):
+        raise OSError("No space left on device")
+
+    for attempt in (1, 2):
+        later = time.monotonic() + 1000 * attempt
+        for future in ai_poller.poll_once(app, broken, now=later):
+            future.result()
+        db.session.expire_all()
+        job = db.session.get(AIGenerationJob, job_id)
+        assert job.finalize_attempts == attempt
+    assert job.status == "failed" and "No space left" in job.error
+
+
+def test_only_expired_finalize_leases_are_recovered(client, user):
+    now = datetime.utcnow()
+
+    def finalizing(lease):
+        job = AIGenerationJob(id=str(uuid.uuid4()), user_id=user.id, kind="image",
+                              stage="finalizing", status="generating", meshy_image_id="i1",
+                              finalize_attempts=1, finalize_lease_expires_at=lease)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+    dead = finalizing(now - timedelta(seconds=1))
+    # a slow but healthy download keeps renewing, however long it runs
+    alive = finalizing(now + timedelta(seconds=30))
+    ai_poller._recover_stuck_finalizers()
+    db.session.expire_all()
+    assert db.session.get(AIGenerationJob, dead).stage == "image"
+    assert db.session.get(AIGenerationJob, alive).stage == "finalizing"
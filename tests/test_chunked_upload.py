@@ -0,0 +1,125 @@
+"""Resumable chunked uploads: offset-checked chunks ending in a ConversionJob."""
+
+import hashlib
+
+import pytest
+
+import app as app_module
+import chunked_upload
+from models import ConversionJob, UploadSession
+
+CONTENT = b"solid cube\n" + b"facet normal 0 0 1\nendfacet\n" * 3 + b"endsolid cube\n"
+
+
+@pytest.fixture
+def uploads(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "TEMP_FOLDER", str(tmp_path))
+    monkeypatch.setattr(chunked_upload, "UPLOAD_CHUNK_SIZE", 32)
+    # Leave the job pending instead of converting in a background thread.
+    monkeypatch.setattr(app_module, "JOB_QUEUE_ENABLED", True)
+    return client
+
+
+def _open(client, **extra):
+    body = {"filename": "cube.stl", "size": len(CONTENT), "options": {"useColor": "true"}}
+    body.update(extra)
+    resp = client.post("/api/uploads", json=body)
+    assert resp.status_code == 201
+    return resp.get_json()
+
+
+def _put(client, url, offset, data):
+    return client.put(url, data=data, headers={"Upload-Offset": str(offset)})
+
+
+def test_chunks_resume_and_complete_into_job(uploads):
+    session = _open(uploads, sha256=hashlib.sha256(CONTENT).hexdigest())
+    url, size = session["upload_url"], session["chunk_size"]
+
+    assert _put(uploads, url, 0, CONTENT[:size]).get_json()["offset"] == size
+    # A retried (already committed) chunk is refused with the real offset.
+    conflict = _put(uploads, url, 0, CONTENT[:size])
+    assert conflict.status_code == 409 and conflict.get_json()["offset"] == size
+    # Non-final chunks must be full-size.
+    assert _put(uploads, url, size, CONTENT[size : size + 5]).status_code == 400
+
+    # Another process (no cached hash state) picks up the upload.
+    chunked_upload._hashers.clear()
+    head = uploads.head(url)
+    assert head.headers["Upload-Offset"] == str(size)
+
+    offset = size
+    while offset + size < len(CONTENT):
+        offset = _put(uploads, url, offset, CONTENT[offset : offset + size]).get_json()["offset"]
+    done = _put(uploads, url, offset, CONTENT[offset:])
+    assert done.status_code == 202
+    job = ConversionJob.query.get(done.get_json()["job_id"])
+    assert job.payload["use_color"] is True
+    with open(job.payload["temp_file_path"], "rb") as fh:
+        assert fh.read() == CONTENT
+    record = UploadSession.query.get(session["upload_id"])
+    assert record.status == "completed" and record.sha256 == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_checksum_mismatch_fails_upload(uploads):
+    session = _open(uploads, sha256="0" * 64)
+    url, size = session["upload_url"], session["chunk_size"]
+    offset = 0
+    while offset + size < len(CONTENT):
+        offset = _put(uploads, url, offset, CONTENT[offset : offset + size]).get_json()["offset"]
+    resp = _put(uploads, url, offset, CONTENT[offset:])
+    assert resp.status_code == 422
+    assert ConversionJob.query.count() == 0
+
+
+def test_rejects_bad_sessions(uploads):
+    assert uploads.post("/api/uploads", json={"filename": "notes.txt", "size": 10}).status_code == 400
+    too_big = chunked_upload.UPLOAD_MAX_BYTES + 1
+    assert uploads.post("/api/uploads", json={"filename": "a.glb", "size": too_big}).status_code == 413
+    assert uploads.get("/api/uploads/does-not-exist").status_code == 404
+
+
+def test_failed_handoff_is_retried_without_reupload(uploads, monkeypatch):
+    session = _open(uploads)
+    url, size = session["upload_url"], session["chunk_size"]
+    offset = 0
+    while offset + size < len(CONTENT):
+        offset = _put(uploads, url, offset, CONTENT[offset : offset + size]).get_json()["offset"]
+
+    real_enqueue = app_module._enqueue_upload_job
+
+    def broken_enqueue(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(app_module, "_enqueue_upload_job", broken_enqueue)
+    assert _put(uploads, url, offset, CONTENT[offset:]).status_code == 500
+    record = UploadSession.query.get(session["upload_id"])
+    assert record.status == "uploading" and record.offset == len(CONTENT)
+
+    monkeypatch.setattr(app_module, "_enqueue_upload_job", real_enqueue)
+    retried = _put(uploads, url, len(CONTENT), b"")
+    assert retried.status_code == 202
+    job = ConversionJob.query.get(retried.get_json()["job_id"])
+    with open(job.payload["temp_file_path"], "rb") as fh:
+        assert fh.read() == CONTENT
+    assert UploadSession.query.get(session["upload_id"]).status == "completed"
+
+    # Repeating the finish after success answers with the same job.
+    again = _put(uploads, url, len(CONTENT), b"")
+    assert again.status_code == 202 and again.get_json()["job_id"] == job.id
+    assert ConversionJob.query.count() == 1
+
+
+def test_unreadable_header_still_gets_a_size_estimate(uploads, monkeypatch):
+    def unreadable(path, ext):
+        raise ValueError("truncated header")
+
+    monkeypatch.setattr(app_module, "estimate_complexity", unreadable)
+    session = _open(uploads)
+    url, size = session["upload_url"], session["chunk_size"]
+    offset = 0
+    while offset + size < len(CONTENT):
+        offset = _put(uploads, url, offset, CONTENT[offset : offset + size]).get_json()["offset"]
+    done = _put(uploads, url, offset, CONTENT[offset:])
+    job = ConversionJob.query.get(done.get_json()["job_id"])
+    assert job.estimated_mem_mb == app_module.size_only_mem_mb(len(CONTENT), ".stl")
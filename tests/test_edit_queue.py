@@ -0,0 +1,102 @@
+"""Edits on one model run one batch at a time, and saves that queue up
+behind a running batch are coalesced into the next one."""
+
+import threading
+import time
+
+import edit_queue
+
+
+def _wait(job_ids, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        jobs = [edit_queue.job_status(job_id) for job_id in job_ids]
+        if all(job["status"] in ("completed", "failed") for job in jobs):
+            return jobs
+        time.sleep(0.01)
+    raise AssertionError(f"jobs not finished: {jobs}")
+
+
+def test_queued_edits_coalesce_behind_running_batch():
+    release = threading.Event()
+    batches, active, overlap = [], [], []
+
+    def apply_batch(model_id, batch):
+        if active:
+            overlap.append(model_id)
+        active.append(model_id)
+        batches.append(list(batch))
+        if len(batches) == 1:
+            release.wait(5)
+        active.pop()
+        return {"applied": len(batch)}
+
+    first = edit_queue.submit("model-a", {"n": 1}, apply_batch)
+    while not batches:
+        time.sleep(0.01)
+    rest = [edit_queue.submit("model-a", {"n": n}, apply_batch) for n in (2, 3, 4)]
+    release.set()
+
+    jobs = _wait([first] + rest)
+    assert batches == [[{"n": 1}], [{"n": 2}, {"n": 3}, {"n": 4}]]
+    assert not overlap
+    assert [job["status"] for job in jobs] == ["completed"] * 4
+    assert jobs[1]["batch_size"] == 3 and jobs[1]["applied"] == 3
+
+
+def test_failed_batch_fails_its_jobs_only():
+    def apply_batch(model_id, batch):
+        if batch[0].get("bad"):
+            raise RuntimeError("boom")
+        return {}
+
+    bad = edit_queue.submit("model-b", {"bad": True}, apply_batch)
+    (job,) = _wait([bad])
+    assert job["status"] == "failed" and "boom" in job["error"]
+
+    good = edit_queue.submit("model-b", {"bad": False}, apply_batch)
+    (job,) = _wait([good])
+    assert job["status"] == "completed"
+    assert edit_queue.job_status("no-such-job") is None
+
+
+def test_failed_batch_falls_back_to_single_edits():
+    release = threading.Event()
+    batches = []
+
+    def apply_batch(model_id, batch):
+        batches.append(list(batch))
+        if len(batches) == 1:
+            release.wait(5)
+        if any(mods.get("bad") for mods in batch):
+            raise RuntimeError("bad edit")
+        return {}
+
+    first = edit_queue.submit("model-c", {"n": 1}, apply_batch)
+    while not batches:
+        time.sleep(0.01)
+    good = edit_queue.submit("model-c", {"n": 2}, apply_batch)
+    bad = edit_queue.submit("model-c", {"bad": True}, apply_batch)
+    release.set()
+
+    jobs = _wait([first, good, bad])
+    assert [job["status"] for job in jobs] == ["completed", "completed", "failed"]
+    assert batches[1:] == [[{"n": 2}, {"bad": True}], [{"n": 2}], [{"bad": True}]]
+    assert "model-c" not in edit_queue._draining
+
+
+def test_job_status_is_only_visible_to_its_owner(client, init_database):
+    from models import UserModel, db
+
+    db.session.add(UserModel(id="owned", filename="model.glb", file_type="glb",
+                             user_id=init_database.id))
+    db.session.commit()
+    job_id = edit_queue.submit("owned", {"n": 1}, lambda model_id, batch: {},
+                               user_id=init_database.id)
+    _wait([job_id])
+
+    assert client.get(f"/api/edits/{job_id}").status_code == 404
+    client.post("/login", data={"username": "testuser", "password": "testpassword"})
+    resp = client.get(f"/api/edits/{job_id}")
+    assert resp.status_code == 200
+    assert resp.get_json()["status"] == "completed" and "user_id" not in resp.get_json()
@@ -39,3 +39,114 @@ def test_run_isolated_cleans_up_workdir():
     after = set(os.listdir(tempfile.gettempdir()))
     leaked = [d for d in (after - before) if d.startswith("fbxprobe_")]
     assert not leaked, leaked
+
+
+def test_run_isolated_subprocess_fallback_returns_error(monkeypatch):
+    monkeypatch.setattr(fbx_probe, "POOL_ENABLED", False)
+    m = fbx_probe.run_isolated("/no/such/file.fbx", timeout=60)
+    assert isinstance(m, dict) and m.get("error"), m
+
+
+def test_pooled_probe_survives_repeated_failures():
+    """The warm forkserver must outlive failing children (assimp missing,
+    garbage input) and keep serving later probes."""
+    for _ in range(3):
+        m = fbx_probe.run_isolated("/no/such/file.fbx", timeout=60)
+        assert m.get("error"), m
+
+
+def test_shared_geometry_round_trip_unlinks_segment():
+    import numpy as np
+
+    verts = np.random.rand(50, 3).astype(np.float32)
+    faces = np.arange(60, dtype=np.int64).reshape(20, 3)
+    name = f"{fbx_probe._SHM_PREFIX}test{os.getpid()}"
+    manifest = fbx_probe._share_geometry(
+        {"unit_scale": 0.01, "vertices": verts, "faces": faces}, name
+    )
+    assert "vertices" not in manifest and manifest["geometry_shm"]["name"] == name
+
+    fbx_probe._collect_geometry(manifest)
+    assert np.array_equal(manifest["vertices"], verts)
+    assert manifest["vertices"].dtype == np.float32
+    assert np.array_equal(manifest["faces"], faces)
+    if os.path.isdir("/dev/shm"):
+        assert name not in os.listdir("/dev/shm")
+
+
+def _converter_with_probe(monkeypatch, manifest, delay=0.0):
+    import time
+
+    from converters.fbx_converter import FBXConverter
+
+    def fake_run_isolated(input_path, mem_mb=None, timeout=None, cancel_event=None):
+        time.sleep(delay)
+        return manifest
+
+    monkeypatch.setattr(fbx_probe, "run_isolated", fake_run_isolated)
+    conv = FBXConverter()
+    conv.log_operation = lambda *a, **k: None
+    conv._reset_probe_state()
+    conv._start_probe("/irrelevant.fbx")
+    return conv
+
+
+def test_join_probe_adopts_finished_manifest(monkeypatch):
+    conv = _converter_with_probe(monkeypatch, {
+        "unit_scale": 1.0,
+        "material_textures": {"mat": "tex.png"},
+        "original_dimensions": {"x": 1, "y": 2, "z": 3, "max": 3},
+        "vertices": None, "faces": None,
+    })
+    assert conv._join_probe(5) is True
+    assert conv._fbx_unit_scale == 1.0
+    assert conv._fbx_material_textures == {"mat": "tex.png"}
+    assert conv.original_dimensions["max"] == 3
+
+
+def test_join_probe_grace_leaves_slow_probe_optional(monkeypatch):
+    """A probe still running after the grace window is skipped: converter
+    state keeps its defaults and a late finish never leaks into it."""
+    conv = _converter_with_probe(
+        monkeypatch, {"unit_scale": 1.0, "original_dimensions": {"max": 9}}, delay=0.5
+    )
+    assert conv._join_probe(0.01) is False
+    assert conv._fbx_unit_scale == 0.01
+    assert conv.original_dimensions is None
+    conv._probe_thread.join()
+    assert conv.original_dimensions is None
+
+
+def test_join_probe_error_manifest_keeps_defaults(monkeypatch):
+    conv = _converter_with_probe(monkeypatch, {"error": "boom"})
+    assert conv._join_probe(5) is True
+    assert conv._fbx_vertices is None and conv._fbx_material_textures == {}
+
+
+def test_failed_fbx2gltf_cancels_probe_and_frees_its_slot(monkeypatch, tmp_path):
+    import threading
+
+    from converters import fbx_converter, tool_runner
+
+    holding = threading.Event()
+
+    def slow_probe(input_path, mem_mb=None, timeout=None, cancel_event=None):
+        with tool_runner.tool_slot("fbx_probe", cancel_event):
+            holding.set()
+            cancel_event.wait(30)
+        return {"error": "probe cancelled"}
+
+    def failing_fbx2gltf(tool, cmd, **kwargs):
+        holding.wait(5)
+        return tool_runner.ToolResult(tool, cmd, 1, "", "boom", 0.0, 0.0)
+
+    monkeypatch.setattr(fbx_probe, "run_isolated", slow_probe)
+    monkeypatch.setattr(fbx_converter, "run_tool", failing_fbx2gltf)
+    conv = fbx_converter.FBXConverter()
+    conv.log_operation = lambda *a, **k: None
+
+    src = tmp_path / "m.fbx"
+    src.write_bytes(b"Kaydara FBX Binary")
+    assert conv.convert(str(src), str(tmp_path / "out" / "model.glb")) is False
+    assert conv._probe_thread is None
+    assert tool_runner.stats()["running"].get("fbx_probe", 0) == 0
@@ -0,0 +1,90 @@
+"""FBX texture embedding keeps images in the GLB BIN chunk.
+
+base64 data URIs inflate textures by a third and force a decode on every
+load, so the FBX post-processor must store images as bufferViews.
+"""
+
+import base64
+import io
+
+import numpy as np
+import trimesh
+from PIL import Image as PILImage
+from pygltflib import GLTF2, Image
+
+from converters.fbx_converter import FBXConverter, _gltf_image_bytes
+from converters.glb_quality import BlobBuilder
+
+
+def _png(color=(200, 40, 40)):
+    buf = io.BytesIO()
+    PILImage.new("RGB", (16, 16), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _textured_glb(tmp_path):
+    mesh = trimesh.creation.box()
+    material = trimesh.visual.material.PBRMaterial(
+        baseColorTexture=PILImage.open(io.BytesIO(_png()))
+    )
+    mesh.visual = trimesh.visual.TextureVisuals(
+        uv=np.zeros((len(mesh.vertices), 2)), material=material
+    )
+    path = tmp_path / "model.glb"
+    path.write_bytes(trimesh.Scene([mesh]).export(file_type="glb"))
+    return str(path)
+
+
+def _converter():
+    conv = FBXConverter()
+    conv.log_operation = lambda *a, **k: None
+    return conv
+
+
+def test_blob_builder_aligns_and_commits_once():
+    gltf = GLTF2().load_from_bytes(trimesh.Scene([trimesh.creation.box()]).export(file_type="glb"))
+    original = gltf.binary_blob()
+    builder = BlobBuilder(gltf)
+    first = builder.append(b"abc")
+    second = builder.append(b"defgh")
+    assert first % 4 == 0 and second % 4 == 0 and second >= first + 3
+    assert gltf.binary_blob() == original  # nothing written before commit
+    assert builder.commit() is True
+    blob = gltf.binary_blob()
+    assert blob[:len(original)] == original
+    assert blob[first:first + 3] == b"abc" and blob[second:second + 5] == b"defgh"
+    assert len(blob) % 4 == 0 and gltf.buffers[0].byteLength == len(blob)
+    assert builder.commit() is False
+
+
+def test_embed_moves_data_uri_images_into_bin(tmp_path):
+    glb = _textured_glb(tmp_path)
+    gltf = GLTF2().load(glb)
+    extra = _png((10, 200, 10))
+    gltf.images.append(Image(uri="data:image/png;base64," + base64.b64encode(extra).decode()))
+    gltf.save(glb)
+
+    _converter()._embed_external_textures(glb, str(tmp_path / "model.fbx"))
+
+    out = GLTF2().load(glb)
+    assert all(img.uri is None and img.bufferView is not None for img in out.images)
+    assert all(img.mimeType == "image/png" for img in out.images)
+    assert _gltf_image_bytes(out, len(out.images) - 1) == extra
+
+
+def test_embed_gltf_recovers_texture_as_buffer_view(tmp_path):
+    glb = _textured_glb(tmp_path)
+    gltf = GLTF2().load(glb)
+    gltf.materials[0].name = "skin"
+    gltf.materials[0].pbrMetallicRoughness.baseColorTexture = None
+    tex = _png((0, 0, 255))
+    (tmp_path / "skin.png").write_bytes(tex)
+
+    conv = _converter()
+    conv._fbx_material_textures = {"skin": "skin.png"}
+    conv._embed_external_textures_gltf(gltf, str(tmp_path / "model.fbx"))
+
+    img_idx = gltf.textures[gltf.materials[0].pbrMetallicRoughness.baseColorTexture.index].source
+    img = gltf.images[img_idx]
+    assert img.uri is None and img.mimeType == "image/png"
+    assert _gltf_image_bytes(gltf, img_idx) == tex
@@ -0,0 +1,119 @@
+"""Reachability compaction: repeated edits must not grow the GLB."""
+
+import base64
+import io
+
+import numpy as np
+import trimesh
+from PIL import Image
+from pygltflib import (
+    GLTF2, Accessor, Animation, AnimationChannel, AnimationChannelTarget,
+    AnimationSampler, BufferView, Node,
+)
+
+from converters.glb_quality import BlobBuilder, compact_glb, compact_gltf
+from glb_modifier import modify_glb
+
+
+def _box_glb(path):
+    path.write_bytes(trimesh.creation.box().export(file_type="glb"))
+    return path
+
+
+def _texture(seed):
+    rng = np.random.default_rng(seed)
+    img = Image.fromarray(rng.integers(0, 255, (128, 128, 3), dtype=np.uint8))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def _add_accessor(gltf, builder, array, type_):
+    offset = builder.append(array.tobytes())
+    gltf.bufferViews.append(BufferView(buffer=0, byteOffset=offset, byteLength=array.nbytes))
+    gltf.accessors.append(Accessor(
+        bufferView=len(gltf.bufferViews) - 1, componentType=5126,
+        count=len(array), type=type_,
+        min=[float(array.min())] if type_ == "SCALAR" else None,
+        max=[float(array.max())] if type_ == "SCALAR" else None,
+    ))
+    return len(gltf.accessors) - 1
+
+
+def test_texture_swaps_do_not_accumulate(tmp_path):
+    path = _box_glb(tmp_path / "model.glb")
+    assert modify_glb(str(path), str(path), {"material": {"texture": _texture(1)}})
+    single = path.stat().st_size
+    for seed in (2, 3, 4):
+        assert modify_glb(str(path), str(path), {"material": {"texture": _texture(seed)}})
+
+    gltf = GLTF2().load(str(path))
+    assert len(gltf.images) == 1 and len(gltf.textures) == 1
+    assert path.stat().st_size < single * 1.2
+
+
+def test_orphans_dropped_and_animation_data_kept(tmp_path):
+    path = _box_glb(tmp_path / "model.glb")
+    gltf = GLTF2().load(str(path))
+    builder = BlobBuilder(gltf)
+    # Orphan: an accessor + view nothing references, plus a stray mesh.
+    _add_accessor(gltf, builder, np.zeros((1000, 3), dtype=np.float32), "VEC3")
+    gltf.meshes.append(gltf.meshes[0])
+    # Reachable only through an animation sampler.
+    times = _add_accessor(gltf, builder, np.array([0.0, 1.0], dtype=np.float32), "SCALAR")
+    moves = _add_accessor(gltf, builder, np.zeros((2, 3), dtype=np.float32), "VEC3")
+    gltf.animations = [Animation(
+        samplers=[AnimationSampler(input=times, output=moves)],
+        channels=[AnimationChannel(sampler=0, target=AnimationChannelTarget(node=0, path="translation"))],
+    )]
+    builder.commit()
+    gltf.save(str(path))
+    before = path.stat().st_size
+
+    stats = compact_glb(str(path))
+    assert stats["meshes"] == 1 and stats["accessors"] == 1 and stats["bufferViews"] == 1
+    assert path.stat().st_size < before - 10_000
+
+    gltf = GLTF2().load(str(path))
+    sampler = gltf.animations[0].samplers[0]
+    assert gltf.accessors[sampler.input].count == 2
+    assert gltf.accessors[sampler.output].type == "VEC3"
+    mesh = trimesh.load(str(path), force="mesh")
+    assert len(mesh.vertices) == 8 or len(mesh.faces) == 12
+    # A second pass has nothing left to do.
+    assert compact_glb(str(path)) is None
+
+
+def test_unknown_extensions_are_left_alone(tmp_path):
+    gltf = GLTF2().load(str(_box_glb(tmp_path / "model.glb")))
+    gltf.extensionsUsed = ["KHR_draco_mesh_compression"]
+    gltf.bufferViews.append(BufferView(buffer=0, byteOffset=0, byteLength=4))
+    assert compact_gltf(gltf) is None
+
+
+def test_failed_compaction_saves_uncompacted_glb(tmp_path, monkeypatch):
+    from pygltflib import Material
+
+    import converters.glb_quality as glb_quality
+
+    src = _box_glb(tmp_path / "model.glb")
+    gltf = GLTF2().load(str(src))
+    # an unreachable material ahead of the used one forces an index remap
+    if not gltf.materials:
+        gltf.materials.append(Material(name="used"))
+    gltf.materials.insert(0, Material(name="orphan"))
+    for prim in gltf.meshes[0].primitives:
+        prim.material = (prim.material or 0) + 1
+    gltf.save(str(src))
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("repack failed")
+
+    monkeypatch.setattr(glb_quality, "repack_binary", boom)
+    out = tmp_path / "out.glb"
+    assert modify_glb(str(src), str(out), {"transform": {"scale": 2.0, "bake": True}})
+
+    saved = GLTF2().load(str(out))
+    assert [m.name for m in saved.materials][0] == "orphan"
+    assert saved.meshes[0].primitives[0].material == 1
+    assert np.allclose(trimesh.load(str(out), force="mesh").extents, [2.0, 2.0, 2.0])
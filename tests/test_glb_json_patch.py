@@ -0,0 +1,109 @@
+"""JSON-chunk-only GLB edits: only the JSON chunk is rewritten, the BIN
+chunk is copied through byte for byte."""
+
+import os
+import uuid
+
+import numpy as np
+import pytest
+import trimesh
+from pygltflib import GLTF2
+
+from app import app
+from glb_modifier import patch_glb_json, read_glb_json, recolor_gltf_json
+from models import UserModel, db
+
+
+def _tail(path):
+    _, offset = read_glb_json(str(path))
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        return fh.read()
+
+
+def _vertex_colored_box(path):
+    box = trimesh.creation.box()
+    box.visual = trimesh.visual.ColorVisuals(
+        vertex_colors=np.tile([255, 0, 0, 255], (len(box.vertices), 1)).astype(np.uint8)
+    )
+    path.write_bytes(box.export(file_type="glb"))
+    return path
+
+
+def test_recolor_rewrites_only_json_chunk(tmp_path):
+    src = _vertex_colored_box(tmp_path / "model.glb")
+    tail = _tail(src)
+    assert "COLOR_0" in read_glb_json(str(src))[0]["meshes"][0]["primitives"][0]["attributes"]
+
+    out = tmp_path / "out.glb"
+    assert patch_glb_json(str(src), str(out), lambda doc: recolor_gltf_json(doc, "#808080")) == 1
+
+    assert _tail(out) == tail
+    gltf = GLTF2().load(str(out))  # still a valid GLB
+    prim = gltf.meshes[0].primitives[0]
+    assert prim.attributes.COLOR_0 is None
+    factor = gltf.materials[prim.material].pbrMetallicRoughness.baseColorFactor
+    # sRGB 0x80 in linear space, like the converters write it
+    assert factor[:3] == pytest.approx([0.2158605] * 3, abs=1e-4)
+    assert factor[3] == 1.0
+
+
+def test_recolor_keeps_textured_materials():
+    doc = {"materials": [
+        {"pbrMetallicRoughness": {"baseColorTexture": {"index": 0}}},
+        {"pbrMetallicRoughness": {}, "alphaMode": "MASK"},
+        {"pbrMetallicRoughness": {}},
+    ]}
+    assert recolor_gltf_json(doc, "#ffffff") == 1
+    assert "baseColorFactor" not in doc["materials"][0]["pbrMetallicRoughness"]
+    assert "baseColorFactor" not in doc["materials"][1]["pbrMetallicRoughness"]
+    assert doc["materials"][2]["pbrMetallicRoughness"]["baseColorFactor"] == [1.0, 1.0, 1.0, 1.0]
+
+
+def test_update_model_color_patches_glb(client, init_database):
+    client.post("/login", data={"username": "testuser", "password": "testpassword"})
+    model_id = "test-" + uuid.uuid4().hex[:8]
+    model_dir = os.path.join(app.config["CONVERTED_FOLDER"], model_id)
+    os.makedirs(model_dir)
+    try:
+        glb_path = os.path.join(model_dir, "model.glb")
+        with open(glb_path, "wb") as fh:
+            fh.write(trimesh.creation.box().export(file_type="glb"))
+        db.session.add(UserModel(id=model_id, filename=f"{model_id}/model.glb",
+                                 file_type="glb", user_id=init_database.id))
+        db.session.commit()
+
+        # No uploads/<id> source exists: the old re-conversion path 404'd here.
+        resp = client.post("/api/update-model-color", json={"model_id": model_id, "color": "#ff0000"})
+        assert resp.status_code == 200, resp.get_json()
+        doc, _ = read_glb_json(glb_path)
+        assert all(m["pbrMetallicRoughness"]["baseColorFactor"] == [1.0, 0.0, 0.0, 1.0]
+                   for m in doc["materials"])
+        assert db.session.get(UserModel, model_id).color == "#ff0000"
+    finally:
+        import shutil
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+
+def test_material_only_edit_takes_json_path(tmp_path, monkeypatch):
+    import glb_modifier
+
+    src = tmp_path / "model.glb"
+    src.write_bytes(trimesh.creation.box().export(file_type="glb"))
+    tail = _tail(src)
+    monkeypatch.setattr(glb_modifier.GLTF2, "load", None)  # full parse must not happen
+
+    out = tmp_path / "out.glb"
+    assert glb_modifier.modify_glb(str(src), str(out), [
+        {"material": {"color": "#00ff00", "roughness": 0.3}},
+        {"material": {"opacity": 0.5, "color": "#00ff00", "metalness": 0.7}},
+    ])
+    assert _tail(out) == tail
+    material = read_glb_json(str(out))[0]["materials"][0]
+    assert material["alphaMode"] == "BLEND"
+    assert material["pbrMetallicRoughness"]["baseColorFactor"] == [0.0, 1.0, 0.0, 0.5]
+    assert material["pbrMetallicRoughness"]["roughnessFactor"] == 0.3
+    assert material["pbrMetallicRoughness"]["metallicFactor"] == 0.7
+    assert not glb_modifier.is_json_only_edit({"material": {"texture": "..."}})
+    assert glb_modifier.is_json_only_edit({"transform": {"scale": 2}})
+    assert not glb_modifier.is_json_only_edit({"transform": {"scale": 2, "bake": True}})
@@ -0,0 +1,129 @@
+"""Transform edits live on one root node; baking into the geometry is explicit."""
+
+import numpy as np
+import trimesh
+from pygltflib import GLTF2, Accessor, Attributes, Buffer, BufferView, Mesh, Node, Primitive, Scene
+
+import glb_modifier
+from glb_modifier import (
+    bake_transforms,
+    modify_glb,
+    normalize_model_to_center,
+    read_glb_json,
+    scene_bounds,
+)
+
+
+def _offset_box(path):
+    box = trimesh.creation.box(extents=(1.0, 2.0, 3.0))
+    box.apply_translation([5.0, 0.0, 0.0])
+    path.write_bytes(trimesh.Scene(box).export(file_type="glb"))
+    return path
+
+
+def _tail(path):
+    _, offset = read_glb_json(str(path))
+    return path.read_bytes()[offset:]
+
+
+def _world_vertices(path):
+    return trimesh.load(str(path), force="mesh").vertices
+
+
+def test_transform_edits_compose_on_root_node(tmp_path):
+    src = _offset_box(tmp_path / "model.glb")
+    out = tmp_path / "out.glb"
+    assert modify_glb(str(src), str(out), [
+        {"transform": {"scale": 2.0}},
+        {"transform": {"rotation": {"x": 0, "y": 90, "z": 0}}},
+    ])
+
+    # JSON-only: the geometry bytes are untouched
+    assert _tail(out) == _tail(src)
+    doc, _ = read_glb_json(str(out))
+    roots = doc["scenes"][doc["scene"]]["nodes"]
+    assert len(roots) == 1 and doc["nodes"][roots[0]]["name"] == "web_ar_edit_root"
+
+    # pivot is the model center, so the box stays centred at x=5
+    scene = trimesh.load(str(out), force="scene")
+    assert np.allclose(scene.extents, [6.0, 4.0, 2.0], atol=1e-5)
+    assert np.allclose(scene.bounds.mean(axis=0), [5.0, 0.0, 0.0], atol=1e-5)
+
+    # a second save reuses the same root instead of nesting another
+    again = tmp_path / "again.glb"
+    assert modify_glb(str(out), str(again), {"transform": {"scale": 0.5}})
+    doc, _ = read_glb_json(str(again))
+    assert len(doc["nodes"]) == len(read_glb_json(str(out))[0]["nodes"])
+    assert np.allclose(trimesh.load(str(again), force="scene").extents, [3.0, 2.0, 1.0], atol=1e-5)
+
+
+def test_bake_matches_root_transform(tmp_path):
+    src = _offset_box(tmp_path / "model.glb")
+    edited = tmp_path / "edited.glb"
+    baked = tmp_path / "baked.glb"
+    edit = {"scale": 1.5, "rotation": {"x": 30, "y": 45, "z": 0}}
+    assert modify_glb(str(src), str(edited), {"transform": edit})
+    assert modify_glb(str(src), str(baked), {"transform": dict(edit, bake=True)})
+
+    assert np.allclose(np.sort(_world_vertices(edited), axis=0),
+                       np.sort(_world_vertices(baked), axis=0), atol=1e-4)
+    gltf = GLTF2().load(str(baked))
+    root = gltf.nodes[gltf.scenes[gltf.scene].nodes[0]]
+    assert root.matrix is None
+    assert not bake_transforms(gltf)  # nothing left to bake
+    accessor = gltf.accessors[gltf.meshes[0].primitives[0].attributes.POSITION]
+    assert np.allclose(scene_bounds(gltf), [accessor.min, accessor.max], atol=1e-5)
+
+
+def test_normalize_centers_via_root(tmp_path):
+    gltf = GLTF2().load(str(_offset_box(tmp_path / "model.glb")))
+    blob = gltf.binary_blob()
+    gltf = normalize_model_to_center(gltf)
+    assert gltf.binary_blob() == blob
+    assert np.allclose(scene_bounds(gltf), [[-0.5, -1.0, -1.5], [0.5, 1.0, 1.5]])
+
+
+def _morph_triangle():
+    """One triangle with unit normals and a morph target whose NORMAL deltas
+    are not unit length (they tilt the normal as the morph weight grows)."""
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype="<f4")
+    normals = np.array([[0, 0, 1]] * 3, dtype="<f4")
+    position_deltas = np.zeros((3, 3), dtype="<f4")
+    normal_deltas = np.array([[0.3, 0, 0], [0, 0.5, 0], [0.2, 0.2, 0.4]], dtype="<f4")
+    arrays = [positions, normals, position_deltas, normal_deltas]
+    gltf = GLTF2(scene=0, scenes=[Scene(nodes=[0])], nodes=[Node(mesh=0)])
+    blob = b""
+    for index, array in enumerate(arrays):
+        gltf.bufferViews.append(BufferView(buffer=0, byteOffset=len(blob), byteLength=array.nbytes))
+        gltf.accessors.append(Accessor(bufferView=index, componentType=5126, count=3, type="VEC3",
+                                       min=array.min(axis=0).tolist(), max=array.max(axis=0).tolist()))
+        blob += array.tobytes()
+    gltf.buffers = [Buffer(byteLength=len(blob))]
+    gltf.meshes = [Mesh(primitives=[Primitive(attributes=Attributes(POSITION=0, NORMAL=1),
+                                              targets=[{"POSITION": 2, "NORMAL": 3}])])]
+    gltf.set_binary_blob(blob)
+    return gltf, normals.astype(float), normal_deltas.astype(float)
+
+
+def test_bake_keeps_morph_normal_deltas_unnormalized():
+    gltf, normals, deltas = _morph_triangle()
+    angle = np.radians(40)
+    edit = np.diag([2.0, 1.0, 0.5, 1.0])
+    edit[:3, :3] = edit[:3, :3] @ np.array([[np.cos(angle), 0, np.sin(angle)], [0, 1, 0],
+                                            [-np.sin(angle), 0, np.cos(angle)]])
+    glb_modifier._compose_root(gltf, edit)
+    assert bake_transforms(gltf)
+
+    blob = bytearray(gltf.binary_blob())
+    baked_normals = glb_modifier._accessor_view(gltf, blob, 1, 3).astype(float)
+    baked_deltas = glb_modifier._accessor_view(gltf, blob, 3, 3).astype(float)
+
+    def unit(v):
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+    normal_matrix = np.linalg.inv(edit[:3, :3]).T
+    for weight in (0.5, 1.0):
+        # What a renderer shows for the unbaked model: morph, then transform.
+        expected = unit((normals + weight * deltas) @ normal_matrix.T)
+        assert np.allclose(unit(baked_normals + weight * baked_deltas), expected, atol=1e-5)
+    assert np.allclose(np.linalg.norm(baked_normals, axis=1), 1.0, atol=1e-5)
@@ -131,15 +131,23 @@ def _make_text_job(user, stage="preview"):
 
 
 def test_claim_stage_is_atomic(client, logged_in):
-    from app import _claim_ai_stage
+    from ai_poller import claim_stage
     job = _make_text_job(logged_in)
-    assert _claim_ai_stage(job.id, "preview", "refining") is True
-    # a second concurrent poll loses the claim
-    assert _claim_ai_stage(job.id, "preview", "refining") is False
+    assert claim_stage(job.id, "preview", "refining") is True
+    # a second concurrent poller loses the claim
+    assert claim_stage(job.id, "preview", "refining") is False
+
+
+def _poll():
+    import ai_poller
+    from app import _finalize_ai_job, app
+    ai_poller._schedule.clear()  # every job due
+    for future in ai_poller.poll_once(app, _finalize_ai_job):
+        future.result()
 
 
 def test_refine_started_only_once(client, logged_in, meshy_configured, monkeypatch):
-    """Repeated polls after preview succeeds must not start duplicate
+    """Repeated rounds after preview succeeds must not start duplicate
     refine tasks (duplicate Meshy credits)."""
     job = _make_text_job(logged_in)
     calls = {"refine": 0}
@@ -155,12 +163,15 @@ def test_refine_started_only_once(client, logged_in, meshy_configured, monkeypat
         calls["refine"] += 1
         return "refine-1"
 
+    def no_list(kind, page_size=50):
+        raise ai_generator.MeshyError("list unavailable")
+
+    monkeypatch.setattr(ai_generator, "list_tasks", no_list)
     monkeypatch.setattr(ai_generator, "get_task", fake_get_task)
     monkeypatch.setattr(ai_generator, "start_refine", fake_start_refine)
 
     for _ in range(3):
-        resp = client.get(f"/api/generate-3d/{job.id}/status")
-        assert resp.status_code == 200, resp.get_json()
+        _poll()
 
     assert calls["refine"] == 1
     db.session.refresh(job)
@@ -169,33 +180,35 @@ def test_refine_started_only_once(client, logged_in, meshy_configured, monkeypat
 
 def test_finalize_failure_releases_claim(client, logged_in, meshy_configured, monkeypatch):
     """If the GLB download fails mid-finalize, the stage claim is released
-    so the next poll can retry instead of dead-locking in 'finalizing'."""
+    so the next round can retry instead of dead-locking in 'finalizing'."""
     job = _make_text_job(logged_in, stage="refine")
     job.meshy_refine_id = "refine-1"
     db.session.commit()
 
-    monkeypatch.setattr(ai_generator, "get_task",
-                        lambda kind, task_id: {"status": "SUCCEEDED", "progress": 100,
-                                               "model_urls": {"glb": "https://assets.meshy.ai/m.glb"},
-                                               "thumbnail_url": None, "task_error": None})
+    monkeypatch.setattr(ai_generator, "list_tasks",
+                        lambda kind, page_size=50: {"refine-1": {
+                            "status": "SUCCEEDED", "progress": 100,
+                            "model_urls": {"glb": "https://assets.meshy.ai/m.glb"},
+                            "thumbnail_url": None, "task_error": None}})
 
     def boom(url, dest):
         raise ai_generator.MeshyError("download blew up")
 
     monkeypatch.setattr(ai_generator, "download", boom)
 
-    resp = client.get(f"/api/generate-3d/{job.id}/status")
-    assert resp.status_code == 502
+    _poll()
     db.session.refresh(job)
-    assert job.stage == "refine"  # claim released, next poll retries
+    assert job.stage == "refine"  # claim released, next round retries
     assert job.status == "generating"
 
 
-def test_status_includes_stage(client, logged_in, meshy_configured, monkeypatch):
+def test_status_is_a_db_read(client, logged_in, meshy_configured, monkeypatch):
     job = _make_text_job(logged_in)
-    monkeypatch.setattr(ai_generator, "get_task",
-                        lambda kind, task_id: {"status": "IN_PROGRESS", "progress": 80,
-                                               "model_urls": {}, "thumbnail_url": None,
-                                               "task_error": None})
+
+    def no_meshy(*args, **kwargs):
+        raise AssertionError("status endpoint must not call Meshy")
+
+    monkeypatch.setattr(ai_generator, "get_task", no_meshy)
+    monkeypatch.setattr(ai_generator, "list_tasks", no_meshy)
     body = client.get(f"/api/generate-3d/{job.id}/status").get_json()
-    assert body["stage"] == "preview"
+    assert body["stage"] == "preview" and body["progress"] == 49
@@ -0,0 +1,69 @@
+"""LOD chain: quadric clustering decimation and stale-chain detection."""
+
+import os
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+import lod_generator
+
+
+def test_simplify_hits_ratio_and_stays_on_surface():
+    sphere = trimesh.creation.icosphere(subdivisions=5)
+    v, f, _, _ = lod_generator.simplify_mesh(sphere.vertices, sphere.faces, 0.05)
+    assert 0.01 * len(sphere.faces) < len(f) <= 0.05 * len(sphere.faces)
+    radius = np.linalg.norm(v, axis=1)
+    assert np.allclose(radius, 1.0, atol=0.02)
+    assert f.max() < len(v)
+
+
+def test_quadric_positions_keep_box_corners():
+    box = trimesh.creation.box().subdivide().subdivide().subdivide()
+    v, f, _, _ = lod_generator.simplify_mesh(box.vertices, box.faces, 0.1)
+    # Corners are well-posed quadrics; the mean would pull them inwards.
+    assert np.allclose(np.abs(v).max(axis=0), 0.5, atol=1e-6)
+    assert len(f) < len(box.faces)
+
+
+def test_textured_geometry_keeps_uvs_and_downscales_texture():
+    sphere = trimesh.creation.uv_sphere(count=[64, 64])
+    uv = np.column_stack([
+        (np.arctan2(sphere.vertices[:, 1], sphere.vertices[:, 0]) / (2 * np.pi)) % 1.0,
+        sphere.vertices[:, 2] * 0.5 + 0.5,
+    ])
+    material = trimesh.visual.material.PBRMaterial(
+        baseColorTexture=Image.new("RGB", (1024, 1024), (200, 40, 40))
+    )
+    sphere.visual = trimesh.visual.TextureVisuals(uv=uv, material=material)
+
+    out = lod_generator._simplify_geometry(sphere, 0.25, max_side=256)
+    assert len(out.faces) <= 0.25 * len(sphere.faces)
+    assert out.visual.uv.shape == (len(out.vertices), 2)
+    assert max(out.visual.material.baseColorTexture.size) == 256
+
+
+def test_build_lod_chain_writes_levels_and_detects_edits(tmp_path, monkeypatch):
+    monkeypatch.setattr(lod_generator, "LOD_MIN_TRIANGLES", 1000)
+    glb = tmp_path / "model.glb"
+    glb.write_bytes(trimesh.creation.icosphere(subdivisions=5).export(file_type="glb"))
+
+    lods = lod_generator.build_lod_chain(str(glb), ratios=[0.25, 0.05])
+    assert [lvl["filename"] for lvl in lods["levels"]] == ["model_lod1.glb", "model_lod2.glb"]
+    assert lods["levels"][0]["triangles"] > lods["levels"][1]["triangles"]
+    assert lods["levels"][1]["bytes"] < os.path.getsize(glb)
+    assert lod_generator.fresh_levels(str(glb), lods) == lods["levels"]
+
+    # Any rewrite of model.glb (an edit) makes the chain stale.
+    glb.write_bytes(trimesh.creation.icosphere(subdivisions=4).export(file_type="glb"))
+    assert lod_generator.fresh_levels(str(glb), lods) == []
+
+    lod_generator.remove_lod_files(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["model.glb"]
+
+
+def test_small_models_get_no_chain(tmp_path):
+    glb = tmp_path / "model.glb"
+    glb.write_bytes(trimesh.creation.box().export(file_type="glb"))
+    assert lod_generator.build_lod_chain(str(glb)) is None
+    assert lod_generator.fresh_levels(str(glb), None) == []
@@ -0,0 +1,119 @@
+"""Vectorized plane cut: exact geometry, interpolated attributes, capped sections."""
+
+import time
+
+import numpy as np
+import trimesh
+
+from mesh_slicer import _plane_cut, slice_mesh
+
+UP = np.array([0.0, 0.0, 1.0])
+
+
+def test_cut_matches_trimesh_and_is_watertight():
+    sphere = trimesh.creation.icosphere(subdivisions=3)
+    open_cut = _plane_cut(sphere, np.array([0, 0, 0.1]), UP)
+    other_side = _plane_cut(sphere, np.array([0, 0, 0.1]), -UP)
+    assert open_cut.vertices[:, 2].min() >= 0.1 - 1e-9
+    # The two halves partition the surface exactly.
+    assert np.isclose(open_cut.area + other_side.area, sphere.area, rtol=1e-12)
+
+    ours = _plane_cut(sphere, np.array([0, 0, 0.1]), UP, cap=True)
+    # Spherical cap of height 0.9 on the unit sphere (tessellation loses ~2%).
+    assert np.isclose(ours.volume, np.pi * 0.9 ** 2 * (3 - 0.9) / 3, rtol=0.03)
+    merged = ours.copy()
+    merged.merge_vertices()
+    assert merged.is_watertight and merged.volume > 0
+
+    # Section with a hole (torus through its equator).
+    torus = _plane_cut(trimesh.creation.torus(major_radius=1, minor_radius=0.3), np.zeros(3), UP, cap=True)
+    torus.merge_vertices()
+    assert torus.is_watertight and torus.is_winding_consistent and torus.volume > 0
+
+    # Plane through existing vertices: no duplicate cut vertices, still closed.
+    box = trimesh.creation.box()
+    halved = _plane_cut(box, np.zeros(3), UP, cap=True)
+    assert np.isclose(halved.volume, 0.5)
+
+
+def test_interpolates_uv_and_colors():
+    plane = trimesh.creation.box(extents=(1, 1, 1))
+    uv = plane.vertices[:, [0, 2]] + 0.5   # u = x, v = z (both 0..1)
+    textured = plane.copy()
+    textured.visual = trimesh.visual.TextureVisuals(uv=uv)
+    cut = _plane_cut(textured, np.array([0, 0, 0.25]), UP)
+    assert cut.vertices[:, 2].min() >= 0.25 - 1e-9
+    assert np.allclose(cut.visual.uv[:, 1], cut.vertices[:, 2] + 0.5)
+
+    colored = plane.copy()
+    colors = np.zeros((len(plane.vertices), 4), dtype=np.uint8)
+    colors[:, 0] = np.where(plane.vertices[:, 2] > 0, 255, 0)
+    colors[:, 3] = 255
+    colored.visual = trimesh.visual.ColorVisuals(colored, vertex_colors=colors)
+    cut = _plane_cut(colored, np.zeros(3), UP)
+    on_cut = np.isclose(cut.vertices[:, 2], 0)
+    assert on_cut.any() and np.all(np.abs(cut.visual.vertex_colors[on_cut, 0].astype(int) - 128) <= 1)
+
+
+def test_large_mesh_is_fast(tmp_path):
+    sphere = trimesh.creation.icosphere(subdivisions=7)  # ~330k faces
+    start = time.perf_counter()
+    cut = _plane_cut(sphere, np.zeros(3), UP, cap=False)
+    assert time.perf_counter() - start < 5
+    assert abs(len(cut.faces) - len(sphere.faces) / 2) < len(sphere.faces) * 0.02
+
+
+def test_slice_mesh_end_to_end(tmp_path):
+    src, dst = tmp_path / "in.glb", tmp_path / "out.glb"
+    src.write_bytes(trimesh.Scene(trimesh.creation.box()).export(file_type="glb"))
+    assert slice_mesh(str(src), str(dst), [0, 0, 0], [0, 0, 1], keep_side="negative")
+    bounds = trimesh.load(str(dst), force="mesh").bounds
+    assert np.allclose(bounds, [[-0.5, -0.5, -0.5], [0.5, 0.5, 0.0]])
+
+
+def test_world_mesh_cache(tmp_path):
+    import os
+
+    import mesh_cache
+    from mesh_slicer import get_mesh_bounds
+
+    mesh_cache.clear()
+    src = tmp_path / "model.glb"
+    src.write_bytes(trimesh.Scene(trimesh.creation.box()).export(file_type="glb"))
+    before = mesh_cache.stats()
+    assert get_mesh_bounds(str(src))["max"]["z"] == 0.5
+    assert get_mesh_bounds(str(src))["max"]["z"] == 0.5
+    # A byte-identical copy is served by content hash without parsing.
+    copy = tmp_path / "copy.glb"
+    copy.write_bytes(src.read_bytes())
+    assert mesh_cache.world_meshes(str(copy)) is mesh_cache.world_meshes(str(src))
+    after = mesh_cache.stats()
+    assert after["misses"] - before.get("misses", 0) == 1
+    assert after["hits"] - before.get("hits", 0) == 2
+
+    # Rewriting the file (new size/mtime) is picked up even without invalidate().
+    src.write_bytes(trimesh.Scene(trimesh.creation.box(extents=(2, 2, 2))).export(file_type="glb"))
+    os.utime(src, ns=(0, 1))
+    assert get_mesh_bounds(str(src))["max"]["z"] == 1.0
+    mesh_cache.invalidate(str(src))
+    mesh_cache.invalidate(str(copy))
+    assert mesh_cache.stats()["entries"] == 0
+
+
+def test_world_mesh_cache_counts_texture_images(tmp_path):
+    from PIL import Image
+
+    import mesh_cache
+
+    box = trimesh.creation.box()
+    plain = mesh_cache._mesh_nbytes(box)
+    texture = Image.new("RGBA", (256, 256))
+    box.visual = trimesh.visual.TextureVisuals(
+        uv=np.zeros((len(box.vertices), 2)),
+        material=trimesh.visual.material.PBRMaterial(baseColorTexture=texture),
+    )
+    seen = set()
+    textured = mesh_cache._mesh_nbytes(box, seen)
+    assert textured - plain >= 256 * 256 * 4
+    # The same image on a second mesh of the scene is not counted again.
+    assert mesh_cache._mesh_nbytes(box, seen) == textured - 256 * 256 * 4
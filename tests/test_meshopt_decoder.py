@@ -0,0 +1,157 @@
+"""Meshopt decoding: gltfpack output must be editable, not refused."""
+
+import numpy as np
+import pytest
+import trimesh
+from pygltflib import GLTF2, Accessor, Asset, Attributes, Buffer, BufferView, Mesh, Node, Primitive, Scene
+
+from converters.glb_optimizer import glb_requires_meshopt
+from converters.meshopt_decoder import (
+    MeshoptDecodeError,
+    decode_index_buffer,
+    decode_index_sequence,
+    decode_vertex_buffer,
+    filter_exponential,
+    filter_octahedral,
+    filter_quaternion,
+    load_trimesh,
+)
+from glb_modifier import modify_glb
+
+# Streams produced by the reference encoder (meshoptimizer 0.2x) for
+# trimesh.creation.box().
+BOX_VERTICES = np.array(
+    [[-0.5, -0.5, -0.5], [-0.5, -0.5, 0.5], [-0.5, 0.5, -0.5], [-0.5, 0.5, 0.5],
+     [0.5, -0.5, -0.5], [0.5, -0.5, 0.5], [0.5, 0.5, -0.5], [0.5, 0.5, 0.5]],
+    dtype=np.float32,
+)
+BOX_FACES = [1, 3, 0, 4, 1, 0, 0, 3, 2, 2, 4, 0, 1, 7, 3, 5, 1, 4,
+             5, 7, 1, 3, 7, 2, 6, 4, 2, 2, 7, 6, 6, 5, 4, 7, 5, 6]
+# float32 positions, vertex codec v1
+POSITIONS_V1 = bytes.fromhex(
+    "a16a6aea001000ff005400ffffff00ffffffffffffff000000000000000000000000"
+    "bf000000bf000000bf000000"
+)
+# uint16 positions ((v + 0.5) * 1000, padded to 8 bytes), vertex codec v0
+QUANTIZED_V0 = bytes.fromhex(
+    "a00100c000002f0100c0000006010ccc00002f302f010ccc0000060506013fff0000"
+    "2f302f302f302f0206565656" + "00" * 38
+)
+# The triangle codec may rotate each triangle's corners (winding is kept).
+ROTATED_FACES = [0, 1, 3, 1, 0, 4, 0, 3, 2, 0, 2, 4, 3, 1, 7, 1, 4, 5,
+                 1, 5, 7, 3, 7, 2, 4, 2, 6, 6, 2, 7, 4, 6, 5, 5, 6, 7]
+INDICES_V1 = bytes.fromhex("e1fe2e20017f6f01429e1221120f060603007687566778a9866589689801690000")
+SEQUENCE_V1 = bytes.fromhex(
+    "d104080a100a02000c0200080e04180e080e0c0408160810121006060014020002020c060400000000"
+)
+
+
+def _quantized():
+    q = np.zeros((8, 4), dtype=np.uint16)
+    q[:, :3] = np.round((BOX_VERTICES + 0.5) * 1000)
+    return q
+
+
+def test_codecs_match_reference_streams():
+    assert decode_vertex_buffer(POSITIONS_V1, 8, 12) == BOX_VERTICES.tobytes()
+    assert decode_vertex_buffer(QUANTIZED_V0, 8, 8) == _quantized().tobytes()
+    rotated = np.array(ROTATED_FACES, dtype=np.uint32)
+    assert decode_index_buffer(INDICES_V1, 36, 4) == rotated.tobytes()
+    assert decode_index_buffer(INDICES_V1, 36, 2) == rotated.astype(np.uint16).tobytes()
+    expected = np.array(BOX_FACES, dtype=np.uint32)
+    assert decode_index_sequence(SEQUENCE_V1, 36, 4) == expected.tobytes()
+
+
+def test_filters():
+    up = np.array([0, 0, 127, 9], dtype=np.int8)
+    assert np.frombuffer(filter_octahedral(up.tobytes(), 1, 4), np.int8).tolist() == [0, 0, 127, 9]
+    # Identity quaternion: x/y/z zero, w is the dropped (max) component 3.
+    identity = np.array([0, 0, 0, (0x7F << 2) | 3], dtype=np.int16)
+    assert np.frombuffer(filter_quaternion(identity.tobytes(), 1, 8), np.int16).tolist() == [0, 0, 0, 32767]
+    # 3 * 2^-1
+    packed = np.array([(0xFF << 24) | 3], dtype=np.uint32)
+    assert np.frombuffer(filter_exponential(packed.tobytes(), 1, 4), np.float32).tolist() == [1.5]
+
+
+def test_corrupt_streams_raise():
+    with pytest.raises(MeshoptDecodeError):
+        decode_vertex_buffer(POSITIONS_V1[:-8], 8, 12)
+    with pytest.raises(MeshoptDecodeError):
+        decode_vertex_buffer(b"\xa7" + POSITIONS_V1[1:], 8, 12)
+    with pytest.raises(MeshoptDecodeError):
+        decode_index_buffer(INDICES_V1 + b"\x00", 36, 4)
+
+
+def _gltfpack_style_glb(path):
+    """A box laid out like gltfpack -cc output: quantized + meshopt streams."""
+    blob = QUANTIZED_V0 + b"\x00" * (-len(QUANTIZED_V0) % 4)
+    index_offset = len(blob)
+    blob += INDICES_V1 + b"\x00" * (-len(INDICES_V1) % 4)
+    ext = "EXT_meshopt_compression"
+    gltf = GLTF2(
+        asset=Asset(version="2.0"),
+        extensionsUsed=[ext, "KHR_mesh_quantization"],
+        extensionsRequired=[ext, "KHR_mesh_quantization"],
+        buffers=[
+            Buffer(byteLength=len(blob)),
+            Buffer(byteLength=64 + 144, extensions={ext: {"fallback": True}}),
+        ],
+        bufferViews=[
+            BufferView(buffer=1, byteOffset=0, byteLength=64, byteStride=8, target=34962,
+                       extensions={ext: {"buffer": 0, "byteOffset": 0, "byteLength": len(QUANTIZED_V0),
+                                         "byteStride": 8, "count": 8, "mode": "ATTRIBUTES"}}),
+            BufferView(buffer=1, byteOffset=64, byteLength=144, target=34963,
+                       extensions={ext: {"buffer": 0, "byteOffset": index_offset,
+                                         "byteLength": len(INDICES_V1), "byteStride": 4,
+                                         "count": 36, "mode": "TRIANGLES"}}),
+        ],
+        accessors=[
+            Accessor(bufferView=0, componentType=5123, count=8, type="VEC3",
+                     min=[0, 0, 0], max=[1000, 1000, 1000]),
+            Accessor(bufferView=1, componentType=5125, count=36, type="SCALAR"),
+        ],
+        meshes=[Mesh(primitives=[Primitive(attributes=Attributes(POSITION=0), indices=1)])],
+        # gltfpack moves the dequantization transform onto the node.
+        nodes=[Node(mesh=0, scale=[0.001] * 3, translation=[-0.5] * 3)],
+        scenes=[Scene(nodes=[0])],
+        scene=0,
+    )
+    gltf.set_binary_blob(blob)
+    gltf.save(str(path))
+    return path
+
+
+def test_gltfpack_output_loads_and_edits(tmp_path):
+    path = _gltfpack_style_glb(tmp_path / "model.glb")
+    with pytest.raises(Exception):
+        trimesh.load(str(path), force="mesh")
+
+    mesh = load_trimesh(str(path), force="mesh")
+    assert len(mesh.faces) == 12
+    assert np.allclose(mesh.bounds, [[-0.5] * 3, [0.5] * 3], atol=1e-6)
+
+    # Material-only edits patch the JSON chunk; the compressed BIN stays.
+    recolored = tmp_path / "recolored.glb"
+    assert modify_glb(str(path), str(recolored), {"material": {"color": "#ff0000"}})
+    assert glb_requires_meshopt(str(recolored))
+    assert np.allclose(load_trimesh(str(recolored), force="mesh").bounds, mesh.bounds)
+
+    out = tmp_path / "edited.glb"
+    assert modify_glb(str(path), str(out), {"material": {"color": "#ff0000"}, "transform": {"bake": True}})
+    gltf = GLTF2().load(str(out))
+    assert not set(gltf.extensionsUsed or []) & {"EXT_meshopt_compression", "KHR_mesh_quantization"}
+    assert len(gltf.buffers) == 1
+    assert gltf.accessors[gltf.meshes[0].primitives[0].attributes.POSITION].componentType == 5126
+    edited = trimesh.load(str(out), force="mesh")
+    assert np.allclose(edited.bounds, [[-0.5] * 3, [0.5] * 3], atol=1e-6)
+
+
+def test_plain_glb_loads_without_pygltflib_parse(tmp_path, monkeypatch):
+    import trimesh
+    from pygltflib import GLTF2
+
+    path = tmp_path / "plain.glb"
+    path.write_bytes(trimesh.creation.box().export(file_type="glb"))
+    monkeypatch.setattr(GLTF2, "load", None)  # a full parse must not happen
+    assert not glb_requires_meshopt(str(path))
+    assert np.allclose(load_trimesh(str(path), force="mesh").extents, [1.0, 1.0, 1.0])
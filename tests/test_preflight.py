@@ -0,0 +1,106 @@
+"""Pre-flight complexity estimates come from headers, not full loads."""
+
+import io
+import struct
+
+import pytest
+import trimesh
+
+from converters import preflight
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _fbx_node(name, props=b"", children=b"", offset=0, num_props=0):
+    """Binary FBX (7.4, 32-bit offsets) node record starting at `offset`."""
+    header_len = 13 + len(name)
+    body = props + children
+    if children:
+        body += b"\x00" * 13  # null record closing the nested list
+    end = offset + header_len + len(body)
+    return struct.pack("<IIIB", end, num_props, len(props), len(name)) + name.encode() + body
+
+
+def _fbx_array(kind, count):
+    return kind + struct.pack("<III", count, 0, 0)
+
+
+def test_binary_stl_uses_header_count(tmp_path):
+    path = _write(tmp_path, "m.stl", trimesh.creation.icosphere(3).export(file_type="stl"))
+    est = preflight.estimate_complexity(path)
+    assert est["triangles"] == 1280 and est["method"] == "stl-binary-header"
+
+
+def test_ascii_stl_counts_facets(tmp_path):
+    data = trimesh.creation.box().export(file_type="stl_ascii")
+    path = _write(tmp_path, "m.stl", data.encode() if isinstance(data, str) else data)
+    assert preflight.estimate_complexity(path)["triangles"] == 12
+
+
+def test_obj_counts_vertices_and_fans_quads(tmp_path):
+    lines = ["v 0 0 0", "v 1 0 0", "v 1 1 0", "v 0 1 0", "f 1 2 3 4", "f 1 2 3"]
+    path = _write(tmp_path, "m.obj", "\n".join(lines).encode())
+    est = preflight.estimate_complexity(path)
+    assert est["vertices"] == 4
+    assert est["triangles"] == 3  # quad (2) + tri (1), via the sampled average
+    assert est["exact"] is False
+
+
+def test_glb_reads_json_chunk_only(tmp_path):
+    mesh = trimesh.creation.icosphere(2)
+    path = _write(tmp_path, "m.glb", trimesh.Scene([mesh]).export(file_type="glb"))
+    est = preflight.estimate_complexity(path)
+    assert est["triangles"] == len(mesh.faces) and est["vertices"] == len(mesh.vertices)
+
+
+def test_binary_fbx_reads_array_lengths_from_node_headers(tmp_path):
+    head = b"Kaydara FBX Binary  \x00\x1a\x00" + struct.pack("<I", 7400)
+    start = len(head)
+    geom_start = start + 13 + len("Objects")
+    verts_start = geom_start + 13 + len("Geometry")
+    verts = _fbx_node("Vertices", _fbx_array(b"d", 300), offset=verts_start, num_props=1)
+    pvi = _fbx_node("PolygonVertexIndex", _fbx_array(b"i", 600),
+                    offset=verts_start + len(verts), num_props=1)
+    geometry = _fbx_node("Geometry", children=verts + pvi, offset=geom_start)
+    objects = _fbx_node("Objects", children=geometry, offset=start)
+    path = _write(tmp_path, "m.fbx", head + objects + b"\x00" * 13)
+
+    est = preflight.estimate_complexity(path)
+    assert est["vertices"] == 100 and est["triangles"] == 200
+    assert est["nodes"]["Geometry"] == 1 and est["exact"] is False
+
+
+def test_assess_routes_and_rejects(monkeypatch):
+    small = {"format": "obj", "triangles": 10, "vertices": 10, "peak_mem_mb": 201}
+    assert preflight.assess(small) == "standard"
+    monkeypatch.setattr(preflight, "HEAVY_TRIANGLES", 5)
+    assert preflight.assess(small) == "heavy"
+    monkeypatch.setattr(preflight, "MAX_TRIANGLES", 5)
+    with pytest.raises(preflight.PreflightRejected):
+        preflight.assess(small)
+
+
+def test_vertex_heavy_model_is_routed_not_rejected(monkeypatch):
+    # MAX_MODEL_VERTICES only skips version snapshots; it must not refuse uploads.
+    monkeypatch.setattr(preflight, "HEAVY_VERTICES", 5)
+    est = {"format": "obj", "triangles": 10, "vertices": 10, "peak_mem_mb": 201}
+    assert preflight.assess(est) == "heavy"
+
+
+def test_upload_rejects_oversized_model_before_conversion(client, monkeypatch):
+    from models import ConversionJob
+
+    monkeypatch.setattr(preflight, "MAX_TRIANGLES", 5)
+    stl = trimesh.creation.box().export(file_type="stl")
+    resp = client.post(
+        "/upload_model",
+        data={"file": (io.BytesIO(stl), "box.stl")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 413
+    assert resp.get_json()["estimate"]["triangles"] == 12
+    assert ConversionJob.query.count() == 0
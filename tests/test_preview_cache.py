@@ -0,0 +1,123 @@
+"""apply_modifications previews: cached by content + edit, bounded, never
+written into the model's converted directory."""
+
+import errno
+import os
+import shutil
+from collections import namedtuple
+import time
+import uuid
+
+import pytest
+import trimesh
+
+import app as app_module
+import preview_cache
+from app import app
+from models import UserModel, db
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_cache, "PREVIEW_CACHE_DIR", str(tmp_path / "previews"))
+    monkeypatch.setattr(preview_cache, "PREVIEW_FALLBACK_DIR", str(tmp_path / "fallback"))
+    return tmp_path / "previews"
+
+
+@pytest.fixture
+def model_id(client):
+    model_id = "test-" + uuid.uuid4().hex[:8]
+    model_dir = os.path.join(app.config["CONVERTED_FOLDER"], model_id)
+    os.makedirs(model_dir)
+    with open(os.path.join(model_dir, "model.glb"), "wb") as fh:
+        fh.write(trimesh.creation.box().export(file_type="glb"))
+    db.session.add(UserModel(id=model_id, filename=f"{model_id}/model.glb", file_type="glb"))
+    db.session.commit()
+    yield model_id
+    shutil.rmtree(model_dir, ignore_errors=True)
+
+
+def test_identical_previews_are_built_once(client, cache_dir, model_id, monkeypatch):
+    builds = []
+    real_modify = app_module.modify_glb
+    monkeypatch.setattr(app_module, "modify_glb",
+                        lambda *args: builds.append(args) or real_modify(*args))
+
+    payload = {"model_id": model_id, "modifications": {"material": {"color": "#ff0000", "roughness": 0.5}}}
+    first = client.post("/apply_modifications", json=payload).get_json()
+    # same edit, different key order
+    payload["modifications"] = {"material": {"roughness": 0.5, "color": "#ff0000"}}
+    second = client.post("/apply_modifications", json=payload).get_json()
+
+    assert first["success"] and first["download_url"] == second["download_url"]
+    assert len(builds) == 1
+    assert not [n for n in os.listdir(os.path.join(app.config["CONVERTED_FOLDER"], model_id))
+                if n.startswith("modified_")]
+
+    resp = client.get(first["download_url"])
+    assert resp.status_code == 200 and resp.data[:4] == b"glTF"
+    assert client.get(f"/download_modified/{model_id}/{'0' * 64}.glb").status_code == 404
+
+
+def test_evicts_expired_then_oldest(cache_dir, monkeypatch):
+    monkeypatch.setattr(preview_cache, "PREVIEW_CACHE_MAX_MB", 1)
+    model_dir = cache_dir / "m"
+    model_dir.mkdir(parents=True)
+    now = time.time()
+    ages = {"a": 10, "b": 20, "c": 30, "old": preview_cache.PREVIEW_CACHE_TTL_SECONDS + 5}
+    for name, age in ages.items():
+        path = model_dir / f"{name}.glb"
+        path.write_bytes(b"\0" * 400 * 1024)
+        os.utime(path, (now - age, now - age))
+
+    preview_cache.evict(now)
+    # "old" expired; of the rest only the two newest fit in 1 MiB
+    assert sorted(os.listdir(model_dir)) == ["a.glb", "b.glb"]
+
+
+def _fill(model_dir, ages, size=400 * 1024):
+    model_dir.mkdir(parents=True)
+    now = time.time()
+    for name, age in ages.items():
+        path = model_dir / f"{name}.glb"
+        path.write_bytes(b"\0" * size)
+        os.utime(path, (now - age, now - age))
+    return now
+
+
+def test_budget_shrinks_with_free_space(cache_dir, monkeypatch):
+    usage = namedtuple("usage", "total used free")
+    monkeypatch.setattr(preview_cache.shutil, "disk_usage",
+                        lambda path: usage(10**9, 10**9 - 600 * 1024, 600 * 1024))
+    model_dir = cache_dir / "m"
+    now = _fill(model_dir, {"a": 10, "b": 20, "c": 30})
+
+    preview_cache.evict(now)
+    # half of (1200 KiB held + 600 KiB free) leaves room for two
+    assert sorted(os.listdir(model_dir)) == ["a.glb", "b.glb"]
+
+
+def test_full_cache_dir_falls_back_to_disk(cache_dir, tmp_path):
+    glb = tmp_path / "model.glb"
+    glb.write_bytes(trimesh.creation.box().export(file_type="glb"))
+
+    def build(src, dest, modifications):
+        if dest.startswith(str(cache_dir)):
+            raise OSError(errno.ENOSPC, "No space left on device")
+        shutil.copyfile(src, dest)
+        return True
+
+    filename, hit = preview_cache.get_or_build("m", str(glb), {"n": 1}, build)
+    assert filename and not hit
+    assert preview_cache.lookup("m", filename).startswith(str(tmp_path / "fallback"))
+    assert preview_cache.get_or_build("m", str(glb), {"n": 1}, build) == (filename, True)
+
+
+def test_open_preview_survives_eviction(cache_dir):
+    model_dir = cache_dir / "m"
+    _fill(model_dir, {"a" * 64: 1}, size=1024)
+    fh, size = preview_cache.open_preview("m", f"{'a' * 64}.glb")
+    with fh:
+        os.remove(model_dir / f"{'a' * 64}.glb")  # evicted mid-download
+        assert size == 1024 and len(fh.read()) == 1024
+    assert preview_cache.open_preview("m", f"{'a' * 64}.glb") is None
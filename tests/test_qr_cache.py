@@ -0,0 +1,80 @@
+"""QR codes are a pure function of (viewer URL, size, format): served with a
+stable ETag, rendered once, cached inside the model's directory."""
+
+import os
+import shutil
+import uuid
+
+import pytest
+
+import qr_cache
+from app import app
+
+
+@pytest.fixture
+def model_dir(client):
+    model_id = "test-" + uuid.uuid4().hex[:8]
+    path = os.path.join(app.config["CONVERTED_FOLDER"], model_id)
+    os.makedirs(path)  # no UserModel row: the route must not need one
+    yield model_id, path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _no_render(*args):
+    raise AssertionError("QR code rendered again")
+
+
+def test_png_rendered_once_into_model_dir(client, model_dir, monkeypatch):
+    model_id, path = model_dir
+    first = client.get(f"/qr/{model_id}.png?size=300")
+    assert first.status_code == 200 and first.data[:8] == b"\x89PNG\r\n\x1a\n"
+    etag = first.headers["ETag"].strip('"')
+    assert os.listdir(os.path.join(path, "qr")) == [f"{etag}.png"]
+    assert "immutable" in first.headers["Cache-Control"]
+
+    monkeypatch.setattr(qr_cache, "render_png", _no_render)
+    again = client.get(f"/qr/{model_id}.png?size=300")
+    assert again.data == first.data and again.headers["ETag"] == first.headers["ETag"]
+    assert client.get(f"/qr/{model_id}.png?size=300",
+                      headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    # sizes round up to one of QR_SIZES: 300 and 500 are the same code
+    assert client.get(f"/qr/{model_id}.png?size=500").headers["ETag"] == first.headers["ETag"]
+    monkeypatch.undo()
+    assert client.get(f"/qr/{model_id}.png?size=600").headers["ETag"] != first.headers["ETag"]
+
+
+def test_svg_is_compact_and_cached(client, model_dir, monkeypatch):
+    model_id, _ = model_dir
+    resp = client.get(f"/qr/{model_id}.svg")
+    assert resp.status_code == 200 and resp.mimetype == "image/svg+xml"
+    assert resp.data.count(b"<path") == 1 and len(resp.data) < 8192
+    assert b'width="512"' in resp.data  # QR_DEFAULT_SIZE
+
+    monkeypatch.setattr(qr_cache, "render_svg", _no_render)
+    assert client.get(f"/qr/{model_id}.svg").data == resp.data
+    assert client.get(f"/qr/{model_id}.svg",
+                      headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+
+
+def test_unknown_model_or_format_is_404(client, model_dir):
+    model_id, _ = model_dir
+    assert client.get("/qr/no-such-model.svg").status_code == 404
+    assert client.get(f"/qr/{model_id}.gif").status_code == 404
+
+
+def test_public_base_url_ignores_host_header(client, model_dir, monkeypatch):
+    model_id, _ = model_dir
+    monkeypatch.setitem(app.config, "PUBLIC_BASE_URL", "https://ar.example.com")
+    ours = client.get(f"/qr/{model_id}.svg")
+    spoofed = client.get(f"/qr/{model_id}.svg", headers={"Host": "evil.example"})
+    assert spoofed.headers["ETag"] == ours.headers["ETag"]
+    assert qr_cache.cache_key(f"https://ar.example.com/view/{model_id}", 512, "svg") == \
+        ours.headers["ETag"].strip('"')
+
+
+def test_model_qr_dir_is_capped(client, model_dir, monkeypatch):
+    model_id, path = model_dir
+    monkeypatch.setattr(qr_cache, "QR_MAX_PER_MODEL", 2)
+    for host in ("a.example", "b.example", "c.example"):
+        assert client.get(f"/qr/{model_id}.png", headers={"Host": host}).status_code == 200
+    assert len(os.listdir(os.path.join(path, "qr"))) == 2
@@ -0,0 +1,138 @@
+"""Hot queries must stay index-bound: EXPLAIN QUERY PLAN regression suite.
+
+Each query mirrors one issued by app.py / worker.py / version_manager.py.
+A plain "SCAN <table>" step (no index) fails the test; "SCAN ... USING
+INDEX" over a partial index is fine — the partial index only holds the
+rows the query wants. The tables are left un-ANALYZEd on purpose: without
+statistics SQLite plans as if tables were large, which is the case we care
+about.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, or_
+
+from models import (
+    AIGenerationJob, CameraView, ConversionJob, Folder, ModelHotspot, ModelLike,
+    ModelSave, ModelVersion, UploadSession, UserModel, db,
+)
+
+_FULL_SCAN = re.compile(r"^SCAN \w+$")
+NOW = datetime(2026, 1, 1)
+
+
+def _plan(query):
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), params
+    ).all()
+    return [row[3] for row in rows]
+
+
+def _assert_index_bound(query, sorted_by_index=False):
+    plan = _plan(query)
+    scans = [step for step in plan if _FULL_SCAN.match(step)]
+    assert not scans, f"full table scan in plan: {plan}"
+    if sorted_by_index:
+        assert not any("TEMP B-TREE" in step for step in plan), f"sort not served by index: {plan}"
+
+
+@pytest.fixture
+def schema(client):
+    return db
+
+
+def test_worker_queries(schema):
+    claim = ConversionJob.query.filter_by(status="pending").order_by(ConversionJob.created_at)
+    _assert_index_bound(claim, sorted_by_index=True)
+    _assert_index_bound(claim.filter(ConversionJob.lane.in_(["heavy"])), sorted_by_index=True)
+    _assert_index_bound(ConversionJob.query.filter(
+        ConversionJob.status == "processing", ConversionJob.lease_expires_at < NOW,
+    ))
+    _assert_index_bound(ConversionJob.query.filter(
+        ConversionJob.status == "processing", ConversionJob.started_at < NOW,
+        ConversionJob.lease_expires_at.is_(None),
+    ))
+    pending = ConversionJob.query.filter(ConversionJob.status == "pending")
+    _assert_index_bound(pending.with_entities(ConversionJob.user_id, func.min(ConversionJob.created_at))
+                        .group_by(ConversionJob.user_id))
+    _assert_index_bound(pending.filter(ConversionJob.created_at.in_([NOW]))
+                        .order_by(ConversionJob.created_at, ConversionJob.id))
+    _assert_index_bound(db.session.query(ConversionJob.user_id, ConversionJob.estimated_mem_mb).filter(
+        ConversionJob.status.in_(["processing", "completed", "failed"]),
+        ConversionJob.started_at >= NOW,
+    ))
+    _assert_index_bound(UploadSession.query.filter(
+        UploadSession.status == "uploading", UploadSession.updated_at < NOW,
+    ))
+
+
+def test_model_listing_queries(schema):
+    live = UserModel.deleted_at.is_(None)
+    _assert_index_bound(UserModel.query.filter(
+        UserModel.folder_id.is_(None), UserModel.user_id == 1, live
+    ))
+    _assert_index_bound(UserModel.query.filter(
+        UserModel.folder_id == 3, UserModel.user_id == 1, live
+    ))
+    _assert_index_bound(
+        UserModel.query.filter(UserModel.folder_id == 3, live).order_by(UserModel.upload_date.desc()).limit(4),
+        sorted_by_index=True,
+    )
+    _assert_index_bound(UserModel.query.filter(UserModel.folder_id == 3, live).with_entities(func.count()))
+    _assert_index_bound(
+        UserModel.query.filter(UserModel.user_id == 1, UserModel.id != "x", live)
+        .order_by(UserModel.upload_date.desc()).limit(9),
+        sorted_by_index=True,
+    )
+    _assert_index_bound(
+        UserModel.query.filter(UserModel.user_id == 1, UserModel.deleted_at.isnot(None))
+        .order_by(UserModel.deleted_at.desc()),
+        sorted_by_index=True,
+    )
+    _assert_index_bound(UserModel.query.filter(
+        UserModel.user_id == 1, UserModel.deleted_at < NOW - timedelta(days=30)
+    ))
+    _assert_index_bound(
+        db.session.query(func.sum(UserModel.file_size)).filter(UserModel.user_id == 1)
+    )
+    _assert_index_bound(Folder.query.filter_by(parent_id=None, user_id=1))
+
+
+def test_per_model_queries(schema):
+    _assert_index_bound(ModelLike.query.filter_by(model_id="m").with_entities(func.count()))
+    _assert_index_bound(ModelLike.query.filter_by(model_id="m", user_id=1))
+    _assert_index_bound(ModelLike.query.filter_by(model_id="m", session_id="s"))
+    _assert_index_bound(ModelSave.query.filter_by(model_id="m", user_id=1))
+    _assert_index_bound(
+        ModelHotspot.query.filter_by(model_id="m").order_by(ModelHotspot.created_at),
+        sorted_by_index=True,
+    )
+    _assert_index_bound(
+        CameraView.query.filter_by(model_id="m").order_by(CameraView.created_at),
+        sorted_by_index=True,
+    )
+    _assert_index_bound(
+        ModelVersion.query.filter_by(model_id="m").order_by(ModelVersion.version_number.desc()).limit(1),
+        sorted_by_index=True,
+    )
+    _assert_index_bound(ModelVersion.query.filter_by(model_id="m", version_number=2))
+    _assert_index_bound(
+        ModelVersion.query.filter_by(model_id="m").order_by(ModelVersion.created_at.desc()),
+        sorted_by_index=True,
+    )
+    _assert_index_bound(AIGenerationJob.query.filter(
+        AIGenerationJob.user_id == 1, AIGenerationJob.created_at >= NOW
+    ).with_entities(func.count()))
+    _assert_index_bound(AIGenerationJob.query.filter(AIGenerationJob.status == "generating"))
+    _assert_index_bound(AIGenerationJob.query.filter(
+        AIGenerationJob.status == "generating", AIGenerationJob.stage == "finalizing",
+        or_(AIGenerationJob.finalize_lease_expires_at.is_(None),
+            AIGenerationJob.finalize_lease_expires_at < NOW),
+    ))
@@ -0,0 +1,76 @@
+"""Shared state: one store that every worker process agrees on."""
+
+import multiprocessing
+import time
+
+import pytest
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import shared_state
+from shared_state import MemoryState, SQLiteState
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        return MemoryState()
+    return SQLiteState(str(tmp_path / "state.sqlite"))
+
+
+def test_basic_operations(state):
+    assert state.get("missing", "d") == "d"
+    state.set("k", {"a": [1, 2]})
+    assert state.get("k") == {"a": [1, 2]}
+    assert state.add("k", 1) is False
+    assert state.add("new", 1, ttl=60) is True
+    assert state.expires_at("new") > time.time()
+    state.delete("k")
+    assert state.get("k") is None
+
+    assert state.incr("c", ttl=60) == 1
+    assert state.incr("c", 4, ttl=60) == 5
+
+    state.set("gone", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert state.get("gone") is None
+    assert state.incr("gone", ttl=60) == 1
+
+    calls = []
+    assert state.cached("x", 60, lambda: calls.append(1) or 42) == 42
+    assert state.cached("x", 60, lambda: calls.append(1) or 42) == 42
+    assert calls == [1]
+
+    state.set("p:1", 1)
+    state.set("p_2", 1)
+    state.clear("p:")
+    assert state.get("p:1") is None and state.get("p_2") == 1
+
+
+def _hammer(path, n):
+    store = SQLiteState(path)
+    for _ in range(n):
+        store.incr("hits", ttl=60)
+
+
+def test_sqlite_counter_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_hammer, args=(path, 50)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert SQLiteState(path).get("hits") == 150
+
+
+def test_limiter_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_state, "_state", SQLiteState(str(tmp_path / "state.sqlite")))
+    limiter = FixedWindowRateLimiter(storage_from_string("shared://"))
+    limit = RateLimitItemPerMinute(2)
+    assert limiter.hit(limit, "user:1") and limiter.hit(limit, "user:1")
+    assert not limiter.hit(limit, "user:1")
+    # A second storage instance (another worker) sees the same counter.
+    assert not FixedWindowRateLimiter(storage_from_string("shared://")).hit(limit, "user:1")
+    assert limiter.hit(limit, "user:2")
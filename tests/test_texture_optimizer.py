@@ -0,0 +1,122 @@
+"""Texture stage: cap, re-encode and dedupe embedded images, then repack BIN."""
+
+import io
+
+import numpy as np
+import trimesh
+from PIL import Image
+from pygltflib import GLTF2, Image as GLTFImage, Material, NormalMaterialTexture, Texture, TextureInfo
+
+from converters import texture_optimizer
+from converters.glb_quality import BlobBuilder, repack_binary
+from glb_modifier import modify_glb
+
+
+def _png(image):
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _noise(size, mode="RGB", seed=0):
+    rng = np.random.default_rng(seed)
+    channels = len(mode)
+    data = rng.integers(0, 255, (size[1], size[0], channels), dtype=np.uint8)
+    return Image.fromarray(data, mode)
+
+
+def _textured_glb(tmp_path):
+    """Box GLB with: two identical 3000px PNGs, a cutout PNG and a normal map."""
+    path = tmp_path / "model.glb"
+    path.write_bytes(trimesh.creation.box().export(file_type="glb"))
+    gltf = GLTF2().load(str(path))
+
+    cutout = _noise((256, 256), "RGBA", seed=1)
+    alpha = np.zeros((256, 256), dtype=np.uint8)
+    alpha[:, 128:] = 255
+    cutout.putalpha(Image.fromarray(alpha))
+    payloads = [
+        _png(_noise((3000, 1500), seed=2)),
+        _png(_noise((3000, 1500), seed=2)),  # byte-identical duplicate
+        _png(cutout),
+        _png(_noise((512, 512), seed=3)),
+    ]
+    builder = BlobBuilder(gltf)
+    gltf.images, gltf.textures = [], []
+    for payload in payloads:
+        image = GLTFImage()
+        builder.add_image(image, payload, "image/png")
+        gltf.textures.append(Texture(source=len(gltf.images)))
+        gltf.images.append(image)
+    builder.commit()
+    gltf.materials = [
+        Material(pbrMetallicRoughness={"baseColorTexture": TextureInfo(index=0)}),
+        Material(pbrMetallicRoughness={"baseColorTexture": TextureInfo(index=1)}),
+        Material(
+            pbrMetallicRoughness={"baseColorTexture": TextureInfo(index=2)},
+            normalTexture=NormalMaterialTexture(index=3),
+            alphaMode="MASK",
+        ),
+    ]
+    gltf.meshes[0].primitives[0].material = 0
+    gltf.save(str(path))
+    return path
+
+
+def test_texture_stage_caps_dedupes_and_reencodes(tmp_path, monkeypatch):
+    monkeypatch.setattr(texture_optimizer, "TEXTURE_MAX_SIDE", 1024)
+    path = _textured_glb(tmp_path)
+    before = path.stat().st_size
+
+    stats = texture_optimizer.optimize_textures(str(path))
+    assert stats["deduped"] == 1 and stats["images_after"] == 3
+    assert path.stat().st_size < before / 2
+
+    gltf = GLTF2().load(str(path))
+    blob = gltf.binary_blob()
+    assert [t.source for t in gltf.textures] == [0, 0, 1, 2]
+    mimes = [img.mimeType for img in gltf.images]
+    assert mimes == ["image/jpeg", "image/png", "image/png"]  # alpha + normal map stay PNG
+
+    def decoded(idx):
+        bv = gltf.bufferViews[gltf.images[idx].bufferView]
+        return Image.open(io.BytesIO(blob[bv.byteOffset : bv.byteOffset + bv.byteLength]))
+
+    assert decoded(0).size == (1024, 512)
+    assert decoded(1).mode == "RGBA"
+    # Geometry accessors survived the repack.
+    scene = trimesh.load(str(path), force="scene")
+    assert len(scene.geometry) == 1
+
+
+def test_budget_scales_all_images_together():
+    targets = texture_optimizer._target_sizes(
+        {0: (4096, 4096), 1: (2048, 2048)}, max_side=4096, budget_mpx=5
+    )
+    total = sum(w * h for w, h in targets.values())
+    assert total <= 5_000_000
+    assert targets[0][0] == 2 * targets[1][0]
+
+
+def test_repack_drops_unreferenced_bytes(tmp_path):
+    path = tmp_path / "m.glb"
+    path.write_bytes(trimesh.creation.box().export(file_type="glb"))
+    gltf = GLTF2().load(str(path))
+    clean = len(gltf.binary_blob())
+    gltf.set_binary_blob(gltf.binary_blob() + b"\xff" * 4096)  # stale texture bytes
+    assert repack_binary(gltf) == clean
+
+
+def test_reapplying_a_texture_does_not_grow_the_file(tmp_path):
+    path = tmp_path / "model.glb"
+    path.write_bytes(trimesh.creation.box().export(file_type="glb"))
+    import base64
+
+    texture = base64.b64encode(_png(_noise((256, 256), seed=4))).decode()
+    mods = {"material": {"texture": texture}}
+    assert modify_glb(str(path), str(path), mods)
+    first = path.stat().st_size
+    assert modify_glb(str(path), str(path), mods)
+    gltf = GLTF2().load(str(path))
+    assert len(gltf.images) == 1 and gltf.images[0].mimeType == "image/jpeg"
+    assert path.stat().st_size <= first + 1024  # only a texture/sampler entry added
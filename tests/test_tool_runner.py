@@ -0,0 +1,86 @@
+"""The shared external-tool runner: slots, admission, cancellation, metrics."""
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from converters import tool_runner
+
+
+@pytest.fixture(autouse=True)
+def _isolated_slots(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool_runner, "SLOT_DIR", str(tmp_path / "slots"))
+    monkeypatch.setattr(tool_runner, "_local_semaphores", {})
+
+
+def _py(code):
+    return [sys.executable, "-c", code]
+
+
+def test_run_tool_collects_output_and_metrics():
+    r = tool_runner.run_tool(
+        "testtool", _py("import sys; print('hi'); sys.stderr.write('warn'); sys.exit(3)"), timeout=30
+    )
+    assert r.returncode == 3 and r.stdout.strip() == "hi" and r.stderr == "warn"
+    assert r.duration > 0 and r.peak_rss_mb and r.peak_rss_mb > 1
+    assert tool_runner.stats()["tools"]["testtool"]["failures"] >= 1
+
+
+def test_run_tool_timeout_kills_child():
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        tool_runner.run_tool("testtool", _py("import time; time.sleep(30)"), timeout=0.5)
+    assert time.monotonic() - start < 10
+
+
+def test_run_tool_truncates_output(monkeypatch):
+    monkeypatch.setattr(tool_runner, "OUTPUT_LIMIT", 1000)
+    r = tool_runner.run_tool(
+        "testtool", _py("import sys; sys.stderr.write('x' * 50000 + 'END')"), timeout=30
+    )
+    assert r.stderr.startswith("[...truncated...]") and r.stderr.endswith("END")
+    assert len(r.stderr) < 1100
+
+
+def test_concurrency_slot_serializes_runs(monkeypatch):
+    monkeypatch.setenv("TOOL_CONCURRENCY_SERIALTOOL", "1")
+    results = []
+
+    def run():
+        results.append(
+            tool_runner.run_tool("serialtool", _py("import time; time.sleep(0.4)"), timeout=30)
+        )
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(r.queued for r in results) >= 0.3
+
+
+def test_memory_admission_rejects_when_starved(monkeypatch):
+    monkeypatch.setattr(tool_runner, "available_memory_mb", lambda: 10)
+    with tool_runner.tool_slot("testtool", admission_timeout=0):
+        with pytest.raises(tool_runner.ToolAdmissionError):
+            tool_runner.run_tool("blender", _py("pass"), timeout=30, admission_timeout=0.2)
+    assert tool_runner.stats()["running"].get("blender", 0) == 0
+
+
+def test_memory_admission_passes_when_alone(monkeypatch):
+    # Less memory than blender's estimate, but nothing else to wait for.
+    monkeypatch.setattr(tool_runner, "available_memory_mb", lambda: 10)
+    r = tool_runner.run_tool("blender", _py("pass"), timeout=30, admission_timeout=0.2)
+    assert r.returncode == 0
+
+
+def test_cancel_event_stops_running_child():
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    with pytest.raises(tool_runner.ToolCancelled):
+        tool_runner.run_tool(
+            "testtool", _py("import time; time.sleep(30)"), timeout=60, cancel_event=cancel
+        )
@@ -3,6 +3,7 @@ USDZ must be regenerated — Quick Look serves the USDZ, so a stale one keeps
 showing the model at its pre-edit size in iPhone AR."""
 
 import os
+import time
 import uuid
 
 import pytest
@@ -32,6 +33,16 @@ def model_on_disk(client):
     shutil.rmtree(model_dir, ignore_errors=True)
 
 
+def wait_for_edit(client, status_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(status_url).get_json()
+        if body["status"] in ("completed", "failed"):
+            return body
+        time.sleep(0.05)
+    raise AssertionError(f"edit job still {body['status']} after {timeout}s")
+
+
 def test_save_modifications_refreshes_usdz(client, model_on_disk, monkeypatch):
     calls = []
     monkeypatch.setattr(app_module, "refresh_usdz_after_edit",
@@ -42,7 +53,9 @@ def test_save_modifications_refreshes_usdz(client, model_on_disk, monkeypatch):
         "modifications": {"transform": {"scale": 2.0}},
     })
     body = resp.get_json()
-    assert resp.status_code == 200 and body["success"], body
+    assert resp.status_code == 202 and body["success"], body
+    body = wait_for_edit(client, body["status_url"])
+    assert body["status"] == "completed", body
     assert calls and calls[0][0] == model_on_disk
     assert calls[0][1].endswith("model.glb")
 
@@ -0,0 +1,146 @@
+"""Delta version snapshots: storage scales with what changed, not model size."""
+
+import os
+import time
+
+import numpy as np
+import pytest
+import trimesh
+from pygltflib import GLTF2, Material, PbrMetallicRoughness
+
+import version_manager
+import version_store
+from models import ModelVersion, UserModel, db
+
+
+@pytest.fixture
+def model(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(version_manager, "CONVERTED_FOLDER", str(tmp_path))
+    monkeypatch.setattr(version_store, "MIN_SEGMENT_BYTES", 1024)
+    model_id = "versioned"
+    model_dir = tmp_path / model_id
+    model_dir.mkdir()
+    # Two separate meshes -> several bufferViews worth of binary data.
+    meshes = [
+        trimesh.creation.icosphere(subdivisions=4, radius=0.5),
+        trimesh.creation.box(extents=(0.2, 0.4, 0.6)),
+    ]
+    glb = model_dir / "model.glb"
+    glb.write_bytes(trimesh.Scene(meshes).export(file_type="glb"))
+    gltf = GLTF2().load(str(glb))
+    gltf.materials = [Material(pbrMetallicRoughness=PbrMetallicRoughness(baseColorFactor=[1, 1, 1, 1]))]
+    for mesh in gltf.meshes:
+        for prim in mesh.primitives:
+            prim.material = 0
+    gltf.save(str(glb))
+    db.session.add(UserModel(id=model_id, filename=str(model_dir / "model.glb"), file_type="glb"))
+    db.session.commit()
+    return model_dir
+
+
+def _recolor(path, rgba):
+    gltf = GLTF2().load(str(path))
+    gltf.materials[0].pbrMetallicRoughness.baseColorFactor = rgba
+    gltf.save(str(path))
+
+
+def _object_bytes(model_dir):
+    objects = model_dir / "versions" / "objects"
+    return sum(f.stat().st_size for f in objects.iterdir())
+
+
+def _mesh(data_or_path):
+    return trimesh.load(data_or_path, force="mesh", file_type="glb")
+
+
+def test_edits_store_deltas_and_restore(model, monkeypatch):
+    monkeypatch.setattr(version_store, "VERSION_KEYFRAME_INTERVAL", 3)
+    glb = model / "model.glb"
+    original = _mesh(str(glb))
+
+    v1 = version_manager.create_version("versioned", "upload")
+    assert v1.vertices == len(original.vertices) and v1.faces == len(original.faces)
+    assert v1.dimensions["max"] == pytest.approx(100.0, abs=0.01)
+    base = _object_bytes(model)
+    assert base >= os.path.getsize(glb) * 0.9
+
+    colors = [[1, 0, 0, 1], [0, 1, 0, 1], [0, 0, 1, 1], [1, 1, 0, 1]]
+    for rgba in colors:
+        _recolor(glb, rgba)
+        version_manager.create_version("versioned", "material")
+    # Four colour edits cost a few hundred bytes of JSON deltas, not 4 copies.
+    assert _object_bytes(model) - base < 4096
+
+    manifests = [version_store._load_manifest(str(model), n) for n in range(1, 6)]
+    assert [m["keyframe"] for m in manifests] == [True, False, False, True, False]
+
+    assert version_manager.restore_version("versioned", 3)
+    gltf = GLTF2().load(str(glb))
+    assert gltf.materials[0].pbrMetallicRoughness.baseColorFactor == colors[1]
+    assert np.allclose(_mesh(str(glb)).vertices, original.vertices)
+
+
+def test_delete_keeps_later_versions_restorable(model):
+    glb = model / "model.glb"
+    version_manager.create_version("versioned", "upload")
+    _recolor(glb, [0, 1, 0, 1])
+    version_manager.create_version("versioned", "material")
+    _recolor(glb, [0, 0, 1, 1])
+    version_manager.create_version("versioned", "material")
+
+    assert version_manager.delete_version("versioned", 1)
+    assert version_manager.delete_version("versioned", 2)
+    assert version_store._load_manifest(str(model), 3)["keyframe"]
+    assert not (model / "versions" / "v1.json").exists()
+
+    _recolor(glb, [1, 1, 1, 1])
+    assert version_manager.restore_version("versioned", 3)
+    gltf = GLTF2().load(str(glb))
+    assert gltf.materials[0].pbrMetallicRoughness.baseColorFactor == [0, 0, 1, 1]
+
+
+def test_download_streams_rebuilt_glb(client, model, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setitem(app_module.app.config, "CONVERTED_FOLDER", str(model.parent))
+    version_manager.create_version("versioned", "upload")
+    resp = client.get("/api/versions/versioned/download/1")
+    assert resp.status_code == 200
+    assert int(resp.headers["Content-Length"]) == len(resp.data)
+    assert len(_mesh(trimesh.util.wrap_as_stream(resp.data)).faces) == ModelVersion.query.one().faces
+
+
+def test_garbage_collection_spares_recent_objects(model):
+    version_manager.create_version("versioned", "upload")
+    digest, _ = version_store._put(str(model), b"snapshot still writing its manifest")
+    orphan = model / "versions" / "objects" / digest
+
+    assert version_store.collect_garbage(str(model)) == 0
+    assert orphan.exists()
+
+    size = orphan.stat().st_size
+    later = time.time() + version_store.VERSION_GC_GRACE_SECONDS + 1
+    assert version_store.collect_garbage(str(model), now=later) == size
+    assert not orphan.exists()
+    assert not list((model / "versions").glob("*.tmp.*"))
+    assert version_manager.restore_version("versioned", 1)
+
+
+def test_snapshot_compacts_a_copy_and_leaves_model_glb_alone(model):
+    from converters.glb_quality import BlobBuilder
+    from pygltflib import BufferView
+
+    glb = model / "model.glb"
+    gltf = GLTF2().load(str(glb))
+    builder = BlobBuilder(gltf)
+    offset = builder.append(np.zeros(20_000, dtype=np.float32).tobytes())
+    gltf.bufferViews.append(BufferView(buffer=0, byteOffset=offset, byteLength=80_000))
+    builder.commit()
+    gltf.save(str(glb))
+    before = glb.read_bytes()
+    stamp = glb.stat().st_mtime_ns
+
+    version = version_manager.create_version("versioned", "upload")
+    assert glb.read_bytes() == before and glb.stat().st_mtime_ns == stamp
+    assert version.file_size < len(before) - 70_000
+    assert not [p for p in os.listdir(model) if p.startswith(".snapshot-")]
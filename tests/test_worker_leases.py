@@ -0,0 +1,111 @@
+"""Worker claims are leases: an expired lease is reclaimed right away, a
+renewed one never is."""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+import app as app_module
+import worker
+from converters import tool_runner
+from models import ConversionJob, db
+
+
+def _job(**fields):
+    job = ConversionJob(id=str(uuid.uuid4()), payload={}, **fields)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_claim_records_lease(client):
+    job_id = _job()
+    job = worker.claim_next_job()
+    assert job.id == job_id
+    row = db.session.get(ConversionJob, job_id)
+    assert row.worker_id == worker.WORKER_ID
+    assert row.lease_expires_at > datetime.utcnow()
+
+
+def test_sweep_reclaims_expired_leases_only(client):
+    now = datetime.utcnow()
+    crashed = _job(status="processing", started_at=now - timedelta(seconds=40),
+                   worker_id="gone", lease_expires_at=now - timedelta(seconds=1))
+    healthy = _job(status="processing", started_at=now - timedelta(hours=2),
+                   worker_id="alive", lease_expires_at=now + timedelta(seconds=20))
+    inline = _job(status="processing", started_at=now - timedelta(minutes=5))
+
+    worker.requeue_stale_jobs()
+    assert db.session.get(ConversionJob, crashed).status == "pending"
+    assert db.session.get(ConversionJob, crashed).worker_id is None
+    assert db.session.get(ConversionJob, healthy).status == "processing"
+    assert db.session.get(ConversionJob, inline).status == "processing"
+
+
+def test_renewal_needs_the_lease(client):
+    job_id = _job()
+    worker.claim_next_job()
+    # claim_next_job hands back an object that looks pending in memory; the
+    # heartbeat works from its own session, so drop that local change.
+    db.session.expire_all()
+    before = db.session.get(ConversionJob, job_id).lease_expires_at
+    assert worker.renew_lease(job_id)
+    db.session.expire_all()
+    assert db.session.get(ConversionJob, job_id).lease_expires_at >= before
+
+    db.session.get(ConversionJob, job_id).worker_id = "someone-else"
+    db.session.commit()
+    assert not worker.renew_lease(job_id)
+
+
+def test_lost_lease_cancels_the_job_and_drops_its_result(client, monkeypatch):
+    job_id = _job()
+    monkeypatch.setattr(worker, "HEARTBEAT_INTERVAL", 0.05)
+    cancelled = []
+
+    def pipeline(payload, progress_callback):
+        # Meanwhile the lease expired and another worker took the job over.
+        db.session.execute(update(ConversionJob).where(ConversionJob.id == job_id)
+                           .values(worker_id="other-worker"))
+        db.session.commit()
+        event = tool_runner._scope.cancel_event
+        assert event.wait(5)  # the heartbeat noticed and cancelled our tools
+        cancelled.append(True)
+        progress_callback(80, "Optimizing", "")
+        return "stale-result"
+
+    monkeypatch.setattr(app_module, "_run_upload_pipeline", pipeline)
+    worker._run_claimed(worker.claim_next_job(), "main")
+    assert cancelled
+
+    db.session.expire_all()
+    row = db.session.get(ConversionJob, job_id)
+    assert (row.status, row.worker_id, row.model_id, row.error) == (
+        "processing", "other-worker", None, None)
+
+    # The new owner's result is the one that sticks.
+    assert app_module._write_job(row, "other-worker", status="completed", model_id="real-result")
+    assert not app_module._write_job(row, worker.WORKER_ID, status="failed")
+    db.session.expire_all()
+    row = db.session.get(ConversionJob, job_id)
+    assert (row.status, row.model_id) == ("completed", "real-result")
+
+
+def test_run_claimed_logs_the_status_written(client, monkeypatch, caplog):
+    import logging
+
+    job_id = _job()
+
+    def pipeline(payload, progress_callback):
+        db.session.execute(update(ConversionJob).where(ConversionJob.id == job_id)
+                           .values(worker_id="other-worker"))
+        db.session.commit()
+        return "stale-result"
+
+    monkeypatch.setattr(app_module, "_run_upload_pipeline", pipeline)
+    with caplog.at_level(logging.INFO, logger=worker.logger.name):
+        worker._run_claimed(worker.claim_next_job(), "main")
+    # The row still reads 'processing' (the new owner's); we wrote nothing.
+    assert f"Job {job_id} -> lease lost" in caplog.text
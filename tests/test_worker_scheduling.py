@@ -0,0 +1,72 @@
+"""Claim order is fair across users and size-aware: one user's batch of
+heavy jobs can't hold a small upload from someone else behind it."""
+
+import uuid
+from datetime import datetime, timedelta
+
+import worker
+from models import ConversionJob, db
+
+HEAVY_MB, SMALL_MB = 3000, 210
+
+
+def _job(user_id, mem_mb, minutes_ago=0, payload=None, **fields):
+    job = ConversionJob(
+        id=str(uuid.uuid4()), payload=payload or {}, user_id=user_id, estimated_mem_mb=mem_mb,
+        created_at=datetime.utcnow() - timedelta(minutes=minutes_ago), **fields,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_small_upload_overtakes_heavy_batch(client):
+    now = datetime.utcnow()
+    _job(1, HEAVY_MB, minutes_ago=3, status="processing", started_at=now)
+    batch = [_job(1, HEAVY_MB, minutes_ago=2) for _ in range(20)]
+    small = _job(2, SMALL_MB, minutes_ago=1)
+
+    assert worker.claim_next_job().id == small
+    # with the small job gone, the batch resumes in upload order
+    assert worker.claim_next_job().id == batch[0]
+
+
+def test_fast_lane_only_takes_small_jobs(client, tmp_path):
+    heavy = _job(1, HEAVY_MB, minutes_ago=2)
+    own_small = _job(1, SMALL_MB, minutes_ago=1)  # queued behind the user's own heavy job
+    # Jobs without an estimate are sized from their staged file.
+    small_file, big_file = tmp_path / "small.stl", tmp_path / "big.fbx"
+    small_file.write_bytes(b"\0" * 1024)
+    with open(big_file, "wb") as fh:
+        fh.truncate(200 * 1024 * 1024)
+    unestimated_small = _job(2, None, minutes_ago=3, payload={
+        "temp_file_path": str(small_file), "file_extension": ".stl"})
+    unestimated_big = _job(3, None, minutes_ago=3, payload={
+        "temp_file_path": str(big_file), "file_extension": ".fbx"})
+
+    fast = {worker.claim_next_job(fast_lane=True).id, worker.claim_next_job(fast_lane=True).id}
+    assert fast == {own_small, unestimated_small}
+    assert worker.claim_next_job(fast_lane=True) is None
+    assert {worker.claim_next_job().id, worker.claim_next_job().id} == {heavy, unestimated_big}
+
+
+def test_waiting_heavy_job_is_not_starved(client):
+    heavy = _job(1, HEAVY_MB, minutes_ago=60)
+    _job(2, SMALL_MB)
+    assert worker.claim_next_job().id == heavy
+
+
+def test_lost_race_moves_to_next_candidate(client, monkeypatch):
+    first = _job(1, SMALL_MB, minutes_ago=2)
+    second = _job(2, SMALL_MB, minutes_ago=1)
+    real_claim = worker._claim
+
+    def racing_claim(job_id):
+        if job_id == first:
+            # another worker claims it between ordering and claiming
+            db.session.get(ConversionJob, first).status = "processing"
+            db.session.commit()
+        return real_claim(job_id)
+
+    monkeypatch.setattr(worker, "_claim", racing_claim)
+    assert worker.claim_next_job().id == second
@@ -6,14 +6,21 @@ Handles version tracking for model modifications
 import os
 import shutil
 import logging
+import tempfile
 from datetime import datetime
+
+import numpy as np
+
+import version_store
 from models import db, ModelVersion, UserModel
 from config import CONVERTED_FOLDER
+from converters.glb_quality import compact_glb
 
 logger = logging.getLogger(__name__)
 
-# Reject absurdly large meshes before loading them into memory (DoS guard).
-MAX_VERTICES = int(os.environ.get("MAX_MODEL_VERTICES", 5_000_000))
+# Component type -> divisor for normalized integer accessors
+# (KHR_mesh_quantization stores min/max in the integer domain).
+_NORMALIZED_MAX = {5120: 127.0, 5121: 255.0, 5122: 32767.0, 5123: 65535.0}
 
 
 def _model_dir(model_id):
@@ -28,6 +35,76 @@ def _atomic_copy(src, dst):
     os.replace(tmp, dst)
 
 
+def _node_matrix(node):
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=float).reshape(4, 4).T
+    t = np.array(node.get("translation", [0, 0, 0]), dtype=float)
+    x, y, z, w = node.get("rotation", [0, 0, 0, 1])
+    s = np.array(node.get("scale", [1, 1, 1]), dtype=float)
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * s
+    matrix[:3, 3] = t
+    return matrix
+
+
+def _scene_stats(doc):
+    """(vertices, faces, bounds) of the default scene, from the JSON chunk alone.
+
+    Counts every mesh instance (like trimesh's concatenated scene) and takes
+    bounds from POSITION accessor min/max under each node's world transform,
+    so no geometry has to be decoded.
+    """
+    nodes = doc.get("nodes") or []
+    meshes = doc.get("meshes") or []
+    accessors = doc.get("accessors") or []
+    scenes = doc.get("scenes") or []
+    if scenes:
+        roots = scenes[doc.get("scene", 0) or 0].get("nodes") or []
+    else:
+        children = {c for node in nodes for c in node.get("children") or []}
+        roots = [i for i in range(len(nodes)) if i not in children]
+
+    vertices = faces = 0
+    corners = []
+    stack = [(i, np.eye(4)) for i in roots]
+    while stack:
+        index, parent = stack.pop()
+        node = nodes[index]
+        world = parent @ _node_matrix(node)
+        stack.extend((c, world) for c in node.get("children") or [])
+        if node.get("mesh") is None:
+            continue
+        for prim in meshes[node["mesh"]].get("primitives") or []:
+            pos = (prim.get("attributes") or {}).get("POSITION")
+            if pos is None:
+                continue
+            accessor = accessors[pos]
+            count = int(accessor.get("count") or 0)
+            vertices += count
+            if prim.get("mode", 4) == 4:
+                idx = prim.get("indices")
+                faces += (int(accessors[idx].get("count") or 0) if idx is not None else count) // 3
+            if "min" in accessor and "max" in accessor:
+                lo, hi = np.array(accessor["min"][:3], float), np.array(accessor["max"][:3], float)
+                if accessor.get("normalized"):
+                    scale = _NORMALIZED_MAX.get(accessor.get("componentType"), 1.0)
+                    lo, hi = np.maximum(lo / scale, -1.0), hi / scale
+                box = np.array([[x, y, z, 1.0] for x in (lo[0], hi[0])
+                                for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+                corners.append((box @ world.T)[:, :3])
+    if corners:
+        points = np.vstack(corners)
+        bounds = np.array([points.min(axis=0), points.max(axis=0)])
+    else:
+        bounds = np.zeros((2, 3))
+    return vertices, faces, bounds
+
+
 def create_version(model_id, operation_type, operation_details=None, comment=None):
     """
     Create a new version entry for a model
@@ -51,37 +128,36 @@ def create_version(model_id, operation_type, operation_details=None, comment=Non
         last_version = ModelVersion.query.filter_by(model_id=model_id).order_by(ModelVersion.version_number.desc()).first()
         version_number = (last_version.version_number + 1) if last_version else 1
         
-        # Copy current model file to version storage
         current_file = os.path.join(_model_dir(model_id), 'model.glb')
-        version_file = os.path.join(_model_dir(model_id), f'version_{version_number}.glb')
-
-        if os.path.exists(current_file):
-            shutil.copy2(current_file, version_file)
-            file_size = os.path.getsize(version_file)
-        else:
+        if not os.path.exists(current_file):
             logger.error(f"Current model file not found: {current_file}")
             return None
+        # Snapshot a compacted copy, not whatever edits left behind. The live
+        # model.glb is left alone: callers don't all hold the model's write
+        # lock, and rewriting it would invalidate the LOD and mesh caches.
+        fd, compacted = tempfile.mkstemp(prefix='.snapshot-', suffix='.glb', dir=_model_dir(model_id))
+        os.close(fd)
+        try:
+            snapshot_source = current_file
+            try:
+                if compact_glb(current_file, output_path=compacted):
+                    snapshot_source = compacted
+            except Exception as e:
+                logger.warning(f"Compaction before version snapshot skipped: {e}")
 
-        # Get model metadata
-        import trimesh
-        mesh = trimesh.load(current_file, force='mesh')
-
-        if isinstance(mesh, trimesh.Scene):
-            meshes = list(mesh.geometry.values())
-            if meshes:
-                mesh = trimesh.util.concatenate(meshes)
-
-        if not hasattr(mesh, 'vertices'):
-            logger.error(f"Model {model_id} produced no mesh; skipping version metadata")
-            return None
-        if len(mesh.vertices) > MAX_VERTICES:
-            logger.error(
-                f"Model {model_id} mesh too large "
-                f"({len(mesh.vertices)} > {MAX_VERTICES} verts); skipping version"
+            # Stored as a delta on the previous version (see version_store):
+            # only changed bufferViews and JSON keys cost new bytes.
+            parent = last_version.version_number if last_version and version_store.is_manifest(last_version.filename) else None
+            version_file, doc, written = version_store.snapshot(
+                _model_dir(model_id), snapshot_source, version_number, parent=parent
             )
-            return None
+            file_size = os.path.getsize(snapshot_source)
+        finally:
+            os.remove(compacted)
 
-        bounds = mesh.bounds
+        # Stats from the JSON chunk; loading the mesh just for these used to
+        # dominate snapshot time on large models.
+        vertex_count, face_count, bounds = _scene_stats(doc)
         dimensions = bounds[1] - bounds[0]
         
         # Create version entry
@@ -98,15 +174,18 @@ def create_version(model_id, operation_type, operation_details=None, comment=Non
                 'z': round(float(dimensions[2] * 100), 2),
                 'max': round(float(max(dimensions) * 100), 2)
             },
-            vertices=len(mesh.vertices),
-            faces=len(mesh.faces),
+            vertices=vertex_count,
+            faces=face_count,
             comment=comment
         )
         
         db.session.add(version)
         db.session.commit()
         
-        logger.info(f"Created version {version_number} for model {model_id}: {operation_type}")
+        logger.info(
+            f"Created version {version_number} for model {model_id}: {operation_type} "
+            f"({written} new bytes stored)"
+        )
         return version
         
     except Exception as e:
@@ -149,10 +228,14 @@ def restore_version(model_id, version_number):
         # Create a new version before restoring (to preserve current state)
         create_version(model_id, 'restore', {'restored_from': version_number}, f'Restored from version {version_number}')
 
-        # Copy version file to current model atomically (temp + rename), so a
-        # failure mid-copy never leaves a truncated model.glb being served.
+        # Rebuild (or, for full-copy versions from before the delta store,
+        # copy) into model.glb atomically, so a failure midway never leaves a
+        # truncated model.glb being served.
         current_file = os.path.join(_model_dir(model_id), 'model.glb')
-        _atomic_copy(version.filename, current_file)
+        if version_store.is_manifest(version.filename):
+            version_store.materialize(_model_dir(model_id), version_number, current_file)
+        else:
+            _atomic_copy(version.filename, current_file)
 
         # Update model metadata
         model = UserModel.query.get(model_id)
@@ -186,15 +269,26 @@ def delete_version(model_id, version_number):
             logger.error(f"Version {version_number} not found for model {model_id}")
             return False
         
+        # Later versions may replay their JSON through this one; turn those
+        # into keyframes before it goes away.
+        version_file = version.filename
+        if version_store.is_manifest(version_file):
+            remaining = [
+                number for (number,) in db.session.query(ModelVersion.version_number)
+                .filter(ModelVersion.model_id == model_id, ModelVersion.id != version.id)
+            ]
+            version_store.detach(_model_dir(model_id), version_number, remaining)
+
         # Commit the DB deletion first; only remove the file once the row is
         # gone. Removing the file first risks losing data if the commit fails.
-        version_file = version.filename
         db.session.delete(version)
         db.session.commit()
 
         if version_file and os.path.exists(version_file):
             try:
                 os.remove(version_file)
+                if version_store.is_manifest(version_file):
+                    version_store.collect_garbage(_model_dir(model_id))
             except OSError as file_err:
                 logger.warning(f"Version row deleted but file remains {version_file}: {file_err}")
 
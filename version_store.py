@@ -0,0 +1,372 @@
+"""
+Version Store
+Content-addressed, delta-based storage for model version snapshots.
+
+A version used to be a full copy of model.glb, so ten colour tweaks on a
+100 MB model cost a gigabyte. A GLB is a JSON chunk plus a BIN chunk cut
+into bufferViews, and an edit usually touches a few JSON keys and few (or
+no) bufferViews. So a snapshot is stored as a small manifest:
+
+- the BIN chunk split at bufferView boundaries into segments, each stored
+  once under its SHA-256 in objects/ (unchanged segments are shared with
+  every other version);
+- the JSON chunk, either whole (a keyframe) or as a delta of the top-level
+  keys that changed since the parent version.
+
+A full JSON keyframe is written every VERSION_KEYFRAME_INTERVAL versions so
+rebuilding never walks a long chain. Layout under <model dir>/versions/:
+v<N>.json manifests and objects/<sha256> blobs.
+
+Snapshots and garbage collection of one model take the store lock
+(versions/.lock), so a collection can't delete a blob that a snapshot has
+found or written but not yet referenced from its manifest.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEYFRAME_INTERVAL = int(os.environ.get("VERSION_KEYFRAME_INTERVAL", 10))
+# Adjacent bufferViews are merged into segments of at least this many bytes
+# so a model with thousands of tiny accessors doesn't become thousands of
+# object files. Boundaries only depend on the bufferView layout, so an edit
+# that keeps the layout still reproduces identical segments.
+MIN_SEGMENT_BYTES = int(os.environ.get("VERSION_MIN_SEGMENT_BYTES", 64 * 1024))
+# Unreferenced objects younger than this survive garbage collection, in case
+# a writer that doesn't take the store lock (an older process) is mid-snapshot.
+VERSION_GC_GRACE_SECONDS = int(os.environ.get("VERSION_GC_GRACE_SECONDS", 3600))
+
+try:
+    import fcntl
+except ImportError:  # Windows: process-local locking only
+    fcntl = None
+
+_FORMAT = 1
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class VersionStoreError(ValueError):
+    """A manifest or object is missing or unreadable."""
+
+
+def store_dir(model_dir):
+    return os.path.join(model_dir, "versions")
+
+
+def manifest_path(model_dir, version_number):
+    return os.path.join(store_dir(model_dir), f"v{version_number}.json")
+
+
+def is_manifest(path):
+    return bool(path) and path.endswith(".json")
+
+
+def _object_path(model_dir, digest):
+    return os.path.join(store_dir(model_dir), "objects", digest)
+
+
+@contextlib.contextmanager
+def _store_lock(model_dir):
+    """Exclusive use of a model's version store (threads + processes)."""
+    root = store_dir(model_dir)
+    os.makedirs(root, exist_ok=True)
+    with _locks_guard:
+        local = _locks.setdefault(root, threading.Lock())
+    with local:
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(os.path.join(root, ".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # closing the fd drops the flock
+
+
+def _write_atomic(path, data, mode="wb"):
+    """Write via a unique temp file in the same directory, then os.replace.
+
+    The temp name keeps ".tmp." so collect_garbage leaves it alone.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.tmp.")
+    try:
+        with os.fdopen(fd, mode) as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _put(model_dir, data):
+    """Store bytes by content hash; returns (digest, bytes newly written)."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _object_path(model_dir, digest)
+    if os.path.exists(path):
+        os.utime(path)  # reused: restart its garbage-collection grace period
+        return digest, 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(path, data)
+    return digest, len(data)
+
+
+def _get(model_dir, digest):
+    try:
+        with open(_object_path(model_dir, digest), "rb") as fh:
+            return fh.read()
+    except OSError as e:
+        raise VersionStoreError(f"Version object {digest} is missing") from e
+
+
+def _put_json(model_dir, obj):
+    return _put(model_dir, json.dumps(obj, separators=(",", ":"), sort_keys=True).encode())
+
+
+def _get_json(model_dir, digest):
+    return json.loads(_get(model_dir, digest))
+
+
+def read_glb(path):
+    """(parsed JSON chunk, BIN chunk offset, BIN chunk length) of a GLB file."""
+    with open(path, "rb") as fh:
+        header = fh.read(20)
+        if len(header) < 20 or header[:4] != b"glTF":
+            raise VersionStoreError("not a GLB file")
+        json_len, chunk_type = struct.unpack_from("<I4s", header, 12)
+        if chunk_type != b"JSON":
+            raise VersionStoreError("GLB JSON chunk missing")
+        doc = json.loads(fh.read(json_len))
+        bin_offset, bin_len = 20 + json_len, 0
+        chunk = fh.read(8)
+        if len(chunk) == 8:
+            length, chunk_type = struct.unpack("<I4s", chunk)
+            if chunk_type == b"BIN\x00":
+                bin_offset, bin_len = bin_offset + 8, length
+    return doc, bin_offset, bin_len
+
+
+def _segment_bounds(doc, bin_len):
+    """Split points of the BIN chunk: bufferView edges, merged to MIN_SEGMENT_BYTES."""
+    edges = {0, bin_len}
+    for view in doc.get("bufferViews") or []:
+        if view.get("buffer", 0) != 0:
+            continue
+        start = int(view.get("byteOffset", 0))
+        for edge in (start, start + int(view.get("byteLength", 0))):
+            if 0 < edge < bin_len:
+                edges.add(edge)
+    bounds, start = [], 0
+    for edge in sorted(edges)[1:]:
+        if edge - start >= MIN_SEGMENT_BYTES or edge == bin_len:
+            bounds.append((start, edge))
+            start = edge
+    return bounds
+
+
+def _json_delta(parent, doc):
+    changed = {key: value for key, value in doc.items() if parent.get(key) != value}
+    removed = sorted(key for key in parent if key not in doc)
+    return {"set": changed, "unset": removed}
+
+
+def _load_manifest(model_dir, version_number):
+    try:
+        with open(manifest_path(model_dir, version_number)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError) as e:
+        raise VersionStoreError(f"Version {version_number} manifest is unreadable") from e
+
+
+def _write_manifest(model_dir, version_number, manifest):
+    path = manifest_path(model_dir, version_number)
+    _write_atomic(path, json.dumps(manifest), mode="w")
+    return path
+
+
+def resolve_json(model_dir, version_number):
+    """The full JSON chunk of a version, replayed from its nearest keyframe."""
+    chain = []
+    manifest = _load_manifest(model_dir, version_number)
+    while not manifest["keyframe"]:
+        chain.append(manifest["json_delta"])
+        manifest = _load_manifest(model_dir, manifest["parent"])
+    doc = _get_json(model_dir, manifest["json"])
+    for digest in reversed(chain):
+        delta = _get_json(model_dir, digest)
+        doc.update(delta["set"])
+        for key in delta["unset"]:
+            doc.pop(key, None)
+    return doc
+
+
+def snapshot(model_dir, glb_path, version_number, parent=None):
+    """Store glb_path as version_number, as a delta on version `parent` if given.
+
+    Returns (manifest path, parsed JSON chunk, bytes newly written). Falls
+    back to a keyframe when the parent is too far from its keyframe or its
+    manifest can't be read.
+    """
+    doc, bin_offset, bin_len = read_glb(glb_path)
+    with _store_lock(model_dir):
+        return _snapshot(model_dir, glb_path, version_number, parent, doc, bin_offset, bin_len)
+
+
+def _snapshot(model_dir, glb_path, version_number, parent, doc, bin_offset, bin_len):
+    written = 0
+    segments = []
+    with open(glb_path, "rb") as fh:
+        for start, end in _segment_bounds(doc, bin_len):
+            fh.seek(bin_offset + start)
+            digest, new = _put(model_dir, fh.read(end - start))
+            segments.append([digest, end - start])
+            written += new
+
+    manifest = {"format": _FORMAT, "size": os.path.getsize(glb_path), "bin": segments,
+                "keyframe": True, "depth": 0}
+    if parent is not None:
+        try:
+            parent_manifest = _load_manifest(model_dir, parent)
+            if parent_manifest["depth"] + 1 < VERSION_KEYFRAME_INTERVAL:
+                digest, new = _put_json(model_dir, _json_delta(resolve_json(model_dir, parent), doc))
+                manifest.update(keyframe=False, parent=parent, json_delta=digest,
+                                depth=parent_manifest["depth"] + 1)
+                written += new
+        except VersionStoreError as e:
+            logger.warning(f"Version {version_number}: parent {parent} unusable, writing a keyframe: {e}")
+    if manifest["keyframe"]:
+        digest, new = _put_json(model_dir, doc)
+        manifest["json"] = digest
+        written += new
+    return _write_manifest(model_dir, version_number, manifest), doc, written
+
+
+def iter_glb(model_dir, version_number):
+    """(total size, iterator of byte chunks) rebuilding a version's GLB."""
+    manifest = _load_manifest(model_dir, version_number)
+    json_bytes = json.dumps(resolve_json(model_dir, version_number), separators=(",", ":")).encode()
+    json_bytes += b" " * (-len(json_bytes) % 4)
+    bin_len = sum(length for _, length in manifest["bin"])
+    bin_pad = -bin_len % 4
+    total = 12 + 8 + len(json_bytes) + (8 + bin_len + bin_pad if bin_len else 0)
+
+    def chunks():
+        yield struct.pack("<4sII", b"glTF", 2, total)
+        yield struct.pack("<I4s", len(json_bytes), b"JSON") + json_bytes
+        if bin_len:
+            yield struct.pack("<I4s", bin_len + bin_pad, b"BIN\x00")
+            for digest, length in manifest["bin"]:
+                data = _get(model_dir, digest)
+                if len(data) != length:
+                    raise VersionStoreError(f"Version object {digest} is corrupt")
+                yield data
+            yield b"\x00" * bin_pad
+
+    return total, chunks()
+
+
+def materialize(model_dir, version_number, dest):
+    """Rebuild a version's GLB at dest (atomically)."""
+    _, chunks = iter_glb(model_dir, version_number)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=f"{os.path.basename(dest)}.tmp.")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def detach(model_dir, version_number, remaining):
+    """Prepare for deleting a version: children that replay their JSON
+    through it are rewritten as keyframes. `remaining` are the version
+    numbers that stay."""
+    with _store_lock(model_dir):
+        _detach(model_dir, version_number, remaining)
+
+
+def _detach(model_dir, version_number, remaining):
+    for number in remaining:
+        try:
+            manifest = _load_manifest(model_dir, number)
+        except VersionStoreError:
+            continue
+        if manifest.get("parent") != version_number:
+            continue
+        doc = resolve_json(model_dir, number)
+        digest, _ = _put_json(model_dir, doc)
+        manifest.update(keyframe=True, json=digest, depth=0)
+        manifest.pop("parent", None)
+        manifest.pop("json_delta", None)
+        _write_manifest(model_dir, number, manifest)
+        # Its own delta children now hang off a keyframe: fix their depth so
+        # the keyframe interval stays honest.
+        _rebase_depths(model_dir, number, remaining)
+
+
+def _rebase_depths(model_dir, version_number, remaining):
+    depth = _load_manifest(model_dir, version_number)["depth"]
+    for number in sorted(n for n in remaining if n > version_number):
+        try:
+            manifest = _load_manifest(model_dir, number)
+        except VersionStoreError:
+            continue
+        if manifest.get("parent") == version_number:
+            manifest["depth"] = depth + 1
+            _write_manifest(model_dir, number, manifest)
+            _rebase_depths(model_dir, number, remaining)
+
+
+def collect_garbage(model_dir, now=None):
+    """Remove objects no manifest references; returns bytes freed.
+
+    Runs under the store lock and spares objects touched within
+    VERSION_GC_GRACE_SECONDS.
+    """
+    root = store_dir(model_dir)
+    objects = os.path.join(root, "objects")
+    if not os.path.isdir(objects):
+        return 0
+    with _store_lock(model_dir):
+        return _collect(root, objects, (now or time.time()) - VERSION_GC_GRACE_SECONDS)
+
+
+def _collect(root, objects, cutoff):
+    live = set()
+    for name in os.listdir(root):
+        if not (name.startswith("v") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(root, name)) as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        live.update(digest for digest, _ in manifest["bin"])
+        live.add(manifest.get("json") or manifest.get("json_delta"))
+    freed = 0
+    for digest in os.listdir(objects):
+        # ".tmp." names are writes still in flight.
+        if digest in live or ".tmp." in digest:
+            continue
+        path = os.path.join(objects, digest)
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        freed += stat.st_size
+    return freed
@@ -7,16 +7,48 @@ JOB_QUEUE=true, otherwise the web process keeps converting inline and this
 worker simply idles.
 
 On PostgreSQL, jobs are claimed with FOR UPDATE SKIP LOCKED so multiple
-workers never grab the same job. SQLite (local dev) falls back to a plain
-query — run a single worker there.
+workers never grab the same job. SQLite (local dev) claims with an UPDATE
+guarded on status = 'pending', so a lost race just moves on to the next
+candidate.
+
+A claim is a lease: the job row records this worker's id and a
+lease_expires_at that a heartbeat thread pushes forward while the job runs.
+A worker that dies (OOM kill, redeploy) stops renewing, and the sweep
+reclaims its job as soon as the lease runs out, instead of after a fixed
+timeout that a healthy long job could also exceed. A worker that is alive
+but lost its lease anyway (e.g. a long DB outage) cancels the job, and its
+result writes are fenced on worker_id, so only the new owner's result is
+committed.
+
+Which pending job to claim is a fair-queueing decision rather than plain
+FIFO, so one user's batch of large FBX files can't hold every other
+user's small STL behind it. Each job has a cost (its pre-flight peak
+memory estimate, which already folds in file size and format class).
+Each user is charged for the cost of their jobs that started within
+FAIR_WINDOW_SECONDS. The claim takes, across users, the oldest pending
+job whose "virtual finish" (the user's recent charge plus the job's own
+cost, minus an ageing credit so big jobs can't starve) is lowest. The
+charge comes from the job table itself, so every worker agrees on it
+without any shared counters. On top of that, FAST_LANE_SLOTS threads
+per worker only take jobs at or below FAST_LANE_MAX_MB. Small uploads
+therefore keep moving while the main loop is busy with a heavy
+conversion.
 """
 
 import logging
 import os
+import signal
+import socket
+import threading
 import time
+import uuid
 from datetime import datetime, timedelta
 
-from app import app, db, run_conversion_job
+from sqlalchemy import func, or_, update
+
+from app import _finalize_ai_job, app, db, run_conversion_job
+from converters import tool_runner
+from converters.preflight import size_only_mem_mb
 from models import ConversionJob
 
 logging.basicConfig(
@@ -26,48 +58,254 @@ logging.basicConfig(
 logger = logging.getLogger("worker")
 
 POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", "2"))
-# Jobs stuck in 'processing' longer than this are assumed orphaned
-# (worker crashed mid-job) and put back to pending.
+# Jobs stuck in 'processing' longer than this without a lease (run inline by
+# a web process that crashed) are assumed orphaned and put back to pending.
 STALE_PROCESSING_MINUTES = int(os.environ.get("WORKER_STALE_MINUTES", "30"))
+# A claimed job's lease; the heartbeat renews it every third of this, so a
+# couple of missed beats (DB hiccup) don't cost the lease.
+LEASE_SECONDS = int(os.environ.get("WORKER_LEASE_SECONDS", "30"))
+HEARTBEAT_INTERVAL = LEASE_SECONDS / 3
+# How often the expired-lease sweep runs.
+SWEEP_INTERVAL = float(os.environ.get("WORKER_SWEEP_INTERVAL", "5"))
+# How often the external-tool telemetry (tool_runner.stats) is logged.
+TOOL_STATS_INTERVAL = float(os.environ.get("WORKER_TOOL_STATS_INTERVAL", "300"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:64]
+# Comma-separated job lanes this worker claims (ConversionJob.lane, set by
+# the upload pre-flight). Empty = all lanes; e.g. run a large-memory worker
+# with WORKER_LANES=heavy and the regular ones with WORKER_LANES=standard.
+WORKER_LANES = [
+    lane.strip() for lane in os.environ.get("WORKER_LANES", "").split(",") if lane.strip()
+]
+# Fair scheduling: how far back a user's started jobs count against them,
+# and how much cost (MB) a pending job is forgiven per minute of waiting.
+FAIR_WINDOW_SECONDS = int(os.environ.get("WORKER_FAIR_WINDOW_SECONDS", "900"))
+FAIR_AGING_MB_PER_MINUTE = float(os.environ.get("WORKER_FAIR_AGING_MB_PER_MINUTE", "100"))
+# Reserved fast lane: extra claim threads per worker that only take jobs
+# whose estimated peak memory is at most FAST_LANE_MAX_MB. 0 disables it.
+FAST_LANE_SLOTS = int(os.environ.get("WORKER_FAST_LANE_SLOTS", "1"))
+FAST_LANE_MAX_MB = int(os.environ.get("WORKER_FAST_LANE_MAX_MB", "320"))
+
 
+def job_cost(job):
+    """Scheduling cost of a job in MB of estimated peak conversion memory."""
+    if job.estimated_mem_mb:
+        return job.estimated_mem_mb
+    # Pre-flight couldn't read the headers; size it from the staged file.
+    payload = job.payload or {}
+    try:
+        size = os.path.getsize(payload.get("temp_file_path") or "")
+    except OSError:
+        size = 0
+    return size_only_mem_mb(size, payload.get("file_extension"))
 
-def claim_next_job():
-    """Atomically claim the oldest pending job; returns it or None."""
-    query = (
-        ConversionJob.query.filter_by(status="pending")
-        .order_by(ConversionJob.created_at)
+
+def _user_charges(now):
+    """Cost each user has started within the fairness window."""
+    rows = (
+        db.session.query(ConversionJob.user_id, ConversionJob.estimated_mem_mb)
+        .filter(
+            ConversionJob.status.in_(["processing", "completed", "failed"]),
+            ConversionJob.started_at >= now - timedelta(seconds=FAIR_WINDOW_SECONDS),
+        )
+        .all()
     )
+    charges = {}
+    for user_id, mem_mb in rows:
+        # Unestimated finished jobs have no staged file left to measure.
+        charges[user_id] = charges.get(user_id, 0) + (mem_mb or size_only_mem_mb(0, None))
+    return charges
+
+
+def _pending(max_cost=None):
+    query = ConversionJob.query.filter(ConversionJob.status == "pending")
+    if WORKER_LANES:
+        query = query.filter(ConversionJob.lane.in_(WORKER_LANES))
+    if max_cost is not None:
+        # Rows queued before estimates were backfilled have none; they are
+        # sized by job_cost in schedule_order instead.
+        query = query.filter(
+            or_(ConversionJob.estimated_mem_mb.is_(None), ConversionJob.estimated_mem_mb <= max_cost)
+        )
+    return query
+
+
+def _candidates(max_cost=None):
+    """Each user's oldest eligible pending job (anonymous uploads share one queue)."""
+    heads = (
+        _pending(max_cost)
+        .with_entities(ConversionJob.user_id, func.min(ConversionJob.created_at))
+        .group_by(ConversionJob.user_id)
+        .all()
+    )
+    if not heads:
+        return []
+    wanted = set(heads)
+    jobs = (
+        _pending(max_cost)
+        .filter(ConversionJob.created_at.in_({created for _, created in heads}))
+        .order_by(ConversionJob.created_at, ConversionJob.id)
+        .all()
+    )
+    candidates, seen = [], set()
+    for job in jobs:
+        if (job.user_id, job.created_at) in wanted and job.user_id not in seen:
+            seen.add(job.user_id)
+            candidates.append(job)
+    return candidates
+
+
+def schedule_order(max_cost=None, now=None):
+    """Pending jobs to try, best first, by virtual finish time."""
+    now = now or datetime.utcnow()
+    charges = _user_charges(now)
+
+    def virtual_finish(job):
+        waited_minutes = (now - job.created_at).total_seconds() / 60 if job.created_at else 0
+        finish = (charges.get(job.user_id, 0) + job_cost(job)
+                  - FAIR_AGING_MB_PER_MINUTE * waited_minutes)
+        return finish, job.created_at or now, job.id
+
+    candidates = _candidates(max_cost)
+    if max_cost is not None:
+        candidates = [job for job in candidates if job_cost(job) <= max_cost]
+    return sorted(candidates, key=virtual_finish)
+
+
+def _claim(job_id):
+    """Flip one pending job to processing under this worker's lease, or None
+    if another worker got there first."""
+    now = datetime.utcnow()
+    lease = {
+        "status": "processing",
+        "started_at": now,
+        "worker_id": WORKER_ID,
+        "lease_expires_at": now + timedelta(seconds=LEASE_SECONDS),
+    }
     if db.engine.dialect.name == "postgresql":
-        query = query.with_for_update(skip_locked=True)
-    job = query.first()
-    if job is None:
-        db.session.rollback()  # release any FOR UPDATE transaction
+        # A row another worker is claiming is skipped, not waited on.
+        job = (
+            ConversionJob.query.filter_by(id=job_id, status="pending")
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.session.rollback()
+            return None
+        for field, value in lease.items():
+            setattr(job, field, value)
+        db.session.commit()
+        return job
+    # SQLite has no row locks; the status guard makes the UPDATE the claim.
+    result = db.session.execute(
+        update(ConversionJob)
+        .where(ConversionJob.id == job_id, ConversionJob.status == "pending")
+        .values(**lease)
+    )
+    db.session.commit()
+    if result.rowcount != 1:
         return None
-    job.status = "processing"
-    job.started_at = datetime.utcnow()
+    return db.session.get(ConversionJob, job_id, populate_existing=True)
+
+
+def claim_next_job(fast_lane=False):
+    """Atomically claim the fairest pending job; returns it or None.
+
+    fast_lane restricts the claim to jobs of at most FAST_LANE_MAX_MB.
+    """
+    order = [job.id for job in schedule_order(FAST_LANE_MAX_MB if fast_lane else None)]
+    db.session.rollback()  # end the read transaction before claiming
+    for job_id in order:
+        job = _claim(job_id)
+        if job is None:
+            continue
+        # The DB row is now authoritatively 'processing' (so a crash before
+        # run_conversion_job is recoverable once the lease expires).
+        # run_conversion_job owns the attempts increment and the terminal
+        # status transition; we hand it an in-memory object that looks
+        # pending so those transitions stay uniform with the inline path.
+        # The brief in-memory/DB disagreement is intentional.
+        job.status = "pending"
+        return job
+    return None
+
+
+def renew_lease(job_id):
+    """Extend this worker's lease on job_id; False if the lease was lost."""
+    result = db.session.execute(
+        update(ConversionJob)
+        .where(
+            ConversionJob.id == job_id,
+            ConversionJob.worker_id == WORKER_ID,
+            ConversionJob.status == "processing",
+        )
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS))
+    )
     db.session.commit()
-    # The DB row is now authoritatively 'processing' (so a crash before
-    # run_conversion_job is recoverable by the stale sweep). run_conversion_job
-    # owns the attempts increment and the terminal status transition; we hand it
-    # an in-memory object that looks pending so those transitions stay uniform
-    # with the inline path. The brief in-memory/DB disagreement is intentional.
-    job.status = "pending"
-    return job
+    return result.rowcount == 1
+
+
+class Heartbeat:
+    """Renews a job's lease from a background thread while the job runs.
+
+    `lost` is set once a renewal finds the lease gone; the job run checks it
+    (and its running tool is killed through tool_runner.cancel_scope).
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"lease-{job_id[:8]}", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=HEARTBEAT_INTERVAL)
+
+    def _run(self):
+        with app.app_context():
+            while not self._stop.wait(HEARTBEAT_INTERVAL):
+                try:
+                    if not renew_lease(self.job_id):
+                        # Reclaimed after we missed the lease (long DB outage):
+                        # another worker may be running it now.
+                        logger.error(f"Lost the lease on job {self.job_id}; cancelling it")
+                        self.lost.set()
+                        return
+                except Exception as e:
+                    logger.warning(f"Lease renewal for job {self.job_id} failed: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
 
 
 def requeue_stale_jobs():
     """Recover orphaned 'processing' jobs (crashed worker).
 
+    Worker-claimed jobs are orphaned once their lease expires; jobs without
+    a lease (inline runs) fall back to the STALE_PROCESSING_MINUTES age.
+
     run_conversion_job increments and commits `attempts` *before* the pipeline
     runs, so a hard crash mid-conversion still persists the attempt. We respect
     max_attempts here: a job that keeps crashing the worker (toxic input) is
     marked failed instead of being requeued forever (poison-pill protection).
     """
-    cutoff = datetime.utcnow() - timedelta(minutes=STALE_PROCESSING_MINUTES)
-    stale = ConversionJob.query.filter(
+    now = datetime.utcnow()
+    expired = ConversionJob.query.filter(
         ConversionJob.status == "processing",
-        ConversionJob.started_at < cutoff,
+        ConversionJob.lease_expires_at < now,
     ).all()
+    unleased = ConversionJob.query.filter(
+        ConversionJob.status == "processing",
+        ConversionJob.started_at < now - timedelta(minutes=STALE_PROCESSING_MINUTES),
+        ConversionJob.lease_expires_at.is_(None),
+    ).all()
+    stale = expired + unleased
     for job in stale:
         staged = (job.payload or {}).get("temp_file_path")
         if staged and not os.path.exists(staged):
@@ -77,7 +315,7 @@ def requeue_stale_jobs():
             logger.warning(f"Stale job {job.id} source missing; marking failed")
             job.status = "failed"
             job.error = "Source file is no longer available — please re-upload the model."
-            job.finished_at = datetime.utcnow()
+            job.finished_at = now
         elif (job.attempts or 0) >= (job.max_attempts or 1):
             logger.error(
                 f"Stale job {job.id} exhausted attempts "
@@ -85,36 +323,99 @@ def requeue_stale_jobs():
             )
             job.status = "failed"
             job.error = "Conversion worker crashed repeatedly on this job."
-            job.finished_at = datetime.utcnow()
+            job.finished_at = now
         else:
-            logger.warning(f"Requeueing stale job {job.id} (started {job.started_at})")
+            logger.warning(
+                f"Requeueing stale job {job.id} (worker {job.worker_id or 'inline'}, "
+                f"lease {job.lease_expires_at or 'none'})"
+            )
             job.status = "pending"
+        job.worker_id = None
+        job.lease_expires_at = None
     if stale:
         db.session.commit()
 
 
+def _run_claimed(job, lane_name):
+    logger.info(
+        f"Processing job {job.id} on {lane_name} lane "
+        f"(attempt {(job.attempts or 0) + 1}, ~{job_cost(job)} MB)"
+    )
+    with Heartbeat(job.id) as heartbeat, tool_runner.cancel_scope(heartbeat.lost):
+        status = run_conversion_job(job, cancel_event=heartbeat.lost)
+    logger.info(f"Job {job.id} -> {status or 'lease lost'}")
+
+
+def fast_lane_loop(stop):
+    """Claim loop of one reserved fast-lane slot."""
+    with app.app_context():
+        while not stop.is_set():
+            try:
+                job = claim_next_job(fast_lane=True)
+                if job is None:
+                    stop.wait(POLL_INTERVAL)
+                    continue
+                _run_claimed(job, "fast")
+            except Exception as e:
+                logger.error(f"Fast lane loop error: {e}", exc_info=True)
+                try:
+                    db.session.rollback()
+                except Exception:
+                    pass
+                stop.wait(POLL_INTERVAL)
+            finally:
+                db.session.remove()
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
 def main():
     logger.info(
-        f"Conversion worker started (poll {POLL_INTERVAL}s, "
-        f"db {db.engine.dialect.name})"
+        f"Conversion worker {WORKER_ID} started (poll {POLL_INTERVAL}s, "
+        f"lease {LEASE_SECONDS}s, db {db.engine.dialect.name}, "
+        f"lanes {','.join(WORKER_LANES) or 'all'}, "
+        f"fast lane {FAST_LANE_SLOTS}x <= {FAST_LANE_MAX_MB} MB)"
     )
-    last_stale_sweep = 0.0
+    # Start the FBX probe's warm forkserver now rather than on the first
+    # FBX upload, so that job doesn't pay the interpreter + import cost.
+    from converters import fbx_probe
+
+    if fbx_probe.warm_pool():
+        logger.info("FBX probe forkserver warmed")
+    # Meshy generations advance here too; the shared-state leader key keeps
+    # this and the web process from both polling.
+    import ai_poller
+
+    ai_poller.ensure_running(app, _finalize_ai_job)
+    stop = threading.Event()
+    for slot in range(FAST_LANE_SLOTS):
+        threading.Thread(
+            target=fast_lane_loop, args=(stop,), name=f"fast-lane-{slot}", daemon=True
+        ).start()
+    # A redeploy sends SIGTERM; stop like Ctrl-C so running tools get killed
+    # instead of outliving the worker.
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    last_stale_sweep = last_stats = time.monotonic()
     while True:
         try:
-            if time.monotonic() - last_stale_sweep > 60:
+            if time.monotonic() - last_stale_sweep > SWEEP_INTERVAL:
                 requeue_stale_jobs()
                 last_stale_sweep = time.monotonic()
+            if time.monotonic() - last_stats > TOOL_STATS_INTERVAL:
+                logger.info(f"Tool stats: {tool_runner.stats()}")
+                last_stats = time.monotonic()
 
             job = claim_next_job()
             if job is None:
                 time.sleep(POLL_INTERVAL)
                 continue
-
-            logger.info(f"Processing job {job.id} (attempt {(job.attempts or 0) + 1})")
-            run_conversion_job(job)
-            logger.info(f"Job {job.id} -> {job.status}")
+            _run_claimed(job, "main")
         except KeyboardInterrupt:
-            logger.info("Worker stopped")
+            stop.set()
+            killed = tool_runner.cancel_running()
+            logger.info(f"Worker stopped ({killed} running tool(s) killed)")
             break
         except Exception as e:
             logger.error(f"Worker loop error: {e}", exc_info=True)